@@ -0,0 +1,347 @@
+#!/usr/bin/env python3
+"""
+Stand-in `yt-dlp` for the offline benchmarks (see offline.py).
+
+Understands the subset of yt-dlp's command line that mdl's builders emit and
+behaves like yt-dlp would against the local media server:
+
+- `URL` / `--load-info-json FILE`: "extract" (derive an info dict from the
+  URL), download it over HTTP into the `-o` template, honoring --limit-rate,
+  --sleep-interval and --no-overwrites, then run the requested
+  post-processors (-x/--audio-format, --embed-metadata, --remux-video) with
+  the real ffmpeg when one is on PATH (ExtractAudio takes
+  --postprocessor-args "ExtractAudio+ffmpeg_o:...").
+- `--flat-playlist -J URL`: the server answers playlist URLs with the JSON.
+- `-F`: a one-row format table.
+- `--cookies-from-browser B`: "decrypts" the browser's cookie database (a
+  fixed delay per run); with `--cookies FILE` the jar is written to FILE on
+  exit, with or without a URL, as yt-dlp does.
+- `--print-to-file TEMPLATE FILE`, `--progress-template` and `--newline`
+  render the same template fields mdl relies on.
+
+Errors from the server come back the way yt-dlp reports them
+("ERROR: ... HTTP Error 429: Too Many Requests") with exit code 1.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+_FLAGS = {
+    "-x", "--add-metadata", "--embed-metadata", "--embed-thumbnail", "--write-thumbnail",
+    "--ignore-errors", "--continue", "--no-overwrites", "--newline", "--flat-playlist",
+    "-J", "-F", "--ignore-config", "--enable-file-urls", "--keep-video", "--lazy-playlist", "--skip-download",
+}
+_STAGES = ("pre_process", "after_filter", "video", "before_dl", "post_process", "after_move", "after_video", "playlist")
+_FIELD = re.compile(r"%\((?P<key>[^)]*)\)(?P<spec>[-#0 +]*\d*(?:\.\d+)?)(?P<conv>[sdj])")
+_CODECS = {"mp3": "libmp3lame", "opus": "libopus", "flac": "flac", "m4a": "aac", "wav": "pcm_s16le"}
+_CHUNK = 64 * 1024
+_COOKIE_DB_SECONDS = 0.5
+# Codecs of the media the local server hosts (see offline.make_media).
+_SOURCE_CODECS = {
+    "m4a": {"acodec": "mp4a.40.2", "vcodec": "none"},
+    "mp4": {"acodec": "mp4a.40.2", "vcodec": "mp4v.20.9"},
+    "opus": {"acodec": "opus", "vcodec": "none"},
+    "mp3": {"acodec": "mp3", "vcodec": "none"},
+}
+
+
+def _parse(argv: List[str]) -> Tuple[Dict[str, Any], List[str]]:
+    opts: Dict[str, Any] = {"print_to_file": [], "progress_template": {}}
+    positional: List[str] = []
+    it = iter(argv)
+    for arg in it:
+        if arg in _FLAGS:
+            opts[arg] = True
+        elif arg == "--print-to-file":
+            opts["print_to_file"].append((next(it), next(it)))
+        elif arg == "--progress-template":
+            kind, _, tpl = next(it).partition(":")
+            opts["progress_template"][kind] = tpl
+        elif arg.startswith("-"):
+            opts[arg] = next(it)
+        else:
+            positional.append(arg)
+    return opts, positional
+
+
+def _lookup(obj: Any, key: str) -> Any:
+    if key == "":
+        return obj
+    for alt in key.split("|"):
+        cur = obj
+        path, _, fields = alt.partition("{")
+        for part in [p for p in path.split(".") if p]:
+            cur = cur.get(part) if isinstance(cur, dict) else None
+        if fields:
+            names = fields.rstrip("}").split(",")
+            cur = {n: cur[n] for n in names if isinstance(cur, dict) and cur.get(n) is not None}
+        if cur is not None:
+            return cur
+    return None
+
+
+def render(tpl: str, obj: Dict[str, Any], *, sanitize: bool = True) -> str:
+    """
+    yt-dlp output-template rendering, for the field forms mdl uses. Path
+    separators in field values are replaced, as in file names, unless
+    `sanitize` is off (--print templates).
+    """
+    def _one(m: "re.Match[str]") -> str:
+        value = _lookup(obj, m.group("key"))
+        conv = m.group("conv")
+        if conv == "j":
+            return json.dumps(value, ensure_ascii=False)
+        if value is None:
+            return "NA"
+        if conv == "d":
+            return ("%" + m.group("spec") + "d") % int(value)
+        return str(value).replace("/", "⧸") if sanitize else str(value)
+
+    return _FIELD.sub(_one, tpl.replace("%%", "\x00")).replace("\x00", "%")
+
+
+def _rate(raw: Optional[str]) -> Optional[float]:
+    if not raw:
+        return None
+    m = re.fullmatch(r"([\d.]+)([KMG]?)", raw.strip().upper())
+    if not m:
+        return None
+    return float(m.group(1)) * {"": 1, "K": 1 << 10, "M": 1 << 20, "G": 1 << 30}[m.group(2)]
+
+
+def _error(msg: str) -> int:
+    print(f"ERROR: {msg}", file=sys.stderr, flush=True)
+    return 1
+
+
+def _open(url: str):
+    try:
+        return urllib.request.urlopen(url, timeout=30)
+    except urllib.error.HTTPError as e:
+        raise RuntimeError(f"[generic] Unable to download webpage: HTTP Error {e.code}: {e.reason}")
+    except OSError as e:
+        raise RuntimeError(f"[generic] Unable to download webpage: {e}")
+
+
+def extract(url: str) -> Dict[str, Any]:
+    """The info dict yt-dlp's generic extractor would return for a media URL."""
+    parts = urlsplit(url)
+    name = Path(parts.path).name
+    stem, _, ext = name.rpartition(".")
+    video_id = stem + (f"-{parts.query}" if parts.query else "")
+    return {
+        "id": video_id,
+        "title": stem,
+        "uploader": "mdl-bench",
+        "extractor": "generic",
+        "extractor_key": "Generic",
+        "webpage_url": url,
+        "original_url": url,
+        "url": url,
+        "ext": ext or "bin",
+        "format_id": "0",
+        **_SOURCE_CODECS.get(ext, {}),
+    }
+
+
+def _emit_progress(opts: Dict[str, Any], kind: str, progress: Dict[str, Any], info: Dict[str, Any]) -> None:
+    tpl = opts["progress_template"].get(kind)
+    if tpl is not None:
+        print(render(tpl, {"progress": progress, "info": info}), flush=True)
+
+
+def download(info: Dict[str, Any], dest: Path, opts: Dict[str, Any]) -> None:
+    rate = _rate(opts.get("--limit-rate"))
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    part = dest.with_name(dest.name + ".part")
+    started = time.monotonic()
+    last = 0.0
+    done = 0
+    if info["url"].startswith("file:") and not opts.get("--enable-file-urls"):
+        raise RuntimeError("file:// URLs are disabled by default in yt-dlp for security reasons. Use --enable-file-urls to enable at your own risk.")
+    with _open(info["url"]) as resp, open(part, "wb") as fh:
+        total = int(resp.headers.get("Content-Length") or 0) or None
+        while True:
+            chunk = resp.read(_CHUNK)
+            if not chunk:
+                break
+            fh.write(chunk)
+            done += len(chunk)
+            elapsed = time.monotonic() - started
+            if rate:
+                ahead = done / rate - elapsed
+                if ahead > 0:
+                    time.sleep(ahead)
+            if elapsed - last >= 0.1:
+                last = elapsed
+                speed = done / elapsed if elapsed > 0 else None
+                _emit_progress(opts, "download", {
+                    "status": "downloading", "downloaded_bytes": done, "total_bytes": total,
+                    "speed": speed, "eta": ((total - done) / speed if total and speed else None),
+                    "elapsed": elapsed, "filename": str(dest),
+                }, info)
+    os.replace(part, dest)
+    _emit_progress(opts, "download", {
+        "status": "finished", "downloaded_bytes": done, "total_bytes": done,
+        "elapsed": time.monotonic() - started, "filename": str(dest),
+    }, info)
+    print(f"[download] 100% of {done} bytes in {time.monotonic() - started:.2f}s", flush=True)
+
+
+def _ffmpeg(args: List[str]) -> None:
+    ffmpeg = shutil.which("ffmpeg")
+    if ffmpeg is None:
+        return
+    subprocess.run([ffmpeg, "-nostdin", "-hide_banner", "-loglevel", "error", "-y", *args], check=True)
+
+
+def _postprocessor(
+    opts: Dict[str, Any], info: Dict[str, Any], name: str, src: Path, dst: Path, args: List[str], *, keep: bool = False
+) -> Path:
+    """Run one ffmpeg step src -> dst (a plain copy/rename without ffmpeg)."""
+    _emit_progress(opts, "postprocess", {"status": "started", "postprocessor": name}, info)
+    tmp = dst.with_name(f"{dst.stem}.temp{dst.suffix}")
+    if shutil.which("ffmpeg") is not None:
+        _ffmpeg(["-i", str(src), *args, str(tmp)])
+    else:
+        shutil.copyfile(src, tmp)
+    os.replace(tmp, dst)
+    if src != dst and not keep:
+        src.unlink(missing_ok=True)
+    info["filepath"] = str(dst)
+    _emit_progress(opts, "postprocess", {"status": "finished", "postprocessor": name}, info)
+    return dst
+
+
+def _pp_output_args(opts: Dict[str, Any], name: str) -> List[str]:
+    """Extra ffmpeg output args for one post-processor (--postprocessor-args NAME+ffmpeg_o:ARGS)."""
+    raw = opts.get("--postprocessor-args", "")
+    key, sep, args = raw.partition(":")
+    return args.split() if sep and key == f"{name}+ffmpeg_o" else []
+
+
+def postprocess(info: Dict[str, Any], path: Path, opts: Dict[str, Any]) -> Path:
+    if opts.get("-x"):
+        fmt = opts.get("--audio-format", "best")
+        if fmt not in ("best", path.suffix.lstrip(".")):
+            args = ["-vn", "-c:a", _CODECS.get(fmt, "copy"), *_pp_output_args(opts, "ExtractAudio")]
+            path = _postprocessor(
+                opts, info, "ExtractAudio", path, path.with_suffix(f".{fmt}"), args, keep=bool(opts.get("--keep-video"))
+            )
+    remux = opts.get("--remux-video")
+    if remux and path.suffix.lstrip(".") != remux:
+        path = _postprocessor(opts, info, "VideoRemuxer", path, path.with_suffix(f".{remux}"), ["-c", "copy"])
+    if opts.get("--embed-metadata") or opts.get("--add-metadata"):
+        path = _postprocessor(
+            opts, info, "Metadata", path, path,
+            ["-map", "0", "-c", "copy", "-metadata", f"title={info['title']}", "-metadata", f"artist={info['uploader']}"],
+        )
+    return path
+
+
+def _print_to_file(opts: Dict[str, Any], info: Dict[str, Any], stage: str) -> None:
+    for tpl, target in opts["print_to_file"]:
+        when, sep, rest = tpl.partition(":")
+        if sep and when in _STAGES:
+            tpl = rest
+        else:
+            when = "video"
+        if when == stage:
+            with open(target, "a", encoding="utf-8") as fh:
+                fh.write(render(tpl, info, sanitize=False) + "\n")
+
+
+def _final_ext(opts: Dict[str, Any], info: Dict[str, Any]) -> str:
+    if opts.get("-x") and opts.get("--audio-format", "best") != "best":
+        return opts["--audio-format"]
+    return opts.get("--remux-video") or info["ext"]
+
+
+def run_item(info: Dict[str, Any], opts: Dict[str, Any]) -> int:
+    dest = Path(render(opts.get("-o", "%(title)s.%(ext)s"), info))
+    info["_filename"] = info["filepath"] = info["filename"] = str(dest)
+    _print_to_file(opts, info, "video")
+    if opts.get("--skip-download"):
+        return 0
+
+    final = dest.with_suffix("." + _final_ext(opts, info))
+    if opts.get("--no-overwrites") and final.exists() and final != dest:
+        print(f"[download] {final} has already been downloaded", flush=True)
+        info["filepath"] = str(final)
+        _print_to_file(opts, info, "after_move")
+        return 0
+
+    if dest.exists():
+        print(f"[download] {dest} has already been downloaded", flush=True)
+    else:
+        sleep = opts.get("--sleep-interval")
+        if sleep:
+            time.sleep(float(sleep))
+        download(info, dest, opts)
+
+    path = postprocess(info, dest, opts)
+    info["filepath"] = str(path)
+    _print_to_file(opts, info, "after_move")
+    return 0
+
+
+def _browser_cookies(opts: Dict[str, Any]) -> None:
+    browser = opts.get("--cookies-from-browser")
+    if not browser:
+        return
+    time.sleep(_COOKIE_DB_SECONDS)
+    if opts.get("--cookies"):
+        Path(opts["--cookies"]).write_text(
+            f"# Netscape HTTP Cookie File\n127.0.0.1\tFALSE\t/\tFALSE\t0\tbrowser\t{browser}\n", encoding="utf-8"
+        )
+
+
+def main(argv: List[str]) -> int:
+    opts, positional = _parse(argv)
+    _browser_cookies(opts)
+    try:
+        if opts.get("--load-info-json"):
+            lines = Path(opts["--load-info-json"]).read_text(encoding="utf-8").splitlines()
+            info = json.loads([ln for ln in lines if ln.strip()][-1])
+        elif positional:
+            url = positional[-1]
+            if opts.get("--flat-playlist"):
+                with _open(url) as resp:
+                    listing = json.loads(resp.read().decode("utf-8"))
+                items = opts.get("--playlist-items") or opts.get("-I")
+                if items:
+                    first, _, last = items.partition(":")
+                    listing["entries"] = listing["entries"][int(first) - 1:int(last) if last else None]
+                sys.stdout.write(json.dumps(listing) + "\n")
+                return 0
+            with _open(url.replace("/media/", "/head/", 1)):
+                pass  # extraction round trip (the server's simulated latency)
+            info = extract(url)
+        else:
+            return _error("You must provide at least one URL.")
+
+        if opts.get("-F"):
+            _print_to_file(opts, info, "video")
+            print(f"[info] Available formats for {info['id']}:")
+            print("ID EXT  RESOLUTION")
+            print(f"0  {info['ext']:<4} unknown")
+            return 0
+        return run_item(info, opts)
+    except (RuntimeError, subprocess.CalledProcessError) as e:
+        return _error(str(e))
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
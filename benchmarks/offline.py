@@ -0,0 +1,427 @@
+"""
+End-to-end benchmarks for mdl that need no network access.
+
+mdl runs for real (fresh config dir, subprocess engine) against a stub
+`yt-dlp` (fake_yt_dlp.py) that downloads from a local HTTP server serving
+synthetic media. When ffmpeg is on PATH the media is real audio/video and the
+stub runs the same ffmpeg post-processing steps yt-dlp would; without it the
+media is random bytes and post-processing is a file copy.
+
+Scenarios:
+    overhead     per-invocation cost of cli.main -> run_app -> builder ->
+                 run_command, as the difference to running the printed
+                 yt-dlp command directly
+    batch        `mdl batch` throughput at several --jobs levels
+    postprocess  seconds per item for every `audio-format` value (needs ffmpeg)
+
+Usage:
+    python benchmarks/offline.py                    # all scenarios
+    python benchmarks/offline.py batch --jobs 1 2 4 8 --items 32
+    python benchmarks/offline.py --quick --check    # CI: exit 1 on a regression
+    python benchmarks/offline.py --json out.json    # also record raw results
+"""
+
+from __future__ import annotations
+
+import argparse
+import contextlib
+import json
+import os
+import re
+import shlex
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+from urllib.parse import parse_qs, urlsplit
+
+ROOT = Path(__file__).resolve().parent.parent
+BUDGET_FILE = Path(__file__).with_name("offline_budget.json")
+FAKE_YT_DLP = Path(__file__).with_name("fake_yt_dlp.py")
+
+sys.path.insert(0, str(ROOT))
+
+from mdl.core.config_store import ALLOWED  # noqa: E402
+
+_RUNNER = "import sys; from mdl.cli import main; main(sys.argv[1:])"
+_ALIAS = re.compile(r"~\d+(?=\.[^.]+$)")
+_MiB = 1024 * 1024
+
+
+# --- local media server -------------------------------------------------------
+
+
+class MediaServer:
+    """
+    Serves files from `media_dir` on 127.0.0.1:
+      /media/NAME           the file, at most `rate` bytes/s per connection
+      /head/NAME            empty answer after `latency` seconds (extraction)
+      /playlist?list=PFX    flat-playlist JSON of every file starting with PFX
+    NAME may carry an alias suffix (`song~07.m4a` serves `song.m4a`) so one
+    source file can stand in for many distinct items.
+    """
+
+    def __init__(self, media_dir: Path, *, rate: Optional[float], latency: float) -> None:
+        self.media_dir = media_dir
+        self.rate = rate
+        self.latency = latency
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *_args: Any) -> None:
+                pass
+
+            def do_GET(self) -> None:
+                parts = urlsplit(self.path)
+                kind, _, name = parts.path.lstrip("/").partition("/")
+                if kind == "playlist":
+                    return self._json(server.playlist(parse_qs(parts.query).get("list", [""])[0]))
+                path = server.media_dir / _ALIAS.sub("", name)
+                if kind not in ("media", "head") or not name or not path.is_file():
+                    return self.send_error(404)
+                if kind == "head":
+                    time.sleep(server.latency)
+                    return self._json({})
+                self._file(path)
+
+            def _json(self, payload: Any) -> None:
+                body = json.dumps(payload).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _file(self, path: Path) -> None:
+                self.send_response(200)
+                self.send_header("Content-Type", "application/octet-stream")
+                self.send_header("Content-Length", str(path.stat().st_size))
+                self.end_headers()
+                started = time.monotonic()
+                sent = 0
+                with open(path, "rb") as fh:
+                    while True:
+                        chunk = fh.read(64 * 1024)
+                        if not chunk:
+                            return
+                        self.wfile.write(chunk)
+                        sent += len(chunk)
+                        if server.rate:
+                            ahead = sent / server.rate - (time.monotonic() - started)
+                            if ahead > 0:
+                                time.sleep(ahead)
+
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._httpd.daemon_threads = True
+        self.base = f"http://127.0.0.1:{self._httpd.server_address[1]}"
+
+    def url(self, name: str) -> str:
+        return f"{self.base}/media/{name}"
+
+    def playlist(self, prefix: str) -> Dict[str, Any]:
+        names = sorted(p.name for p in self.media_dir.iterdir() if p.name.startswith(prefix))
+        return {
+            "id": prefix,
+            "title": f"{prefix} playlist",
+            "entries": [{"id": n, "title": n, "url": self.url(n)} for n in names],
+        }
+
+    def __enter__(self) -> "MediaServer":
+        threading.Thread(target=self._httpd.serve_forever, name="mdl-bench-http", daemon=True).start()
+        return self
+
+    def __exit__(self, *_exc: Any) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+
+def make_media(media_dir: Path, name: str, *, seconds: float) -> Path:
+    """
+    Synthetic source file `name` (.m4a audio or .mp4 video) of `seconds`
+    length: real media when ffmpeg is available, otherwise random bytes of
+    about the same size (128 kbit/s audio, ~1 Mbit/s video).
+    """
+    path = media_dir / name
+    ffmpeg = shutil.which("ffmpeg")
+    video = path.suffix == ".mp4"
+    if ffmpeg is None:
+        size = int(seconds * (1_000_000 if video else 128_000) / 8)
+        path.write_bytes(os.urandom(size))
+        return path
+
+    sine = ["-f", "lavfi", "-i", f"sine=frequency=440:sample_rate=44100:duration={seconds}"]
+    if video:
+        args = ["-f", "lavfi", "-i", f"testsrc=size=640x360:rate=25:duration={seconds}", *sine,
+                "-c:v", "mpeg4", "-q:v", "6", "-c:a", "aac", "-b:a", "128k", "-shortest"]
+    else:
+        args = [*sine, "-c:a", "aac", "-b:a", "128k"]
+    subprocess.run([ffmpeg, "-nostdin", "-loglevel", "error", "-y", *args, str(path)], check=True)
+    return path
+
+
+# --- mdl sandbox --------------------------------------------------------------
+
+
+class Sandbox:
+    """Temporary config dir, library and PATH with the stub yt-dlp first."""
+
+    def __init__(self, base: Path) -> None:
+        self.config = base / "config"
+        self.out = base / "library"
+        self.bin = base / "bin"
+        self.bin.mkdir(parents=True)
+        stub = self.bin / "yt-dlp"
+        stub.write_text(f'#!/bin/sh\nexec "{sys.executable}" "{FAKE_YT_DLP}" "$@"\n', encoding="utf-8")
+        stub.chmod(0o755)
+
+        self.env = dict(os.environ)
+        self.env.update({
+            "PATH": f"{self.bin}{os.pathsep}{os.environ.get('PATH', '')}",
+            "MDL_CONFIG_DIR": str(self.config),
+            "MDL_NO_DAEMON": "1",
+            "PYTHONPATH": str(ROOT),
+        })
+        # Every item comes from one local host: no per-host cap, so `--jobs` alone sets concurrency.
+        self.configure(preset="fast", engine="subprocess", cover="off", host_jobs="off", out=str(self.out))
+
+    def mdl(self, *argv: str) -> float:
+        """Run `mdl ARGV` in a fresh interpreter; wall seconds."""
+        return self.run([sys.executable, "-c", _RUNNER, *argv])
+
+    def run(self, cmd: List[str]) -> float:
+        started = time.perf_counter()
+        p = subprocess.run(cmd, env=self.env, stdin=subprocess.DEVNULL, capture_output=True, text=True)
+        elapsed = time.perf_counter() - started
+        if p.returncode != 0:
+            tail = "\n".join((p.stdout + p.stderr).splitlines()[-10:])
+            raise SystemExit(f"{cmd[-4:]} exited {p.returncode}:\n{tail}")
+        return elapsed
+
+    def configure(self, **settings: str) -> None:
+        for name, value in settings.items():
+            self.mdl(name.replace("_", "-"), value)
+
+    def printed_command(self, *argv: str) -> List[str]:
+        """The yt-dlp argument list `mdl ARGV --print` shows."""
+        p = subprocess.run(
+            [sys.executable, "-c", _RUNNER, *argv, "--print"], env=self.env, capture_output=True, text=True, check=True
+        )
+        line = next(ln for ln in p.stdout.splitlines() if ln.startswith("[mdl] exec: "))
+        return shlex.split(line[len("[mdl] exec: "):])
+
+    def clear_library(self) -> None:
+        shutil.rmtree(self.out, ignore_errors=True)
+
+
+@contextlib.contextmanager
+def _quiet() -> Iterator[None]:
+    """Send fd 1/2 (including child processes) to /dev/null."""
+    sys.stdout.flush()
+    sys.stderr.flush()
+    saved = os.dup(1), os.dup(2)
+    devnull = os.open(os.devnull, os.O_WRONLY)
+    try:
+        os.dup2(devnull, 1)
+        os.dup2(devnull, 2)
+        yield
+    finally:
+        sys.stdout.flush()
+        sys.stderr.flush()
+        os.dup2(saved[0], 1)
+        os.dup2(saved[1], 2)
+        for fd in (devnull, *saved):
+            os.close(fd)
+
+
+def _call_main(argv: List[str]) -> int:
+    from mdl.cli import main
+
+    try:
+        main(argv)
+    except SystemExit as e:
+        return int(e.code or 0) if not isinstance(e.code, str) else 1
+    return 0
+
+
+# --- scenarios ----------------------------------------------------------------
+
+
+def bench_overhead(sb: Sandbox, server: MediaServer, *, repeat: int) -> Dict[str, Any]:
+    """
+    One small audio item, three ways: the printed yt-dlp command run directly,
+    `mdl audio URL` called in this process (cli.main with everything imported),
+    and `mdl audio URL` in a fresh interpreter.
+    """
+    make_media(server.media_dir, "overhead.m4a", seconds=2)
+    url = server.url("overhead.m4a")
+    raw_cmd = sb.printed_command("audio", url)
+
+    os.environ.update(sb.env)
+    raw: List[float] = []
+    call: List[float] = []
+    fresh: List[float] = []
+    with _quiet():
+        _call_main(["audio", url])  # warm-up: imports, config, archive
+        for _ in range(repeat):
+            sb.clear_library()
+            raw.append(sb.run(raw_cmd))
+            sb.clear_library()
+            started = time.perf_counter()
+            rc = _call_main(["audio", url])
+            call.append(time.perf_counter() - started)
+            if rc != 0:
+                raise SystemExit(f"mdl audio exited {rc}")
+            sb.clear_library()
+            fresh.append(sb.mdl("audio", url))
+
+    raw_ms = statistics.median(raw) * 1000
+    call_ms = statistics.median(call) * 1000
+    fresh_ms = statistics.median(fresh) * 1000
+    print(f"{'yt-dlp directly':<22} {raw_ms:>9.1f} ms")
+    print(f"{'mdl audio (cli.main)':<22} {call_ms:>9.1f} ms   overhead {call_ms - raw_ms:+.1f} ms")
+    print(f"{'mdl audio (process)':<22} {fresh_ms:>9.1f} ms   overhead {fresh_ms - raw_ms:+.1f} ms")
+    return {
+        "raw_ms": round(raw_ms, 2),
+        "main_ms": round(call_ms, 2),
+        "process_ms": round(fresh_ms, 2),
+        "overhead_ms": round(call_ms - raw_ms, 2),
+        "process_overhead_ms": round(fresh_ms - raw_ms, 2),
+    }
+
+
+def bench_batch(
+    sb: Sandbox, server: MediaServer, *, items: int, jobs: List[int], item_mib: float
+) -> Dict[str, Any]:
+    """`mdl batch` over `items` distinct audio URLs (no transcode) per --jobs level."""
+    # 128 kbit/s: 1 MiB is about 65 seconds of audio.
+    make_media(server.media_dir, "batch.m4a", seconds=round(item_mib * _MiB * 8 / 128_000))
+    size = (server.media_dir / "batch.m4a").stat().st_size
+    urls = sb.config.parent / "batch-urls.txt"
+    urls.write_text("".join(server.url(f"batch~{i:03d}.m4a") + "\n" for i in range(items)), encoding="utf-8")
+    sb.configure(audio_format="m4a")
+
+    # Speedup is relative to the first --jobs level (normally 1).
+    results: Dict[str, Any] = {}
+    base: Optional[float] = None
+    print(f"{'jobs':>4} {'seconds':>9} {'items/s':>9} {'MiB/s':>8} {'speedup':>8}")
+    for j in jobs:
+        sb.clear_library()
+        seconds = sb.mdl("batch", str(urls), "--jobs", str(j))
+        base = base if base is not None else seconds
+        speedup = base / seconds
+        print(f"{j:>4} {seconds:>9.2f} {items / seconds:>9.2f} {items * size / _MiB / seconds:>8.2f} {speedup:>7.2f}x")
+        results[str(j)] = {
+            "seconds": round(seconds, 3),
+            "items_per_s": round(items / seconds, 3),
+            "mib_per_s": round(items * size / _MiB / seconds, 3),
+            "speedup": round(speedup, 3),
+        }
+    return {"items": items, "item_bytes": size, "baseline_jobs": jobs[0], "jobs": results}
+
+
+def bench_postprocess(sb: Sandbox, server: MediaServer, *, seconds: float, repeat: int) -> Dict[str, Any]:
+    """`mdl audio URL` from an AAC source for every audio-format value."""
+    make_media(server.media_dir, "postprocess.m4a", seconds=seconds)
+    url = server.url("postprocess.m4a")
+
+    times: Dict[str, float] = {}
+    for fmt in ALLOWED["audio-format"]:
+        sb.configure(audio_format=fmt)
+        runs = []
+        for _ in range(repeat):
+            sb.clear_library()
+            runs.append(sb.mdl("audio", url))
+        times[fmt] = statistics.median(runs)
+
+    base = min(times.values())
+    print(f"{'format':<8} {'seconds':>9} {'vs fastest':>11} {'x realtime':>11}")
+    for fmt, t in times.items():
+        print(f"{fmt:<8} {t:>9.2f} {t - base:>+10.2f}s {seconds / t:>10.1f}x")
+    return {
+        "source_seconds": seconds,
+        "formats": {fmt: {"seconds": round(t, 3), "extra_seconds": round(t - base, 3)} for fmt, t in times.items()},
+    }
+
+
+# --- driver -------------------------------------------------------------------
+
+
+_SCENARIOS = ("overhead", "batch", "postprocess")
+
+
+def _check(results: Dict[str, Any], budget: Dict[str, Any]) -> List[str]:
+    failures: List[str] = []
+    overhead = results.get("overhead")
+    if overhead is not None and overhead["overhead_ms"] > budget["overhead_ms"]:
+        failures.append(f"overhead: {overhead['overhead_ms']:.1f} ms > budget {budget['overhead_ms']} ms")
+    batch = results.get("batch")
+    if batch is not None and batch["baseline_jobs"] == 1:
+        for j, minimum in budget["batch_min_speedup"].items():
+            got = batch["jobs"].get(j)
+            if got is not None and got["speedup"] < minimum:
+                failures.append(f"batch --jobs {j}: speedup {got['speedup']:.2f}x < {minimum}x")
+    return failures
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("scenario", nargs="*", help=f"Scenarios to run: {', '.join(_SCENARIOS)} (default: all).")
+    ap.add_argument("--quick", action="store_true", help="Smaller workloads (CI).")
+    ap.add_argument("-n", "--repeat", type=int, default=None, help="Runs per measurement (median is reported).")
+    ap.add_argument("--items", type=int, default=None, help="Batch size (default: 16, quick: 8).")
+    ap.add_argument("--jobs", type=int, nargs="+", default=None, help="Batch --jobs levels (default: 1 2 4 8).")
+    ap.add_argument("--item-mib", type=float, default=1.0, help="Size of each batch item in MiB (default: 1).")
+    ap.add_argument("--rate", type=float, default=4.0, help="Server bandwidth per connection in MiB/s (0 = unlimited).")
+    ap.add_argument("--latency", type=float, default=50.0, help="Simulated extraction round trip in ms.")
+    ap.add_argument("--check", action="store_true", help="Exit 1 if a result misses offline_budget.json.")
+    ap.add_argument("--json", metavar="FILE", help="Write raw results to FILE.")
+    args = ap.parse_args(argv)
+
+    names = args.scenario or list(_SCENARIOS)
+    unknown = [n for n in names if n not in _SCENARIOS]
+    if unknown:
+        ap.error(f"unknown scenario(s): {', '.join(unknown)}")
+    repeat = args.repeat or (3 if args.quick else 7)
+    items = args.items or (8 if args.quick else 16)
+    jobs = args.jobs or ([1, 4] if args.quick else [1, 2, 4, 8])
+    has_ffmpeg = shutil.which("ffmpeg") is not None
+
+    results: Dict[str, Any] = {"ffmpeg": has_ffmpeg}
+    with tempfile.TemporaryDirectory(prefix="mdl-bench-") as tmp:
+        media = Path(tmp) / "media"
+        media.mkdir()
+        sb = Sandbox(Path(tmp) / "sandbox")
+        rate = args.rate * _MiB if args.rate > 0 else None
+        with MediaServer(media, rate=rate, latency=args.latency / 1000) as server:
+            print(f"[bench] media server {server.base}; ffmpeg: {'yes' if has_ffmpeg else 'no (copy only)'}")
+            for name in names:
+                print(f"\n== {name}")
+                if name == "overhead":
+                    results[name] = bench_overhead(sb, server, repeat=repeat)
+                elif name == "batch":
+                    results[name] = bench_batch(sb, server, items=items, jobs=jobs, item_mib=args.item_mib)
+                elif not has_ffmpeg:
+                    print("skipped: ffmpeg not found in PATH")
+                else:
+                    results[name] = bench_postprocess(
+                        sb, server, seconds=(10 if args.quick else 60), repeat=(1 if args.quick else 3)
+                    )
+
+    if args.json:
+        Path(args.json).write_text(json.dumps(results, indent=2, sort_keys=True) + "\n", encoding="utf-8")
+
+    failures = _check(results, json.loads(BUDGET_FILE.read_text(encoding="utf-8")))
+    if failures:
+        print("\nregressions:\n  " + "\n  ".join(failures), file=sys.stderr)
+        return 1 if args.check else 0
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
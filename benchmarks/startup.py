@@ -0,0 +1,186 @@
+"""
+Startup-cost benchmark for mdl subcommands.
+
+Runs each scenario in a fresh interpreter under `python -X importtime` and
+records how long importing mdl (and everything it pulls in while the command
+runs) took. Two kinds of regression checks:
+
+- budget: the median import time of a scenario must stay under its entry in
+  startup_budget.json (milliseconds);
+- forbidden modules: settings commands and --print dry runs must not import
+  the execution stack (subprocess, sqlite3, importlib.metadata, ...). This one
+  does not depend on machine speed.
+
+Usage:
+    python benchmarks/startup.py                 # print a table
+    python benchmarks/startup.py --check         # exit 1 on any regression
+    python benchmarks/startup.py --json out.json # also record raw results
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Set, Tuple
+
+ROOT = Path(__file__).resolve().parent.parent
+BUDGET_FILE = Path(__file__).with_name("startup_budget.json")
+
+_URL = "https://www.youtube.com/watch?v=dQw4w9WgXcQ"
+_PLAYLIST = "https://www.youtube.com/playlist?list=PL0000000000000000"
+
+# Scenario name -> mdl argv. Names are the keys of startup_budget.json.
+SCENARIOS: Dict[str, List[str]] = {
+    "help": ["--help"],
+    "version": ["--version"],
+    "preset": ["preset"],
+    "out": ["out"],
+    "preset-list": ["preset", "--list"],
+    "audio-print": ["audio", _URL, "--print"],
+    "video-print": ["video", _URL, "--print"],
+    "playlist-print": ["audio", _PLAYLIST, "--print"],
+    "info-print": ["info", _URL, "--print"],
+    "batch-print": ["batch", "-", "--print"],
+    "serve-status": ["serve", "status"],
+}
+
+# Scenarios that exit non-zero by design (no daemon is running).
+_EXPECTED_RC: Dict[str, int] = {"serve-status": 1}
+
+# Execution-only modules that lightweight commands must never import.
+_EXECUTION_MODULES = {"subprocess", "sqlite3", "concurrent.futures", "socketserver", "yt_dlp"}
+_LIGHT = _EXECUTION_MODULES | {"importlib.metadata"}
+FORBIDDEN: Dict[str, Set[str]] = {
+    "preset": _LIGHT,
+    "out": _LIGHT,
+    "preset-list": _LIGHT,
+    "audio-print": _LIGHT,
+    "video-print": _LIGHT,
+    "playlist-print": _LIGHT,
+    "info-print": _LIGHT,
+    "batch-print": _LIGHT,
+    "serve-status": _LIGHT,
+    "help": _LIGHT,
+}
+
+_RUNNER = "import sys; from mdl.cli import main; main(sys.argv[1:])"
+
+
+def parse_importtime(stderr: str) -> Tuple[float, Set[str]]:
+    """
+    (milliseconds spent importing mdl and what it loaded, set of module names).
+
+    -X importtime prints one line per module, children before parents, with
+    nesting shown by indentation. Top-level entries from `mdl.cli` onwards
+    cover the entry point and every import made while the command ran.
+    """
+    top: List[Tuple[str, int]] = []
+    modules: Set[str] = set()
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|", 2)
+        if not cumulative.strip().isdigit():
+            continue  # header line
+        modules.add(name.strip())
+        if not name[1:].startswith(" "):
+            top.append((name.strip(), int(cumulative)))
+
+    names = [n for n, _ in top]
+    start = names.index("mdl.cli") if "mdl.cli" in names else 0
+    # Packages are reported after their submodules; the entry point's own
+    # parent packages (mdl, ...) may appear before mdl.cli in the top level.
+    start = min([start] + [i for i, n in enumerate(names) if n == "mdl" or n.startswith("mdl.")])
+    micros = sum(c for _, c in top[start:])
+    return micros / 1000.0, modules
+
+
+def run_scenario(name: str, *, env: Dict[str, str]) -> Tuple[float, float, Set[str]]:
+    """(import ms, wall ms, modules) for one fresh-interpreter run."""
+    argv = SCENARIOS[name]
+    t0 = time.perf_counter()
+    p = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", _RUNNER, *argv],
+        cwd=str(ROOT),
+        env=env,
+        input="",
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        text=True,
+    )
+    wall = (time.perf_counter() - t0) * 1000.0
+    if p.returncode != _EXPECTED_RC.get(name, 0):
+        tail = "\n".join(p.stderr.splitlines()[-5:])
+        raise SystemExit(f"scenario {argv} exited {p.returncode}:\n{tail}")
+    imports, modules = parse_importtime(p.stderr)
+    return imports, wall, modules
+
+
+def main(argv: List[str] | None = None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("-n", "--repeat", type=int, default=7, help="Runs per scenario (median is reported).")
+    ap.add_argument("--check", action="store_true", help="Exit 1 if a budget or forbidden-module check fails.")
+    ap.add_argument("--json", metavar="FILE", help="Write raw results to FILE.")
+    ap.add_argument("scenario", nargs="*", help="Scenarios to run (default: all).")
+    args = ap.parse_args(argv)
+
+    budget: Dict[str, float] = json.loads(BUDGET_FILE.read_text(encoding="utf-8"))
+    names = args.scenario or list(SCENARIOS)
+    unknown = [n for n in names if n not in SCENARIOS]
+    if unknown:
+        ap.error(f"unknown scenario(s): {', '.join(unknown)}")
+
+    results: Dict[str, dict] = {}
+    failures: List[str] = []
+    with tempfile.TemporaryDirectory(prefix="mdl-startup-") as cfg:
+        env = dict(os.environ)
+        env.update({"MDL_CONFIG_DIR": cfg, "MDL_NO_DAEMON": "1", "PYTHONPATH": str(ROOT)})
+        # One warm-up run so .pyc files exist before measuring.
+        run_scenario("help", env=env)
+
+        print(f"{'scenario':<16} {'import ms':>10} {'wall ms':>9} {'budget':>8}  modules")
+        for name in names:
+            runs = [run_scenario(name, env=env) for _ in range(max(1, args.repeat))]
+            imports = statistics.median(r[0] for r in runs)
+            wall = statistics.median(r[1] for r in runs)
+            modules = runs[0][2]
+            limit = budget.get(name)
+
+            status = ""
+            if limit is not None and imports > limit:
+                status = "  OVER BUDGET"
+                failures.append(f"{name}: {imports:.1f} ms > budget {limit:.1f} ms")
+            leaked = sorted(FORBIDDEN.get(name, set()) & modules)
+            if leaked:
+                status += f"  imports {', '.join(leaked)}"
+                failures.append(f"{name}: imports {', '.join(leaked)}")
+
+            limit_s = f"{limit:.0f}" if limit is not None else "-"
+            print(f"{name:<16} {imports:>10.1f} {wall:>9.1f} {limit_s:>8}  {len(modules)}{status}")
+            results[name] = {
+                "argv": SCENARIOS[name],
+                "import_ms": round(imports, 2),
+                "wall_ms": round(wall, 2),
+                "budget_ms": limit,
+                "modules": len(modules),
+                "forbidden_imported": leaked,
+            }
+
+    if args.json:
+        Path(args.json).write_text(json.dumps(results, indent=2, sort_keys=True) + "\n", encoding="utf-8")
+
+    if failures:
+        print("\nregressions:\n  " + "\n  ".join(failures), file=sys.stderr)
+        return 1 if args.check else 0
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
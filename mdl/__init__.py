@@ -1,8 +1,16 @@
 from __future__ import annotations
 
-from importlib.metadata import PackageNotFoundError, version
 
-try:
-    __version__ = version("mdl-cli")
-except PackageNotFoundError:
-    __version__ = "0.0.0"
+def __getattr__(name: str) -> str:
+    # Resolved on first access: importlib.metadata is one of the most expensive
+    # imports in the package and only `mdl --version` needs it.
+    if name == "__version__":
+        from importlib.metadata import PackageNotFoundError, version
+
+        try:
+            value = version("mdl-cli")
+        except PackageNotFoundError:
+            value = "0.0.0"
+        globals()["__version__"] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
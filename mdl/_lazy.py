@@ -0,0 +1,22 @@
+from __future__ import annotations
+
+from importlib import import_module
+from typing import Any, Callable, Dict
+
+
+def lazy_exports(package: str, exports: Dict[str, str]) -> Callable[[str], Any]:
+    """
+    Module-level __getattr__ (PEP 562) for a package's re-exports.
+
+    `exports` maps each public name to the submodule defining it. The submodule
+    is imported on first access, so importing one submodule of a package does
+    not import all of its siblings.
+    """
+
+    def __getattr__(name: str) -> Any:
+        module = exports.get(name)
+        if module is None:
+            raise AttributeError(f"module {package!r} has no attribute {name!r}")
+        return getattr(import_module(module), name)
+
+    return __getattr__
@@ -1,36 +1,68 @@
 from __future__ import annotations
 
 import argparse
-from typing import Callable, Dict
+import os
+import sys
+import time
+from dataclasses import replace
+from importlib import import_module
+from typing import Callable, Dict, Sequence, Tuple
 
-from mdl.commands.audio import handle_audio
-from mdl.commands.video import handle_video
-from mdl.commands.info import handle_info
-from mdl.commands.smoke import handle_smoke
-from mdl.commands.settings import SETTINGS_COMMANDS, handle_settings
+from mdl.core.config_store import SETTINGS_COMMANDS
 from mdl.core.options import Options
 from mdl.core.resolve import resolve_run_options
+from mdl.core.urls import canonical_url
+from mdl.infra.tracing import configure_profile, record_span, span, write_profile
+from mdl.services.daemon_client import submit_to_daemon
 
 
-# Handlers that require RunOptions
-_RUN_HANDLERS: Dict[str, Callable] = {
-    "info": handle_info,
-    "smoke": handle_smoke,
-    "audio": handle_audio,
-    "video": handle_video,
+# Handlers that require RunOptions ("module:function", imported only when the
+# command runs so e.g. `mdl out` never loads the download stack).
+_RUN_HANDLERS: Dict[str, str] = {
+    "info": "mdl.commands.info:handle_info",
+    "smoke": "mdl.commands.smoke:handle_smoke",
+    "audio": "mdl.commands.audio:handle_audio",
+    "video": "mdl.commands.video:handle_video",
+    "both": "mdl.commands.both:handle_both",
+    "batch": "mdl.commands.batch:handle_batch",
+    "resume": "mdl.commands.resume:handle_resume",
+    "sync": "mdl.commands.sync:handle_sync",
+    "worker": "mdl.commands.worker:handle_worker",
+    "coordinator": "mdl.commands.coordinator:handle_coordinator",
+    "watch": "mdl.commands.watch:handle_watch",
 }
 
+# Handlers that manage their own runtime state (no RunOptions up front)
+_PLAIN_HANDLERS: Dict[str, str] = {
+    "serve": "mdl.commands.serve:handle_serve",
+}
+
+_SETTINGS_HANDLER = "mdl.commands.settings:handle_settings"
+
+# Profile every run of this process as if --profile FILE had been given.
+_ENV_PROFILE = "MDL_PROFILE"
+
 # Settings commands are handled without runtime resolution.
 _SETTINGS = set(SETTINGS_COMMANDS)
 
 
-def run_app(args: argparse.Namespace) -> int:
+def _load_handler(target: str) -> Callable[..., int]:
+    module, _, name = target.partition(":")
+    return getattr(import_module(module), name)
+
+
+def run_app(args: argparse.Namespace, *, timings: Sequence[Tuple[str, float, float]] = ()) -> int:
     """
     Application entrypoint (routing/orchestration).
 
     Responsibilities:
     - Convert argparse Namespace -> Options DTO
     - Handle settings commands (no yt-dlp execution)
+    - Record a trace of the run (--profile/MDL_PROFILE; `timings` are the
+      CLI's own spans from before the arguments were parsed)
+    - Canonicalize the target URL (youtu.be/..., tracking parameters, ...)
+    - Enable telemetry output (--events/--metrics)
+    - Hand audio/video/info to a running `mdl serve` daemon when there is one
     - Resolve RunOptions (config + defaults)
     - Dispatch to the correct command handler
     """
@@ -38,13 +70,49 @@ def run_app(args: argparse.Namespace) -> int:
 
     # Settings commands: no runtime resolution needed
     if opts.command in _SETTINGS:
-        return handle_settings(opts)
+        return _load_handler(_SETTINGS_HANDLER)(opts)
+
+    profile = opts.profile or os.environ.get(_ENV_PROFILE)
+    if not profile:
+        return _dispatch(opts)
+
+    epoch = timings[0][1] if timings else time.monotonic()
+    configure_profile(profile, epoch=epoch, label=f"mdl {opts.command}")
+    for name, start, end in timings:
+        record_span(name, start, end, cat="cli")
+    try:
+        with span(f"mdl {opts.command}", cat="cli"):
+            return _dispatch(replace(opts, profile=profile))
+    finally:
+        written = write_profile()
+        if written is not None:
+            print(f"[mdl] profile: {written[1]} events written to {written[0]}", file=sys.stderr)
+
+
+def _dispatch(opts: Options) -> int:
+    if opts.url:
+        opts = replace(opts, url=canonical_url(opts.url))
+
+    if opts.events or opts.metrics:
+        from mdl.core.telemetry import configure_telemetry
+
+        configure_telemetry(events=opts.events, metrics=opts.metrics)
+
+    plain = _PLAIN_HANDLERS.get(opts.command)
+    if plain is not None:
+        return _load_handler(plain)(opts)
+
+    # Thin-client mode: the daemon already holds config, RunOptions and a warm yt-dlp.
+    rc = submit_to_daemon(opts)
+    if rc is not None:
+        return rc
 
     # Resolve runtime options (config + defaults) for commands that invoke yt-dlp
-    run_opts = resolve_run_options(opts)
+    with span("resolve_run_options"):
+        run_opts = resolve_run_options(opts)
 
     handler = _RUN_HANDLERS.get(opts.command)
     if handler is None:
         raise SystemExit(f"[mdl] ERROR: Unknown command '{opts.command}'.")
 
-    return handler(opts, run_opts)
+    return _load_handler(handler)(opts, run_opts)
@@ -1,33 +1,82 @@
 from __future__ import annotations
 
-from typing import List
+from pathlib import Path
+from typing import List, Optional
 
-from mdl.builders.yt_dlp_common import base_yt_dlp_args
+from mdl.builders.yt_dlp_common import base_yt_dlp_args, info_json_args, result_args, target_args
 from mdl.core.config import Defaults
+from mdl.core.formats import audio_format_selector
 from mdl.core.options import RunOptions
 from mdl.core.playlist import is_playlist_url
 
 
-def build_audio_command(url: str, opts: RunOptions) -> List[str]:
-    """Build the yt-dlp command for best-quality audio downloads."""
-    tpl = Defaults.audio_playlist_tpl if is_playlist_url(url) else Defaults.audio_single_tpl
+def build_audio_command(
+    url: str,
+    opts: RunOptions,
+    *,
+    record_to: Optional[Path] = None,
+    info_json: Optional[Path] = None,
+    out_tpl: Optional[str] = None,
+    postprocess: bool = True,
+    handoff_to: Optional[Path] = None,
+    local_source: bool = False,
+) -> List[str]:
+    """
+    Build the yt-dlp command for best-quality audio downloads.
+
+    The source is the best stream already in the target codec when there
+    is one (AAC for m4a, Opus for opus, ...), so extraction is a stream
+    copy; otherwise the best audio stream, transcoded with
+    opts.ffmpeg_threads encoder threads.
+
+    With postprocess=False only the source stream is downloaded (no ffmpeg
+    work) and its info JSON is written to `handoff_to`; running the full
+    command with info_json=handoff_to afterwards finds the file already
+    downloaded and only extracts, tags and embeds.
+
+    local_source=True is for an info_json whose formats are files on disk
+    (file:// URLs, see `mdl both`): yt-dlp is allowed to read them and
+    keeps them after extraction, and throttling and cookies are left out.
+    """
+    if out_tpl is not None:
+        tpl = out_tpl  # pre-rendered playlist entry template (see core.playlist.entry_template)
+    else:
+        tpl = Defaults.audio_playlist_tpl if is_playlist_url(url) else Defaults.audio_single_tpl
     out_template = str(opts.out_dir / tpl)
 
     cmd: List[str] = ["yt-dlp"]
-    cmd += base_yt_dlp_args(opts)
+    if not local_source:
+        cmd += base_yt_dlp_args(opts)  # a local file needs no throttling or cookies
 
-    cmd += ["-f", "bestaudio/best"]
-    cmd += ["-x", "--audio-format", opts.audio_format]
+    # Prefer a source already in the target codec: -x then copies it instead of encoding
+    cmd += ["-f", audio_format_selector(opts.audio_format)]
 
-    # Metadata (no quality impact)
-    cmd += ["--add-metadata", "--embed-metadata"]
+    if postprocess:
+        cmd += ["-x", "--audio-format", opts.audio_format]
+        if opts.ffmpeg_threads is not None:
+            cmd += ["--postprocessor-args", f"ExtractAudio+ffmpeg_o:-threads {opts.ffmpeg_threads}"]
 
-    # Cover behavior (best-effort; actual fallback strategy is handled later)
-    if opts.cover:
-        cmd += ["--embed-thumbnail"]
+        # Metadata (no quality impact)
+        cmd += ["--add-metadata", "--embed-metadata"]
+
+        # Cover behavior (best-effort; actual fallback strategy is handled later)
+        if opts.cover:
+            cmd += ["--embed-thumbnail"]
 
     # Robustness
     cmd += ["--ignore-errors", "--continue", "--no-overwrites"]
 
-    cmd += ["-o", out_template, url]
+    if local_source:
+        # The "download" may be the video file itself (same folder and title):
+        # extraction must not delete it.
+        cmd += ["--enable-file-urls", "--keep-video"]
+
+    # Library archive bookkeeping (see mdl.services.library)
+    if record_to is not None:
+        cmd += result_args(record_to)
+    if handoff_to is not None:
+        cmd += info_json_args(handoff_to)
+
+    cmd += ["-o", out_template]
+    cmd += target_args(url, info_json)
     return cmd
@@ -1,27 +1,57 @@
 from __future__ import annotations
 
-from typing import List
+from pathlib import Path
+from typing import List, Optional
 
 from mdl.core.options import RunOptions
 
+# One compact JSON object per finished item, written after yt-dlp moves the
+# file to its final location (so `filepath` is the real library path); the
+# source codecs go into the per-item format line (see core.formats), the
+# item's URLs into the archive's URL index (see services.library).
+RESULT_TEMPLATE = "after_move:%(.{extractor_key,id,format_id,acodec,vcodec,filepath,original_url,webpage_url,playlist_index})j"
+
+# Full info dict as one JSON line; loadable later with --load-info-json.
+INFO_JSON_TEMPLATE = "%()j"
+
 
 def base_yt_dlp_args(opts: RunOptions) -> List[str]:
     """Flags shared across all yt-dlp invocations."""
     args: List[str] = []
 
-    if opts.cookies_from:
+    # Exported jar when there is one (see mdl.services.cookie_jar), else the browser itself
+    if opts.cookies_file is not None:
+        args += ["--cookies", str(opts.cookies_file)]
+    elif opts.cookies_from:
         args += ["--cookies-from-browser", opts.cookies_from]
 
-    # Preset-derived throttling (only set in safe preset)
+    # Throttling: preset baseline, adjusted per host by mdl.core.throttle
     if opts.limit_rate:
         args += ["--limit-rate", opts.limit_rate]
 
     if opts.sleep_min is not None and opts.sleep_max is not None:
         args += [
             "--sleep-interval",
-            str(opts.sleep_min),
+            f"{opts.sleep_min:g}",
             "--max-sleep-interval",
-            str(opts.sleep_max),
+            f"{opts.sleep_max:g}",
         ]
 
     return args
+
+
+def result_args(record_to: Path) -> List[str]:
+    """Ask yt-dlp to append a result record per finished item to `record_to`."""
+    return ["--print-to-file", RESULT_TEMPLATE, str(record_to)]
+
+
+def info_json_args(cache_to: Path) -> List[str]:
+    """Ask yt-dlp to write the extracted info JSON to `cache_to`."""
+    return ["--print-to-file", INFO_JSON_TEMPLATE, str(cache_to)]
+
+
+def target_args(url: str, info_json: Optional[Path]) -> List[str]:
+    """The download target: the URL, or a cached info JSON (no re-extraction)."""
+    if info_json is not None:
+        return ["--load-info-json", str(info_json)]
+    return [url]
@@ -1,18 +1,24 @@
 from __future__ import annotations
 
+from pathlib import Path
 from typing import List
 
-from mdl.builders.yt_dlp_common import base_yt_dlp_args
+from mdl.builders.yt_dlp_common import base_yt_dlp_args, info_json_args
 from mdl.core.options import RunOptions
 
 
-def build_info_command(url: str, opts: RunOptions) -> List[str]:
+def build_info_command(url: str, opts: RunOptions, *, info_to: Path) -> List[str]:
     """
-    Build the yt-dlp command to display available formats for a URL.
+    Build the yt-dlp command that probes a URL without downloading it: the
+    extracted info JSON (every format with codecs, bitrates and sizes) is
+    written to `info_to`, from which mdl renders the format table or the
+    --json summary. `info_to` is also what fills the info cache.
 
-    Equivalent to: yt-dlp -F URL
+    Equivalent to: yt-dlp --skip-download --print-to-file "%()j" FILE URL
     """
     cmd: List[str] = ["yt-dlp"]
     cmd += base_yt_dlp_args(opts)
-    cmd += ["-F", url]
+    cmd += ["--skip-download"]
+    cmd += info_json_args(info_to)
+    cmd += [url]
     return cmd
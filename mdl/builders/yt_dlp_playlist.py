@@ -0,0 +1,26 @@
+from __future__ import annotations
+
+from typing import List, Optional
+
+from mdl.builders.yt_dlp_common import base_yt_dlp_args
+from mdl.core.options import RunOptions
+
+
+def build_playlist_command(url: str, opts: RunOptions, *, items: Optional[str] = None) -> List[str]:
+    """
+    Build the yt-dlp command that enumerates a playlist without resolving
+    its entries (one JSON document on stdout).
+
+    Equivalent to: yt-dlp --flat-playlist -J URL
+
+    `items` ("START:END", 1-based) lists only that slice; entries are then
+    read lazily, so listing the first entries of a long channel fetches
+    only the first pages.
+    """
+    cmd: List[str] = ["yt-dlp"]
+    cmd += base_yt_dlp_args(opts)
+    cmd += ["--flat-playlist", "-J"]
+    if items is not None:
+        cmd += ["--lazy-playlist", "--playlist-items", items]
+    cmd += [url]
+    return cmd
@@ -1,39 +1,69 @@
 from __future__ import annotations
 
-from typing import List
+from pathlib import Path
+from typing import List, Optional
 
-from mdl.builders.yt_dlp_common import base_yt_dlp_args
+from mdl.builders.yt_dlp_common import base_yt_dlp_args, info_json_args, result_args, target_args
 from mdl.core.config import Defaults
+from mdl.core.formats import video_format_sort
 from mdl.core.options import RunOptions
 from mdl.core.playlist import is_playlist_url
 
 
-def build_video_command(url: str, opts: RunOptions) -> List[str]:
+def build_video_command(
+    url: str,
+    opts: RunOptions,
+    *,
+    record_to: Optional[Path] = None,
+    info_json: Optional[Path] = None,
+    out_tpl: Optional[str] = None,
+    postprocess: bool = True,
+    handoff_to: Optional[Path] = None,
+) -> List[str]:
     """
     Build the yt-dlp command for best-quality video.
 
     Strategy:
     - Always pick best video + best audio (no forced downgrade).
+    - At equal resolution and frame rate, prefer H.264/AAC for mp4.
     - Remux to the configured container (mp4/mkv) without re-encoding.
+
+    postprocess=False leaves out remux and thumbnail embedding (see
+    build_audio_command); merging the selected streams still happens here.
     """
-    tpl = Defaults.video_playlist_tpl if is_playlist_url(url) else Defaults.video_single_tpl
+    if out_tpl is not None:
+        tpl = out_tpl  # pre-rendered playlist entry template (see core.playlist.entry_template)
+    else:
+        tpl = Defaults.video_playlist_tpl if is_playlist_url(url) else Defaults.video_single_tpl
     out_template = str(opts.out_dir / tpl)
 
     cmd: List[str] = ["yt-dlp"]
     cmd += base_yt_dlp_args(opts)
 
-    # Best quality selection (avoid forcing container here)
+    # Best quality selection (avoid forcing container here); among equally good
+    # formats, prefer codecs the container takes natively (H.264/AAC for mp4)
     cmd += ["-f", "bv*+ba/b"]
+    sort = video_format_sort(opts.video_format)
+    if sort is not None:
+        cmd += ["-S", sort]
 
-    # Remux to the user-chosen container (safe subset: mp4|mkv)
-    cmd += ["--remux-video", opts.video_format]
+    if postprocess:
+        # Remux to the user-chosen container (safe subset: mp4|mkv)
+        cmd += ["--remux-video", opts.video_format]
 
-    # Cover behavior (optional)
-    if opts.cover:
-        cmd += ["--write-thumbnail", "--embed-thumbnail"]
+        # Cover behavior (optional)
+        if opts.cover:
+            cmd += ["--write-thumbnail", "--embed-thumbnail"]
 
     # Robustness
     cmd += ["--ignore-errors", "--continue", "--no-overwrites"]
 
-    cmd += ["-o", out_template, url]
+    # Library archive bookkeeping (see mdl.services.library)
+    if record_to is not None:
+        cmd += result_args(record_to)
+    if handoff_to is not None:
+        cmd += info_json_args(handoff_to)
+
+    cmd += ["-o", out_template]
+    cmd += target_args(url, info_json)
     return cmd
@@ -2,12 +2,25 @@ from __future__ import annotations
 
 import argparse
 import sys
+import time
 from typing import Optional, List
 
-from mdl import __version__
 from mdl.app import run_app
 
 
+class _VersionAction(argparse.Action):
+    """`--version`, with the package version looked up only when asked for."""
+
+    def __init__(self, option_strings, dest=argparse.SUPPRESS, default=argparse.SUPPRESS, help=None):
+        super().__init__(option_strings=option_strings, dest=dest, default=default, nargs=0, help=help)
+
+    def __call__(self, parser, namespace, values, option_string=None):
+        from mdl import __version__
+
+        parser._print_message(f"mdl {__version__}\n", sys.stdout)
+        parser.exit()
+
+
 def _add_download_flags(p: argparse.ArgumentParser) -> None:
     """
     Flags for download commands (audio/video).
@@ -26,6 +39,89 @@ def _add_setting_value_arg(p: argparse.ArgumentParser, *, name: str, metavar: st
     p.add_argument(name, nargs="?", default=None, metavar=metavar)
 
 
+def _positive_int(raw: str) -> int:
+    try:
+        value = int(raw)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected a positive integer, got '{raw}'")
+    if value < 1:
+        raise argparse.ArgumentTypeError(f"expected a positive integer, got '{raw}'")
+    return value
+
+
+def _add_jobs_flag(
+    p: argparse.ArgumentParser,
+    help: str = "Maximum number of concurrent yt-dlp downloads, e.g. for playlist entries (default: 4).",
+) -> None:
+    """
+    Per-run concurrency limit for commands that run several yt-dlp processes.
+    """
+    p.add_argument(
+        "-j",
+        "--jobs",
+        type=_positive_int,
+        default=None,
+        metavar="N",
+        help=help,
+    )
+
+
+def _add_pp_jobs_flag(p: argparse.ArgumentParser) -> None:
+    """
+    Concurrency limit for the post-processing stage of multi-item runs.
+    """
+    p.add_argument(
+        "--pp-jobs",
+        type=_positive_int,
+        default=None,
+        metavar="N",
+        help="Maximum number of concurrent post-processing steps (ffmpeg) in multi-item runs (default: one per CPU).",
+    )
+
+
+def _add_telemetry_flags(p: argparse.ArgumentParser) -> None:
+    """
+    Machine-readable progress/throughput output for commands that download.
+    """
+    p.add_argument(
+        "--events",
+        default=None,
+        metavar="FILE",
+        help="Append structured progress events (JSON lines) to FILE.",
+    )
+    p.add_argument(
+        "--metrics",
+        default=None,
+        metavar="FILE",
+        help="Keep a Prometheus textfile-collector export of throughput counters in FILE.",
+    )
+
+
+def _add_profile_flag(p: argparse.ArgumentParser) -> None:
+    """
+    Phase-level profiling for commands that run yt-dlp (also MDL_PROFILE=FILE).
+    """
+    p.add_argument(
+        "--profile",
+        default=None,
+        metavar="FILE",
+        help="Write wall-clock spans of every phase of the run to FILE as a Chrome/Perfetto trace.",
+    )
+
+
+def _add_queue_flag(p: argparse.ArgumentParser, default=argparse.SUPPRESS) -> None:
+    """
+    Queue of the multi-node commands. Sub-actions suppress their default so
+    `mdl coordinator --queue Q add` and `mdl coordinator add --queue Q` agree.
+    """
+    p.add_argument(
+        "--queue",
+        default=default,
+        metavar="QUEUE",
+        help="Queue file, or http://HOST:PORT of a coordinator for add/status (default: the local queue).",
+    )
+
+
 def _add_print_flag(p: argparse.ArgumentParser) -> None:
     """
     Per-command print flag.
@@ -52,7 +148,21 @@ def build_parser() -> argparse.ArgumentParser:
             "Examples:\n"
             "  mdl audio URL --print\n"
             "  mdl video URL --print\n"
+            "  mdl both URL\n"
             "  mdl info URL --print\n"
+            "  mdl info --json URL1 URL2 URL3\n"
+            "  mdl batch urls.txt --jobs 8\n"
+            "  mdl batch urls.txt --profile run.trace.json\n"
+            "  cat urls.txt | mdl batch - --kind video\n"
+            "  mdl resume\n"
+            "  mdl resume --list\n"
+            "  mdl sync https://www.youtube.com/@channel/videos --kind video\n"
+            "  mdl watch ~/inbox --kind video\n"
+            "  mdl coordinator --listen 0.0.0.0:8765\n"
+            "  mdl coordinator add urls.txt --kind video\n"
+            "  mdl worker http://coordinator-host:8765 --jobs 8\n"
+            "  mdl serve --jobs 4\n"
+            "  mdl serve status\n"
             "  mdl smoke audio\n"
             "  mdl smoke video\n"
             "  mdl out\n"
@@ -68,13 +178,16 @@ def build_parser() -> argparse.ArgumentParser:
             "  mdl cover on\n"
             "  mdl audio-format opus\n"
             "  mdl video-format mkv\n"
+            "  mdl engine inprocess\n"
+            "  mdl host-jobs 2\n"
+            "  mdl bandwidth 8m\n"
+            "  mdl scratch /mnt/fast/mdl\n"
         ),
     )
 
     parser.add_argument(
         "--version",
-        action="version",
-        version=f"mdl {__version__}",
+        action=_VersionAction,
         help="Show program version and exit.",
     )
 
@@ -83,25 +196,209 @@ def build_parser() -> argparse.ArgumentParser:
     # Downloads
     p_audio = subparsers.add_parser("audio", help="Download best-quality audio.")
     _add_download_flags(p_audio)
+    _add_jobs_flag(p_audio)
+    _add_pp_jobs_flag(p_audio)
+    _add_telemetry_flags(p_audio)
+    _add_profile_flag(p_audio)
     _add_print_flag(p_audio)
 
     p_video = subparsers.add_parser("video", help="Download best-quality video.")
     _add_download_flags(p_video)
+    _add_jobs_flag(p_video)
+    _add_pp_jobs_flag(p_video)
+    _add_telemetry_flags(p_video)
+    _add_profile_flag(p_video)
     _add_print_flag(p_video)
 
+    p_both = subparsers.add_parser(
+        "both", help="Download best-quality video and extract its audio from it (one download)."
+    )
+    _add_download_flags(p_both)
+    _add_jobs_flag(p_both)
+    _add_pp_jobs_flag(p_both)
+    _add_telemetry_flags(p_both)
+    _add_profile_flag(p_both)
+    _add_print_flag(p_both)
+
     # Info
-    p_info = subparsers.add_parser("info", help="Show available formats for a URL (yt-dlp -F).")
-    p_info.add_argument("url", metavar="URL", help="Target URL to inspect (no download).")
+    p_info = subparsers.add_parser("info", help="Show available formats, codecs, bitrates and sizes for URLs.")
+    p_info.add_argument("urls", nargs="+", metavar="URL", help="Target URL(s) to inspect (no download).")
+    p_info.add_argument(
+        "--json",
+        dest="json_out",
+        action="store_true",
+        help="Print one compact JSON object per URL instead of tables (yt-dlp output goes to stderr).",
+    )
+    _add_jobs_flag(p_info, help="Maximum number of URLs probed at once (default: 4).")
+    _add_profile_flag(p_info)
     _add_print_flag(p_info)
 
+    # Batch
+    p_batch = subparsers.add_parser("batch", help="Download many URLs from a file (or stdin) in parallel.")
+    p_batch.add_argument(
+        "source",
+        nargs="?",
+        default="-",
+        metavar="FILE",
+        help="File with one URL per line ('-' or omitted: read stdin). '#' starts a comment.",
+    )
+    p_batch.add_argument(
+        "--kind",
+        choices=["audio", "video", "both"],
+        default="audio",
+        help="Download kind applied to every URL (default: audio).",
+    )
+    _add_jobs_flag(p_batch)
+    _add_pp_jobs_flag(p_batch)
+    _add_telemetry_flags(p_batch)
+    _add_profile_flag(p_batch)
+    _add_print_flag(p_batch)
+
+    # Sync
+    p_sync = subparsers.add_parser(
+        "sync", help="Download only what is new in playlists/channels since the last sync."
+    )
+    p_sync.add_argument("urls", nargs="+", metavar="URL", help="Playlist or channel URL(s) to mirror.")
+    p_sync.add_argument(
+        "--kind",
+        choices=["audio", "video", "both"],
+        default="audio",
+        help="Download kind for new entries (default: audio).",
+    )
+    p_sync.add_argument(
+        "--full",
+        action="store_true",
+        help="Walk the whole listing instead of stopping at known entries (also forgets removed ones).",
+    )
+    _add_jobs_flag(p_sync)
+    _add_pp_jobs_flag(p_sync)
+    _add_telemetry_flags(p_sync)
+    _add_profile_flag(p_sync)
+
+    # Watch
+    p_watch = subparsers.add_parser(
+        "watch", help="Download URL lists as they are dropped into an inbox directory (or written to a FIFO)."
+    )
+    p_watch.add_argument(
+        "source",
+        metavar="PATH",
+        help="Inbox directory for URL list files, or a FIFO to read URLs from (one per line).",
+    )
+    p_watch.add_argument(
+        "--kind",
+        choices=["audio", "video", "both"],
+        default="audio",
+        help="Download kind applied to every URL (default: audio).",
+    )
+    _add_jobs_flag(p_watch)
+    _add_pp_jobs_flag(p_watch)
+    _add_telemetry_flags(p_watch)
+    _add_profile_flag(p_watch)
+
+    # Resume
+    p_resume = subparsers.add_parser("resume", help="Continue an interrupted batch/playlist run.")
+    p_resume.add_argument(
+        "run_id",
+        nargs="?",
+        type=_positive_int,
+        metavar="RUN",
+        help="Run id (default: the latest unfinished run; see: mdl resume --list).",
+    )
+    p_resume.add_argument(
+        "--list",
+        dest="list_runs",
+        action="store_true",
+        help="List recent runs and their job counts, then exit.",
+    )
+    p_resume.add_argument(
+        "--retry-failed",
+        action="store_true",
+        help="Also retry jobs that ran out of attempts (default: only unfinished ones).",
+    )
+    _add_jobs_flag(p_resume)
+    _add_pp_jobs_flag(p_resume)
+    _add_telemetry_flags(p_resume)
+    _add_profile_flag(p_resume)
+
+    # Multi-node queue
+    p_worker = subparsers.add_parser(
+        "worker", help="Download jobs leased from a shared queue (coordinator URL or queue file)."
+    )
+    p_worker.add_argument(
+        "queue",
+        nargs="?",
+        default=None,
+        metavar="QUEUE",
+        help="http://HOST:PORT of an `mdl coordinator`, or a queue file on shared storage (default: the local queue).",
+    )
+    p_worker.add_argument(
+        "--out",
+        default=None,
+        metavar="DIR",
+        help="Write files under DIR (e.g. a shared directory) instead of the configured out.",
+    )
+    p_worker.add_argument(
+        "--drain",
+        action="store_true",
+        help="Exit once the queue has no unfinished jobs (default: keep waiting for work).",
+    )
+    _add_jobs_flag(p_worker, help="Jobs leased and downloaded at once on this node (default: 4).")
+    _add_pp_jobs_flag(p_worker)
+    _add_telemetry_flags(p_worker)
+    _add_profile_flag(p_worker)
+
+    p_coord = subparsers.add_parser(
+        "coordinator", help="Serve a download queue to `mdl worker` nodes over HTTP."
+    )
+    _add_queue_flag(p_coord, default=None)
+    p_coord.add_argument(
+        "--listen",
+        default=None,
+        metavar="HOST:PORT",
+        help="Address to serve on (default: 127.0.0.1:8765; use 0.0.0.0:8765 for other machines).",
+    )
+    coord_sub = p_coord.add_subparsers(dest="coordinator_action", required=False)
+    p_coord_add = coord_sub.add_parser("add", help="Queue URLs from a file (or stdin) for the worker nodes.")
+    p_coord_add.add_argument(
+        "source",
+        nargs="?",
+        default="-",
+        metavar="FILE",
+        help="File with one URL per line ('-' or omitted: read stdin). '#' starts a comment.",
+    )
+    p_coord_add.add_argument(
+        "--kind",
+        choices=["audio", "video", "both"],
+        default="audio",
+        help="Download kind applied to every URL (default: audio).",
+    )
+    _add_queue_flag(p_coord_add)
+    p_coord_status = coord_sub.add_parser("status", help="Show job counts, leases per node and failed jobs.")
+    _add_queue_flag(p_coord_status)
+
+    # Daemon
+    p_serve = subparsers.add_parser(
+        "serve",
+        help="Run a local daemon that executes audio/video/info jobs for thin clients.",
+    )
+    _add_jobs_flag(p_serve)
+    _add_telemetry_flags(p_serve)
+    serve_sub = p_serve.add_subparsers(dest="serve_action", required=False)
+    serve_sub.add_parser("status", help="List queued, running and finished daemon jobs.")
+    p_serve_cancel = serve_sub.add_parser("cancel", help="Cancel a queued or running daemon job.")
+    p_serve_cancel.add_argument("job_id", type=int, metavar="ID", help="Job id (see: mdl serve status).")
+    serve_sub.add_parser("stop", help="Stop the running daemon.")
+
     # Smoke
     p_smoke = subparsers.add_parser("smoke", help="Download a small sample to verify setup.")
     smoke_sub = p_smoke.add_subparsers(dest="smoke_kind", required=True)
 
     p_smoke_audio = smoke_sub.add_parser("audio", help="Smoke test: audio download.")
+    _add_profile_flag(p_smoke_audio)
     _add_print_flag(p_smoke_audio)
 
     p_smoke_video = smoke_sub.add_parser("video", help="Smoke test: video download.")
+    _add_profile_flag(p_smoke_video)
     _add_print_flag(p_smoke_video)
 
     # Persistent settings (show on no arg, set on value, list on --list)
@@ -125,14 +422,37 @@ def build_parser() -> argparse.ArgumentParser:
     p_video_fmt.add_argument("--list", action="store_true", help="List allowed values.")
     _add_setting_value_arg(p_video_fmt, name="value", metavar="mp4|mkv")
 
+    p_engine = subparsers.add_parser("engine", help="Configure how yt-dlp is executed (subprocess/inprocess).")
+    p_engine.add_argument("--list", action="store_true", help="List allowed values.")
+    _add_setting_value_arg(p_engine, name="value", metavar="subprocess|inprocess")
+
+    p_host_jobs = subparsers.add_parser(
+        "host-jobs", help="Configure concurrent downloads per host in batch/playlist runs (auto follows the preset)."
+    )
+    p_host_jobs.add_argument("--list", action="store_true", help="List allowed values.")
+    _add_setting_value_arg(p_host_jobs, name="value", metavar="auto|N|off")
+
+    p_bandwidth = subparsers.add_parser(
+        "bandwidth", help="Configure the total download rate shared by all running downloads (auto follows the preset)."
+    )
+    p_bandwidth.add_argument("--list", action="store_true", help="List allowed values.")
+    _add_setting_value_arg(p_bandwidth, name="value", metavar="auto|RATE|off")
+
     p_out = subparsers.add_parser("out", help="Configure default output base directory.")
     _add_setting_value_arg(p_out, name="value", metavar="PATH")
 
+    p_scratch = subparsers.add_parser(
+        "scratch", help="Configure a fast local directory for in-progress downloads (off = write into out)."
+    )
+    _add_setting_value_arg(p_scratch, name="value", metavar="PATH|off")
+
     return parser
 
 
 def main(argv: Optional[List[str]] = None) -> None:
+    started = time.monotonic()
     parser = build_parser()
+    built = time.monotonic()
 
     # UX: if user runs just `mdl`, show help instead of an error.
     if argv is None:
@@ -142,4 +462,6 @@ def main(argv: Optional[List[str]] = None) -> None:
         raise SystemExit(0)
 
     args = parser.parse_args(argv)
-    raise SystemExit(run_app(args))
+    # Reported as spans when profiling (mdl.app only learns about it from the parsed arguments).
+    timings = [("build_parser", started, built), ("parse_args", built, time.monotonic())]
+    raise SystemExit(run_app(args, timings=timings))
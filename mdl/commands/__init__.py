@@ -1,13 +1,22 @@
-from mdl.commands.audio import handle_audio
-from mdl.commands.video import handle_video
-from mdl.commands.info import handle_info
-from mdl.commands.smoke import handle_smoke
-from mdl.commands.settings import handle_settings
+from mdl._lazy import lazy_exports
 
-__all__ = [
-    "handle_audio",
-    "handle_video",
-    "handle_info",
-    "handle_smoke",
-    "handle_settings",
-]
+# Command handlers are imported on first use; see mdl.app for the dispatch table.
+_EXPORTS = {
+    "handle_audio": "mdl.commands.audio",
+    "handle_video": "mdl.commands.video",
+    "handle_both": "mdl.commands.both",
+    "handle_info": "mdl.commands.info",
+    "handle_batch": "mdl.commands.batch",
+    "handle_resume": "mdl.commands.resume",
+    "handle_sync": "mdl.commands.sync",
+    "handle_worker": "mdl.commands.worker",
+    "handle_coordinator": "mdl.commands.coordinator",
+    "handle_watch": "mdl.commands.watch",
+    "handle_smoke": "mdl.commands.smoke",
+    "handle_serve": "mdl.commands.serve",
+    "handle_settings": "mdl.commands.settings",
+}
+
+__getattr__ = lazy_exports(__name__, _EXPORTS)
+
+__all__ = list(_EXPORTS)
@@ -0,0 +1,8 @@
+from __future__ import annotations
+
+from mdl.core.options import Options, RunOptions
+from mdl.services.batch_service import run_batch
+
+
+def handle_batch(opts: Options, run_opts: RunOptions) -> int:
+    return run_batch(opts, run_opts)
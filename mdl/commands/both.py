@@ -0,0 +1,8 @@
+from __future__ import annotations
+
+from mdl.core.options import Options, RunOptions
+from mdl.services.download_service import run_both_download
+
+
+def handle_both(opts: Options, run_opts: RunOptions) -> int:
+    return run_both_download(opts, run_opts)
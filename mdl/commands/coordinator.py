@@ -0,0 +1,15 @@
+from __future__ import annotations
+
+from mdl.core.options import Options, RunOptions
+from mdl.services.coordinator_service import run_coordinator, run_coordinator_add, run_coordinator_status
+
+
+def handle_coordinator(opts: Options, run_opts: RunOptions) -> int:
+    action = opts.coordinator_action or "run"
+    if action == "run":
+        return run_coordinator(opts)
+    if action == "add":
+        return run_coordinator_add(opts, run_opts)
+    if action == "status":
+        return run_coordinator_status(opts)
+    raise SystemExit("[mdl] ERROR: Unknown coordinator action (expected: add|status).")
@@ -0,0 +1,8 @@
+from __future__ import annotations
+
+from mdl.core.options import Options, RunOptions
+from mdl.services.journal_service import run_resume
+
+
+def handle_resume(opts: Options, run_opts: RunOptions) -> int:
+    return run_resume(opts, run_opts)
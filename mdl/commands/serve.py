@@ -0,0 +1,20 @@
+from __future__ import annotations
+
+from mdl.core.options import Options
+from mdl.services.daemon_client import run_serve_cancel, run_serve_status, run_serve_stop
+
+
+def handle_serve(opts: Options) -> int:
+    action = opts.serve_action or "run"
+    if action == "run":
+        # The daemon side (server, job pool, runner) is only needed to run one.
+        from mdl.services.daemon_service import run_serve
+
+        return run_serve(opts)
+    if action == "status":
+        return run_serve_status(opts)
+    if action == "cancel":
+        return run_serve_cancel(opts)
+    if action == "stop":
+        return run_serve_stop(opts)
+    raise SystemExit("[mdl] ERROR: Unknown serve action (expected: status|cancel|stop).")
@@ -24,7 +24,7 @@ def _handle_setting(cmd: str, value: str | None, list_flag: bool) -> int:
     if cmd not in SETTINGS_COMMANDS:
         raise SystemExit(f"[mdl] ERROR: unknown settings command '{cmd}'.")
 
-    if list_flag and cmd != "out":
+    if list_flag and cmd not in ("out", "scratch"):
         values = list_allowed_values(cmd)
         print(f"[mdl] {cmd} allowed: {', '.join(values)}")
         return 0
@@ -36,8 +36,8 @@ def _handle_setting(cmd: str, value: str | None, list_flag: bool) -> int:
         print(f"[mdl] {cmd}: {current}")
         return 0
 
-    if cmd == "out" and not str(value).strip():
-        raise SystemExit("[mdl] ERROR: out requires a PATH")
+    if cmd in ("out", "scratch") and not str(value).strip():
+        raise SystemExit(f"[mdl] ERROR: {cmd} requires a PATH")
 
     cfg2 = set_config_value(cfg, cmd, value)
     save_config(cfg2)
@@ -0,0 +1,8 @@
+from __future__ import annotations
+
+from mdl.core.options import Options, RunOptions
+from mdl.services.sync_service import run_sync
+
+
+def handle_sync(opts: Options, run_opts: RunOptions) -> int:
+    return run_sync(opts, run_opts)
@@ -0,0 +1,8 @@
+from __future__ import annotations
+
+from mdl.core.options import Options, RunOptions
+from mdl.services.watch_service import run_watch
+
+
+def handle_watch(opts: Options, run_opts: RunOptions) -> int:
+    return run_watch(opts, run_opts)
@@ -0,0 +1,8 @@
+from __future__ import annotations
+
+from mdl.core.options import Options, RunOptions
+from mdl.services.worker_service import run_worker
+
+
+def handle_worker(opts: Options, run_opts: RunOptions) -> int:
+    return run_worker(opts, run_opts)
@@ -1,11 +1,13 @@
-from mdl.core.options import Options, AppConfig, RunOptions
-from mdl.core.config import Defaults
-from mdl.core.resolve import resolve_run_options
+from mdl._lazy import lazy_exports
 
-__all__ = [
-    "Options",
-    "AppConfig",
-    "RunOptions",
-    "Defaults",
-    "resolve_run_options",
-]
+_EXPORTS = {
+    "Options": "mdl.core.options",
+    "AppConfig": "mdl.core.options",
+    "RunOptions": "mdl.core.options",
+    "Defaults": "mdl.core.config",
+    "resolve_run_options": "mdl.core.resolve",
+}
+
+__getattr__ = lazy_exports(__name__, _EXPORTS)
+
+__all__ = list(_EXPORTS)
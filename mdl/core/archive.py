@@ -0,0 +1,136 @@
+from __future__ import annotations
+
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable, Optional
+
+from mdl.core.config_store import state_path
+
+_ARCHIVE_NAME = "archive.sqlite3"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS items (
+    extractor     TEXT    NOT NULL,
+    video_id      TEXT    NOT NULL,
+    kind          TEXT    NOT NULL,
+    path          TEXT    NOT NULL,
+    format        TEXT,
+    size          INTEGER,
+    downloaded_at REAL    NOT NULL,
+    PRIMARY KEY (extractor, video_id, kind)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS items_path ON items (path);
+CREATE TABLE IF NOT EXISTS sources (
+    url       TEXT    NOT NULL,
+    kind      TEXT    NOT NULL,
+    extractor TEXT    NOT NULL,
+    video_id  TEXT    NOT NULL,
+    PRIMARY KEY (url, kind)
+) WITHOUT ROWID;
+"""
+
+@dataclass(frozen=True)
+class ArchiveEntry:
+    extractor: str
+    video_id: str
+    kind: str                 # "audio" | "video"
+    path: str
+    format: Optional[str]
+    size: Optional[int]
+    downloaded_at: float
+
+
+class Archive:
+    """
+    Persistent library index: (extractor, video id, kind) -> downloaded file,
+    so an item's audio and video downloads are tracked separately. Items
+    whose id cannot be derived from their URL (anything but YouTube, see
+    mdl.core.urls.media_key) are also found by canonical URL (`sources`),
+    and every item by the path of its file.
+
+    Lookups are index-backed (primary keys and `items_path`), so they stay
+    O(log n) at hundreds of thousands of entries. One connection is shared by
+    all threads of a process and serialized with a lock; WAL mode lets other
+    mdl processes read while one writes.
+    """
+
+    def __init__(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(path), timeout=30.0, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(_SCHEMA)
+
+    def lookup(self, extractor: str, video_id: str, kind: str) -> Optional[ArchiveEntry]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT extractor, video_id, kind, path, format, size, downloaded_at "
+                "FROM items WHERE extractor = ? AND video_id = ? AND kind = ?",
+                (extractor, video_id, kind),
+            ).fetchone()
+        return ArchiveEntry(*row) if row else None
+
+    def lookup_path(self, path: str, kind: str) -> Optional[ArchiveEntry]:
+        """Entry whose downloaded file is `path` (as recorded: the final path)."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT extractor, video_id, kind, path, format, size, downloaded_at "
+                "FROM items WHERE path = ? AND kind = ?",
+                (path, kind),
+            ).fetchone()
+        return ArchiveEntry(*row) if row else None
+
+    def lookup_url(self, url: str, kind: str) -> Optional[ArchiveEntry]:
+        """Entry recorded for the canonical URL `url` (see record's `urls`)."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT i.extractor, i.video_id, i.kind, i.path, i.format, i.size, i.downloaded_at "
+                "FROM sources s JOIN items i USING (extractor, video_id, kind) WHERE s.url = ? AND s.kind = ?",
+                (url, kind),
+            ).fetchone()
+        return ArchiveEntry(*row) if row else None
+
+    def record(
+        self,
+        extractor: str,
+        video_id: str,
+        path: str,
+        *,
+        kind: str,
+        format: Optional[str] = None,
+        size: Optional[int] = None,
+        urls: Iterable[str] = (),
+    ) -> None:
+        """Record a finished download; `urls` are canonical URLs it was downloaded from."""
+        with self._lock, self._db:
+            # A path belongs to one item: drop rows for whatever used to live there.
+            self._db.execute(
+                "DELETE FROM items WHERE path = ? AND NOT (extractor = ? AND video_id = ? AND kind = ?)",
+                (path, extractor, video_id, kind),
+            )
+            self._db.execute(
+                "INSERT OR REPLACE INTO items (extractor, video_id, kind, path, format, size, downloaded_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (extractor, video_id, kind, path, format, size, time.time()),
+            )
+            self._db.executemany(
+                "INSERT OR REPLACE INTO sources (url, kind, extractor, video_id) VALUES (?, ?, ?, ?)",
+                [(url, kind, extractor, video_id) for url in urls],
+            )
+
+
+_SHARED: Optional[Archive] = None
+_SHARED_LOCK = threading.Lock()
+
+
+def open_archive() -> Archive:
+    """Process-wide archive under the mdl config dir (opened on first use)."""
+    global _SHARED
+    with _SHARED_LOCK:
+        if _SHARED is None:
+            _SHARED = Archive(state_path(_ARCHIVE_NAME))
+        return _SHARED
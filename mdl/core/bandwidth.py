@@ -0,0 +1,219 @@
+from __future__ import annotations
+
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import replace
+from pathlib import Path
+from typing import Dict, Optional
+
+from mdl.core.config import Defaults
+from mdl.core.config_store import state_path
+from mdl.core.options import RunOptions
+from mdl.core.throttle import format_rate, parse_rate
+
+_LEASES_NAME = "bandwidth.sqlite3"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS leases (
+    id      INTEGER PRIMARY KEY,
+    pid     INTEGER NOT NULL,
+    cap     INTEGER,
+    slots   INTEGER NOT NULL DEFAULT 1,
+    granted INTEGER,
+    started REAL    NOT NULL
+);
+"""
+
+
+def fair_shares(budget: int, caps: Dict[int, Optional[int]]) -> Dict[int, int]:
+    """
+    Max-min fair split of `budget` bytes/s over leases with optional caps:
+    a lease capped below its equal share gets its cap, and what it leaves
+    unused is split evenly among the others.
+    """
+    shares: Dict[int, int] = {}
+    left = budget
+    order = sorted(caps.items(), key=lambda kv: (kv[1] is None, kv[1] or 0))
+    for n, (lease_id, cap) in enumerate(order):
+        fair = left // (len(order) - n)
+        share = cap if cap is not None and cap < fair else fair
+        shares[lease_id] = max(1, share)
+        left -= share
+    return shares
+
+
+def _alive(pid: int) -> bool:
+    if pid == os.getpid():
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    try:
+        # After a reboot the PID may belong to something else entirely.
+        return b"mdl" in Path(f"/proc/{pid}/cmdline").read_bytes()
+    except OSError:
+        return True
+
+
+class Lease:
+    """
+    One download's claim on the bandwidth budget (see BandwidthBudget.lease).
+    Without a budget it is inert: rate() is just the lease's own cap.
+    """
+
+    def __init__(
+        self, budget: Optional["BandwidthBudget"], lease_id: Optional[int], total: int = 0, cap: Optional[int] = None
+    ) -> None:
+        self._budget = budget
+        self._id = lease_id
+        self._total = total
+        self._cap = cap
+        self._rate = cap
+        self._checked: Optional[float] = None
+
+    @property
+    def shared(self) -> bool:
+        return self._id is not None
+
+    def rate(self) -> Optional[int]:
+        """
+        Current limit in bytes/s: the lease's grant from the budget. Renewed
+        at most every `bandwidth_rebalance_every` seconds, so it is cheap
+        enough to call from a progress hook.
+        """
+        if self._budget is None or self._id is None:
+            return self._cap
+        now = time.monotonic()
+        if self._checked is None or now - self._checked >= Defaults.bandwidth_rebalance_every:
+            self._rate = self._budget.grant(self._id, self._total)
+            self._checked = now
+        return self._rate
+
+    def apply(self, run_opts: RunOptions) -> RunOptions:
+        """RunOptions with --limit-rate set to the lease's current grant."""
+        rate = self.rate()
+        return replace(run_opts, limit_rate=(format_rate(rate) if rate is not None else None))
+
+    def release(self) -> None:
+        if self._budget is not None and self._id is not None:
+            self._budget.release(self._id)
+            self._id = None
+
+    def __enter__(self) -> "Lease":
+        return self
+
+    def __exit__(self, *_exc) -> None:
+        self.release()
+
+
+class BandwidthBudget:
+    """
+    Machine-wide download bandwidth budget, shared by every concurrent
+    download of every mdl process through a lease table in the config dir.
+
+    Every running download holds a lease with a grant (its --limit-rate).
+    A grant is the lease's max-min fair share (host throttle limits act as
+    caps) but never more than what the other grants leave of the budget, so
+    the total stays within it; a download that arrives while the budget is
+    fully granted starts at `bandwidth_min_share` until others finish.
+    Processes announce how many downloads they are about to run (expect()),
+    so the first item of a batch does not take the whole budget.
+
+    A yt-dlp subprocess keeps the grant it started with; in-process
+    downloads renew theirs while they run, which is how capacity freed by a
+    finished download reaches the ones still running. Leases of processes
+    that died are dropped on the next grant, so a crash never keeps
+    bandwidth reserved.
+    """
+
+    def __init__(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._slots = 1
+        self._db = sqlite3.connect(str(path), timeout=30.0, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(_SCHEMA)
+
+    def expect(self, slots: int) -> None:
+        """This process is about to run up to `slots` downloads at once."""
+        with self._lock:
+            self._slots = max(1, int(slots))
+            self._db.execute("UPDATE leases SET slots = ? WHERE pid = ?", (self._slots, os.getpid()))
+
+    def lease(self, total: int, cap: Optional[int]) -> Lease:
+        """Claim a share of `total` bytes/s until the lease is released."""
+        with self._lock:
+            cur = self._db.execute(
+                "INSERT INTO leases (pid, cap, slots, started) VALUES (?, ?, ?, ?)",
+                (os.getpid(), cap, self._slots, time.time()),
+            )
+            lease_id = int(cur.lastrowid)
+        return Lease(self, lease_id, total, cap)
+
+    def grant(self, lease_id: int, total: int) -> int:
+        """(Re)compute and record the grant of one lease."""
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self._db.execute("SELECT id, pid, cap, slots, granted FROM leases").fetchall()
+                dead = {lid for lid, pid, _cap, _slots, _grant in rows if not _alive(pid)}
+                if dead:
+                    self._db.executemany("DELETE FROM leases WHERE id = ?", [(lid,) for lid in dead])
+                live = [row for row in rows if row[0] not in dead]
+
+                # Downloads expected per process: the ones running, or as many as
+                # it announced; the ones not started yet count as uncapped.
+                caps: Dict[int, Optional[int]] = {lid: cap for lid, _pid, cap, _slots, _grant in live}
+                caps.setdefault(lease_id, None)
+                per_pid: Dict[int, list] = {}
+                for lid, pid, _cap, slots, _grant in live:
+                    per_pid.setdefault(pid, [0, 1])
+                    per_pid[pid][0] += 1
+                    per_pid[pid][1] = max(per_pid[pid][1], slots)
+                missing = sum(max(0, slots - running) for running, slots in per_pid.values())
+                for n in range(missing):
+                    caps[-1 - n] = None
+
+                fair = fair_shares(total, caps)[lease_id]
+                granted = sum(g for lid, _pid, _cap, _slots, g in live if g is not None and lid != lease_id)
+                grant = max(min(fair, total - granted), min(parse_rate(Defaults.bandwidth_min_share), fair))
+                self._db.execute("UPDATE leases SET granted = ? WHERE id = ?", (grant, lease_id))
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+        return grant
+
+    def release(self, lease_id: int) -> None:
+        with self._lock:
+            self._db.execute("DELETE FROM leases WHERE id = ?", (lease_id,))
+
+
+_SHARED: Optional[BandwidthBudget] = None
+_SHARED_LOCK = threading.Lock()
+
+
+def open_bandwidth() -> BandwidthBudget:
+    """Process-wide handle on the lease table (opened on first use)."""
+    global _SHARED
+    with _SHARED_LOCK:
+        if _SHARED is None:
+            _SHARED = BandwidthBudget(state_path(_LEASES_NAME))
+        return _SHARED
+
+
+def download_lease(run_opts: RunOptions) -> Lease:
+    """
+    Lease for one download with `run_opts` (already throttled for its host):
+    capped at the host's --limit-rate, sharing run_opts.bandwidth.
+    """
+    cap = parse_rate(run_opts.limit_rate) if run_opts.limit_rate else None
+    if run_opts.bandwidth is None:
+        return Lease(None, None, cap=cap)
+    return open_bandwidth().lease(run_opts.bandwidth, cap)
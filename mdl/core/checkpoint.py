@@ -0,0 +1,51 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Set
+
+from mdl.core.config_store import state_path
+
+_CHECKPOINT_DIR = "playlists"
+
+
+class PlaylistCheckpoint:
+    """
+    Set of finished entry ids for one playlist run, persisted after every
+    entry (write to temp file + rename, so a crash never leaves it torn).
+    Cleared once every entry of the playlist has finished.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        self.done: Set[str] = set()
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+            self.done = {str(x) for x in data.get("done", [])}
+        except (OSError, ValueError, AttributeError):
+            self.done = set()
+
+    def mark_done(self, entry_id: str) -> None:
+        with self._lock:
+            self.done.add(entry_id)
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_suffix(".tmp")
+            tmp.write_text(json.dumps({"done": sorted(self.done)}), encoding="utf-8")
+            os.replace(tmp, self.path)
+
+    def clear(self) -> None:
+        with self._lock:
+            self.done.clear()
+            try:
+                self.path.unlink()
+            except FileNotFoundError:
+                pass
+
+
+def open_checkpoint(kind: str, url: str) -> PlaylistCheckpoint:
+    digest = hashlib.sha1(url.strip().encode("utf-8")).hexdigest()[:16]
+    return PlaylistCheckpoint(state_path(_CHECKPOINT_DIR) / f"{kind}-{digest}.json")
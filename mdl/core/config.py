@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
+from functools import lru_cache
 from pathlib import Path
 import os
 import re
@@ -32,16 +33,106 @@ def _xdg_music_dir() -> Path:
     return Path.home() / "Music"
 
 
+@lru_cache(maxsize=1)
+def default_out_dir() -> Path:
+    """
+    Default output base directory (<XDG music dir>/mdl).
+    Resolved on first use rather than at import: most invocations either
+    have `out` configured or never need a path at all.
+    """
+    return _xdg_music_dir() / "mdl"
+
+
 @dataclass(frozen=True)
 class Defaults:
-    # Output
-    out_dir: Path = _xdg_music_dir() / "mdl"
-
-    # Networking behavior (safe preset)
+    # Networking behavior (safe preset starting point; see mdl.core.throttle)
     limit_rate: str = "1M"
     sleep_min: int = 5
     sleep_max: int = 15
 
+    # Machine-wide download budget shared by all concurrent downloads when the
+    # `bandwidth` setting is "auto" (safe only; fast has none), the smallest
+    # grant a download starts with while the budget is taken, and how often an
+    # in-process download renews its grant while it runs.
+    bandwidth_safe: str = "4M"
+    bandwidth_min_share: str = "64K"
+    bandwidth_rebalance_every: float = 1.0
+
+    # Adaptive throttling bounds (per host, persisted between runs)
+    throttle_min_rate: str = "128K"
+    throttle_max_rate: str = "16M"      # safe preset ceiling; fast has none
+    throttle_backoff_rate: str = "4M"   # first limit for an unthrottled (fast) host that pushes back
+    throttle_safe_min_sleep: float = 1.0
+    throttle_max_sleep: float = 120.0
+    throttle_increase_every: int = 30   # seconds between speed-ups for one host
+
+    # Batch mode: concurrent yt-dlp processes when --jobs is not given
+    batch_jobs: int = 4
+
+    # Multi-item runs: concurrent downloads from one host when `host-jobs` is
+    # "auto" (safe stays polite to each site; fast lets one site use every slot).
+    host_jobs_safe: int = 2
+    host_jobs_fast: int = 4
+
+    # Multi-item runs: concurrent post-processing (ffmpeg) steps when --pp-jobs
+    # is not given (0 = one per CPU), and downloaded items allowed to wait for
+    # a free post-processing slot before downloads pause.
+    postprocess_jobs: int = 0
+    handoff_queue: int = 4
+
+    # Job journal (batch/playlist runs, `mdl resume`): attempts per job, retry
+    # backoff (doubles per attempt, capped) and runs kept in the journal.
+    job_max_attempts: int = 3
+    job_retry_backoff: float = 15.0
+    job_retry_backoff_max: float = 300.0
+    journal_keep_runs: int = 50
+
+    # `mdl sync` (see mdl.services.sync_service): entries listed per page at
+    # first (doubling while everything is new), consecutive already-known
+    # entries that end the walk, and how often the whole listing is walked
+    # anyway (catches entries inserted further down; forgets deleted ones).
+    sync_window: int = 50
+    sync_known_run: int = 5
+    sync_full_every: int = 7 * 24 * 3600
+
+    # Multi-node queue (`mdl worker`, `mdl coordinator`; see mdl.core.work_queue):
+    # how long a lease lasts without a heartbeat, how often workers renew
+    # theirs, how often an idle worker asks for work, and the coordinator's
+    # default port.
+    lease_ttl: int = 90
+    lease_heartbeat: float = 30.0
+    worker_poll: float = 5.0
+    coordinator_port: int = 8765
+
+    # `mdl watch` (see mdl.services.watch_service): how often the inbox is
+    # scanned without inotify, how long a dropped file must stay unchanged
+    # before it is read, and URLs picked up ahead of the running batch before
+    # new files are left in the inbox.
+    watch_poll: float = 2.0
+    watch_settle: float = 0.5
+    watch_backlog: int = 1000
+
+    # Negative-result cache (see mdl.core.failures): how long an item that
+    # failed permanently is skipped without running yt-dlp. Removed/private
+    # videos rarely come back; geo blocks depend on where mdl runs from.
+    failure_ttl_unavailable: int = 30 * 24 * 3600
+    failure_ttl_geo: int = 7 * 24 * 3600
+
+    # Free space required in the library and in the scratch directory before
+    # a download is admitted (see mdl.services.scratch).
+    min_free_space: str = "1G"
+
+    # Browser cookie jar exported for yt-dlp runs (see mdl.services.cookie_jar):
+    # re-exported after this many seconds; how long one export may take.
+    cookie_jar_ttl: int = 1800
+    cookie_export_timeout: int = 120
+
+    # Info JSON cache (mdl info -> download reuse). Upstream format URLs expire,
+    # so entries are short-lived.
+    info_cache_ttl: int = 3600
+    info_cache_max_entries: int = 1000
+    info_cache_max_bytes: int = 256 * 1024 * 1024
+
     # Output templates
     audio_single_tpl: str = "%(artist|uploader)s/%(title)s.%(ext)s"
     audio_playlist_tpl: str = "%(artist|uploader)s/%(playlist_title)s/%(playlist_index)02d - %(title)s.%(ext)s"
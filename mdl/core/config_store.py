@@ -5,14 +5,14 @@ import os
 from dataclasses import asdict, replace
 from pathlib import Path
 
-from mdl.core.config import Defaults
+from mdl.core.config import default_out_dir
 from mdl.core.options import AppConfig
 
 # overrideable for tests via env var
 _DEFAULT_CONFIG_DIR = Path("~/.config/mdl").expanduser()
 _ENV_CONFIG_DIR = "MDL_CONFIG_DIR"
 
-SETTINGS_COMMANDS = {"cover", "cookies", "preset", "audio-format", "video-format", "out"}
+SETTINGS_COMMANDS = {"cover", "cookies", "preset", "audio-format", "video-format", "engine", "host-jobs", "bandwidth", "out", "scratch"}
 
 ALLOWED = {
     "cover": ["on", "off"],
@@ -20,6 +20,9 @@ ALLOWED = {
     "preset": ["safe", "fast"],
     "audio-format": ["flac", "mp3", "opus", "m4a"],
     "video-format": ["mp4", "mkv"],
+    "engine": ["subprocess", "inprocess"],
+    "host-jobs": ["auto", "1", "2", "3", "4", "6", "8", "off"],
+    "bandwidth": ["auto", "1m", "2m", "4m", "8m", "16m", "32m", "64m", "off"],
 }
 
 
@@ -32,7 +35,11 @@ def default_config() -> AppConfig:
         cover=False,
         audio_format="m4a",
         video_format="mp4",
-        out_dir=str(Path(Defaults.out_dir).expanduser()),
+        engine="subprocess",
+        host_jobs="auto",
+        bandwidth="auto",
+        out_dir=str(default_out_dir().expanduser()),
+        scratch_dir="",
     )
 
 
@@ -47,6 +54,22 @@ def _config_file() -> Path:
     return _config_dir() / "config.json"
 
 
+def state_path(name: str) -> Path:
+    """Path of an mdl-managed state file (socket, index, cache) in the config dir."""
+    return _config_dir() / name
+
+
+def config_version() -> int:
+    """
+    Cheap change marker for the persisted config (mtime in ns, 0 if missing).
+    Long-running processes use it to notice `mdl <setting> VALUE` edits.
+    """
+    try:
+        return _config_file().stat().st_mtime_ns
+    except OSError:
+        return 0
+
+
 def load_config() -> AppConfig:
     cfg_file = _config_file()
     if not cfg_file.exists():
@@ -64,12 +87,19 @@ def load_config() -> AppConfig:
     cover = bool(data.get("cover", cfg.cover))
     audio_format = _norm_str(data.get("audio_format", cfg.audio_format))
     video_format = _norm_str(data.get("video_format", cfg.video_format))
+    engine = _norm_str(data.get("engine", cfg.engine))
+    host_jobs = _norm_str(data.get("host_jobs", cfg.host_jobs))
+    bandwidth = _norm_str(data.get("bandwidth", cfg.bandwidth))
     out_dir = _normalize_out_dir(data.get("out_dir", cfg.out_dir), cfg.out_dir)
+    scratch_dir = _normalize_out_dir(data.get("scratch_dir", cfg.scratch_dir), cfg.scratch_dir)
 
     preset = preset if preset in ALLOWED["preset"] else cfg.preset
     cookies = cookies if cookies in ALLOWED["cookies"] else cfg.cookies
     audio_format = audio_format if audio_format in ALLOWED["audio-format"] else cfg.audio_format
     video_format = video_format if video_format in ALLOWED["video-format"] else cfg.video_format
+    engine = engine if engine in ALLOWED["engine"] else cfg.engine
+    host_jobs = host_jobs if host_jobs in ALLOWED["host-jobs"] else cfg.host_jobs
+    bandwidth = bandwidth if bandwidth in ALLOWED["bandwidth"] else cfg.bandwidth
 
     return AppConfig(
         preset=preset,
@@ -77,7 +107,11 @@ def load_config() -> AppConfig:
         cover=cover,
         audio_format=audio_format,
         video_format=video_format,
+        engine=engine,
+        host_jobs=host_jobs,
+        bandwidth=bandwidth,
         out_dir=out_dir,
+        scratch_dir=scratch_dir,
     )
 
 
@@ -107,8 +141,16 @@ def describe_config_value(cfg: AppConfig, setting: str) -> str:
         return cfg.audio_format
     if setting == "video-format":
         return cfg.video_format
+    if setting == "engine":
+        return cfg.engine
+    if setting == "host-jobs":
+        return cfg.host_jobs
+    if setting == "bandwidth":
+        return cfg.bandwidth
     if setting == "out":
         return cfg.out_dir
+    if setting == "scratch":
+        return cfg.scratch_dir or "off"
     raise SystemExit(f"[mdl] ERROR: unknown setting '{setting}'.")
 
 
@@ -124,6 +166,17 @@ def set_config_value(cfg: AppConfig, setting: str, value: str) -> AppConfig:
             raise SystemExit("[mdl] ERROR: out requires a PATH")
         return replace(cfg, out_dir=out_dir)
 
+    if setting == "scratch":
+        value_s = str(value).strip()
+        if not value_s:
+            raise SystemExit("[mdl] ERROR: scratch requires a PATH (or off)")
+        if _norm_str(value_s) == "off":
+            return replace(cfg, scratch_dir="")
+        scratch_dir = _normalize_out_dir(value_s, "")
+        if not scratch_dir:
+            raise SystemExit("[mdl] ERROR: scratch requires a PATH (or off)")
+        return replace(cfg, scratch_dir=scratch_dir)
+
     value_n = _norm_str(value)
 
     if setting not in ALLOWED:
@@ -143,6 +196,12 @@ def set_config_value(cfg: AppConfig, setting: str, value: str) -> AppConfig:
         return replace(cfg, audio_format=value_n)
     if setting == "video-format":
         return replace(cfg, video_format=value_n)
+    if setting == "engine":
+        return replace(cfg, engine=value_n)
+    if setting == "host-jobs":
+        return replace(cfg, host_jobs=value_n)
+    if setting == "bandwidth":
+        return replace(cfg, bandwidth=value_n)
 
     # unreachable
     raise SystemExit(f"[mdl] ERROR: unknown setting '{setting}'.")
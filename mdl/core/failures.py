@@ -0,0 +1,189 @@
+from __future__ import annotations
+
+import re
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from mdl.core.config import Defaults
+from mdl.core.config_store import state_path
+from mdl.core.info_cache import cache_key
+
+_CACHE_NAME = "failures.sqlite3"
+
+# Failure classes of a yt-dlp run.
+RATE_LIMITED = "rate-limited"
+AUTH_REQUIRED = "auth-required"
+GEO_BLOCKED = "geo-blocked"
+UNAVAILABLE = "unavailable"      # removed or private
+NETWORK = "network"              # transient network trouble
+POSTPROCESS = "postprocess"      # ffmpeg/post-processor failure (local)
+
+# yt-dlp error lines per class, checked in this order: the first match wins
+# ("Sign in to confirm you're not a bot" is rate limiting, not a login wall;
+# "Private video. Sign in if you've been granted access" is private).
+# UNAVAILABLE is cached for a month, so it only takes the extractor's own
+# verdicts: a bare HTTP 404/410 is as often a CDN fragment or an expired
+# signed format URL (e.g. from a stale info cache entry), so it is NETWORK.
+_SIGNALS: List[Tuple[str, "re.Pattern[str]"]] = [
+    (RATE_LIMITED, re.compile(
+        r"HTTP Error 429|Too Many Requests|rate.?limit|confirm you.re not a bot|try again later|HTTP Error 403",
+        re.IGNORECASE,
+    )),
+    (GEO_BLOCKED, re.compile(
+        r"not (?:made this video )?available in your (?:country|region|location)|geo.?restrict|"
+        r"blocked it in your country|from your location",
+        re.IGNORECASE,
+    )),
+    (UNAVAILABLE, re.compile(
+        r"Video unavailable|Private video|This video is private|has been removed|no longer available|"
+        r"account associated with this video has been terminated|copyright claim",
+        re.IGNORECASE,
+    )),
+    (AUTH_REQUIRED, re.compile(
+        r"Sign in|login required|requires authentication|members.only|"
+        r"Join this channel|cookies are no longer valid|HTTP Error 401",
+        re.IGNORECASE,
+    )),
+    (POSTPROCESS, re.compile(
+        r"Postprocessing|Conversion failed|ffmpeg|ffprobe",
+        re.IGNORECASE,
+    )),
+    (NETWORK, re.compile(
+        r"timed out|Connection (?:reset|refused|aborted)|Remote end closed|IncompleteRead|"
+        r"Temporary failure in name resolution|Name or service not known|Network is unreachable|"
+        r"HTTP Error (?:5\d\d|404|410)|Unable to download (?:webpage|API page|JSON)|SSL|EOF occurred",
+        re.IGNORECASE,
+    )),
+]
+
+
+@dataclass(frozen=True)
+class FailurePolicy:
+    retry: bool                # worth another attempt (journaled runs, with backoff)
+    cache_ttl: Optional[int]   # seconds the item is skipped without running yt-dlp (None: not cached)
+    action: str                # what happens next, for the failure note
+
+
+_POLICIES: Dict[str, FailurePolicy] = {
+    RATE_LIMITED: FailurePolicy(True, None, "retried with backoff; the host's throttle backs off"),
+    AUTH_REQUIRED: FailurePolicy(False, None, "not retried (needs cookies that sign in; see: mdl cookies)"),
+    GEO_BLOCKED: FailurePolicy(False, Defaults.failure_ttl_geo, "given up"),
+    UNAVAILABLE: FailurePolicy(False, Defaults.failure_ttl_unavailable, "given up"),
+    NETWORK: FailurePolicy(True, None, "retried with backoff"),
+    POSTPROCESS: FailurePolicy(False, None, "not retried (the download is not the problem)"),
+}
+
+# Unclassified failures keep the journal's default: retry with backoff.
+_UNKNOWN = FailurePolicy(True, None, "retried with backoff")
+
+
+def classify_failure(rc: int, error: Optional[str]) -> Optional[str]:
+    """
+    Failure class of a finished yt-dlp run from its exit code and its last
+    error line; None for success, cancellation (130), a missing dependency
+    (127) or an error mdl does not recognize.
+    """
+    if rc in (0, 127, 130) or not error:
+        return None
+    for failure, pattern in _SIGNALS:
+        if pattern.search(error):
+            return failure
+    return None
+
+
+def failure_policy(failure: Optional[str]) -> FailurePolicy:
+    return _POLICIES.get(failure or "", _UNKNOWN)
+
+
+@dataclass(frozen=True)
+class KnownFailure:
+    failure: str          # class, e.g. UNAVAILABLE
+    error: str            # yt-dlp's error line
+    failed_at: float
+    expires_at: float
+
+    def describe(self) -> str:
+        return f"{self.failure}: {self.error}"
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS failures (
+    key        TEXT PRIMARY KEY,
+    url        TEXT NOT NULL,
+    failure    TEXT NOT NULL,
+    error      TEXT NOT NULL,
+    failed_at  REAL NOT NULL,
+    expires_at REAL NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS failures_expiry ON failures (expires_at);
+"""
+
+
+class FailureCache:
+    """
+    Negative-result cache: items whose last run failed permanently (removed,
+    private, geo-blocked), keyed like the info cache, so later runs skip
+    them without an extraction until the entry expires. Expired entries are
+    dropped on open. Shared by all threads of a process behind a lock, WAL
+    mode across processes (as Archive).
+    """
+
+    def __init__(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(path), timeout=30.0, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(_SCHEMA)
+        with self._db:
+            self._db.execute("DELETE FROM failures WHERE expires_at <= ?", (time.time(),))
+
+    def get(self, url: str) -> Optional[KnownFailure]:
+        key = cache_key(url)
+        if key is None:
+            return None
+        with self._lock:
+            row = self._db.execute(
+                "SELECT failure, error, failed_at, expires_at FROM failures WHERE key = ? AND expires_at > ?",
+                (key, time.time()),
+            ).fetchone()
+        return KnownFailure(*row) if row else None
+
+    def record(self, url: str, failure: str, error: str) -> bool:
+        """Remember a failure if its class is cached at all; returns whether it was."""
+        ttl = failure_policy(failure).cache_ttl
+        key = cache_key(url)
+        if ttl is None or key is None:
+            return False
+        now = time.time()
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO failures (key, url, failure, error, failed_at, expires_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, url, failure, error, now, now + ttl),
+            )
+        return True
+
+    def forget(self, url: str) -> None:
+        key = cache_key(url)
+        if key is None:
+            return
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM failures WHERE key = ?", (key,))
+
+
+_SHARED: Optional[FailureCache] = None
+_SHARED_LOCK = threading.Lock()
+
+
+def open_failure_cache() -> FailureCache:
+    """Process-wide negative-result cache under the mdl config dir (opened on first use)."""
+    global _SHARED
+    with _SHARED_LOCK:
+        if _SHARED is None:
+            _SHARED = FailureCache(state_path(_CACHE_NAME))
+        return _SHARED
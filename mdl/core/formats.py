@@ -0,0 +1,55 @@
+from __future__ import annotations
+
+from typing import Dict, List, Mapping, Optional
+
+# Source audio codecs (prefixes of yt-dlp's `acodec`, e.g. "mp4a.40.2") that
+# the target takes as-is: with one of these, -x copies the stream instead of
+# running an encoder.
+_AUDIO_NATIVE: Dict[str, List[str]] = {
+    "m4a": ["mp4a", "aac"],
+    "opus": ["opus"],
+    "mp3": ["mp3"],
+    "flac": ["flac"],
+}
+
+# Video: prefer codecs the container takes natively, but only among formats
+# of the best resolution and frame rate (never a downgrade for the sake of
+# the codec). mkv takes everything.
+_VIDEO_SORT: Dict[str, str] = {
+    "mp4": "res,fps,vcodec:h264,acodec:aac",
+}
+
+
+def audio_format_selector(audio_format: str) -> str:
+    """
+    `-f` for an audio download: the best stream whose codec already is the
+    target's, else the best audio stream (then transcoded by -x).
+    """
+    native = [f"ba[acodec^={codec}]" for codec in _AUDIO_NATIVE.get(audio_format, [])]
+    return "/".join(native + ["bestaudio", "best"])
+
+
+def video_format_sort(video_format: str) -> Optional[str]:
+    """`-S` for a video download remuxed to `video_format` (None = yt-dlp's default order)."""
+    return _VIDEO_SORT.get(video_format)
+
+
+def audio_copies(audio_format: str, acodec: Optional[str]) -> bool:
+    """True if a source stream with `acodec` goes into `audio_format` without re-encoding."""
+    native = tuple(_AUDIO_NATIVE.get(audio_format, []))
+    return bool(native and acodec) and str(acodec).lower().startswith(native)
+
+
+def describe_format(kind: str, target: str, rec: Mapping[str, object]) -> str:
+    """
+    Per-item format decision as an output line, from a result record
+    (see builders.RESULT_TEMPLATE): source format and codecs, and whether
+    the conversion to `target` copied the streams or re-encoded them.
+    """
+    fmt = rec.get("format_id") or "?"
+    acodec = str(rec.get("acodec") or "?")
+    if kind == "audio":
+        how = "copy" if audio_copies(target, acodec) else "transcode"
+        return f"[mdl] format: {fmt} ({acodec}) -> {target}: {how}"
+    vcodec = str(rec.get("vcodec") or "?")
+    return f"[mdl] format: {fmt} ({vcodec}+{acodec}) -> {target}: remux"
@@ -0,0 +1,146 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, Optional
+
+from mdl.core.config import Defaults
+from mdl.core.config_store import state_path
+from mdl.core.playlist import is_playlist_url
+from mdl.core.urls import canonical_url, media_key
+
+_CACHE_DIR_NAME = "info-cache"
+_SUFFIX = ".info.json"
+
+
+def cache_key(url: str) -> Optional[str]:
+    """
+    Cache key for a URL: "<extractor>-<id>" when the id can be derived locally,
+    so every URL shape of the same video shares one entry; otherwise a hash of
+    the canonical URL. Playlists are not cached (None).
+    """
+    if is_playlist_url(url):
+        return None
+    key = media_key(url)
+    if key is not None:
+        return f"{key[0]}-{key[1]}"
+    digest = hashlib.sha1(canonical_url(url).encode("utf-8")).hexdigest()[:20]
+    return f"url-{digest}"
+
+
+class InfoCache:
+    """
+    On-disk cache of yt-dlp info JSON, one file per item.
+
+    - Freshness: a file's mtime is its extraction time; entries older than
+      `ttl` seconds are misses (format URLs expire upstream).
+    - Recency: a file's atime is its last use; it is set explicitly on every
+      hit, so LRU works on noatime/relatime mounts too.
+    - Size: after each insert, expired entries are removed, then least
+      recently used ones until both `max_entries` and `max_bytes` hold.
+    """
+
+    def __init__(self, root: Path, *, ttl: int, max_entries: int, max_bytes: int) -> None:
+        self.root = root
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    def _path(self, key: str) -> Path:
+        return self.root / f"{key}{_SUFFIX}"
+
+    def get(self, url: str) -> Optional[Path]:
+        """Path of a fresh cached info JSON for `url` (marking it used), or None."""
+        key = cache_key(url)
+        if key is None:
+            return None
+        path = self._path(key)
+        try:
+            st = path.stat()
+        except OSError:
+            return None
+        now = time.time()
+        if now - st.st_mtime > self.ttl:
+            self._unlink(path)
+            return None
+        try:
+            os.utime(path, (now, st.st_mtime))
+        except OSError:
+            pass
+        return path
+
+    def invalidate(self, url: str) -> None:
+        key = cache_key(url)
+        if key is not None:
+            self._unlink(self._path(key))
+
+    @contextmanager
+    def filling(self, url: str) -> Iterator[Optional[Path]]:
+        """
+        Temporary file for yt-dlp to write the info JSON into. It is moved into
+        the cache on a clean exit if yt-dlp wrote a complete object, and
+        discarded otherwise. Yields None for URLs that are not cacheable.
+        """
+        key = cache_key(url)
+        if key is None:
+            yield None
+            return
+
+        self.root.mkdir(parents=True, exist_ok=True)
+        fd, name = tempfile.mkstemp(prefix=".fill-", suffix=_SUFFIX, dir=str(self.root))
+        os.close(fd)
+        tmp = Path(name)
+        try:
+            yield tmp
+            # One JSON object on one line; anything else (empty, several entries) is not reusable.
+            data = tmp.read_bytes().strip()
+            if data.startswith(b"{") and data.endswith(b"}") and b"\n" not in data:
+                os.replace(tmp, self._path(key))
+                self._evict()
+        finally:
+            self._unlink(tmp)
+
+    def _evict(self) -> None:
+        with self._lock:
+            now = time.time()
+            entries = []
+            for path in self.root.glob(f"*{_SUFFIX}"):
+                if path.name.startswith(".fill-"):
+                    continue
+                try:
+                    st = path.stat()
+                except OSError:
+                    continue
+                if now - st.st_mtime > self.ttl:
+                    self._unlink(path)
+                    continue
+                entries.append((st.st_atime, st.st_size, path))
+
+            entries.sort()  # least recently used first
+            total = sum(size for _, size, _ in entries)
+            while entries and (len(entries) > self.max_entries or total > self.max_bytes):
+                _, size, path = entries.pop(0)
+                self._unlink(path)
+                total -= size
+
+    @staticmethod
+    def _unlink(path: Path) -> None:
+        try:
+            path.unlink()
+        except FileNotFoundError:
+            pass
+
+
+def open_info_cache() -> InfoCache:
+    return InfoCache(
+        state_path(_CACHE_DIR_NAME),
+        ttl=int(Defaults.info_cache_ttl),
+        max_entries=int(Defaults.info_cache_max_entries),
+        max_bytes=int(Defaults.info_cache_max_bytes),
+    )
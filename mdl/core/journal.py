@@ -0,0 +1,338 @@
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+from mdl.core.config import Defaults
+from mdl.core.config_store import state_path
+
+_JOURNAL_NAME = "jobs.sqlite3"
+
+STATE_QUEUED = "queued"
+STATE_RUNNING = "running"
+STATE_DONE = "done"
+STATE_FAILED = "failed"
+STATE_RETRYABLE = "retryable"
+
+# States a job can still leave (the run is unfinished while any job has one).
+_OPEN_STATES = (STATE_QUEUED, STATE_RUNNING, STATE_RETRYABLE)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id          INTEGER PRIMARY KEY,
+    command     TEXT    NOT NULL,
+    kind        TEXT    NOT NULL,
+    source      TEXT    NOT NULL,
+    options     TEXT    NOT NULL,
+    pid         INTEGER,
+    created_at  REAL    NOT NULL,
+    finished_at REAL
+);
+CREATE TABLE IF NOT EXISTS jobs (
+    run_id        INTEGER NOT NULL REFERENCES runs (id) ON DELETE CASCADE,
+    seq           INTEGER NOT NULL,
+    url           TEXT    NOT NULL,
+    out_tpl       TEXT,
+    playlist      TEXT,
+    entry_id      TEXT,
+    state         TEXT    NOT NULL,
+    attempts      INTEGER NOT NULL DEFAULT 0,
+    last_error    TEXT,
+    next_eligible REAL    NOT NULL DEFAULT 0,
+    updated_at    REAL    NOT NULL,
+    PRIMARY KEY (run_id, seq)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS jobs_open ON jobs (run_id, state, next_eligible);
+"""
+
+
+@dataclass(frozen=True)
+class JobSpec:
+    """What to download; enough to rebuild the work item after a restart."""
+    url: str
+    out_tpl: Optional[str] = None   # pre-rendered playlist entry template
+    playlist: Optional[str] = None  # playlist URL whose checkpoint tracks this entry
+    entry_id: Optional[str] = None
+
+
+@dataclass(frozen=True)
+class Job:
+    run_id: int
+    seq: int
+    spec: JobSpec
+    state: str
+    attempts: int
+    last_error: Optional[str]
+    next_eligible: float
+
+
+@dataclass(frozen=True)
+class Run:
+    id: int
+    command: str              # "batch" | "playlist" | "sync" | "watch"
+    kind: str                 # "audio" | "video"
+    source: str               # URL list path or playlist URL (for display)
+    options: Dict[str, Any]   # jobs / pp_jobs of the original invocation
+    pid: Optional[int]
+    created_at: float
+    finished_at: Optional[float]
+    counts: Dict[str, int]    # state -> number of jobs
+
+
+def retry_delay(attempts: int) -> float:
+    """Backoff before attempt `attempts + 1`: doubles per attempt, capped."""
+    delay = Defaults.job_retry_backoff * (2 ** max(0, attempts - 1))
+    return min(delay, Defaults.job_retry_backoff_max)
+
+
+def _pid_alive(pid: Optional[int]) -> bool:
+    if not pid or pid == os.getpid():
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    try:
+        # After a reboot the PID may belong to something else entirely.
+        return b"mdl" in Path(f"/proc/{pid}/cmdline").read_bytes()
+    except OSError:
+        return True
+
+
+class JobJournal:
+    """
+    Durable record of multi-item runs (batch, playlist): one row per job with
+    its state, attempt count, last error and next-eligible time, updated as
+    each job starts and finishes.
+
+    WAL mode with synchronous=NORMAL: a committed transition survives a
+    process crash; a power loss can drop at most the last few, which then
+    just run again. Jobs found `running` when a run is resumed were
+    interrupted mid-flight and are retried (their attempt still counts).
+    """
+
+    def __init__(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(path), timeout=30.0, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute("PRAGMA foreign_keys=ON")
+        self._db.executescript(_SCHEMA)
+
+    # --- runs -----------------------------------------------------------------
+
+    def create_run(
+        self, command: str, kind: str, source: str, specs: Sequence[JobSpec], *, options: Dict[str, Any]
+    ) -> int:
+        now = time.time()
+        with self._lock, self._db:
+            cur = self._db.execute(
+                "INSERT INTO runs (command, kind, source, options, pid, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (command, kind, source, json.dumps(options), os.getpid(), now),
+            )
+            run_id = int(cur.lastrowid)
+            self._db.executemany(
+                "INSERT INTO jobs (run_id, seq, url, out_tpl, playlist, entry_id, state, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (run_id, seq, s.url, s.out_tpl, s.playlist, s.entry_id, STATE_QUEUED, now)
+                    for seq, s in enumerate(specs)
+                ],
+            )
+            self._prune()
+        return run_id
+
+    def claim_run(self, run_id: int, *, retry_failed: bool = False) -> Run:
+        """
+        Take over an unfinished run in this process: interrupted jobs become
+        retryable (or failed once out of attempts), retryable jobs are
+        eligible right away, and optionally failed jobs get a fresh set of
+        attempts. Raises SystemExit if the run is unknown,
+        finished with nothing to retry, or still owned by a live mdl process.
+        """
+        run = self.get_run(run_id)
+        if run is None:
+            raise SystemExit(f"[mdl] ERROR: no run with id {run_id} (see: mdl resume --list).")
+        if run.finished_at is not None and not (retry_failed and run.counts.get(STATE_FAILED)):
+            raise SystemExit(f"[mdl] ERROR: run {run_id} has already finished (retry its failed jobs with --retry-failed).")
+        if _pid_alive(run.pid):
+            raise SystemExit(f"[mdl] ERROR: run {run_id} is still active in process {run.pid}.")
+
+        now = time.time()
+        with self._lock, self._db:
+            self._db.execute("UPDATE runs SET pid = ?, finished_at = NULL WHERE id = ?", (os.getpid(), run_id))
+            self._db.execute(
+                "UPDATE jobs SET state = CASE WHEN attempts >= ? THEN ? ELSE ? END, "
+                "last_error = COALESCE(last_error, 'interrupted'), updated_at = ? "
+                "WHERE run_id = ? AND state = ?",
+                (Defaults.job_max_attempts, STATE_FAILED, STATE_RETRYABLE, now, run_id, STATE_RUNNING),
+            )
+            # An explicit resume does not wait out earlier backoffs.
+            self._db.execute(
+                "UPDATE jobs SET next_eligible = 0 WHERE run_id = ? AND state = ?", (run_id, STATE_RETRYABLE)
+            )
+            if retry_failed:
+                self._db.execute(
+                    "UPDATE jobs SET state = ?, attempts = 0, next_eligible = 0, updated_at = ? "
+                    "WHERE run_id = ? AND state = ?",
+                    (STATE_QUEUED, now, run_id, STATE_FAILED),
+                )
+        claimed = self.get_run(run_id)
+        assert claimed is not None
+        return claimed
+
+    def finish_run(self, run_id: int) -> bool:
+        """Mark the run finished if no job can still change; returns whether it did."""
+        with self._lock, self._db:
+            open_jobs = self._db.execute(
+                f"SELECT COUNT(*) FROM jobs WHERE run_id = ? AND state IN ({','.join('?' * len(_OPEN_STATES))})",
+                (run_id, *_OPEN_STATES),
+            ).fetchone()[0]
+            if open_jobs:
+                return False
+            self._db.execute("UPDATE runs SET finished_at = ?, pid = NULL WHERE id = ?", (time.time(), run_id))
+            return True
+
+    def get_run(self, run_id: int) -> Optional[Run]:
+        runs = self._runs("WHERE id = ?", (run_id,))
+        return runs[0] if runs else None
+
+    def latest_unfinished(self) -> Optional[Run]:
+        runs = self._runs("WHERE finished_at IS NULL ORDER BY id DESC LIMIT 1", ())
+        return runs[0] if runs else None
+
+    def recent_runs(self, limit: int = 20) -> List[Run]:
+        return self._runs("ORDER BY id DESC LIMIT ?", (limit,))
+
+    def _runs(self, where: str, params: tuple) -> List[Run]:
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT id, command, kind, source, options, pid, created_at, finished_at FROM runs {where}", params
+            ).fetchall()
+            out: List[Run] = []
+            for row in rows:
+                counts = dict(
+                    self._db.execute(
+                        "SELECT state, COUNT(*) FROM jobs WHERE run_id = ? GROUP BY state", (row[0],)
+                    ).fetchall()
+                )
+                out.append(Run(
+                    id=row[0], command=row[1], kind=row[2], source=row[3], options=json.loads(row[4]),
+                    pid=row[5], created_at=row[6], finished_at=row[7], counts=counts,
+                ))
+        return out
+
+    def _prune(self) -> None:
+        """
+        Drop finished runs beyond the newest ones (caller holds the lock and a
+        transaction). Unfinished runs are kept however old: they are what
+        `mdl resume` continues, and `mdl watch` may have many in flight.
+        """
+        self._db.execute(
+            "DELETE FROM runs WHERE finished_at IS NOT NULL "
+            "AND id NOT IN (SELECT id FROM runs ORDER BY id DESC LIMIT ?)",
+            (Defaults.journal_keep_runs,),
+        )
+
+    # --- jobs -----------------------------------------------------------------
+
+    def jobs(self, run_id: int, *, states: Optional[Sequence[str]] = None) -> List[Job]:
+        sql = (
+            "SELECT run_id, seq, url, out_tpl, playlist, entry_id, state, attempts, last_error, next_eligible "
+            "FROM jobs WHERE run_id = ?"
+        )
+        params: List[Any] = [run_id]
+        if states is not None:
+            sql += f" AND state IN ({','.join('?' * len(states))})"
+            params.extend(states)
+        with self._lock:
+            rows = self._db.execute(sql + " ORDER BY seq", params).fetchall()
+        return [
+            Job(run_id=r[0], seq=r[1], spec=JobSpec(url=r[2], out_tpl=r[3], playlist=r[4], entry_id=r[5]),
+                state=r[6], attempts=r[7], last_error=r[8], next_eligible=r[9])
+            for r in rows
+        ]
+
+    def runnable(self, run_id: int, *, now: Optional[float] = None) -> List[Job]:
+        """Queued jobs and retryable jobs whose backoff has passed, in list order."""
+        now = time.time() if now is None else now
+        return [
+            j for j in self.jobs(run_id, states=(STATE_QUEUED, STATE_RETRYABLE))
+            if j.state == STATE_QUEUED or j.next_eligible <= now
+        ]
+
+    def next_eligible(self, run_id: int) -> Optional[float]:
+        """Earliest time a retryable job becomes runnable, or None."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT MIN(next_eligible) FROM jobs WHERE run_id = ? AND state = ?", (run_id, STATE_RETRYABLE)
+            ).fetchone()
+        return row[0] if row and row[0] is not None else None
+
+    def start(self, run_id: int, seq: int) -> None:
+        with self._lock, self._db:
+            self._db.execute(
+                "UPDATE jobs SET state = ?, attempts = attempts + 1, updated_at = ? WHERE run_id = ? AND seq = ?",
+                (STATE_RUNNING, time.time(), run_id, seq),
+            )
+
+    def finish(self, run_id: int, seq: int, rc: int, *, error: Optional[str] = None, retry: bool = True) -> str:
+        """
+        Record a job's outcome and return its new state: done (rc 0), queued
+        again if it was cancelled (rc 130, the attempt does not count),
+        retryable with exponential backoff, or failed once out of attempts
+        (at once with `retry=False`, for failures another attempt cannot fix).
+        """
+        now = time.time()
+        with self._lock, self._db:
+            row = self._db.execute(
+                "SELECT attempts FROM jobs WHERE run_id = ? AND seq = ?", (run_id, seq)
+            ).fetchone()
+            attempts = int(row[0]) if row else 0
+            attempts_sql = "attempts"
+            if rc == 0:
+                state, error = STATE_DONE, None
+            elif rc == 130:
+                state, error = STATE_QUEUED, error or "cancelled"
+                attempts_sql = "MAX(attempts - 1, 0)"
+            else:
+                state = STATE_FAILED if not retry or attempts >= Defaults.job_max_attempts else STATE_RETRYABLE
+                error = error or f"exit code {rc}"
+            next_eligible = now + retry_delay(attempts) if state == STATE_RETRYABLE else 0
+            self._db.execute(
+                f"UPDATE jobs SET state = ?, attempts = {attempts_sql}, last_error = ?, next_eligible = ?, "
+                "updated_at = ? WHERE run_id = ? AND seq = ?",
+                (state, error, next_eligible, now, run_id, seq),
+            )
+        return state
+
+    def requeue_running(self, run_id: int) -> None:
+        """Put jobs left running by an interrupted pass back in the queue (attempt not counted)."""
+        with self._lock, self._db:
+            self._db.execute(
+                "UPDATE jobs SET state = ?, attempts = MAX(attempts - 1, 0), updated_at = ? "
+                "WHERE run_id = ? AND state = ?",
+                (STATE_QUEUED, time.time(), run_id, STATE_RUNNING),
+            )
+
+
+_SHARED: Optional[JobJournal] = None
+_SHARED_LOCK = threading.Lock()
+
+
+def open_journal() -> JobJournal:
+    """Process-wide job journal under the mdl config dir (opened on first use)."""
+    global _SHARED
+    with _SHARED_LOCK:
+        if _SHARED is None:
+            _SHARED = JobJournal(state_path(_JOURNAL_NAME))
+        return _SHARED
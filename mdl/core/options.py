@@ -2,7 +2,7 @@ from __future__ import annotations
 
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Optional
+from typing import Optional, Tuple
 
 
 @dataclass(frozen=True)
@@ -16,10 +16,42 @@ class Options:
 
     # Download/info
     url: Optional[str]
+    json_out: bool             # info --json
 
     # Smoke
     smoke_kind: Optional[str]  # "audio" | "video"
 
+    # Batch
+    source: Optional[str]      # URL list path, "-" for stdin
+    kind: Optional[str]        # "audio" | "video" | "both" (batch, sync)
+    jobs: Optional[int]        # --jobs (None -> Defaults.batch_jobs)
+    pp_jobs: Optional[int]     # --pp-jobs (None -> Defaults.postprocess_jobs)
+
+    # Telemetry
+    events: Optional[str]      # --events FILE (JSONL progress events)
+    metrics: Optional[str]     # --metrics FILE (Prometheus textfile)
+    profile: Optional[str]     # --profile FILE (Chrome trace; MDL_PROFILE when not given)
+
+    # Daemon
+    serve_action: Optional[str]  # None (run) | "status" | "cancel" | "stop"
+    job_id: Optional[int]        # serve cancel ID
+
+    # Resume
+    run_id: Optional[int]      # resume RUN (None -> latest unfinished run)
+    retry_failed: bool         # --retry-failed
+    list_runs: bool            # resume --list
+
+    # Info, sync
+    urls: Tuple[str, ...]      # info/sync URL...
+    full: bool                 # sync --full
+
+    # Multi-node queue
+    coordinator_action: Optional[str]  # None (serve) | "add" | "status"
+    queue: Optional[str]       # worker QUEUE / coordinator --queue: coordinator URL or queue file
+    listen: Optional[str]      # coordinator --listen HOST:PORT
+    out: Optional[str]         # worker --out DIR (None -> the configured out)
+    drain: bool                # worker --drain
+
     # Settings commands
     list_values: bool          # --list
     value: Optional[str]       # optional positional VALUE for settings
@@ -28,14 +60,42 @@ class Options:
     def from_namespace(ns) -> "Options":
         # In cli.py you used --print (dest defaults to "print").
         # We store it internally as print_cmd to avoid using name "print".
+        urls = tuple(str(u) for u in getattr(ns, "urls", None) or ())
         return Options(
             command=str(ns.command),
             print_cmd=bool(getattr(ns, "print", False)),
 
-            url=(str(ns.url) if hasattr(ns, "url") else None),
+            # Commands that take several URLs (info, sync) still expose a lone one as `url`.
+            url=(str(ns.url) if hasattr(ns, "url") else (urls[0] if len(urls) == 1 else None)),
+            json_out=bool(getattr(ns, "json_out", False)),
 
             smoke_kind=(str(ns.smoke_kind) if hasattr(ns, "smoke_kind") else None),
 
+            source=(str(ns.source) if hasattr(ns, "source") else None),
+            kind=(str(ns.kind) if hasattr(ns, "kind") else None),
+            jobs=(int(ns.jobs) if getattr(ns, "jobs", None) is not None else None),
+            pp_jobs=(int(ns.pp_jobs) if getattr(ns, "pp_jobs", None) is not None else None),
+
+            events=(str(ns.events) if getattr(ns, "events", None) else None),
+            metrics=(str(ns.metrics) if getattr(ns, "metrics", None) else None),
+            profile=(str(ns.profile) if getattr(ns, "profile", None) else None),
+
+            serve_action=(str(ns.serve_action) if getattr(ns, "serve_action", None) else None),
+            job_id=(int(ns.job_id) if getattr(ns, "job_id", None) is not None else None),
+
+            run_id=(int(ns.run_id) if getattr(ns, "run_id", None) is not None else None),
+            retry_failed=bool(getattr(ns, "retry_failed", False)),
+            list_runs=bool(getattr(ns, "list_runs", False)),
+
+            urls=urls,
+            full=bool(getattr(ns, "full", False)),
+
+            coordinator_action=(str(ns.coordinator_action) if getattr(ns, "coordinator_action", None) else None),
+            queue=(str(ns.queue) if getattr(ns, "queue", None) else None),
+            listen=(str(ns.listen) if getattr(ns, "listen", None) else None),
+            out=(str(ns.out) if getattr(ns, "out", None) else None),
+            drain=bool(getattr(ns, "drain", False)),
+
             list_values=bool(getattr(ns, "list", False)),
             value=(str(ns.value) if hasattr(ns, "value") and ns.value is not None else None),
         )
@@ -52,7 +112,11 @@ class AppConfig:
     cover: bool               # cover behavior enabled
     audio_format: str         # "flac" | "mp3" | "opus" | "m4a"
     video_format: str         # "mp4" | "mkv"
+    engine: str               # "subprocess" | "inprocess"
     out_dir: str              # absolute base output path as string
+    host_jobs: str = "auto"   # "auto" (from preset) | "off" | per-host download cap ("1".."8")
+    bandwidth: str = "auto"   # "auto" (from preset) | "off" | total download rate ("1M".."64M")
+    scratch_dir: str = ""     # absolute scratch path as string ("" = off: write into out_dir)
 
 
 @dataclass(frozen=True)
@@ -64,7 +128,8 @@ class RunOptions:
     Invariants:
     - out_dir is defined (downloads)
     - cookies_from is None when cookies are disabled
-    - limit_rate/sleep* are only set in safe preset
+    - limit_rate/sleep* start from the preset (safe only) and are adjusted
+      per host by mdl.core.throttle before each download
     """
     out_dir: Path
     preset: str
@@ -72,8 +137,28 @@ class RunOptions:
     cover: bool
     audio_format: str
     video_format: str
+    engine: str               # "subprocess" | "inprocess" (runner falls back to subprocess)
 
     # Internal network throttling derived from preset (not user-exposed)
     limit_rate: Optional[str]
-    sleep_min: Optional[int]
-    sleep_max: Optional[int]
+    sleep_min: Optional[float]
+    sleep_max: Optional[float]
+
+    # Multi-item runs: concurrent downloads per host (None = no per-host cap)
+    host_jobs: Optional[int] = None
+
+    # Total download rate shared by all concurrent downloads, in bytes/s
+    # (None = no budget; see mdl.core.bandwidth)
+    bandwidth: Optional[int] = None
+
+    # Fast local directory for in-progress files; finished files are moved
+    # into out_dir (None = write into out_dir directly; see mdl.services.scratch)
+    scratch_dir: Optional[Path] = None
+
+    # Exported cookie jar passed as --cookies instead of --cookies-from-browser
+    # (set per run by mdl.services.cookie_jar; None on --print)
+    cookies_file: Optional[Path] = None
+
+    # Encoder threads per ffmpeg transcode (None = ffmpeg's default, all CPUs);
+    # multi-item runs split the CPUs over their post-processing workers
+    ffmpeg_threads: Optional[int] = None
@@ -1,9 +1,44 @@
 from __future__ import annotations
 
+import re
+
+from mdl.core.config import Defaults
+from mdl.core.urls import KIND_PLAYLIST, classify_url
+
+_INDEX_FIELD = re.compile(r"%\(playlist_index\)(?P<spec>0?\d*)d")
+
 
 def is_playlist_url(url: str) -> bool:
     """
-    Best-effort heuristic used only for output templates.
-    yt-dlp remains the source of truth for what gets downloaded.
+    True for URLs that name a playlist (see mdl.core.urls.classify_url); picks
+    the output template and whether entries are fanned out. A watch URL that
+    merely carries a list= parameter names a single video.
+    """
+    return classify_url(url).kind == KIND_PLAYLIST
+
+
+def entry_template(tpl: str, *, playlist_title: str, playlist_index: int) -> str:
+    """
+    Render the playlist fields of a playlist output template for one entry,
+    so the entry can be downloaded on its own and still land in the same
+    place as a whole-playlist run would put it.
+
+    The title is sanitized as a single path component and escaped for
+    yt-dlp's template syntax; all other fields are left for yt-dlp.
+    """
+    tpl = _INDEX_FIELD.sub(lambda m: f"%{m.group('spec')}d" % playlist_index, tpl)
+    title = playlist_title.replace("/", "⧸").replace("\x00", "").strip() or "NA"
+    return tpl.replace("%(playlist_title)s", title.replace("%", "%%"))
+
+
+def audio_entry_template(video_tpl: str) -> str:
+    """
+    The audio counterpart of a rendered video playlist entry template:
+    both playlist templates differ only in their first path component
+    (the uploader field), so that component is swapped.
     """
-    return "list=" in url
+    video_head = Defaults.video_playlist_tpl.split("/", 1)[0]
+    audio_head = Defaults.audio_playlist_tpl.split("/", 1)[0]
+    if video_tpl.startswith(video_head + "/"):
+        return audio_head + video_tpl[len(video_head):]
+    return video_tpl
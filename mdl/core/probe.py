@@ -0,0 +1,110 @@
+from __future__ import annotations
+
+from typing import Any, Dict, List, Mapping, Optional
+
+# Per-format fields kept in `mdl info --json` (absent/None values are dropped).
+_FORMAT_FIELDS = ("format_id", "ext", "protocol", "width", "height", "fps", "vcodec", "acodec", "vbr", "abr", "tbr", "asr")
+
+
+def _num(value: Any) -> Optional[float]:
+    return float(value) if isinstance(value, (int, float)) and not isinstance(value, bool) else None
+
+
+def _format(fmt: Mapping[str, Any], duration: Optional[float]) -> Dict[str, Any]:
+    out = {k: fmt[k] for k in _FORMAT_FIELDS if fmt.get(k) is not None}
+    size = _num(fmt.get("filesize"))
+    approx = size is None
+    if size is None:
+        size = _num(fmt.get("filesize_approx"))
+    tbr = _num(fmt.get("tbr"))
+    if size is None and tbr and duration:
+        size = tbr * 1000 / 8 * duration  # tbr is in KBit/s
+    if size is not None:
+        out["filesize"] = int(size)
+        if approx:
+            out["filesize_approx"] = True
+    return out
+
+
+def summarize_info(url: str, info: Mapping[str, Any]) -> Dict[str, Any]:
+    """
+    Compact description of an extracted info dict (`mdl info --json`):
+    identity, duration and, per format, container, codecs, bitrates and
+    size (exact, or estimated from the bitrate and flagged filesize_approx).
+    """
+    duration = _num(info.get("duration"))
+    formats = info.get("formats") or [info]
+    return {
+        "url": url,
+        "id": info.get("id"),
+        "title": info.get("title"),
+        "extractor": info.get("extractor_key") or info.get("extractor"),
+        "duration": duration,
+        "formats": [_format(f, duration) for f in formats if isinstance(f, Mapping)],
+    }
+
+
+def summarize_playlist(url: str, playlist_id: Optional[str], title: str, durations: List[Optional[float]]) -> Dict[str, Any]:
+    """`mdl info --json` for a playlist: entry count and total duration (of the entries that list one)."""
+    known = [d for d in durations if d is not None]
+    return {
+        "url": url,
+        "id": playlist_id,
+        "title": title,
+        "type": "playlist",
+        "entries": len(durations),
+        "duration": sum(known) if known else None,
+    }
+
+
+def _size(fmt: Mapping[str, Any]) -> str:
+    size = fmt.get("filesize")
+    if size is None:
+        return ""
+    mark = "~" if fmt.get("filesize_approx") else ""
+    for unit in ("B", "KiB", "MiB", "GiB"):
+        if size < 1024 or unit == "GiB":
+            return f"{mark}{size:.0f}{unit}" if unit == "B" else f"{mark}{size:.2f}{unit}"
+        size /= 1024
+    return ""
+
+
+def _clock(seconds: float) -> str:
+    s = int(round(seconds))
+    return f"{s // 3600}:{s // 60 % 60:02d}:{s % 60:02d}" if s >= 3600 else f"{s // 60}:{s % 60:02d}"
+
+
+def _resolution(fmt: Mapping[str, Any]) -> str:
+    if fmt.get("width") and fmt.get("height"):
+        return f"{fmt['width']}x{fmt['height']}"
+    if fmt.get("vcodec") == "none":
+        return "audio only"
+    return str(fmt.get("height") or "")
+
+
+def _rate(value: Any) -> str:
+    return f"{value:.0f}k" if isinstance(value, (int, float)) and value else ""
+
+
+def format_table(summary: Mapping[str, Any]) -> List[str]:
+    """The human view of a summary (as yt-dlp -F), one string per line."""
+    head = f"[mdl] info: {summary.get('title') or '?'} [{summary.get('id') or '?'}]"
+    if summary.get("duration") is not None:
+        head += f" {_clock(summary['duration'])}"
+    if summary.get("type") == "playlist":
+        return [f"{head}, playlist of {summary.get('entries', 0)} entries"]
+    rows = [["ID", "EXT", "RESOLUTION", "FPS", "FILESIZE", "TBR", "VCODEC", "ACODEC", "ABR"]]
+    for fmt in summary.get("formats", []):
+        rows.append([
+            str(fmt.get("format_id", "")),
+            str(fmt.get("ext", "")),
+            _resolution(fmt),
+            f"{fmt['fps']:g}" if fmt.get("fps") else "",
+            _size(fmt),
+            _rate(fmt.get("tbr")),
+            str(fmt.get("vcodec", "")),
+            str(fmt.get("acodec", "")),
+            _rate(fmt.get("abr")),
+        ])
+    widths = [max(len(row[i]) for row in rows) for i in range(len(rows[0]))]
+    return [head] + ["  ".join(cell.ljust(w) for cell, w in zip(row, widths)).rstrip() for row in rows]
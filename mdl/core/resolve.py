@@ -2,9 +2,10 @@ from __future__ import annotations
 
 from pathlib import Path
 
-from mdl.core.config import Defaults
+from mdl.core.config import Defaults, default_out_dir
 from mdl.core.config_store import load_config
 from mdl.core.options import Options, RunOptions
+from mdl.infra.tracing import span
 
 
 def resolve_run_options(opts: Options) -> RunOptions:
@@ -15,14 +16,15 @@ def resolve_run_options(opts: Options) -> RunOptions:
     - We intentionally do NOT expose rate/sleep/js runtime/remote components to the user.
       Presets control internal throttling.
     """
-    cfg = load_config()
+    with span("load_config"):
+        cfg = load_config()
 
     out_raw = str(getattr(cfg, "out_dir", "")).strip()
-    base_out = Path(out_raw if out_raw else Defaults.out_dir).expanduser()
+    base_out = Path(out_raw).expanduser() if out_raw else default_out_dir().expanduser()
     try:
         out_dir = base_out.resolve()
     except Exception:
-        out_dir = Path(Defaults.out_dir).expanduser().resolve()
+        out_dir = default_out_dir().expanduser().resolve()
 
     preset = str(cfg.preset).strip().lower()
 
@@ -46,6 +48,31 @@ def resolve_run_options(opts: Options) -> RunOptions:
         sleep_min = int(Defaults.sleep_min)
         sleep_max = int(Defaults.sleep_max)
 
+    # Per-host download cap for multi-item runs ("auto" follows the preset)
+    host_jobs_raw = str(getattr(cfg, "host_jobs", "auto")).strip().lower()
+    if host_jobs_raw == "off":
+        host_jobs = None
+    elif host_jobs_raw.isdigit() and int(host_jobs_raw) > 0:
+        host_jobs = int(host_jobs_raw)
+    else:
+        host_jobs = Defaults.host_jobs_fast if preset == "fast" else Defaults.host_jobs_safe
+
+    # Total download budget shared by concurrent downloads ("auto" follows the preset).
+    # Imported here: mdl.app loads this module for every command, settings included.
+    from mdl.core.throttle import parse_rate
+
+    bandwidth_raw = str(getattr(cfg, "bandwidth", "auto")).strip().lower()
+    if bandwidth_raw == "off":
+        bandwidth = None
+    elif bandwidth_raw != "auto":
+        bandwidth = parse_rate(bandwidth_raw)
+    else:
+        bandwidth = parse_rate(Defaults.bandwidth_safe) if preset == "safe" else None
+
+    # Scratch directory for in-progress files ("" = off)
+    scratch_raw = str(getattr(cfg, "scratch_dir", "")).strip()
+    scratch_dir = Path(scratch_raw).expanduser() if scratch_raw else None
+
     # Defensive sanity checks (even though user can't set these via CLI)
     if preset == "safe":
         if sleep_min is None or sleep_max is None or sleep_min <= 0 or sleep_max <= 0:
@@ -60,7 +87,11 @@ def resolve_run_options(opts: Options) -> RunOptions:
         cover=bool(cfg.cover),
         audio_format=str(cfg.audio_format).strip().lower(),
         video_format=str(cfg.video_format).strip().lower(),
+        engine=str(cfg.engine).strip().lower(),
         limit_rate=limit_rate,
         sleep_min=sleep_min,
         sleep_max=sleep_max,
+        host_jobs=host_jobs,
+        bandwidth=bandwidth,
+        scratch_dir=scratch_dir,
     )
@@ -0,0 +1,99 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Set
+
+from mdl.core.config_store import state_path
+
+_SYNC_DIR = "sync"
+
+
+class SyncState:
+    """
+    What `mdl sync` knows about one playlist or channel: the ids of entries
+    already downloaded, the newest upload date listed so far and when the
+    whole listing was last walked. Persisted after every change (temp file
+    + rename, as PlaylistCheckpoint). Unlike a checkpoint it is never
+    cleared: it is what lets the next run stop early.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        self.seen: Set[str] = set()
+        self.newest: Optional[str] = None  # upload date, YYYYMMDD
+        self.full_at: float = 0.0          # last complete walk of the listing
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+            self.seen = {str(x) for x in data.get("seen", [])}
+            self.newest = str(data["newest"]) if data.get("newest") else None
+            self.full_at = float(data.get("full_at") or 0.0)
+        except (OSError, ValueError, AttributeError, TypeError):
+            pass
+
+    def _save(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        payload = {"seen": sorted(self.seen), "newest": self.newest, "full_at": self.full_at}
+        tmp.write_text(json.dumps(payload), encoding="utf-8")
+        os.replace(tmp, self.path)
+
+    def known(self, entry_id: str, upload_date: Optional[str]) -> bool:
+        """True for an entry a previous run already covered: downloaded, or older than the newest one listed."""
+        if entry_id in self.seen:
+            return True
+        return bool(upload_date and self.newest and upload_date < self.newest)
+
+    def mark_seen(self, entry_id: str) -> None:
+        with self._lock:
+            if entry_id not in self.seen:
+                self.seen.add(entry_id)
+                self._save()
+
+    def listed(self, upload_dates: Iterable[Optional[str]], *, complete_ids: Optional[Set[str]] = None) -> int:
+        """
+        Record a walk of the listing: the newest upload date in it and, for
+        a walk that reached the end (`complete_ids` = every id listed),
+        forget entries that are no longer there. Returns how many were
+        forgotten.
+        """
+        with self._lock:
+            dates = [d for d in upload_dates if d]
+            if dates and (self.newest is None or max(dates) > self.newest):
+                self.newest = max(dates)
+            gone = 0
+            if complete_ids is not None:
+                gone = len(self.seen - complete_ids)
+                self.seen &= complete_ids
+                self.full_at = time.time()
+            self._save()
+            return gone
+
+
+_OPEN: Dict[Path, SyncState] = {}
+_OPEN_LOCK = threading.Lock()
+
+
+def _state_file(kind: str, url: str) -> Path:
+    digest = hashlib.sha1(url.strip().encode("utf-8")).hexdigest()[:16]
+    return state_path(_SYNC_DIR) / f"{kind}-{digest}.json"
+
+
+def open_sync_state(kind: str, url: str) -> SyncState:
+    """Process-wide handle on the sync state of one playlist/channel URL for `kind`."""
+    path = _state_file(kind, url)
+    with _OPEN_LOCK:
+        state = _OPEN.get(path)
+        if state is None:
+            state = _OPEN[path] = SyncState(path)
+        return state
+
+
+def is_synced(kind: str, url: str) -> bool:
+    """True if `mdl sync` tracks this playlist/channel for `kind` (without loading it)."""
+    return _state_file(kind, url).exists()
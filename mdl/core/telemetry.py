@@ -0,0 +1,279 @@
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, List, Optional, TextIO
+
+from mdl.core.throttle import host_key
+from mdl.infra.tracing import origin, profiling, record_span, trace_track
+
+# Emit at most one "downloading" progress event per item per interval (seconds).
+_PROGRESS_EVENT_INTERVAL = 1.0
+
+_PHASES = ("extract", "download", "handoff", "postprocess")
+
+
+class EventLog:
+    """Append-only JSONL event stream (one object per line, flushed per line)."""
+
+    def __init__(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._fh: TextIO = open(path, "a", encoding="utf-8", buffering=1)
+
+    def emit(self, event: str, **fields: Any) -> None:
+        rec = {"ts": round(time.time(), 3), "event": event}
+        rec.update({k: v for k, v in fields.items() if v is not None})
+        line = json.dumps(rec, ensure_ascii=False, separators=(",", ":"))
+        with self._lock:
+            self._fh.write(line + "\n")
+
+
+def _label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class Metrics:
+    """
+    Process-lifetime counters, rewritten atomically as a Prometheus
+    textfile-collector file after every change.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.lock = threading.RLock()  # held by callers while updating counters
+        self.items: Counter = Counter()             # (kind, result) -> count
+        self.bytes: Counter = Counter()             # host -> bytes
+        self.download_seconds: Counter = Counter()  # host -> seconds
+        self.phase_seconds: Counter = Counter()     # phase -> seconds
+        self.active = 0
+
+    def render(self) -> str:
+        out: List[str] = []
+
+        def family(name: str, kind: str, help_text: str, samples: List[str]) -> None:
+            out.append(f"# HELP {name} {help_text}")
+            out.append(f"# TYPE {name} {kind}")
+            out.extend(samples)
+
+        family("mdl_items_total", "counter", "Items finished by this mdl process, by kind and result.", [
+            f'mdl_items_total{{kind="{_label(k)}",result="{_label(r)}"}} {n}'
+            for (k, r), n in sorted(self.items.items())
+        ])
+        family("mdl_items_in_progress", "gauge", "Items currently running.", [
+            f"mdl_items_in_progress {self.active}"
+        ])
+        family("mdl_downloaded_bytes_total", "counter", "Bytes downloaded, by host.", [
+            f'mdl_downloaded_bytes_total{{host="{_label(h)}"}} {n}' for h, n in sorted(self.bytes.items())
+        ])
+        family("mdl_download_seconds_total", "counter", "Seconds spent downloading, by host.", [
+            f'mdl_download_seconds_total{{host="{_label(h)}"}} {s:.3f}'
+            for h, s in sorted(self.download_seconds.items())
+        ])
+        family("mdl_phase_seconds_total", "counter", "Seconds spent per item phase.", [
+            f'mdl_phase_seconds_total{{phase="{p}"}} {self.phase_seconds.get(p, 0.0):.3f}' for p in _PHASES
+        ])
+        family("mdl_last_update_timestamp_seconds", "gauge", "Unix time of the last metrics update.", [
+            f"mdl_last_update_timestamp_seconds {time.time():.3f}"
+        ])
+        return "\n".join(out) + "\n"
+
+    def write(self) -> None:
+        with self.lock:
+            text = self.render()
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_name(f".{self.path.name}.{os.getpid()}.tmp")
+            tmp.write_text(text, encoding="utf-8")
+            os.replace(tmp, self.path)
+
+
+class ItemTelemetry:
+    """
+    Tracks one download: which phase it is in (extract -> download ->
+    [handoff ->] postprocess), bytes per downloaded file, and the final path. `progress`
+    is a ProgressSink for the runner.
+
+    When profiling, the phases are also recorded as spans, on a track of
+    their own per item: they do not nest with the spans of the threads
+    involved (extraction starts before yt-dlp does, post-processing may run
+    on another worker).
+    """
+
+    def __init__(self, telemetry: "Telemetry", kind: str, url: str) -> None:
+        self._telemetry = telemetry
+        self.kind = kind
+        self.url = url
+        self.host = host_key(url)
+        self.started = time.monotonic()
+        self.filepath: Optional[str] = None
+        self.phase_seconds: Dict[str, float] = {}
+        self._phase: Optional[str] = "extract"
+        self._phase_started = self.started
+        self._bytes: Dict[str, int] = {}
+        self._last_event = 0.0
+        self._lock = threading.Lock()
+        self._origin = origin()
+        self._track = trace_track() if self._origin is not None else None
+
+    @property
+    def downloaded_bytes(self) -> int:
+        return sum(self._bytes.values())
+
+    def _enter(self, phase: Optional[str]) -> None:
+        now = time.monotonic()
+        if self._phase is not None:
+            self.phase_seconds[self._phase] = self.phase_seconds.get(self._phase, 0.0) + now - self._phase_started
+            if self._origin is not None:
+                record_span(
+                    self._phase,
+                    self._phase_started,
+                    now,
+                    cat="yt-dlp",
+                    at=self._origin,
+                    async_id=self._track,
+                    kind=self.kind,
+                    url=self.url,
+                )
+        self._phase = phase
+        self._phase_started = now
+        if phase is not None:
+            self._telemetry.emit("phase", self, phase=phase)
+
+    def enter(self, phase: str) -> None:
+        """Switch phase explicitly (e.g. "handoff" while waiting for a post-processing slot)."""
+        with self._lock:
+            if phase != self._phase:
+                self._enter(phase)
+
+    def progress(self, phase: str, data: Dict[str, Any]) -> None:
+        with self._lock:
+            if phase != self._phase:
+                self._enter(phase)
+            status = data.get("status")
+
+            if phase == "postprocess":
+                if data.get("filepath"):
+                    self.filepath = str(data["filepath"])
+                self._telemetry.emit("progress", self, phase=phase, status=status, postprocessor=data.get("postprocessor"))
+                return
+
+            done = data.get("downloaded_bytes") or 0
+            total = data.get("total_bytes") or data.get("total_bytes_estimate")
+            if status == "finished" and data.get("total_bytes"):
+                done = data["total_bytes"]
+            name = str(data.get("filename") or "")
+            self._bytes[name] = max(self._bytes.get(name, 0), int(done))
+
+            now = time.monotonic()
+            if status == "downloading" and now - self._last_event < _PROGRESS_EVENT_INTERVAL:
+                return
+            self._last_event = now
+            self._telemetry.emit(
+                "progress",
+                self,
+                phase=phase,
+                status=status,
+                downloaded_bytes=int(done),
+                total_bytes=(int(total) if total else None),
+                speed=(round(data["speed"], 1) if data.get("speed") else None),
+                eta=data.get("eta"),
+                filename=data.get("filename"),
+            )
+
+    def file(self, path: str) -> None:
+        """Final location of a finished item (from the archive records)."""
+        self.filepath = path
+
+    def finish(self, rc: int, *, skipped: bool = False) -> None:
+        with self._lock:
+            self._enter(None)
+        if skipped:
+            result = "skipped"
+        elif rc == 0:
+            result = "ok"
+        elif rc == 130:
+            result = "cancelled"
+        else:
+            result = "failed"
+        self._telemetry.finished(self, rc, result)
+
+
+class Telemetry:
+    """Fans item lifecycle updates out to the event log and/or metrics file."""
+
+    def __init__(self, *, events: Optional[EventLog], metrics: Optional[Metrics]) -> None:
+        self.events = events
+        self.metrics = metrics
+
+    def emit(self, event: str, item: ItemTelemetry, **fields: Any) -> None:
+        if self.events is not None:
+            self.events.emit(event, kind=item.kind, url=item.url, host=item.host, **fields)
+
+    def start_item(self, kind: str, url: str) -> ItemTelemetry:
+        item = ItemTelemetry(self, kind, url)
+        self.emit("item_start", item)
+        self.emit("phase", item, phase="extract")
+        m = self.metrics
+        if m is not None:
+            with m.lock:
+                m.active += 1
+                m.write()
+        return item
+
+    def finished(self, item: ItemTelemetry, rc: int, result: str) -> None:
+        elapsed = time.monotonic() - item.started
+        self.emit(
+            "item_end",
+            item,
+            rc=rc,
+            result=result,
+            elapsed=round(elapsed, 3),
+            downloaded_bytes=item.downloaded_bytes,
+            filepath=item.filepath,
+            phases={p: round(s, 3) for p, s in item.phase_seconds.items()},
+        )
+        m = self.metrics
+        if m is None:
+            return
+        with m.lock:
+            m.active = max(0, m.active - 1)
+            m.items[(item.kind, result)] += 1
+            if result != "skipped":
+                m.bytes[item.host] += item.downloaded_bytes
+                m.download_seconds[item.host] += item.phase_seconds.get("download", 0.0)
+                for phase, seconds in item.phase_seconds.items():
+                    m.phase_seconds[phase] += seconds
+            m.write()
+
+
+_CURRENT: Optional[Telemetry] = None
+
+
+def configure_telemetry(*, events: Optional[str], metrics: Optional[str]) -> None:
+    """Enable telemetry for this process (`--events FILE`, `--metrics FILE`)."""
+    global _CURRENT
+    if not events and not metrics:
+        _CURRENT = None
+        return
+    _CURRENT = Telemetry(
+        events=(EventLog(Path(events).expanduser()) if events else None),
+        metrics=(Metrics(Path(metrics).expanduser()) if metrics else None),
+    )
+    if _CURRENT.metrics is not None:
+        _CURRENT.metrics.write()
+
+
+# Phase tracking for --profile alone (no events or metrics to write).
+_SPANS_ONLY = Telemetry(events=None, metrics=None)
+
+
+def start_item(kind: str, url: str) -> Optional[ItemTelemetry]:
+    """Tracker for one download, or None when telemetry and profiling are off."""
+    if _CURRENT is None:
+        return _SPANS_ONLY.start_item(kind, url) if profiling() else None
+    return _CURRENT.start_item(kind, url)
@@ -0,0 +1,210 @@
+from __future__ import annotations
+
+import json
+import os
+import re
+import threading
+import time
+from dataclasses import dataclass, replace
+from pathlib import Path
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+from mdl.core.config import Defaults
+from mdl.core.config_store import state_path
+from mdl.core.options import RunOptions
+
+_STATE_NAME = "throttle.json"
+
+# yt-dlp output that means "the host wants us to slow down".
+_THROTTLE_SIGNAL = re.compile(
+    r"HTTP Error 429|HTTP Error 403|Too Many Requests|rate.?limit|"
+    r"confirm you.re not a bot|try again later|throttl",
+    re.IGNORECASE,
+)
+
+_HOST_ALIASES = {"youtu.be": "youtube.com", "youtube-nocookie.com": "youtube.com"}
+_HOST_PREFIXES = ("www.", "m.", "music.")
+
+_UNITS = {"": 1, "K": 1024, "M": 1024**2, "G": 1024**3}
+
+
+def parse_rate(raw: str) -> int:
+    """Parse a yt-dlp style rate ("512K", "1M", "1.5M") into bytes per second."""
+    m = re.fullmatch(r"\s*(\d+(?:\.\d+)?)\s*([KMG]?)i?B?\s*", str(raw), re.IGNORECASE)
+    if not m:
+        raise ValueError(f"invalid rate '{raw}'")
+    return int(float(m.group(1)) * _UNITS[m.group(2).upper()])
+
+
+def format_rate(bps: int) -> str:
+    """Format bytes per second for --limit-rate, e.g. 1572864 -> "1536K"."""
+    if bps % _UNITS["M"] == 0:
+        return f"{bps // _UNITS['M']}M"
+    return f"{max(1, bps // _UNITS['K'])}K"
+
+
+def is_throttle_signal(line: str) -> bool:
+    return bool(_THROTTLE_SIGNAL.search(line))
+
+
+def host_key(url: str) -> str:
+    """Host that throttling state is tracked under (subdomain variants folded)."""
+    try:
+        host = (urlsplit(url.strip()).hostname or "").lower()
+    except ValueError:
+        host = ""
+    for prefix in _HOST_PREFIXES:
+        if host.startswith(prefix):
+            host = host[len(prefix):]
+            break
+    return _HOST_ALIASES.get(host, host) or "unknown"
+
+
+@dataclass(frozen=True)
+class HostLimits:
+    rate: Optional[int]  # bytes/s; None = unlimited
+    sleep: float         # --sleep-interval seconds; 0 = no sleep flags
+
+
+class ThrottleController:
+    """
+    Per-host AIMD-style controller for yt-dlp's --limit-rate and sleep intervals.
+
+    - A clean run (exit 0, no throttling signals) speeds the host up: rate x1.25
+      and sleep x0.75, at most once per `throttle_increase_every` seconds so a
+      burst of parallel successes does not ramp it all at once.
+    - A run that hit HTTP 429/403 or similar halves the rate and doubles the
+      sleep immediately.
+    - Bounds depend on the preset: safe never goes unlimited nor below the
+      minimum sleep; fast starts unlimited and only limits hosts that pushed back.
+
+    State is kept in <config dir>/throttle.json so a new run starts at the
+    last known-good limits for each host.
+    """
+
+    def __init__(self, path: Path, preset: str) -> None:
+        self.path = path
+        self.preset = preset
+        self._lock = threading.Lock()
+
+        self._min_rate = parse_rate(Defaults.throttle_min_rate)
+        self._max_rate: Optional[int] = parse_rate(Defaults.throttle_max_rate) if preset == "safe" else None
+        self._min_sleep = float(Defaults.throttle_safe_min_sleep) if preset == "safe" else 0.0
+        self._max_sleep = float(Defaults.throttle_max_sleep)
+        if preset == "safe":
+            self._initial = HostLimits(rate=parse_rate(Defaults.limit_rate), sleep=float(Defaults.sleep_min))
+        else:
+            self._initial = HostLimits(rate=None, sleep=0.0)
+
+    def limits(self, host: str) -> HostLimits:
+        with self._lock:
+            entry = self._load().get(host)
+        if not entry:
+            return self._initial
+        return self._clamp(HostLimits(rate=entry.get("rate"), sleep=float(entry.get("sleep", 0.0))))
+
+    def apply(self, run_opts: RunOptions, url: str) -> RunOptions:
+        """
+        RunOptions with throttling flags set for the host of `url`. The rate
+        never exceeds the whole bandwidth budget; the share one download
+        actually gets is set per run by mdl.core.bandwidth.
+        """
+        lim = self.limits(host_key(url))
+        rate = lim.rate
+        if run_opts.bandwidth is not None:
+            rate = run_opts.bandwidth if rate is None else min(rate, run_opts.bandwidth)
+        if lim.sleep > 0:
+            sleep_min: Optional[float] = round(lim.sleep, 1)
+            sleep_max: Optional[float] = round(lim.sleep * (Defaults.sleep_max / Defaults.sleep_min), 1)
+        else:
+            sleep_min = sleep_max = None
+        return replace(
+            run_opts,
+            limit_rate=(format_rate(rate) if rate is not None else None),
+            sleep_min=sleep_min,
+            sleep_max=sleep_max,
+        )
+
+    def record(self, url: str, *, ok: bool, throttled: bool) -> Optional[HostLimits]:
+        """
+        Feed back the outcome of one run. Returns the new limits when they
+        changed, None otherwise. Failures without throttling signals are not
+        evidence either way and leave the state untouched.
+        """
+        host = host_key(url)
+        with self._lock:
+            state = self._load()
+            entry = state.get(host) or {}
+            cur = self._clamp(HostLimits(rate=entry.get("rate", self._initial.rate), sleep=float(entry.get("sleep", self._initial.sleep))))
+            now = time.time()
+
+            if throttled:
+                base = cur.rate if cur.rate is not None else parse_rate(Defaults.throttle_backoff_rate)
+                new = HostLimits(rate=base // 2, sleep=max(cur.sleep * 2, 2.0))
+            elif ok and now - float(entry.get("increased", 0.0)) >= Defaults.throttle_increase_every:
+                rate = None if cur.rate is None else int(cur.rate * 1.25)
+                if rate is not None and self._max_rate is None and rate >= parse_rate(Defaults.throttle_backoff_rate):
+                    rate = None  # fast preset: fully recovered
+                new = HostLimits(rate=rate, sleep=cur.sleep * 0.75 if cur.sleep >= 0.5 else 0.0)
+                entry["increased"] = now
+            else:
+                return None
+
+            new = self._clamp(new)
+            entry.update({"rate": new.rate, "sleep": round(new.sleep, 2), "updated": now})
+            state[host] = entry
+            self._save(state)
+        return new if new != cur else None
+
+    def _clamp(self, lim: HostLimits) -> HostLimits:
+        rate = lim.rate
+        if rate is None and self._max_rate is not None:
+            rate = self._max_rate
+        if rate is not None:
+            rate = max(self._min_rate, rate)
+            if self._max_rate is not None:
+                rate = min(self._max_rate, rate)
+        sleep = min(self._max_sleep, max(self._min_sleep, lim.sleep))
+        return HostLimits(rate=rate, sleep=sleep)
+
+    def _load(self) -> Dict[str, dict]:
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return {}
+        section = data.get(self.preset) if isinstance(data, dict) else None
+        return section if isinstance(section, dict) else {}
+
+    def _save(self, section: Dict[str, dict]) -> None:
+        # Re-read the whole file so other presets' sections are preserved.
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+            if not isinstance(data, dict):
+                data = {}
+        except (OSError, ValueError):
+            data = {}
+        data[self.preset] = section
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(f".{self.path.name}.{os.getpid()}.tmp")
+        tmp.write_text(json.dumps(data, indent=2, sort_keys=True), encoding="utf-8")
+        os.replace(tmp, self.path)
+
+
+_SHARED: Dict[str, ThrottleController] = {}
+_SHARED_LOCK = threading.Lock()
+
+
+def open_throttle(preset: str) -> ThrottleController:
+    """Process-wide controller for a preset (state file shared by all presets)."""
+    with _SHARED_LOCK:
+        ctl = _SHARED.get(preset)
+        if ctl is None:
+            ctl = ThrottleController(state_path(_STATE_NAME), preset)
+            _SHARED[preset] = ctl
+        return ctl
+
+
+def throttled_options(run_opts: RunOptions, url: str) -> RunOptions:
+    """RunOptions for one URL: preset baseline adjusted by the host's throttle state."""
+    return open_throttle(run_opts.preset).apply(run_opts, url)
@@ -0,0 +1,170 @@
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Iterable, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+SITE_YOUTUBE = "youtube"
+SITE_GENERIC = "generic"
+
+KIND_VIDEO = "video"
+KIND_PLAYLIST = "playlist"
+KIND_CHANNEL = "channel"
+KIND_UNKNOWN = "unknown"
+
+# yt-dlp extractor keys, as written to the archive (see media_key).
+_EXTRACTOR_KEYS = {SITE_YOUTUBE: "Youtube"}
+
+_YOUTUBE_HOSTS = {
+    "youtube.com",
+    "www.youtube.com",
+    "m.youtube.com",
+    "music.youtube.com",
+    "youtube-nocookie.com",
+    "www.youtube-nocookie.com",
+}
+_YOUTUBE_ID = re.compile(r"^[0-9A-Za-z_-]{11}$")
+_YOUTUBE_LIST_ID = re.compile(r"^[0-9A-Za-z_-]{2,}$")
+_YOUTUBE_PATH_ID = re.compile(r"^/(?:shorts|embed|live|v)/(?P<id>[0-9A-Za-z_-]{11})(?:[/?#]|$)")
+_YOUTUBE_CHANNEL = re.compile(r"^/(?P<id>@[^/]+|(?:channel|c|user)/[^/]+)(?P<tab>/[^/]*)?/?$")
+
+# Query parameters that only carry attribution/sharing state.
+_TRACKING_PARAMS = {
+    "fbclid", "gclid", "dclid", "gbraid", "wbraid", "msclkid", "yclid",
+    "mc_cid", "mc_eid", "igshid", "_hsenc", "_hsmi",
+}
+_SCHEMELESS = re.compile(r"^[0-9A-Za-z-]+(?:\.[0-9A-Za-z-]+)+(?::\d+)?(?:/|$)")
+
+
+@dataclass(frozen=True)
+class MediaUrl:
+    """A target URL as mdl understands it (see classify_url)."""
+    site: str           # "youtube" | "generic"
+    kind: str           # "video" | "playlist" | "channel" | "unknown"
+    id: Optional[str]   # video/playlist/channel id when derivable locally
+    url: str            # canonical form: what mdl passes to yt-dlp
+
+    @property
+    def key(self) -> str:
+        """Identity for de-duplication: equal keys download the same thing."""
+        if self.id is not None:
+            return f"{self.site}:{self.kind}:{self.id}"
+        return self.url
+
+
+def _strip_tracking(query: str) -> str:
+    pairs = [
+        (k, v) for k, v in parse_qsl(query, keep_blank_values=True)
+        if k not in _TRACKING_PARAMS and not k.startswith("utm_")
+    ]
+    return urlencode(pairs)
+
+
+def _youtube(parts, query: dict) -> Optional[MediaUrl]:
+    host = (parts.hostname or "").lower()
+    path = parts.path or "/"
+
+    video_id: Optional[str] = None
+    if host == "youtu.be":
+        video_id = path.lstrip("/").split("/", 1)[0]
+    elif host in _YOUTUBE_HOSTS:
+        if path == "/watch":
+            video_id = query.get("v", "")
+        else:
+            m = _YOUTUBE_PATH_ID.match(path)
+            video_id = m.group("id") if m else None
+    else:
+        return None
+
+    # A watch URL opened from a playlist or mix still names one video; the
+    # playlist itself has its own URL (/playlist?list=...).
+    if video_id and _YOUTUBE_ID.match(video_id):
+        return MediaUrl(SITE_YOUTUBE, KIND_VIDEO, video_id, f"https://www.youtube.com/watch?v={video_id}")
+
+    list_id = query.get("list", "")
+    if host != "youtu.be" and path in ("/playlist", "/watch") and _YOUTUBE_LIST_ID.match(list_id):
+        return MediaUrl(SITE_YOUTUBE, KIND_PLAYLIST, list_id, f"https://www.youtube.com/playlist?list={list_id}")
+
+    m = _YOUTUBE_CHANNEL.match(path)
+    if host != "youtu.be" and m:
+        url = urlunsplit(("https", "www.youtube.com", path.rstrip("/"), "", ""))
+        return MediaUrl(SITE_YOUTUBE, KIND_CHANNEL, m.group("id"), url)
+
+    url = urlunsplit(("https", host, path, _strip_tracking(parts.query), ""))
+    return MediaUrl(SITE_YOUTUBE, KIND_UNKNOWN, None, url)
+
+
+@lru_cache(maxsize=4096)
+def classify_url(url: str) -> MediaUrl:
+    """
+    Parse a target URL into (site, kind, id) and its canonical form, without
+    network access. Equivalent shapes of the same target (youtu.be/ID,
+    watch?v=ID&list=..., music./m. hosts, share/tracking parameters) map to
+    one canonical URL. Anything unrecognized is passed through with only
+    tracking parameters and the fragment removed; yt-dlp remains the
+    source of truth for what it points at.
+    """
+    raw = url.strip()
+    if "://" not in raw and _SCHEMELESS.match(raw):
+        raw = f"https://{raw}"
+
+    try:
+        parts = urlsplit(raw)
+        parts.port  # raises ValueError for a malformed port
+    except ValueError:
+        return MediaUrl(SITE_GENERIC, KIND_UNKNOWN, None, raw)
+    if parts.scheme.lower() not in ("http", "https") or not parts.hostname:
+        # ytsearch:..., local files and other yt-dlp pseudo-URLs
+        return MediaUrl(SITE_GENERIC, KIND_UNKNOWN, None, raw)
+
+    query = dict(parse_qsl(parts.query, keep_blank_values=True))
+    youtube = _youtube(parts, query)
+    if youtube is not None:
+        return youtube
+
+    scheme = parts.scheme.lower()
+    netloc = parts.hostname.lower()
+    if parts.port is not None and parts.port != {"http": 80, "https": 443}[scheme]:
+        netloc = f"{netloc}:{parts.port}"
+    if parts.username or parts.password:
+        netloc = f"{parts.netloc.rpartition('@')[0]}@{netloc}"
+    canonical = urlunsplit((scheme, netloc, parts.path, _strip_tracking(parts.query), ""))
+    kind = KIND_PLAYLIST if "list" in query else KIND_UNKNOWN
+    return MediaUrl(SITE_GENERIC, kind, None, canonical)
+
+
+def canonical_url(url: str) -> str:
+    return classify_url(url).url
+
+
+def dedupe_urls(urls: Iterable[str]) -> Tuple[List[str], int]:
+    """
+    Canonical URLs in first-seen order with duplicates removed, and how many
+    duplicates were dropped.
+    """
+    seen = set()
+    unique: List[str] = []
+    dropped = 0
+    for url in urls:
+        target = classify_url(url)
+        if target.key in seen:
+            dropped += 1
+            continue
+        seen.add(target.key)
+        unique.append(target.url)
+    return unique, dropped
+
+
+def media_key(url: str) -> Optional[Tuple[str, str]]:
+    """
+    Derive yt-dlp's (extractor_key, id) for a single-item URL without any
+    network access. Returns None when the URL is not a single video or the
+    site is not recognized; callers then let yt-dlp extract as usual.
+    """
+    target = classify_url(url)
+    extractor = _EXTRACTOR_KEYS.get(target.site)
+    if target.kind != KIND_VIDEO or target.id is None or extractor is None:
+        return None
+    return (extractor, target.id)
@@ -0,0 +1,296 @@
+from __future__ import annotations
+
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+from mdl.core.config import Defaults
+from mdl.core.config_store import state_path
+from mdl.core.journal import STATE_DONE, STATE_FAILED, STATE_QUEUED, STATE_RETRYABLE, JobSpec, retry_delay
+from mdl.core.urls import classify_url
+
+_QUEUE_NAME = "queue.sqlite3"
+
+# A job a worker node holds (see WorkQueue.lease); the other states are the journal's.
+STATE_LEASED = "leased"
+
+# States a job can still leave.
+_OPEN_STATES = (STATE_QUEUED, STATE_LEASED, STATE_RETRYABLE)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS queue (
+    id            INTEGER PRIMARY KEY,
+    kind          TEXT    NOT NULL,
+    url           TEXT    NOT NULL,
+    key           TEXT    NOT NULL,
+    out_tpl       TEXT,
+    playlist      TEXT,
+    entry_id      TEXT,
+    state         TEXT    NOT NULL,
+    attempts      INTEGER NOT NULL DEFAULT 0,
+    last_error    TEXT,
+    next_eligible REAL    NOT NULL DEFAULT 0,
+    worker        TEXT,
+    lease_expires REAL,
+    added_at      REAL    NOT NULL,
+    updated_at    REAL    NOT NULL
+);
+CREATE INDEX IF NOT EXISTS queue_open ON queue (state, next_eligible);
+CREATE INDEX IF NOT EXISTS queue_key ON queue (kind, key);
+"""
+
+_COLUMNS = "id, kind, url, out_tpl, playlist, entry_id, state, attempts, last_error, worker, lease_expires"
+
+
+@dataclass(frozen=True)
+class QueuedJob:
+    id: int
+    kind: str                     # "audio" | "video" | "both"
+    spec: JobSpec
+    state: str
+    attempts: int
+    last_error: Optional[str]
+    worker: Optional[str]         # node holding the lease
+    lease_expires: Optional[float]
+
+    def to_message(self) -> Dict[str, Any]:
+        return {
+            "id": self.id, "kind": self.kind, "url": self.spec.url, "out_tpl": self.spec.out_tpl,
+            "playlist": self.spec.playlist, "entry_id": self.spec.entry_id, "state": self.state,
+            "attempts": self.attempts, "last_error": self.last_error, "worker": self.worker,
+            "lease_expires": self.lease_expires,
+        }
+
+    @staticmethod
+    def from_message(msg: Dict[str, Any]) -> "QueuedJob":
+        return QueuedJob(
+            id=int(msg["id"]),
+            kind=str(msg["kind"]),
+            spec=JobSpec(url=str(msg["url"]), out_tpl=msg.get("out_tpl"), playlist=msg.get("playlist"), entry_id=msg.get("entry_id")),
+            state=str(msg.get("state", STATE_LEASED)),
+            attempts=int(msg.get("attempts", 0)),
+            last_error=msg.get("last_error"),
+            worker=msg.get("worker"),
+            lease_expires=msg.get("lease_expires"),
+        )
+
+
+def _job(row: Sequence[Any]) -> QueuedJob:
+    return QueuedJob(
+        id=row[0], kind=row[1], spec=JobSpec(url=row[2], out_tpl=row[3], playlist=row[4], entry_id=row[5]),
+        state=row[6], attempts=row[7], last_error=row[8], worker=row[9], lease_expires=row[10],
+    )
+
+
+class WorkQueue:
+    """
+    Download queue shared by several machines (`mdl worker`): one row per
+    job with its state, attempts, last error and, while a node works on it,
+    the node's lease. Workers lease jobs, renew the leases with heartbeats
+    and report each outcome; a lease that runs out (the node died or lost
+    its network) puts the job back for another node, counting the attempt.
+
+    The file may live on shared storage (NFS, SMB), so it uses a rollback
+    journal instead of WAL (which needs shared memory on one host) and takes
+    the write lock up front (BEGIN IMMEDIATE) for every change. `mdl
+    coordinator` serves the same queue over HTTP for nodes without a shared
+    filesystem.
+    """
+
+    def __init__(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(path), timeout=60.0, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=DELETE")
+        self._db.execute("PRAGMA synchronous=FULL")
+        with self._write():
+            for statement in filter(str.strip, _SCHEMA.split(";")):
+                self._db.execute(statement)
+
+    def describe(self) -> str:
+        return str(self.path)
+
+    @contextmanager
+    def _write(self) -> Iterator[sqlite3.Connection]:
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._db
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+            self._db.execute("COMMIT")
+
+    def add(self, kind: str, specs: Sequence[JobSpec]) -> int:
+        """
+        Queue downloads; returns how many were added. A URL that is already
+        queued, running or done for the same kind is not added again; one
+        that failed is queued again with a fresh set of attempts.
+        """
+        now = time.time()
+        added = 0
+        with self._write() as db:
+            for spec in specs:
+                key = classify_url(spec.url).key
+                row = db.execute(
+                    "SELECT id, state FROM queue WHERE kind = ? AND key = ? ORDER BY id DESC LIMIT 1", (kind, key)
+                ).fetchone()
+                if row is not None and row[1] != STATE_FAILED:
+                    continue
+                if row is not None:
+                    db.execute(
+                        "UPDATE queue SET state = ?, attempts = 0, last_error = NULL, next_eligible = 0, "
+                        "updated_at = ? WHERE id = ?",
+                        (STATE_QUEUED, now, row[0]),
+                    )
+                else:
+                    db.execute(
+                        "INSERT INTO queue (kind, url, key, out_tpl, playlist, entry_id, state, added_at, updated_at) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        (kind, spec.url, key, spec.out_tpl, spec.playlist, spec.entry_id, STATE_QUEUED, now, now),
+                    )
+                added += 1
+        return added
+
+    def lease(self, worker: str, limit: int) -> List[QueuedJob]:
+        """
+        Lease up to `limit` runnable jobs (queued, or retryable with their
+        backoff passed) to `worker`, oldest first and all of one kind, for
+        Defaults.lease_ttl seconds. Expired leases are reclaimed first.
+        """
+        now = time.time()
+        with self._write() as db:
+            self._expire(db, now)
+            first = db.execute(
+                "SELECT kind FROM queue WHERE state = ? OR (state = ? AND next_eligible <= ?) ORDER BY id LIMIT 1",
+                (STATE_QUEUED, STATE_RETRYABLE, now),
+            ).fetchone()
+            if first is None:
+                return []
+            ids = [
+                r[0] for r in db.execute(
+                    "SELECT id FROM queue WHERE kind = ? AND (state = ? OR (state = ? AND next_eligible <= ?)) "
+                    "ORDER BY id LIMIT ?",
+                    (first[0], STATE_QUEUED, STATE_RETRYABLE, now, limit),
+                )
+            ]
+            marks = ",".join("?" * len(ids))
+            db.execute(
+                f"UPDATE queue SET state = ?, worker = ?, lease_expires = ?, attempts = attempts + 1, updated_at = ? "
+                f"WHERE id IN ({marks})",
+                (STATE_LEASED, worker, now + Defaults.lease_ttl, now, *ids),
+            )
+            rows = db.execute(f"SELECT {_COLUMNS} FROM queue WHERE id IN ({marks}) ORDER BY id", ids).fetchall()
+        return [_job(r) for r in rows]
+
+    def heartbeat(self, worker: str, ids: Sequence[int]) -> List[int]:
+        """Extend `worker`'s leases on `ids`; returns the ids it still holds."""
+        if not ids:
+            return []
+        now = time.time()
+        marks = ",".join("?" * len(ids))
+        with self._write() as db:
+            db.execute(
+                f"UPDATE queue SET lease_expires = ? WHERE state = ? AND worker = ? AND id IN ({marks})",
+                (now + Defaults.lease_ttl, STATE_LEASED, worker, *ids),
+            )
+            rows = db.execute(
+                f"SELECT id FROM queue WHERE state = ? AND worker = ? AND id IN ({marks})", (STATE_LEASED, worker, *ids)
+            ).fetchall()
+        return [r[0] for r in rows]
+
+    def finish(self, worker: str, job_id: int, rc: int, *, error: Optional[str] = None, retry: bool = True) -> Optional[str]:
+        """
+        Record the outcome of a leased job, as JobJournal.finish does, and
+        return its new state; None if `worker` no longer holds the lease
+        (it expired and the job went to another node), in which case the
+        outcome is dropped.
+        """
+        now = time.time()
+        with self._write() as db:
+            row = db.execute(
+                "SELECT attempts FROM queue WHERE id = ? AND state = ? AND worker = ?", (job_id, STATE_LEASED, worker)
+            ).fetchone()
+            if row is None:
+                return None
+            attempts = int(row[0])
+            attempts_sql = "attempts"
+            if rc == 0:
+                state, error = STATE_DONE, None
+            elif rc == 130:
+                state, error = STATE_QUEUED, error or "cancelled"
+                attempts_sql = "MAX(attempts - 1, 0)"
+            else:
+                state = STATE_FAILED if not retry or attempts >= Defaults.job_max_attempts else STATE_RETRYABLE
+                error = error or f"exit code {rc}"
+            next_eligible = now + retry_delay(attempts) if state == STATE_RETRYABLE else 0
+            db.execute(
+                f"UPDATE queue SET state = ?, attempts = {attempts_sql}, last_error = ?, next_eligible = ?, "
+                "lease_expires = NULL, updated_at = ? WHERE id = ?",
+                (state, error, next_eligible, now, job_id),
+            )
+        return state
+
+    def release(self, worker: str) -> int:
+        """Give back every lease `worker` holds (attempt not counted); returns how many."""
+        with self._write() as db:
+            cur = db.execute(
+                "UPDATE queue SET state = ?, attempts = MAX(attempts - 1, 0), worker = NULL, lease_expires = NULL, "
+                "updated_at = ? WHERE state = ? AND worker = ?",
+                (STATE_QUEUED, time.time(), STATE_LEASED, worker),
+            )
+        return cur.rowcount
+
+    def status(self) -> Dict[str, Any]:
+        """State counts, the leases per worker and the failed jobs."""
+        now = time.time()
+        with self._write() as db:
+            self._expire(db, now)
+            counts = dict(db.execute("SELECT state, COUNT(*) FROM queue GROUP BY state").fetchall())
+            leases = db.execute(
+                "SELECT worker, COUNT(*), MIN(lease_expires) FROM queue WHERE state = ? GROUP BY worker ORDER BY worker",
+                (STATE_LEASED,),
+            ).fetchall()
+            failed = db.execute(
+                f"SELECT {_COLUMNS} FROM queue WHERE state = ? ORDER BY id", (STATE_FAILED,)
+            ).fetchall()
+            wake = db.execute("SELECT MIN(next_eligible) FROM queue WHERE state = ?", (STATE_RETRYABLE,)).fetchone()[0]
+        return {
+            "counts": counts,
+            "open": sum(counts.get(s, 0) for s in _OPEN_STATES),
+            "workers": [{"worker": w, "jobs": n, "expires_in": max(0.0, exp - now)} for w, n, exp in leases],
+            "failed": [_job(r).to_message() for r in failed],
+            "next_eligible": wake,
+        }
+
+    def _expire(self, db: sqlite3.Connection, now: float) -> None:
+        """Reclaim leases whose worker stopped heartbeating (caller holds the write lock)."""
+        db.execute(
+            "UPDATE queue SET state = CASE WHEN attempts >= ? THEN ? ELSE ? END, next_eligible = 0, "
+            "last_error = 'lease expired on ' || worker, worker = NULL, lease_expires = NULL, updated_at = ? "
+            "WHERE state = ? AND lease_expires < ?",
+            (Defaults.job_max_attempts, STATE_FAILED, STATE_RETRYABLE, now, STATE_LEASED, now),
+        )
+
+
+_SHARED: Dict[Path, WorkQueue] = {}
+_SHARED_LOCK = threading.Lock()
+
+
+def default_queue_path() -> Path:
+    return state_path(_QUEUE_NAME)
+
+
+def open_work_queue(path: Optional[Path] = None) -> WorkQueue:
+    """Process-wide handle on a queue file (default: queue.sqlite3 in the mdl config dir)."""
+    path = (path or default_queue_path()).expanduser().resolve()
+    with _SHARED_LOCK:
+        queue = _SHARED.get(path)
+        if queue is None:
+            queue = _SHARED[path] = WorkQueue(path)
+        return queue
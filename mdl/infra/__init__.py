@@ -1,3 +1,18 @@
-from mdl.infra.runner import printable_cmd, print_command, run_command
+from mdl._lazy import lazy_exports
 
-__all__ = ["printable_cmd", "print_command", "run_command"]
+_EXPORTS = {
+    "check_dependencies": "mdl.infra.runner",
+    "printable_cmd": "mdl.infra.output",
+    "print_command": "mdl.infra.output",
+    "run_command": "mdl.infra.runner",
+    "run_prefixed": "mdl.infra.runner",
+    "run_capture": "mdl.infra.runner",
+    "FairQueue": "mdl.infra.pool",
+    "run_bounded": "mdl.infra.pool",
+    "run_pipeline": "mdl.infra.pool",
+    "run_stream": "mdl.infra.pool",
+}
+
+__getattr__ = lazy_exports(__name__, _EXPORTS)
+
+__all__ = list(_EXPORTS)
@@ -0,0 +1,201 @@
+from __future__ import annotations
+
+import importlib.util
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+from mdl.infra.output import LineSink
+from mdl.infra.progress import ProgressSink, hook_data
+
+ENGINE_SUBPROCESS = "subprocess"
+ENGINE_INPROCESS = "inprocess"
+
+_WARM_LOCK = threading.Lock()
+_warmed = False
+
+
+def inprocess_available() -> bool:
+    """True when the yt_dlp package is importable (does not import it)."""
+    return importlib.util.find_spec("yt_dlp") is not None
+
+
+def warm_up() -> None:
+    """
+    Import yt_dlp and build its extractor list once per interpreter.
+    Batch runs call this before starting workers so the first jobs do not
+    all pay (and contend on) the import at the same time.
+    """
+    global _warmed
+    with _WARM_LOCK:
+        if _warmed:
+            return
+        from yt_dlp.extractor import gen_extractor_classes
+
+        gen_extractor_classes()
+        _warmed = True
+
+
+class _SinkLogger:
+    """
+    yt-dlp logger that routes every message to an mdl line sink.
+    yt-dlp sends regular screen output to `debug`, so "[debug] " lines are the
+    only ones dropped (they only appear with -v).
+    """
+
+    def __init__(self, sink: LineSink) -> None:
+        self._sink = sink
+
+    def debug(self, msg: str) -> None:
+        if msg.startswith("[debug] "):
+            return
+        self._emit(msg)
+
+    def info(self, msg: str) -> None:
+        self._emit(msg)
+
+    def warning(self, msg: str) -> None:
+        self._emit(f"WARNING: {msg}")
+
+    def error(self, msg: str) -> None:
+        self._emit(msg)
+
+    def _emit(self, msg: str) -> None:
+        for line in str(msg).splitlines():
+            if line.strip():
+                self._sink(line)
+
+
+def _sink_ydl_class(base, sink: LineSink):
+    """
+    YoutubeDL subclass for sink-routed runs. `to_stdout` (format tables,
+    --print output) bypasses the logger upstream, so it is redirected here.
+    """
+
+    class _SinkYoutubeDL(base):
+        def to_stdout(self, message, skip_eol=False, quiet=None):
+            for line in str(message).splitlines():
+                sink(line)
+
+    return _SinkYoutubeDL
+
+
+def _observed_ydl_class(base, observe: LineSink):
+    """YoutubeDL subclass that also reports warnings and errors to `observe`."""
+
+    class _ObservedYoutubeDL(base):
+        def report_warning(self, message, *args, **kwargs):
+            observe(f"WARNING: {message}")
+            return super().report_warning(message, *args, **kwargs)
+
+        def trouble(self, message=None, *args, **kwargs):
+            if message:
+                observe(str(message))
+            return super().trouble(message, *args, **kwargs)
+
+    return _ObservedYoutubeDL
+
+
+def _cancel_hook(cancel: threading.Event):
+    from yt_dlp.utils import DownloadCancelled
+
+    def _hook(_status: Dict[str, Any]) -> None:
+        if cancel.is_set():
+            raise DownloadCancelled("cancelled by mdl")
+
+    return _hook
+
+
+def _rate_hook(ydls: List[Any], rate_limit: Callable[[], Optional[int]]):
+    # yt-dlp's downloaders read params["ratelimit"] on every chunk, so updating
+    # it here re-limits a plain HTTP download while it runs. Fragmented
+    # (HLS/DASH) downloads copy their params and keep the starting limit.
+    def _hook(_status: Dict[str, Any]) -> None:
+        for ydl in ydls:
+            ydl.params["ratelimit"] = rate_limit()
+
+    return _hook
+
+
+def _progress_hook(progress: ProgressSink, phase: str):
+    def _hook(status: Dict[str, Any]) -> None:
+        progress(phase, hook_data(phase, status))
+
+    return _hook
+
+
+def run_in_process(
+    cmd: List[str],
+    *,
+    sink: Optional[LineSink] = None,
+    stdout: Optional[LineSink] = None,
+    cancel: Optional[threading.Event] = None,
+    observe: Optional[LineSink] = None,
+    progress: Optional[ProgressSink] = None,
+    rate_limit: Optional[Callable[[], Optional[int]]] = None,
+) -> int:
+    """
+    Execute a yt-dlp argument list (as produced by mdl.builders) through the
+    YoutubeDL API. cmd[0] is the program name and is ignored.
+
+    The arguments are translated with yt-dlp's own option parser, so every flag
+    the builders emit means exactly what it means on the command line.
+    Output goes to the terminal unless `sink` is given; `stdout` receives what
+    yt-dlp prints to stdout (-J, --print, tables) and defaults to `sink`.
+    `observe` also receives yt-dlp's warnings and errors, and `progress` its
+    download/post-processing hook updates. Setting `cancel` aborts the
+    download at its next progress or post-processing update. `rate_limit`
+    is polled on every download progress update for the current rate limit
+    in bytes/s (None = unlimited).
+    Returns a process-style exit code.
+    """
+    warm_up()
+    import yt_dlp
+    from yt_dlp.utils import DownloadCancelled, DownloadError
+
+    try:
+        parsed = yt_dlp.parse_options(list(cmd[1:]))
+    except SystemExit as e:
+        # Option errors are reported by yt-dlp's parser on stderr.
+        return int(e.code) if isinstance(e.code, int) else 2
+
+    ydl_opts = dict(parsed.ydl_opts)
+    ydl_class = yt_dlp.YoutubeDL
+    if sink is not None:
+        ydl_opts["logger"] = _SinkLogger(sink)
+    if stdout is None:
+        stdout = sink
+    if stdout is not None:
+        ydl_class = _sink_ydl_class(ydl_class, stdout)
+    if observe is not None:
+        ydl_class = _observed_ydl_class(ydl_class, observe)
+    progress_hooks = list(ydl_opts.get("progress_hooks") or [])
+    postprocessor_hooks = list(ydl_opts.get("postprocessor_hooks") or [])
+    if progress is not None:
+        progress_hooks.append(_progress_hook(progress, "download"))
+        postprocessor_hooks.append(_progress_hook(progress, "postprocess"))
+    ydls: List[Any] = []
+    if rate_limit is not None:
+        progress_hooks.append(_rate_hook(ydls, rate_limit))
+    if cancel is not None:
+        if cancel.is_set():
+            return 130
+        hook = _cancel_hook(cancel)
+        progress_hooks.append(hook)
+        postprocessor_hooks.append(hook)
+    ydl_opts["progress_hooks"] = progress_hooks
+    ydl_opts["postprocessor_hooks"] = postprocessor_hooks
+
+    try:
+        with ydl_class(ydl_opts) as ydl:
+            ydls.append(ydl)
+            # Mirrors yt-dlp's own main(): --load-info-json replaces the URL list.
+            info_file = getattr(parsed.options, "load_info_filename", None)
+            if info_file:
+                return int(ydl.download_with_info_file(info_file) or 0)
+            return int(ydl.download(parsed.urls) or 0)
+    except DownloadCancelled:
+        return 130
+    except DownloadError:
+        return 1
+    except KeyboardInterrupt:
+        return 130
@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+import json
+import socket
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional, TextIO
+
+# Wire format: one JSON object per line, UTF-8, in both directions.
+Message = Dict[str, Any]
+
+
+def write_message(stream: TextIO, msg: Message) -> None:
+    stream.write(json.dumps(msg, separators=(",", ":")) + "\n")
+    stream.flush()
+
+
+def read_messages(stream: TextIO) -> Iterator[Message]:
+    for line in stream:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            msg = json.loads(line)
+        except ValueError:
+            continue
+        if isinstance(msg, dict):
+            yield msg
+
+
+def connect(path: Path, *, timeout: Optional[float] = 1.0) -> Optional[socket.socket]:
+    """
+    Connect to a Unix socket. Returns None when nothing is listening
+    (missing path, stale socket file, or permission problem).
+    """
+    if not path.exists():
+        return None
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(timeout)
+    try:
+        sock.connect(str(path))
+    except OSError:
+        sock.close()
+        return None
+    # Connected: responses may take as long as a download, so block from here on.
+    sock.settimeout(None)
+    return sock
+
+
+def request(path: Path, payload: Message) -> Optional[Iterator[Message]]:
+    """
+    Send one request and return an iterator over the response stream,
+    or None when no server is listening on `path`.
+    """
+    sock = connect(path)
+    if sock is None:
+        return None
+
+    def _stream() -> Iterator[Message]:
+        with sock, sock.makefile("rw", encoding="utf-8") as f:
+            write_message(f, payload)
+            yield from read_messages(f)
+
+    return _stream()
@@ -0,0 +1,29 @@
+from __future__ import annotations
+
+import shlex
+import threading
+from typing import Callable, List, Optional, TextIO
+
+# Receives one line of child output (without trailing newline).
+LineSink = Callable[[str], None]
+
+# Serializes output from concurrent workers so prefixed lines never interleave mid-line.
+OUTPUT_LOCK = threading.Lock()
+
+
+def emit_line(line: str, *, prefix: str = "", file: Optional[TextIO] = None) -> None:
+    with OUTPUT_LOCK:
+        print(f"{prefix}{line}", file=file, flush=True)
+
+
+def prefixed_sink(prefix: str) -> LineSink:
+    """Default sink: print each line to stdout under the shared lock."""
+    return lambda line: emit_line(line, prefix=prefix)
+
+
+def printable_cmd(cmd: List[str]) -> str:
+    return " ".join(shlex.quote(s) for s in cmd)
+
+
+def print_command(cmd: List[str], *, prefix: str = "") -> None:
+    emit_line(f"[mdl] exec: {printable_cmd(cmd)}", prefix=prefix)
@@ -0,0 +1,338 @@
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import CancelledError, Future, ThreadPoolExecutor
+from typing import Callable, Deque, Dict, Generic, List, Optional, Sequence, TypeVar, Union
+
+T = TypeVar("T")
+R = TypeVar("R")
+H = TypeVar("H")
+
+
+def run_bounded(items: Sequence[T], fn: Callable[[int, T], R], *, workers: int) -> List[R]:
+    """
+    Run `fn(index, item)` for every item with at most `workers` running at once.
+    Results are returned in input order (not completion order).
+
+    Workers are threads: each one mostly waits on a yt-dlp subprocess, so the GIL
+    is not a bottleneck here.
+
+    On Ctrl+C, queued items are cancelled and running ones are left to finish
+    (their subprocesses receive the same SIGINT), then KeyboardInterrupt is re-raised.
+    """
+    if not items:
+        return []
+
+    workers = max(1, min(int(workers), len(items)))
+    ex = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="mdl-worker")
+    try:
+        futures = [ex.submit(fn, i, item) for i, item in enumerate(items)]
+        results = [f.result() for f in futures]
+    except KeyboardInterrupt:
+        ex.shutdown(wait=True, cancel_futures=True)
+        raise
+    ex.shutdown(wait=True)
+    return results
+
+
+class FairQueue(Generic[T]):
+    """
+    Work queue that is fair across keys (hosts): items are handed out
+    round-robin over their keys, FIFO within a key, and at most `per_key`
+    items of one key are out at a time (None = no cap). An item stays
+    queued while its key is at the cap, so a slow host holds back only its
+    own items instead of every worker.
+
+    Consumers call get(), then done(item) once the keyed part of the work is
+    finished. After close(), get() returns None once nothing is left.
+    Producers that fetch work only when a consumer is free (mdl worker)
+    wait for that with wait_for_demand(); producers with a bound on queued
+    items (mdl watch) wait with wait_for_room().
+    """
+
+    def __init__(self, key: Callable[[T], str], *, per_key: Optional[int] = None) -> None:
+        self._key = key
+        self._per_key = per_key
+        lock = threading.Lock()
+        self._cond = threading.Condition(lock)
+        self._demand = threading.Condition(lock)  # producers waiting for an idle consumer or room
+        self._pending: "OrderedDict[str, Deque[T]]" = OrderedDict()
+        self._active: Dict[str, int] = {}
+        self._idle = 0  # consumers blocked in get()
+        self._closed = False
+
+    def set_limit(self, per_key: Optional[int]) -> None:
+        with self._cond:
+            self._per_key = per_key
+            self._cond.notify_all()
+
+    def put(self, item: T) -> None:
+        with self._cond:
+            self._pending.setdefault(self._key(item), deque()).append(item)
+            self._cond.notify()
+
+    def close(self) -> None:
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+            self._demand.notify_all()
+
+    @property
+    def closed(self) -> bool:
+        with self._cond:
+            return self._closed
+
+    def drain(self) -> List[T]:
+        """Remove and return every queued item (cancellation)."""
+        with self._cond:
+            items = [item for queued in self._pending.values() for item in queued]
+            self._pending.clear()
+            self._cond.notify_all()
+            self._demand.notify_all()
+            return items
+
+    def __len__(self) -> int:
+        with self._cond:
+            return self._queued()
+
+    def _queued(self) -> int:
+        return sum(len(queued) for queued in self._pending.values())
+
+    def wait_for_demand(self, timeout: Optional[float] = None) -> bool:
+        """
+        Block until more consumers wait in get() than there are queued items,
+        i.e. one of them would take a new item. Items held back by the
+        per-key cap count as queued, so a capped key does not pull in more
+        work. Returns False on timeout or once closed.
+        """
+        with self._cond:
+            self._demand.wait_for(lambda: self._closed or self._idle > self._queued(), timeout)
+            return not self._closed and self._idle > self._queued()
+
+    def wait_for_room(self, limit: int, timeout: Optional[float] = None) -> bool:
+        """
+        Block until fewer than `limit` items are queued (handed-out items
+        do not count). Returns False on timeout or once closed.
+        """
+        with self._cond:
+            self._demand.wait_for(lambda: self._closed or self._queued() < limit, timeout)
+            return not self._closed and self._queued() < limit
+
+    def get(self) -> Optional[T]:
+        with self._cond:
+            while True:
+                for key, queued in self._pending.items():
+                    if self._per_key is None or self._active.get(key, 0) < self._per_key:
+                        item = queued.popleft()
+                        # Served keys go to the back: the next get() starts with the others.
+                        if queued:
+                            self._pending.move_to_end(key)
+                        else:
+                            del self._pending[key]
+                        self._active[key] = self._active.get(key, 0) + 1
+                        self._demand.notify_all()
+                        return item
+                if self._closed and not self._pending:
+                    return None
+                self._idle += 1
+                self._demand.notify_all()
+                try:
+                    self._cond.wait()
+                finally:
+                    self._idle -= 1
+
+    def done(self, item: T) -> None:
+        key = self._key(item)
+        with self._cond:
+            left = self._active.get(key, 0) - 1
+            if left > 0:
+                self._active[key] = left
+            else:
+                self._active.pop(key, None)
+            self._cond.notify_all()
+
+
+class Handoff(Generic[H]):
+    """Returned by a pipeline's first stage to pass an item on to the second."""
+
+    __slots__ = ("value",)
+
+    def __init__(self, value: H) -> None:
+        self.value = value
+
+
+def run_pipeline(
+    items: Sequence[T],
+    first: Callable[[int, T], Union[R, Handoff[H]]],
+    second: Callable[[int, H], R],
+    *,
+    workers: int,
+    second_workers: int,
+    queue_size: int,
+    key: Optional[Callable[[T], str]] = None,
+    per_key: Optional[int] = None,
+) -> List[R]:
+    """
+    Two-stage variant of run_bounded with a separate pool per stage.
+
+    `first(index, item)` either finishes an item (returns its result) or wraps
+    what the second stage needs in Handoff; `second(index, value)` then
+    produces the result. At most `second_workers` second-stage calls run at
+    once and at most `queue_size` more wait for a slot; when that handoff
+    queue is full, first-stage workers block until it drains, so a slow
+    second stage throttles the first instead of piling up work.
+
+    With `key`, first-stage work is scheduled through a FairQueue: items are
+    picked round-robin across keys and at most `per_key` items of one key
+    are in the first stage at once (the second stage is not keyed).
+
+    Results are returned in input order. Ctrl+C behaves as in run_bounded;
+    so does an exception from either stage: items not started yet are
+    dropped, the running ones are waited for, and the exception is re-raised.
+    """
+    if not items:
+        return []
+
+    workers = max(1, min(int(workers), len(items)))
+    second_workers = max(1, min(int(second_workers), len(items)))
+    slots = threading.BoundedSemaphore(second_workers + max(0, int(queue_size)))
+    stopping = threading.Event()
+    first_ex = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="mdl-worker")
+    second_ex = ThreadPoolExecutor(max_workers=second_workers, thread_name_prefix="mdl-postprocess")
+
+    item_key = key or (lambda _item: "")
+    order: FairQueue[int] = FairQueue(lambda i: item_key(items[i]), per_key=per_key if key else None)
+    futures: List["Future[Union[R, Future[R]]]"] = [Future() for _ in items]
+    for i in range(len(items)):
+        order.put(i)
+    order.close()
+
+    def _second(i: int, value: H) -> R:
+        try:
+            return second(i, value)
+        finally:
+            slots.release()
+
+    def _first(i: int, item: T) -> Union[R, "Future[R]"]:
+        try:
+            out = first(i, item)
+        finally:
+            order.done(i)
+        if not isinstance(out, Handoff):
+            return out
+        while not slots.acquire(timeout=0.2):
+            if stopping.is_set():
+                raise CancelledError()
+        return second_ex.submit(_second, i, out.value)
+
+    def _worker() -> None:
+        while True:
+            i = order.get()
+            if i is None:
+                return
+            if not futures[i].set_running_or_notify_cancel():
+                order.done(i)
+                continue
+            try:
+                futures[i].set_result(_first(i, items[i]))
+            except BaseException as e:
+                futures[i].set_exception(e)
+
+    for _ in range(workers):
+        first_ex.submit(_worker)
+
+    finished = False
+    try:
+        results: List[R] = []
+        for f in futures:
+            out = f.result()
+            results.append(out.result() if isinstance(out, Future) else out)
+        finished = True
+    finally:
+        if not finished:
+            stopping.set()
+            for i in order.drain():
+                futures[i].cancel()
+        first_ex.shutdown(wait=True, cancel_futures=not finished)
+        second_ex.shutdown(wait=True, cancel_futures=not finished)
+    return results
+
+
+def run_stream(
+    queue: FairQueue[T],
+    first: Callable[[T], Optional[Handoff[H]]],
+    second: Callable[[H], None],
+    *,
+    workers: int,
+    second_workers: int,
+    queue_size: int,
+) -> None:
+    """
+    Open-ended variant of run_pipeline: the items come from `queue`, which
+    the caller keeps filling while the stages run, and each of the
+    `workers` first-stage threads takes the next item as soon as it is
+    free, so there is no batch whose slowest item holds the others up.
+    The stages report results through their own callbacks; the handoff
+    between them is bounded as in run_pipeline.
+
+    Returns once the queue is closed and everything taken from it is
+    finished. An exception in a stage stops the stream (the queue is closed
+    and drained) and is re-raised here. On Ctrl+C, the queue is closed and
+    drained, running items are left to finish, then KeyboardInterrupt is re-raised.
+    """
+    workers = max(1, int(workers))
+    second_workers = max(1, int(second_workers))
+    slots = threading.BoundedSemaphore(second_workers + max(0, int(queue_size)))
+    stopping = threading.Event()
+    failures: List[BaseException] = []
+    first_ex = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="mdl-worker")
+    second_ex = ThreadPoolExecutor(max_workers=second_workers, thread_name_prefix="mdl-postprocess")
+
+    def _stop() -> None:
+        stopping.set()
+        queue.close()
+        queue.drain()
+
+    def _second(value: H) -> None:
+        try:
+            second(value)
+        except BaseException as e:
+            failures.append(e)
+            _stop()
+        finally:
+            slots.release()
+
+    def _worker() -> None:
+        while True:
+            item = queue.get()
+            if item is None:
+                return
+            try:
+                try:
+                    out = first(item)
+                finally:
+                    queue.done(item)
+            except BaseException as e:
+                failures.append(e)
+                _stop()
+                return
+            if not isinstance(out, Handoff):
+                continue
+            while not slots.acquire(timeout=0.2):
+                if stopping.is_set():
+                    return
+            second_ex.submit(_second, out.value)
+
+    try:
+        for f in [first_ex.submit(_worker) for _ in range(workers)]:
+            f.result()
+    except KeyboardInterrupt:
+        _stop()
+        first_ex.shutdown(wait=True, cancel_futures=True)
+        second_ex.shutdown(wait=True, cancel_futures=True)
+        raise
+    first_ex.shutdown(wait=True)
+    second_ex.shutdown(wait=True)
+    if failures:
+        raise failures[0]
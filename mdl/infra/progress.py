@@ -0,0 +1,166 @@
+from __future__ import annotations
+
+import json
+import sys
+import time
+from typing import Any, Callable, Dict, List, Optional, TextIO, Tuple
+
+from mdl.infra.output import OUTPUT_LOCK, LineSink
+
+# Marks the machine-readable progress lines mdl asks yt-dlp to print.
+PROGRESS_MARK = "[mdl-progress]"
+
+# Receives (phase, data): phase is "download" or "postprocess"; data holds the
+# fields below that yt-dlp knew at that point (plus "filepath" for postprocess).
+ProgressSink = Callable[[str, Dict[str, Any]], None]
+
+_DOWNLOAD_FIELDS = (
+    "status",
+    "downloaded_bytes",
+    "total_bytes",
+    "total_bytes_estimate",
+    "speed",
+    "eta",
+    "elapsed",
+    "filename",
+)
+_POSTPROCESS_FIELDS = ("status", "postprocessor")
+
+
+def progress_args() -> List[str]:
+    """yt-dlp flags that turn progress output into one JSON line per update."""
+    download = ",".join(_DOWNLOAD_FIELDS)
+    postprocess = ",".join(_POSTPROCESS_FIELDS)
+    return [
+        "--newline",
+        "--progress-template",
+        f"download:{PROGRESS_MARK} download %(progress.{{{download}}})j",
+        "--progress-template",
+        f"postprocess:{PROGRESS_MARK} postprocess %(progress.{{{postprocess}}})j %(info.filepath)j",
+    ]
+
+
+def with_progress_args(cmd: List[str]) -> List[str]:
+    return [cmd[0], *progress_args(), *cmd[1:]]
+
+
+def parse_progress_line(line: str) -> Optional[Tuple[str, Dict[str, Any]]]:
+    """(phase, data) for a line printed by progress_args() templates, else None."""
+    idx = line.find(PROGRESS_MARK)
+    if idx < 0:
+        return None
+    phase, _, payload = line[idx + len(PROGRESS_MARK):].strip().partition(" ")
+    try:
+        data, end = json.JSONDecoder().raw_decode(payload)
+        tail = payload[end:].strip()
+        filepath = json.loads(tail) if tail else None
+    except ValueError:
+        return None
+    if not isinstance(data, dict):
+        return None
+    if isinstance(filepath, str):
+        data["filepath"] = filepath
+    return phase, data
+
+
+def hook_data(phase: str, status: Dict[str, Any]) -> Dict[str, Any]:
+    """The same fields as parse_progress_line(), from an in-process yt-dlp hook."""
+    fields = _DOWNLOAD_FIELDS if phase == "download" else _POSTPROCESS_FIELDS
+    data = {k: status[k] for k in fields if status.get(k) is not None}
+    if phase == "postprocess":
+        filepath = (status.get("info_dict") or {}).get("filepath")
+        if filepath:
+            data["filepath"] = filepath
+    return data
+
+
+def _bytes(n: Optional[float]) -> str:
+    if n is None:
+        return "?"
+    for unit in ("B", "KiB", "MiB", "GiB"):
+        if abs(n) < 1024 or unit == "GiB":
+            return f"{n:.0f}{unit}" if unit == "B" else f"{n:.2f}{unit}"
+        n /= 1024
+    return "?"
+
+
+def _seconds(s: Optional[float]) -> str:
+    if s is None:
+        return "?"
+    m, sec = divmod(int(s), 60)
+    return f"{m}:{sec:02d}"
+
+
+def describe_progress(phase: str, data: Dict[str, Any]) -> str:
+    """Human-readable one-liner for a progress update."""
+    status = data.get("status")
+    if phase == "postprocess":
+        return f"[postprocess] {data.get('postprocessor', '?')} {status}"
+
+    total = data.get("total_bytes") or data.get("total_bytes_estimate")
+    done = data.get("downloaded_bytes")
+    if status == "finished":
+        return f"[download] 100% of {_bytes(total or done)} in {_seconds(data.get('elapsed'))}"
+    pct = f"{100 * done / total:5.1f}%" if done is not None and total else "  ?  "
+    speed = f"{_bytes(data.get('speed'))}/s" if data.get("speed") else "?/s"
+    return f"[download] {pct} of {_bytes(total)} at {speed} ETA {_seconds(data.get('eta'))}"
+
+
+def tee_progress(*sinks: ProgressSink) -> ProgressSink:
+    def _all(phase: str, data: Dict[str, Any]) -> None:
+        for sink in sinks:
+            sink(phase, data)
+
+    return _all
+
+
+class TerminalProgress:
+    """
+    Renders progress as a single self-overwriting line when `stream` is a
+    terminal (and not at all otherwise). Regular output is written through
+    write_line() so it never lands in the middle of a progress line.
+    """
+
+    def __init__(self, stream: TextIO = sys.stdout) -> None:
+        self._stream = stream
+        self._tty = stream.isatty()
+        self._open = False
+
+    def __call__(self, phase: str, data: Dict[str, Any]) -> None:
+        if not self._tty:
+            return
+        text = describe_progress(phase, data)
+        final = phase == "postprocess" or data.get("status") != "downloading"
+        with OUTPUT_LOCK:
+            self._stream.write(f"\r{text}\x1b[K" + ("\n" if final else ""))
+            self._stream.flush()
+            self._open = not final
+
+    def write_line(self, line: str) -> None:
+        with OUTPUT_LOCK:
+            if self._open:
+                self._stream.write("\n")
+                self._open = False
+            self._stream.write(line + "\n")
+            self._stream.flush()
+
+
+class PeriodicProgress:
+    """
+    Renders progress into a line sink (batch/daemon output) without flooding
+    it: a "downloading" update at most every `interval` seconds, every other
+    status change immediately.
+    """
+
+    def __init__(self, sink: LineSink, *, interval: float = 10.0) -> None:
+        self._sink = sink
+        self._interval = interval
+        self._last = 0.0
+
+    def __call__(self, phase: str, data: Dict[str, Any]) -> None:
+        now = time.monotonic()
+        if phase == "download" and data.get("status") == "downloading":
+            if now - self._last < self._interval:
+                return
+        self._last = now
+        self._sink(describe_progress(phase, data))
@@ -1,26 +1,48 @@
 from __future__ import annotations
 
+import os
 import shutil
-import shlex
+import signal
 import subprocess
 import sys
-from typing import List
+import threading
+from typing import IO, Callable, List, Optional, Tuple
+
+from mdl.infra.engine import ENGINE_INPROCESS, inprocess_available, run_in_process
+from mdl.infra.output import LineSink, prefixed_sink, print_command, printable_cmd
+from mdl.infra.progress import (
+    PeriodicProgress,
+    ProgressSink,
+    TerminalProgress,
+    parse_progress_line,
+    tee_progress,
+    with_progress_args,
+)
+from mdl.infra.tracing import span
 
 
 def _command_exists(name: str) -> bool:
     return shutil.which(name) is not None
 
 
-def printable_cmd(cmd: List[str]) -> str:
-    return " ".join(shlex.quote(s) for s in cmd)
+def effective_engine(engine: str) -> str:
+    """
+    Resolve the configured engine to the one that will actually run.
+    The in-process engine silently falls back to subprocess when the yt_dlp
+    module is not importable from mdl's interpreter.
+    """
+    if engine == ENGINE_INPROCESS and inprocess_available():
+        return ENGINE_INPROCESS
+    return "subprocess"
 
 
-def print_command(cmd: List[str]) -> None:
-    print(f"[mdl] exec: {printable_cmd(cmd)}")
+def check_dependencies(*, needs_ffmpeg: bool, engine: str = "subprocess") -> int:
+    with span("check_dependencies"):
+        return _check_dependencies(needs_ffmpeg=needs_ffmpeg, engine=engine)
 
 
-def _check_dependencies(*, needs_ffmpeg: bool) -> int:
-    if not _command_exists("yt-dlp"):
+def _check_dependencies(*, needs_ffmpeg: bool, engine: str) -> int:
+    if effective_engine(engine) != ENGINE_INPROCESS and not _command_exists("yt-dlp"):
         print("[mdl] ERROR: yt-dlp not found in PATH.", file=sys.stderr)
         print("[mdl]        Install it (recommended): pipx install yt-dlp", file=sys.stderr)
         print("[mdl]        Or ensure it is available in your PATH.", file=sys.stderr)
@@ -35,12 +57,41 @@ def _check_dependencies(*, needs_ffmpeg: bool) -> int:
     return 0
 
 
-def run_command(cmd: List[str], *, needs_ffmpeg: bool = False, print_first: bool = True) -> int:
+def _spawn(cmd: List[str], **kwargs) -> subprocess.Popen:
+    """subprocess.Popen, timed as the "spawn" span when profiling."""
+    with span("spawn", cat="process", program=cmd[0]):
+        return subprocess.Popen(cmd, **kwargs)
+
+
+def run_command(
+    cmd: List[str],
+    *,
+    needs_ffmpeg: bool = False,
+    print_first: bool = True,
+    engine: str = "subprocess",
+    observe: Optional[LineSink] = None,
+    progress: Optional[ProgressSink] = None,
+    rate_limit: Optional[Callable[[], Optional[int]]] = None,
+) -> int:
     """
     Runs the given command, streaming stdout/stderr.
-    Returns the subprocess exit code.
+    Returns the yt-dlp exit code.
+
+    With engine="inprocess" the same argument list is executed through the
+    yt_dlp Python API instead of spawning a process; the printed command is
+    unchanged either way.
+
+    `observe` receives yt-dlp's warning/error lines (stderr) as they happen.
+    `progress` receives structured progress updates: yt-dlp is asked for
+    machine-readable progress lines (not shown in the printed command), which
+    are parsed and rendered here as a single status line on a terminal.
+    Without either, output is passed straight through.
+
+    `rate_limit` reports the download's current bandwidth share; only the
+    in-process engine can apply changes mid-download (a subprocess keeps the
+    --limit-rate it was started with).
     """
-    dep_rc = _check_dependencies(needs_ffmpeg=needs_ffmpeg)
+    dep_rc = check_dependencies(needs_ffmpeg=needs_ffmpeg, engine=engine)
     if dep_rc != 0:
         # Keep transparency: still show what would have been executed.
         if print_first:
@@ -50,8 +101,215 @@ def run_command(cmd: List[str], *, needs_ffmpeg: bool = False, print_first: bool
     if print_first:
         print_command(cmd)
 
+    with span("yt-dlp", cat="process", engine=effective_engine(engine)):
+        return _run_command(cmd, engine=engine, observe=observe, progress=progress, rate_limit=rate_limit)
+
+
+def _run_command(
+    cmd: List[str],
+    *,
+    engine: str,
+    observe: Optional[LineSink],
+    progress: Optional[ProgressSink],
+    rate_limit: Optional[Callable[[], Optional[int]]],
+) -> int:
+    if effective_engine(engine) == ENGINE_INPROCESS:
+        return run_in_process(cmd, observe=observe, progress=progress, rate_limit=rate_limit)
+
+    if observe is None and progress is None:
+        p = _spawn(cmd)
+        try:
+            return int(p.wait())
+        except KeyboardInterrupt:
+            p.wait()
+            return 130
+
+    terminal = TerminalProgress(sys.stdout)
+    if progress is not None:
+        cmd = with_progress_args(cmd)
+        progress = tee_progress(progress, terminal)
+
+    p = _spawn(
+        cmd,
+        stdout=(subprocess.PIPE if progress is not None else None),
+        stderr=(subprocess.PIPE if observe is not None else None),
+        text=True,
+        encoding="utf-8",
+        errors="replace",
+    )
+    pumps = []
+    if p.stdout is not None:
+        pumps.append(threading.Thread(target=_pump, args=(p.stdout, terminal.write_line, None, progress), daemon=True))
+    if p.stderr is not None:
+        pumps.append(threading.Thread(target=_pump, args=(p.stderr, _write_stderr, observe, progress), daemon=True))
+    for t in pumps:
+        t.start()
+    try:
+        rc = int(p.wait())
+        for t in pumps:
+            t.join()
+        return rc
+    except KeyboardInterrupt:
+        p.wait()
+        return 130
+    finally:
+        for stream in (p.stdout, p.stderr):
+            if stream is not None:
+                stream.close()
+
+
+def _write_stderr(line: str) -> None:
+    sys.stderr.write(line + "\n")
+    sys.stderr.flush()
+
+
+def _pump(
+    stream: IO[str],
+    write: LineSink,
+    observe: Optional[LineSink],
+    progress: Optional[ProgressSink],
+) -> None:
+    """Copy lines from a child's pipe, diverting progress lines to `progress`."""
+    for line in stream:
+        line = line.rstrip("\n")
+        if progress is not None:
+            parsed = parse_progress_line(line)
+            if parsed is not None:
+                progress(*parsed)
+                continue
+        write(line)
+        if observe is not None and line:
+            observe(line)
+
+
+def _tee(sink: LineSink, observe: LineSink) -> LineSink:
+    def _both(line: str) -> None:
+        sink(line)
+        observe(line)
+
+    return _both
+
+
+def _terminate_on_cancel(p: subprocess.Popen, cancel: threading.Event) -> None:
+    # Signal the whole group: yt-dlp's own children (ffmpeg) also hold our pipe.
+    while p.poll() is None:
+        if cancel.wait(0.2):
+            try:
+                os.killpg(p.pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+            return
+
+
+def run_prefixed(
+    cmd: List[str],
+    *,
+    prefix: str = "",
+    print_first: bool = True,
+    engine: str = "subprocess",
+    sink: Optional[LineSink] = None,
+    cancel: Optional[threading.Event] = None,
+    observe: Optional[LineSink] = None,
+    progress: Optional[ProgressSink] = None,
+    rate_limit: Optional[Callable[[], Optional[int]]] = None,
+) -> int:
+    """
+    Runs the given command with stdout/stderr merged and re-emitted line by line.
+    By default each line is printed tagged with `prefix`; pass `sink` to route
+    lines elsewhere (e.g. to a daemon client). Safe to call from several threads.
+    `observe` additionally sees every output line (unprefixed). `progress`
+    receives structured progress updates; for a subprocess they replace
+    yt-dlp's progress lines, which are then summarized in the output every
+    few seconds instead of on every update.
+
+    Setting `cancel` stops the job (terminates the subprocess, or aborts the
+    in-process download at its next progress update). `rate_limit` is as in
+    run_command.
+
+    Dependency checks are the caller's job (batch runs check once, not per item).
+    Returns the yt-dlp exit code.
+    """
+    if sink is None:
+        sink = prefixed_sink(prefix)
+
+    if print_first:
+        sink(f"[mdl] exec: {printable_cmd(cmd)}")
+
+    if observe is not None:
+        sink = _tee(sink, observe)
+
+    with span("yt-dlp", cat="process", engine=effective_engine(engine)):
+        return _run_prefixed(cmd, engine=engine, sink=sink, cancel=cancel, progress=progress, rate_limit=rate_limit)
+
+
+def _run_prefixed(
+    cmd: List[str],
+    *,
+    engine: str,
+    sink: LineSink,
+    cancel: Optional[threading.Event],
+    progress: Optional[ProgressSink],
+    rate_limit: Optional[Callable[[], Optional[int]]],
+) -> int:
+    if effective_engine(engine) == ENGINE_INPROCESS:
+        return run_in_process(cmd, sink=sink, cancel=cancel, progress=progress, rate_limit=rate_limit)
+
+    if progress is not None:
+        cmd = with_progress_args(cmd)
+        progress = tee_progress(progress, PeriodicProgress(sink))
+
+    # Universal newlines turn yt-dlp's `\r` progress updates into separate lines.
+    p = _spawn(
+        cmd,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        stdin=subprocess.DEVNULL,
+        text=True,
+        encoding="utf-8",
+        errors="replace",
+        # Cancellable jobs get their own process group so cancel can reach it;
+        # the others share ours so a terminal Ctrl+C reaches them directly.
+        start_new_session=cancel is not None,
+    )
+    assert p.stdout is not None
+    if cancel is not None:
+        threading.Thread(target=_terminate_on_cancel, args=(p, cancel), daemon=True).start()
     try:
-        p = subprocess.run(cmd)
-        return int(p.returncode)
+        for line in p.stdout:
+            line = line.rstrip("\n")
+            if progress is not None:
+                parsed = parse_progress_line(line)
+                if parsed is not None:
+                    progress(*parsed)
+                    continue
+            if line:
+                sink(line)
+        return int(p.wait())
     except KeyboardInterrupt:
+        p.terminate()
+        p.wait()
         return 130
+    finally:
+        p.stdout.close()
+
+
+def run_capture(cmd: List[str], *, engine: str = "subprocess") -> Tuple[int, List[str]]:
+    """
+    Runs the given command and returns (exit code, stdout lines).
+    stderr (warnings, errors) still goes to the terminal.
+    Used for machine-readable yt-dlp output such as -J.
+    """
+    with span("yt-dlp", cat="process", engine=effective_engine(engine)):
+        if effective_engine(engine) == ENGINE_INPROCESS:
+            lines: List[str] = []
+            rc = run_in_process(cmd, stdout=lines.append)
+            return rc, lines
+
+        p = _spawn(cmd, stdout=subprocess.PIPE, stdin=subprocess.DEVNULL, text=True, encoding="utf-8", errors="replace")
+        try:
+            out, _ = p.communicate()
+        except KeyboardInterrupt:
+            p.kill()
+            p.wait()
+            return 130, []
+        return int(p.returncode), out.splitlines()
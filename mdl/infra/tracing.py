@@ -0,0 +1,170 @@
+from __future__ import annotations
+
+import itertools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+from typing import Any, ContextManager, Dict, Iterator, List, Optional, Tuple
+
+# Where a span ran: (thread id, thread name, job tags of that thread).
+Origin = Tuple[int, str, Dict[str, Any]]
+
+_NO_SPAN: ContextManager[None] = nullcontext()
+
+
+class Profiler:
+    """
+    Wall-clock spans of one mdl process (`--profile FILE`), written as a
+    Chrome trace (Trace Event Format, JSON) that chrome://tracing and
+    Perfetto open directly. Each thread is a track named after it (e.g.
+    mdl-worker_0); spans carry the job tags of their thread (see tagged()).
+    Times are time.monotonic(), shown relative to `epoch`.
+    """
+
+    def __init__(self, path: Path, *, epoch: float, label: str) -> None:
+        self.path = path
+        self.epoch = epoch
+        self.label = label
+        self._lock = threading.Lock()
+        self._events: List[Dict[str, Any]] = []
+        self._threads: Dict[int, str] = {}
+
+    def add(
+        self,
+        name: str,
+        start: float,
+        end: float,
+        *,
+        cat: str,
+        origin: Origin,
+        args: Dict[str, Any],
+        async_id: Optional[int] = None,
+    ) -> None:
+        tid, thread, tags = origin
+        fields = {**tags, **{k: v for k, v in args.items() if v is not None}}
+        event: Dict[str, Any] = {"name": name, "cat": cat, "pid": os.getpid(), "tid": tid}
+        if fields:
+            event["args"] = fields
+        ts = round((start - self.epoch) * 1e6, 1)
+        if async_id is None:
+            events = [{**event, "ph": "X", "ts": ts, "dur": round(max(0.0, end - start) * 1e6, 1)}]
+        else:
+            # Does not nest with the thread's spans: drawn on its own track.
+            events = [
+                {**event, "ph": "b", "id": async_id, "ts": ts},
+                {**event, "ph": "e", "id": async_id, "ts": round((end - self.epoch) * 1e6, 1)},
+            ]
+        with self._lock:
+            self._threads.setdefault(tid, thread)
+            self._events.extend(events)
+
+    def write(self) -> int:
+        """Write the trace (temp file + rename); returns the number of events."""
+        with self._lock:
+            events = sorted(self._events, key=lambda e: e["ts"])
+            meta: List[Dict[str, Any]] = [
+                {"name": "process_name", "ph": "M", "pid": os.getpid(), "tid": 0, "args": {"name": self.label}}
+            ]
+            meta += [
+                {"name": "thread_name", "ph": "M", "pid": os.getpid(), "tid": tid, "args": {"name": name}}
+                for tid, name in sorted(self._threads.items())
+            ]
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(f".{self.path.name}.{os.getpid()}.tmp")
+        tmp.write_text(json.dumps({"traceEvents": meta + events, "displayTimeUnit": "ms"}), encoding="utf-8")
+        os.replace(tmp, self.path)
+        return len(events)
+
+
+_CURRENT: Optional[Profiler] = None
+_LOCAL = threading.local()
+_TRACKS = itertools.count(1)
+
+
+def configure_profile(path: str, *, epoch: float, label: str) -> None:
+    """Record spans for this process, to be written to `path` by write_profile()."""
+    global _CURRENT
+    _CURRENT = Profiler(Path(path).expanduser(), epoch=epoch, label=label)
+
+
+def profiling() -> bool:
+    return _CURRENT is not None
+
+
+def _here() -> Origin:
+    return threading.get_native_id(), threading.current_thread().name, dict(getattr(_LOCAL, "tags", {}))
+
+
+def origin() -> Optional[Origin]:
+    """The calling thread as a span origin, or None when not profiling."""
+    return None if _CURRENT is None else _here()
+
+
+def trace_track() -> int:
+    """A new track id for record_span(async_id=...)."""
+    return next(_TRACKS)
+
+
+def record_span(
+    name: str,
+    start: float,
+    end: float,
+    *,
+    cat: str = "mdl",
+    at: Optional[Origin] = None,
+    async_id: Optional[int] = None,
+    **args: Any,
+) -> None:
+    """
+    Record a span that already happened (start/end from time.monotonic()),
+    by default on the calling thread. With `async_id` (see trace_track())
+    it is drawn on that track instead, for spans that do not nest with the
+    thread's own (e.g. the phases of an item that moves between pools).
+    """
+    profiler = _CURRENT
+    if profiler is None:
+        return
+    profiler.add(name, start, end, cat=cat, origin=at or _here(), args=args, async_id=async_id)
+
+
+@contextmanager
+def _timed(profiler: Profiler, name: str, cat: str, args: Dict[str, Any]) -> Iterator[None]:
+    at = _here()
+    start = time.monotonic()
+    try:
+        yield
+    finally:
+        profiler.add(name, start, time.monotonic(), cat=cat, origin=at, args=args)
+
+
+def span(name: str, *, cat: str = "mdl", **args: Any) -> ContextManager[None]:
+    """Time the `with` block as a span (a no-op unless profiling)."""
+    profiler = _CURRENT
+    if profiler is None:
+        return _NO_SPAN
+    return _timed(profiler, name, cat, args)
+
+
+@contextmanager
+def tagged(**tags: Any) -> Iterator[None]:
+    """Add `tags` (e.g. the job a pool worker is running) to every span this thread records in the block."""
+    if _CURRENT is None:
+        yield
+        return
+    saved = getattr(_LOCAL, "tags", {})
+    _LOCAL.tags = {**saved, **tags}
+    try:
+        yield
+    finally:
+        _LOCAL.tags = saved
+
+
+def write_profile() -> Optional[Tuple[Path, int]]:
+    """Write the trace if profiling; returns (path, spans)."""
+    profiler = _CURRENT
+    if profiler is None:
+        return None
+    return profiler.path, profiler.write()
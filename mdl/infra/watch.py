@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+import ctypes
+import ctypes.util
+import os
+import select
+import sys
+import time
+from pathlib import Path
+from typing import Optional
+
+# inotify(7) event bits: a file was written and closed, moved in, created or changed.
+_IN_MODIFY = 0x00000002
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_MASK = _IN_MODIFY | _IN_CLOSE_WRITE | _IN_MOVED_TO | _IN_CREATE
+
+WATCH_INOTIFY = "inotify"
+WATCH_POLLING = "polling"
+
+
+def _inotify_fd(path: Path) -> Optional[int]:
+    """An inotify descriptor watching `path`, or None where inotify is unavailable."""
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or None, use_errno=True)
+        fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+    except (OSError, AttributeError):
+        return None
+    if fd < 0:
+        return None
+    if libc.inotify_add_watch(fd, os.fsencode(str(path)), _MASK) < 0:
+        os.close(fd)
+        return None
+    return fd
+
+
+class DirWatcher:
+    """
+    Wakes a caller when something changes in a directory: with inotify on
+    Linux (the wait ends as soon as a file is created, written, closed or
+    moved in), else by returning after the poll interval. It only signals
+    that the directory is worth rescanning; callers look at the files
+    themselves, so a missed or coalesced event costs at most one timeout.
+    """
+
+    def __init__(self, path: Path, *, poll: float) -> None:
+        self.path = path
+        self.poll = poll
+        self._fd = _inotify_fd(path)
+        self.mode = WATCH_INOTIFY if self._fd is not None else WATCH_POLLING
+
+    def wait(self, timeout: Optional[float] = None) -> None:
+        """
+        Block until the directory changes or `timeout` seconds pass (polling:
+        until the earlier of `timeout` and the poll interval).
+        """
+        if self._fd is None:
+            time.sleep(self.poll if timeout is None else min(timeout, self.poll))
+            return
+        ready, _, _ = select.select([self._fd], [], [], timeout)
+        if ready:
+            try:
+                while os.read(self._fd, 65536):
+                    pass  # drain: the events themselves are not needed
+            except BlockingIOError:
+                pass
+
+    def close(self) -> None:
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
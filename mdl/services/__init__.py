@@ -1,15 +1,23 @@
-from mdl.services.download_service import (
-    require_url,
-    run_audio_download,
-    run_video_download,
-    run_info,
-    run_smoke,
-)
+from mdl._lazy import lazy_exports
 
-__all__ = [
-    "require_url",
-    "run_audio_download",
-    "run_video_download",
-    "run_info",
-    "run_smoke",
-]
+_EXPORTS = {
+    "require_url": "mdl.services.download_service",
+    "run_audio_download": "mdl.services.download_service",
+    "run_video_download": "mdl.services.download_service",
+    "run_both_download": "mdl.services.download_service",
+    "run_info": "mdl.services.download_service",
+    "run_smoke": "mdl.services.download_service",
+    "read_url_list": "mdl.services.batch_service",
+    "run_batch": "mdl.services.batch_service",
+    "run_resume": "mdl.services.journal_service",
+    "run_sync": "mdl.services.sync_service",
+    "run_worker": "mdl.services.worker_service",
+    "run_coordinator": "mdl.services.coordinator_service",
+    "run_watch": "mdl.services.watch_service",
+    "submit_to_daemon": "mdl.services.daemon_client",
+    "run_playlist": "mdl.services.playlist_service",
+}
+
+__getattr__ = lazy_exports(__name__, _EXPORTS)
+
+__all__ = list(_EXPORTS)
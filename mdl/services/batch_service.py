@@ -0,0 +1,87 @@
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+from typing import Callable, Dict, List
+
+from mdl.builders.yt_dlp_audio import build_audio_command
+from mdl.builders.yt_dlp_video import build_video_command
+from mdl.core.config import Defaults
+from mdl.core.options import Options, RunOptions
+from mdl.core.throttle import throttled_options
+from mdl.core.urls import dedupe_urls
+from mdl.infra.output import print_command
+from mdl.services.download_service import build_both_commands
+
+_BUILDERS: Dict[str, Callable[..., List[List[str]]]] = {
+    "audio": lambda url, opts: [build_audio_command(url, opts)],
+    "video": lambda url, opts: [build_video_command(url, opts)],
+    "both": build_both_commands,
+}
+
+
+def read_url_list(source: str) -> List[str]:
+    """
+    Read URLs from a file (or stdin when source is "-").
+    Blank lines and lines starting with '#' are ignored.
+    """
+    try:
+        if source == "-":
+            raw = sys.stdin.read()
+        else:
+            raw = Path(source).expanduser().read_text(encoding="utf-8")
+    except OSError as e:
+        raise SystemExit(f"[mdl] ERROR: cannot read URL list '{source}': {e.strerror or e}")
+    return parse_url_list(raw)
+
+
+def parse_url_list(raw: str) -> List[str]:
+    """URLs of a list, one per line (blank lines and '#' comments skipped)."""
+    urls: List[str] = []
+    for line in raw.splitlines():
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        urls.append(line)
+    return urls
+
+
+def run_batch(opts: Options, run_opts: RunOptions) -> int:
+    kind = opts.kind or "audio"
+    build = _BUILDERS.get(kind)
+    if build is None:
+        raise SystemExit("[mdl] ERROR: Unknown batch kind (expected: audio|video|both).")
+
+    # Feeds often list the same video in several shapes; each copy would cost
+    # a full extraction, so duplicates are dropped before anything runs.
+    urls, duplicates = dedupe_urls(read_url_list(opts.source or "-"))
+    if duplicates:
+        print(f"[mdl] batch: skipping {duplicates} duplicate URL(s).", file=sys.stderr)
+    if not urls:
+        print("[mdl] batch: no URLs to process.", file=sys.stderr)
+        return 0
+
+    if opts.print_cmd:
+        for url in urls:
+            for cmd in build(url, throttled_options(run_opts, url)):
+                print_command(cmd)
+        return 0
+
+    # Execution-only imports, kept out of --print runs (see download_service).
+    from mdl.services.journal_service import journal_run, run_journaled
+    from mdl.services.playlist_service import plan_items
+    from mdl.services.pool_service import postprocess_workers, prepare_engine
+
+    dep_rc = prepare_engine(run_opts)
+    if dep_rc != 0:
+        return dep_rc
+
+    items = plan_items(kind, urls, run_opts)
+    if not items:
+        return 0
+
+    jobs = opts.jobs if opts.jobs is not None else Defaults.batch_jobs
+    pools = f"{min(jobs, len(items))} download + {min(postprocess_workers(opts.pp_jobs), len(items))} post-processing worker(s)"
+    run_id = journal_run("batch", kind, opts.source or "-", items, jobs=jobs, pp_jobs=opts.pp_jobs)
+    print(f"[mdl] batch: run {run_id}: {len(items)} {kind} item(s) from {len(urls)} URL(s), {pools}")
+    return run_journaled(run_id, kind, run_opts, jobs=jobs, pp_jobs=opts.pp_jobs, label="batch")
@@ -0,0 +1,191 @@
+from __future__ import annotations
+
+import fcntl
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import replace
+from pathlib import Path
+from typing import Dict, Iterator, Optional
+
+from mdl.core.config import Defaults
+from mdl.core.config_store import state_path
+from mdl.core.options import RunOptions
+
+_JAR_DIR_NAME = "cookies"
+
+# yt-dlp output that means "these cookies no longer sign us in".
+_AUTH_SIGNAL = re.compile(
+    r"Sign in to confirm|login required|requires authentication|members.only|"
+    r"cookies are no longer valid|HTTP Error 401",
+    re.IGNORECASE,
+)
+
+
+def is_auth_signal(line: str) -> bool:
+    return bool(_AUTH_SIGNAL.search(line))
+
+
+def _export(browser: str, dest: Path) -> bool:
+    """
+    Write the browser's cookies to `dest` (Netscape format). With yt_dlp
+    already imported (in-process engine) its extractor is called directly;
+    otherwise `yt-dlp --cookies-from-browser B --cookies FILE` without a URL
+    saves the jar on exit and stops there.
+    """
+    dest.unlink(missing_ok=True)
+    if "yt_dlp" in sys.modules:
+        try:
+            from yt_dlp.cookies import extract_cookies_from_browser
+
+            extract_cookies_from_browser(browser).save(str(dest))
+        except Exception:
+            pass
+    else:
+        try:
+            subprocess.run(
+                ["yt-dlp", "--ignore-config", "--cookies-from-browser", browser, "--cookies", str(dest)],
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+                timeout=Defaults.cookie_export_timeout,
+            )
+        except (OSError, subprocess.SubprocessError):
+            pass
+    try:
+        return dest.stat().st_size > 0
+    except OSError:
+        return False
+
+
+class CookieJarCache:
+    """
+    Browser cookies exported once to a Netscape cookie file per browser in
+    the config dir, so yt-dlp runs get `--cookies FILE` instead of each
+    opening and decrypting the browser's cookie database.
+
+    - Freshness: a jar is re-exported when it is older than `ttl` seconds,
+      or when a download reports it as signed out (refresh()).
+    - Concurrency: one export at a time, across threads (lock) and mdl
+      processes (flock on a lock file); the jar is replaced atomically.
+    - If the export fails (browser missing, keyring locked), callers fall
+      back to --cookies-from-browser until the next `ttl` window.
+    """
+
+    def __init__(self, root: Path, *, ttl: int) -> None:
+        self.root = root
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._failed: Dict[str, float] = {}  # browser -> time of the last failed export
+
+    def _path(self, browser: str) -> Path:
+        return self.root / f"{browser}.txt"
+
+    def get(self, browser: str, *, stale_before: Optional[float] = None) -> Optional[Path]:
+        """
+        Fresh jar for `browser` (exporting it if needed), or None if it cannot
+        be exported. A jar written before `stale_before` counts as stale.
+        """
+        path = self._path(browser)
+        with self._lock:
+            now = time.time()
+            failed = self._failed.get(browser)
+            if failed is not None and now - failed < self.ttl and stale_before is None:
+                return None
+            self.root.mkdir(parents=True, exist_ok=True)
+            os.chmod(self.root, 0o700)
+            with open(self.root / ".lock", "a") as lock:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+                try:
+                    mtime = path.stat().st_mtime
+                except OSError:
+                    mtime = None
+                # Another process may have refreshed it while we waited for the lock.
+                if mtime is not None and now - mtime <= self.ttl and (stale_before is None or mtime >= stale_before):
+                    return path
+                fd, name = tempfile.mkstemp(prefix=f".{browser}-", suffix=".txt", dir=self.root)
+                os.close(fd)
+                tmp = Path(name)
+                if not _export(browser, tmp):
+                    tmp.unlink(missing_ok=True)
+                    self._failed[browser] = now
+                    return None
+                os.chmod(tmp, 0o600)
+                os.replace(tmp, path)
+                self._failed.pop(browser, None)
+                return path
+
+
+_SHARED: Optional[CookieJarCache] = None
+_SHARED_LOCK = threading.Lock()
+
+
+def open_cookie_jars() -> CookieJarCache:
+    """Process-wide handle on the cookie jar cache (created on first use)."""
+    global _SHARED
+    with _SHARED_LOCK:
+        if _SHARED is None:
+            _SHARED = CookieJarCache(state_path(_JAR_DIR_NAME), ttl=Defaults.cookie_jar_ttl)
+        return _SHARED
+
+
+class Cookies:
+    """
+    One yt-dlp run's cookies: a private copy of the cached jar (yt-dlp
+    writes its jar back on exit, so concurrent runs must not share the
+    file). Inert when cookies are off or the export failed; apply() then
+    leaves --cookies-from-browser in place.
+    """
+
+    def __init__(self, browser: Optional[str]) -> None:
+        self._browser = browser
+        self._copy: Optional[Path] = None
+        self._since: Optional[float] = None
+
+    def _take(self, jar: Optional[Path]) -> bool:
+        if jar is None:
+            return False
+        if self._copy is None:
+            fd, name = tempfile.mkstemp(prefix="mdl-", suffix=".cookies.txt")
+            os.close(fd)
+            self._copy = Path(name)
+        shutil.copyfile(jar, self._copy)
+        self._since = time.time()
+        return True
+
+    def load(self) -> None:
+        if self._browser is not None:
+            self._take(open_cookie_jars().get(self._browser))
+
+    def refresh(self) -> bool:
+        """Re-export the jar after a signed-out response; True if there is a new one to retry with."""
+        if self._browser is None or self._since is None:
+            return False
+        return self._take(open_cookie_jars().get(self._browser, stale_before=self._since))
+
+    def apply(self, run_opts: RunOptions) -> RunOptions:
+        if self._copy is None or self._since is None:
+            return run_opts
+        return replace(run_opts, cookies_file=self._copy)
+
+    def close(self) -> None:
+        if self._copy is not None:
+            self._copy.unlink(missing_ok=True)
+            self._copy = None
+
+
+@contextmanager
+def cookie_session(run_opts: RunOptions) -> Iterator[Cookies]:
+    """Cookies for one item's yt-dlp runs, from the cached jar of run_opts.cookies_from."""
+    cookies = Cookies(run_opts.cookies_from)
+    try:
+        cookies.load()
+        yield cookies
+    finally:
+        cookies.close()
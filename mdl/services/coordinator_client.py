@@ -0,0 +1,124 @@
+from __future__ import annotations
+
+import json
+import os
+import secrets
+import urllib.error
+import urllib.request
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Union
+
+from mdl.core.config_store import state_path
+from mdl.core.journal import JobSpec
+from mdl.core.work_queue import QueuedJob, WorkQueue, open_work_queue
+
+# Client side of `mdl coordinator` (see mdl.services.coordinator_service):
+# the same calls as WorkQueue, as JSON over HTTP. Connection problems raise
+# OSError (urllib.error.URLError), as a queue file on unreachable shared
+# storage does.
+
+# Seconds one request may take; the coordinator answers from a local SQLite file.
+_TIMEOUT = 30.0
+
+# Shared secret every request carries; the variable wins over the token file.
+_ENV_TOKEN = "MDL_COORDINATOR_TOKEN"
+_TOKEN_NAME = "coordinator.token"
+
+
+def token_source() -> str:
+    """Where coordinator_token() comes from, for messages (never the token itself)."""
+    return f"${_ENV_TOKEN}" if os.environ.get(_ENV_TOKEN, "").strip() else str(state_path(_TOKEN_NAME))
+
+
+def coordinator_token(*, create: bool = False) -> Optional[str]:
+    """
+    The coordinator's shared token: $MDL_COORDINATOR_TOKEN, else the
+    coordinator.token file in the config dir. With `create` (the coordinator
+    itself), a missing file is created with a random token (mode 0600).
+    """
+    raw = os.environ.get(_ENV_TOKEN, "").strip()
+    if raw:
+        return raw
+    path = state_path(_TOKEN_NAME)
+    try:
+        raw = path.read_text(encoding="utf-8").strip()
+    except FileNotFoundError:
+        raw = ""
+    if raw or not create:
+        return raw or None
+    path.parent.mkdir(parents=True, exist_ok=True)
+    token = secrets.token_urlsafe(32)
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        f.write(token + "\n")
+    return token
+
+
+class RemoteQueue:
+    """A WorkQueue served by `mdl coordinator` at `base` (http://HOST:PORT)."""
+
+    def __init__(self, base: str, token: Optional[str] = None) -> None:
+        self.base = base.rstrip("/")
+        self._token = token
+
+    def describe(self) -> str:
+        return self.base
+
+    def _call(self, op: str, payload: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        headers = {"Authorization": f"Bearer {self._token}"} if self._token else {}
+        if payload is None:
+            req = urllib.request.Request(f"{self.base}/{op}", headers=headers)
+        else:
+            req = urllib.request.Request(
+                f"{self.base}/{op}",
+                data=json.dumps(payload).encode("utf-8"),
+                headers={**headers, "Content-Type": "application/json"},
+                method="POST",
+            )
+        try:
+            with urllib.request.urlopen(req, timeout=_TIMEOUT) as resp:
+                return json.loads(resp.read().decode("utf-8"))
+        except urllib.error.HTTPError as e:
+            if e.code != 401:
+                raise
+            raise SystemExit(
+                f"[mdl] ERROR: the coordinator at {self.base} refused the token; set {_ENV_TOKEN} "
+                f"to the contents of {_TOKEN_NAME} in the coordinator's config dir."
+            )
+
+    def add(self, kind: str, specs: Sequence[JobSpec]) -> int:
+        jobs = [{"url": s.url, "out_tpl": s.out_tpl, "playlist": s.playlist, "entry_id": s.entry_id} for s in specs]
+        return int(self._call("add", {"kind": kind, "jobs": jobs})["added"])
+
+    def lease(self, worker: str, limit: int) -> List[QueuedJob]:
+        reply = self._call("lease", {"worker": worker, "limit": limit})
+        return [QueuedJob.from_message(j) for j in reply["jobs"]]
+
+    def heartbeat(self, worker: str, ids: Sequence[int]) -> List[int]:
+        if not ids:
+            return []
+        return [int(i) for i in self._call("heartbeat", {"worker": worker, "ids": list(ids)})["held"]]
+
+    def finish(self, worker: str, job_id: int, rc: int, *, error: Optional[str] = None, retry: bool = True) -> Optional[str]:
+        reply = self._call("finish", {"worker": worker, "id": job_id, "rc": rc, "error": error, "retry": retry})
+        return reply.get("state")
+
+    def release(self, worker: str) -> int:
+        return int(self._call("release", {"worker": worker})["released"])
+
+    def status(self) -> Dict[str, Any]:
+        return self._call("status")
+
+
+Queue = Union[WorkQueue, RemoteQueue]
+
+
+def open_queue(target: Optional[str]) -> Queue:
+    """
+    The work queue named on the command line: an http(s):// URL of a
+    coordinator (authenticated with coordinator_token()), a queue file (e.g.
+    on shared storage), or, when not given, queue.sqlite3 in the mdl config dir.
+    """
+    if target and target.startswith(("http://", "https://")):
+        return RemoteQueue(target, coordinator_token())
+    return open_work_queue(Path(target) if target else None)
@@ -0,0 +1,237 @@
+from __future__ import annotations
+
+import hmac
+import json
+import signal
+import sys
+import threading
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+from mdl.core.config import Defaults
+from mdl.core.journal import STATE_DONE, STATE_FAILED, STATE_QUEUED, STATE_RETRYABLE, JobSpec
+from mdl.core.options import Options, RunOptions
+from mdl.core.playlist import is_playlist_url
+from mdl.core.urls import dedupe_urls
+from mdl.core.work_queue import STATE_LEASED, WorkQueue, open_work_queue
+from mdl.infra.runner import check_dependencies
+from mdl.services.batch_service import read_url_list
+from mdl.services.coordinator_client import coordinator_token, open_queue, token_source
+
+# Largest request body accepted (an `add` of a few thousand URLs).
+_MAX_BODY = 16 * 1024 * 1024
+
+
+def _listen_address(raw: str) -> Tuple[str, int]:
+    host, sep, port = raw.rpartition(":")
+    if not sep:
+        host, port = raw, str(Defaults.coordinator_port)
+    try:
+        return host or "127.0.0.1", int(port)
+    except ValueError:
+        raise SystemExit(f"[mdl] ERROR: invalid --listen address '{raw}' (expected HOST:PORT).")
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address: Tuple[str, int], queue: WorkQueue, token: str) -> None:
+        self.queue = queue
+        self.token = token
+        super().__init__(address, _Handler)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """
+    JSON over HTTP: GET /status, POST /add, /lease, /heartbeat, /finish,
+    /release. Every request must carry the shared token (Authorization:
+    Bearer TOKEN); others get 401.
+    """
+
+    server: _Server
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass  # one line per lease/finish is printed instead (see _log)
+
+    def _reply(self, status: int, payload: Dict[str, Any]) -> None:
+        body = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _authorized(self) -> bool:
+        scheme, _, token = (self.headers.get("Authorization") or "").partition(" ")
+        if scheme.lower() == "bearer" and hmac.compare_digest(token.strip().encode(), self.server.token.encode()):
+            return True
+        self._reply(401, {"error": "missing or wrong coordinator token"})
+        return False
+
+    def do_GET(self) -> None:
+        if not self._authorized():
+            return
+        if self.path.rstrip("/") == "/status":
+            self._reply(200, self.server.queue.status())
+        else:
+            self._reply(404, {"error": f"unknown path '{self.path}'"})
+
+    def do_POST(self) -> None:
+        if not self._authorized():
+            return
+        length = int(self.headers.get("Content-Length") or 0)
+        if length > _MAX_BODY:
+            self._reply(413, {"error": "request too large"})
+            return
+        try:
+            msg = json.loads(self.rfile.read(length).decode("utf-8") or "{}")
+            reply = self._handle(self.path.strip("/"), msg)
+        except (ValueError, KeyError, TypeError) as e:
+            self._reply(400, {"error": f"bad request: {e}"})
+            return
+        if reply is None:
+            self._reply(404, {"error": f"unknown path '{self.path}'"})
+        else:
+            self._reply(200, reply)
+
+    def _handle(self, op: str, msg: Dict[str, Any]) -> Any:
+        queue = self.server.queue
+        if op == "add":
+            specs = [
+                JobSpec(url=str(j["url"]), out_tpl=j.get("out_tpl"), playlist=j.get("playlist"), entry_id=j.get("entry_id"))
+                for j in msg["jobs"]
+            ]
+            added = queue.add(str(msg["kind"]), specs)
+            _log(f"queued {added} {msg['kind']} job(s)")
+            return {"added": added}
+        if op == "lease":
+            worker = str(msg["worker"])
+            jobs = queue.lease(worker, max(1, int(msg.get("limit", 1))))
+            if jobs:
+                _log(f"leased {len(jobs)} job(s) to {worker}")
+            return {"jobs": [j.to_message() for j in jobs]}
+        if op == "heartbeat":
+            return {"held": queue.heartbeat(str(msg["worker"]), [int(i) for i in msg.get("ids", [])])}
+        if op == "finish":
+            worker = str(msg["worker"])
+            state = queue.finish(
+                worker, int(msg["id"]), int(msg["rc"]), error=msg.get("error"), retry=bool(msg.get("retry", True))
+            )
+            _log(f"job {msg['id']} from {worker} -> {state or 'ignored (lease expired)'}")
+            return {"state": state}
+        if op == "release":
+            released = queue.release(str(msg["worker"]))
+            if released:
+                _log(f"{msg['worker']} gave back {released} job(s)")
+            return {"released": released}
+        return None
+
+
+def _log(text: str) -> None:
+    print(f"[mdl] coordinator: {text}", flush=True)
+
+
+def run_coordinator(opts: Options) -> int:
+    """
+    `mdl coordinator`: serve a queue file over HTTP to `mdl worker
+    http://HOST:PORT` nodes. The file stays usable directly as well
+    (`mdl coordinator add/status` on this machine). Requests must carry the
+    shared token (see coordinator_token), created on first start.
+    """
+    if opts.queue and opts.queue.startswith(("http://", "https://")):
+        raise SystemExit("[mdl] ERROR: coordinator serves a queue file; --queue must be a path.")
+    queue = open_work_queue(Path(opts.queue) if opts.queue else None)
+    address = _listen_address(opts.listen or f"127.0.0.1:{Defaults.coordinator_port}")
+    token = coordinator_token(create=True)
+    assert token is not None
+    try:
+        server = _Server(address, queue, token)
+    except OSError as e:
+        raise SystemExit(f"[mdl] ERROR: cannot listen on {address[0]}:{address[1]}: {e.strerror or e}")
+
+    def _stop(_signum, _frame) -> None:
+        threading.Thread(target=server.shutdown, daemon=True).start()
+
+    signal.signal(signal.SIGTERM, _stop)
+    host, port = server.server_address[:2]
+    _log(f"serving {queue.describe()} on http://{host}:{port}")
+    _log(f"token: {token_source()} (workers send it from their own MDL_COORDINATOR_TOKEN or token file)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    _log("stopped")
+    return 0
+
+
+def _queued_specs(kind: str, urls: List[str], run_opts: RunOptions) -> List[JobSpec]:
+    """Jobs for a URL list; playlists are expanded so their entries spread over the nodes."""
+    specs: List[JobSpec] = []
+    if not any(is_playlist_url(u) for u in urls):
+        return [JobSpec(url=u) for u in urls]
+
+    from mdl.services.playlist_service import entry_items, enumerate_playlist
+
+    dep_rc = check_dependencies(needs_ffmpeg=False, engine=run_opts.engine)
+    if dep_rc != 0:
+        raise SystemExit(dep_rc)
+    for url in urls:
+        playlist = enumerate_playlist(url, run_opts) if is_playlist_url(url) else None
+        if playlist is None:
+            specs.append(JobSpec(url=url))  # single item, or a listing that failed: one job for the node
+            continue
+        print(f"[mdl] coordinator: '{playlist.title}' has {len(playlist.entries)} entries")
+        specs += [
+            JobSpec(url=i.url, out_tpl=i.out_tpl, playlist=i.playlist, entry_id=i.entry_id)
+            for i in entry_items(kind, playlist, playlist.entries)
+        ]
+    return specs
+
+
+def run_coordinator_add(opts: Options, run_opts: RunOptions) -> int:
+    """`mdl coordinator add FILE`: queue a URL list for the worker nodes."""
+    kind = opts.kind or "audio"
+    urls, duplicates = dedupe_urls(read_url_list(opts.source or "-"))
+    if duplicates:
+        print(f"[mdl] coordinator: skipping {duplicates} duplicate URL(s).", file=sys.stderr)
+    if not urls:
+        print("[mdl] coordinator: no URLs to queue.", file=sys.stderr)
+        return 0
+
+    queue = open_queue(opts.queue)
+    specs = _queued_specs(kind, urls, run_opts)
+    try:
+        added = queue.add(kind, specs)
+    except OSError as e:
+        raise SystemExit(f"[mdl] ERROR: cannot reach the queue at {queue.describe()}: {e}")
+    known = len(specs) - added
+    already = f" ({known} already queued or done)" if known else ""
+    print(f"[mdl] coordinator: queued {added} {kind} job(s) in {queue.describe()}{already}")
+    return 0
+
+
+def run_coordinator_status(opts: Options) -> int:
+    """`mdl coordinator status`: job counts, the nodes holding leases, failed jobs."""
+    queue = open_queue(opts.queue)
+    try:
+        status = queue.status()
+    except OSError as e:
+        raise SystemExit(f"[mdl] ERROR: cannot reach the queue at {queue.describe()}: {e}")
+    counts: Dict[str, int] = status["counts"]
+    parts = [f"{counts.get(s, 0)} {s}" for s in (STATE_QUEUED, STATE_LEASED, STATE_RETRYABLE, STATE_DONE, STATE_FAILED)]
+    print(f"[mdl] queue {queue.describe()}: {', '.join(parts)}")
+    for lease in status["workers"]:
+        print(f"[mdl]   {lease['worker']}: {lease['jobs']} job(s), lease expires in {lease['expires_in']:.0f}s")
+    if status.get("next_eligible") and counts.get(STATE_RETRYABLE):
+        wake = datetime.fromtimestamp(status["next_eligible"]).strftime("%H:%M:%S")
+        print(f"[mdl]   next retry at {wake}")
+    for job in status["failed"]:
+        print(f"[mdl]   failed: {job['url']}")
+        if job.get("last_error"):
+            print(f"[mdl]            {job['last_error']}")
+    return 0
+
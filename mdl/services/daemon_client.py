@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+import os
+import sys
+from pathlib import Path
+from typing import Optional
+
+from mdl.core.config_store import state_path
+from mdl.core.options import Options
+from mdl.core.playlist import is_playlist_url
+from mdl.infra.ipc import Message, request
+
+# Client side of `mdl serve` (see mdl.services.daemon_service for the daemon).
+# Every audio/video/info invocation probes the socket, so this module stays
+# free of the daemon's and the runner's imports.
+
+# Commands a thin client may hand over to the daemon.
+DAEMON_COMMANDS = {"audio", "video", "info"}
+
+# Opt out of daemon routing for a single invocation (e.g. from scripts).
+_ENV_NO_DAEMON = "MDL_NO_DAEMON"
+
+_SOCKET_NAME = "mdl.sock"
+
+
+def socket_path() -> Path:
+    return state_path(_SOCKET_NAME)
+
+
+def _require_daemon(payload: Message):
+    stream = request(socket_path(), payload)
+    if stream is None:
+        raise SystemExit("[mdl] ERROR: no mdl daemon is running. Start one with: mdl serve")
+    return stream
+
+
+def run_serve_status(opts: Options) -> int:
+    reply = next(_require_daemon({"op": "status"}), {})
+    jobs = reply.get("jobs", [])
+    if not jobs:
+        print("[mdl] serve: no jobs")
+        return 0
+    for job in jobs:
+        rc = "" if job.get("rc") is None else f" rc={job['rc']}"
+        print(f"[mdl] job {job['id']}: {job['state']}{rc} {job['command']} {job['url']}")
+    return 0
+
+
+def run_serve_cancel(opts: Options) -> int:
+    reply = next(_require_daemon({"op": "cancel", "id": opts.job_id}), {})
+    if not reply.get("ok"):
+        print(f"[mdl] ERROR: job {opts.job_id} is unknown or already finished.", file=sys.stderr)
+        return 1
+    print(f"[mdl] job {opts.job_id}: cancel requested")
+    return 0
+
+
+def run_serve_stop(opts: Options) -> int:
+    next(_require_daemon({"op": "shutdown"}), {})
+    print("[mdl] serve: stop requested")
+    return 0
+
+
+def submit_to_daemon(opts: Options) -> Optional[int]:
+    """
+    Thin-client path for audio/video/info: hand the job to a running daemon and
+    stream its output. Returns None when no daemon is listening, so the caller
+    falls back to running locally.
+    """
+    if opts.command not in DAEMON_COMMANDS or opts.print_cmd or not opts.url:
+        return None
+    if opts.json_out:
+        return None  # machine-readable output is kept apart from yt-dlp's, which the daemon merges
+    if opts.events or opts.metrics or opts.profile:
+        return None  # telemetry/profiling was asked of this process, so run locally
+    if opts.jobs is not None or opts.pp_jobs is not None:
+        return None  # the daemon runs one item at a time and has no worker pools to size
+    if is_playlist_url(opts.url):
+        return None  # playlists fan out over a local worker pool, with checkpoint and journal
+    if os.environ.get(_ENV_NO_DAEMON):
+        return None
+
+    stream = request(socket_path(), {"op": "submit", "command": opts.command, "url": opts.url})
+    if stream is None:
+        return None
+
+    job_id: Optional[int] = None
+    try:
+        for msg in stream:
+            event = msg.get("event")
+            if event == "accepted":
+                job_id = int(msg["id"])
+            elif event == "line":
+                print(msg.get("text", ""), flush=True)
+            elif event == "exit":
+                return int(msg.get("rc", 1))
+            elif not msg.get("ok", True):
+                print(f"[mdl] ERROR: daemon rejected job: {msg.get('error')}", file=sys.stderr)
+                return 1
+    except KeyboardInterrupt:
+        if job_id is not None:
+            cancel = request(socket_path(), {"op": "cancel", "id": job_id})
+            if cancel is not None:
+                next(cancel, None)
+        return 130
+
+    print("[mdl] ERROR: daemon closed the connection before the job finished.", file=sys.stderr)
+    return 1
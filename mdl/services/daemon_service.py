@@ -0,0 +1,290 @@
+from __future__ import annotations
+
+import itertools
+import os
+import queue
+import signal
+import socketserver
+import sys
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field, replace
+from pathlib import Path
+from typing import List, Optional
+
+from mdl.core.config import Defaults
+from mdl.core.config_store import config_version
+from mdl.core.options import Options, RunOptions
+from mdl.core.resolve import resolve_run_options
+from mdl.core.throttle import host_key
+from mdl.infra.engine import ENGINE_INPROCESS, warm_up
+from mdl.infra.ipc import Message, connect, read_messages, write_message
+from mdl.infra.pool import FairQueue
+from mdl.infra.runner import check_dependencies, effective_engine, run_prefixed
+from mdl.services.daemon_client import DAEMON_COMMANDS, socket_path
+from mdl.services.item_service import run_download_item, run_info_item
+
+# Finished jobs kept for `mdl serve status`.
+_HISTORY_LIMIT = 1000
+
+
+@dataclass
+class Job:
+    id: int
+    command: str
+    url: str
+    state: str = "queued"  # queued | running | done | failed | cancelled
+    rc: Optional[int] = None
+    submitted: float = field(default_factory=time.time)
+    cancel: threading.Event = field(default_factory=threading.Event)
+    finished: threading.Event = field(default_factory=threading.Event)
+    # Output for the submitting client; None once that client has gone away.
+    events: Optional["queue.Queue[Message]"] = field(default_factory=queue.Queue)
+
+    def emit(self, msg: Message) -> None:
+        events = self.events
+        if events is not None:
+            events.put(msg)
+
+    def describe(self) -> Message:
+        return {"id": self.id, "command": self.command, "url": self.url, "state": self.state, "rc": self.rc}
+
+
+class JobManager:
+    """
+    Job queue drained by a fixed set of worker threads: FIFO per host,
+    round-robin across hosts, with at most `host-jobs` jobs of one host
+    running at once.
+    RunOptions are resolved once and re-resolved only when config.json changes.
+    """
+
+    def __init__(self, opts: Options, *, workers: int) -> None:
+        self._opts = opts
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._jobs: "OrderedDict[int, Job]" = OrderedDict()
+        self._queue: FairQueue[Job] = FairQueue(lambda job: host_key(job.url))
+        self._run_opts: Optional[RunOptions] = None
+        self._config_version = -1
+        self._workers = [
+            threading.Thread(target=self._worker, name=f"mdl-serve-{i + 1}", daemon=True)
+            for i in range(workers)
+        ]
+        for t in self._workers:
+            t.start()
+
+    def run_options(self) -> RunOptions:
+        version = config_version()
+        with self._lock:
+            if self._run_opts is None or version != self._config_version:
+                # Workers transcode side by side: split the CPUs between them.
+                threads = max(1, (os.cpu_count() or 1) // len(self._workers))
+                self._run_opts = replace(resolve_run_options(self._opts), ffmpeg_threads=threads)
+                self._config_version = version
+                self._queue.set_limit(self._run_opts.host_jobs)
+            return self._run_opts
+
+    def submit(self, command: str, url: str) -> Job:
+        with self._lock:
+            job = Job(id=next(self._ids), command=command, url=url)
+            self._jobs[job.id] = job
+        self._queue.put(job)
+        return job
+
+    def status(self) -> List[Message]:
+        with self._lock:
+            return [job.describe() for job in self._jobs.values()]
+
+    def cancel(self, job_id: int) -> bool:
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is None or job.finished.is_set():
+            return False
+        job.cancel.set()
+        return True
+
+    def shutdown(self) -> None:
+        with self._lock:
+            jobs = list(self._jobs.values())
+        for job in jobs:
+            job.cancel.set()
+        self._queue.close()
+
+    def _worker(self) -> None:
+        while True:
+            job = self._queue.get()
+            if job is None:
+                return
+            if job.cancel.is_set():
+                self._queue.done(job)
+                self._finish(job, "cancelled", 130)
+                continue
+
+            job.state = "running"
+            try:
+                rc = self._run(job)
+            except Exception as e:  # a broken job must not take the worker down
+                job.emit({"event": "line", "text": f"[mdl] ERROR: {e}"})
+                rc = 1
+            finally:
+                self._queue.done(job)
+
+            if job.cancel.is_set():
+                self._finish(job, "cancelled", 130)
+            else:
+                self._finish(job, "done" if rc == 0 else "failed", rc)
+
+    def _run(self, job: Job) -> int:
+        run_opts = self.run_options()
+        needs_ffmpeg = run_opts.cover and job.command != "info"
+
+        def _note(line: str) -> None:
+            job.emit({"event": "line", "text": line})
+
+        dep_rc = check_dependencies(needs_ffmpeg=needs_ffmpeg, engine=ENGINE_INPROCESS)
+        if dep_rc != 0:
+            _note("[mdl] ERROR: missing dependencies on the daemon host (see daemon log).")
+            return dep_rc
+
+        def _execute(cmd: List[str], observe=None, progress=None, rate_limit=None) -> int:
+            # The daemon exists to keep yt_dlp warm, so it prefers the in-process engine.
+            return run_prefixed(
+                cmd,
+                engine=ENGINE_INPROCESS,
+                sink=_note,
+                cancel=job.cancel,
+                observe=observe,
+                progress=progress,
+                rate_limit=rate_limit,
+            )
+
+        if job.command == "info":
+            return run_info_item(job.url, run_opts, execute=_execute, note=_note)
+        return run_download_item(job.command, job.url, run_opts, execute=_execute, note=_note)
+
+    def _finish(self, job: Job, state: str, rc: int) -> None:
+        job.state = state
+        job.rc = rc
+        job.emit({"event": "exit", "rc": rc})
+        job.finished.set()
+        print(f"[mdl] serve: job {job.id} {job.command} {job.url} -> {state} (rc={rc})", flush=True)
+        with self._lock:
+            done = [j for j in self._jobs.values() if j.finished.is_set()]
+            for old in done[: max(0, len(done) - _HISTORY_LIMIT)]:
+                self._jobs.pop(old.id, None)
+
+
+class _Server(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, path: Path, manager: JobManager) -> None:
+        self.manager = manager
+        super().__init__(str(path), _Handler)
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    server: _Server
+
+    def handle(self) -> None:
+        reader = (line.decode("utf-8", "replace") for line in self.rfile)
+        msg = next(read_messages(reader), None)
+        if msg is None:
+            return
+        out = _SocketWriter(self.wfile)
+        op = msg.get("op")
+        manager = self.server.manager
+
+        if op == "ping":
+            write_message(out, {"ok": True, "pid": os.getpid()})
+        elif op == "status":
+            write_message(out, {"ok": True, "jobs": manager.status()})
+        elif op == "cancel":
+            ok = manager.cancel(int(msg.get("id", 0)))
+            write_message(out, {"ok": ok})
+        elif op == "shutdown":
+            write_message(out, {"ok": True})
+            threading.Thread(target=self.server.shutdown, daemon=True).start()
+        elif op == "submit":
+            self._submit(msg, out)
+        else:
+            write_message(out, {"ok": False, "error": f"unknown op '{op}'"})
+
+    def _submit(self, msg: Message, out: "_SocketWriter") -> None:
+        command = str(msg.get("command", ""))
+        url = str(msg.get("url", ""))
+        if command not in DAEMON_COMMANDS or not url:
+            write_message(out, {"ok": False, "error": "submit requires command (audio|video|info) and url"})
+            return
+
+        job = self.server.manager.submit(command, url)
+        events = job.events
+        assert events is not None
+        try:
+            write_message(out, {"event": "accepted", "id": job.id})
+            while True:
+                ev = events.get()
+                write_message(out, ev)
+                if ev.get("event") == "exit":
+                    return
+        except OSError:
+            # Client went away: the job keeps running, its output is dropped.
+            job.events = None
+
+
+class _SocketWriter:
+    """Minimal text adapter so write_message() can target a binary socket file."""
+
+    def __init__(self, wfile) -> None:
+        self._wfile = wfile
+
+    def write(self, text: str) -> None:
+        self._wfile.write(text.encode("utf-8"))
+
+    def flush(self) -> None:
+        self._wfile.flush()
+
+
+def run_serve(opts: Options) -> int:
+    path = socket_path()
+    existing = connect(path)
+    if existing is not None:
+        existing.close()
+        raise SystemExit(f"[mdl] ERROR: a daemon is already listening on {path}")
+    path.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        path.unlink()  # stale socket from a crashed daemon
+    except FileNotFoundError:
+        pass
+
+    workers = opts.jobs if opts.jobs is not None else Defaults.batch_jobs
+    manager = JobManager(opts, workers=workers)
+
+    # Pay config resolution and the yt_dlp import before accepting the first job.
+    manager.run_options()
+    if effective_engine(ENGINE_INPROCESS) == ENGINE_INPROCESS:
+        warm_up()
+    else:
+        print("[mdl] serve: yt_dlp module not importable; jobs will spawn yt-dlp.", file=sys.stderr)
+
+    server = _Server(path, manager)
+    os.chmod(path, 0o600)
+
+    def _stop(_signum, _frame) -> None:
+        threading.Thread(target=server.shutdown, daemon=True).start()
+
+    signal.signal(signal.SIGTERM, _stop)
+    print(f"[mdl] serve: listening on {path} ({workers} worker(s))", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        manager.shutdown()
+        server.server_close()
+        try:
+            path.unlink()
+        except FileNotFoundError:
+            pass
+    print("[mdl] serve: stopped", flush=True)
+    return 0
@@ -1,10 +1,23 @@
 from __future__ import annotations
 
+import sys
+from pathlib import Path
+
 from mdl.builders.yt_dlp_audio import build_audio_command
 from mdl.builders.yt_dlp_video import build_video_command
 from mdl.builders.yt_dlp_info import build_info_command
+from mdl.builders.yt_dlp_playlist import build_playlist_command
+from mdl.core.config import Defaults
 from mdl.core.options import Options, RunOptions
-from mdl.infra.runner import print_command, run_command
+from mdl.core.playlist import is_playlist_url
+from mdl.core.throttle import throttled_options
+from mdl.core.urls import canonical_url
+from mdl.infra.output import print_command
+from mdl.infra.tracing import span, tagged
+
+# Execution-only modules (runner/subprocess, archive/sqlite3, worker pool) are
+# imported inside the functions below, after the --print branch: dry runs are
+# called at high frequency by tooling and only need the builders.
 
 
 # Deterministic smoke targets used to verify the full download pipeline.
@@ -18,43 +31,135 @@ def require_url(opts: Options) -> str:
     return opts.url
 
 
-def _run_or_print(opts: Options, cmd: list[str], *, needs_ffmpeg: bool = False) -> int:
+def _run_or_print(opts: Options, run_opts: RunOptions, cmd: list[str], *, needs_ffmpeg: bool = False) -> int:
     if opts.print_cmd:
         print_command(cmd)
         return 0
-    return run_command(cmd, needs_ffmpeg=needs_ffmpeg)
 
+    from mdl.infra.runner import run_command
 
-def run_audio_download(opts: Options, run_opts: RunOptions) -> int:
-    url = require_url(opts)
-    cmd = build_audio_command(url, run_opts)
-    needs_ffmpeg = run_opts.cover
-    return _run_or_print(opts, cmd, needs_ffmpeg=needs_ffmpeg)
+    return run_command(cmd, needs_ffmpeg=needs_ffmpeg, engine=run_opts.engine)
 
 
-def run_video_download(opts: Options, run_opts: RunOptions) -> int:
-    url = require_url(opts)
-    cmd = build_video_command(url, run_opts)
-    needs_ffmpeg = run_opts.cover
-    return _run_or_print(opts, cmd, needs_ffmpeg=needs_ffmpeg)
+def build_both_commands(url: str, run_opts: RunOptions) -> list[list[str]]:
+    """
+    The yt-dlp commands of `mdl both URL`: the video download, then the
+    audio extraction from the downloaded file. Its info JSON (the video's,
+    with the file as the only format) is written at run time; --print
+    shows it as <video>.info.json.
+    """
+    return [
+        build_video_command(url, run_opts),
+        build_audio_command(url, run_opts, info_json=Path("<video>.info.json"), local_source=True),
+    ]
 
 
-def run_info(opts: Options, run_opts: RunOptions) -> int:
+def _download(opts: Options, run_opts: RunOptions, kind: str, build) -> int:
     url = require_url(opts)
-    cmd = build_info_command(url, run_opts)
-    return _run_or_print(opts, cmd)
+    if opts.print_cmd:
+        if kind == "both":
+            for cmd in build_both_commands(url, throttled_options(run_opts, url)):
+                print_command(cmd)
+        else:
+            print_command(build(url, throttled_options(run_opts, url)))
+        return 0
 
+    from mdl.infra.runner import run_command
+    from mdl.services.item_service import run_both_item, run_download_item
+    from mdl.services.playlist_service import run_playlist
+
+    # Playlists: enumerate once, then fan entries out over the worker pool.
+    if is_playlist_url(url):
+        rc = run_playlist(kind, url, run_opts, jobs=opts.jobs, pp_jobs=opts.pp_jobs)
+        if rc is not None:
+            return rc
+
+    def _execute(cmd: list[str], observe=None, progress=None, rate_limit=None) -> int:
+        return run_command(
+            cmd,
+            needs_ffmpeg=run_opts.cover,
+            engine=run_opts.engine,
+            observe=observe,
+            progress=progress,
+            rate_limit=rate_limit,
+        )
+
+    if kind == "both":
+        return run_both_item(url, run_opts, execute=_execute, note=print)
+    return run_download_item(kind, url, run_opts, execute=_execute, note=print)
 
-def run_smoke(opts: Options, run_opts: RunOptions) -> int:
-    if opts.smoke_kind == "audio":
-        cmd = build_audio_command(SMOKE_AUDIO_URL, run_opts)
-    elif opts.smoke_kind == "video":
-        cmd = build_video_command(SMOKE_VIDEO_URL, run_opts)
-    else:
-        raise SystemExit("[mdl] ERROR: Unknown smoke kind (expected: audio|video).")
 
+def run_audio_download(opts: Options, run_opts: RunOptions) -> int:
+    return _download(opts, run_opts, "audio", build_audio_command)
+
+
+def run_video_download(opts: Options, run_opts: RunOptions) -> int:
+    return _download(opts, run_opts, "video", build_video_command)
+
+
+def run_both_download(opts: Options, run_opts: RunOptions) -> int:
+    return _download(opts, run_opts, "both", build_both_commands)
+
+
+def run_info(opts: Options, run_opts: RunOptions) -> int:
+    """
+    `mdl info URL...`: probe every URL (at most --jobs at once) and print a
+    format table per URL, or with --json one compact JSON line per URL on
+    stdout while yt-dlp's output goes to stderr.
+    """
+    urls = list(dict.fromkeys(canonical_url(u) for u in opts.urls)) or [require_url(opts)]
     if opts.print_cmd:
-        print_command(cmd)
+        for url in urls:
+            if is_playlist_url(url):
+                print_command(build_playlist_command(url, run_opts))
+            else:
+                print_command(build_info_command(url, run_opts, info_to=Path("<info.json>")))
         return 0
 
-    return run_command(cmd, needs_ffmpeg=run_opts.cover)
+    from mdl.infra.output import emit_line
+    from mdl.infra.pool import run_bounded
+    from mdl.infra.runner import check_dependencies, run_prefixed
+    from mdl.services.item_service import run_info_item
+    from mdl.services.pool_service import print_summary
+
+    dep_rc = check_dependencies(needs_ffmpeg=False, engine=run_opts.engine)
+    if dep_rc != 0:
+        return dep_rc
+
+    width = len(str(len(urls)))
+    log_to = sys.stderr if opts.json_out else None
+
+    def _probe(i: int, url: str) -> int:
+        prefix = f"[{i + 1:0{width}d}/{len(urls)}] " if len(urls) > 1 else ""
+
+        def _log(line: str) -> None:
+            emit_line(line, prefix=prefix, file=log_to)
+
+        def _execute(cmd: list[str], observe=None, progress=None, rate_limit=None) -> int:
+            return run_prefixed(cmd, engine=run_opts.engine, sink=_log, observe=observe)
+
+        with tagged(job=f"{i + 1}/{len(urls)}", url=url), span(f"job {i + 1}/{len(urls)}", cat="job", stage="probe"):
+            return run_info_item(url, run_opts, execute=_execute, note=_log, report=emit_line, as_json=opts.json_out)
+
+    jobs = opts.jobs if opts.jobs is not None else Defaults.batch_jobs
+    try:
+        rcs = run_bounded(urls, _probe, workers=jobs)
+    except KeyboardInterrupt:
+        return 130
+    if len(urls) == 1:
+        return rcs[0]
+    if not opts.json_out:
+        print_summary("info", list(zip(urls, rcs)))
+    return 0 if all(rc == 0 for rc in rcs) else 1
+
+
+def run_smoke(opts: Options, run_opts: RunOptions) -> int:
+    with span("build_command"):
+        if opts.smoke_kind == "audio":
+            cmd = build_audio_command(SMOKE_AUDIO_URL, run_opts)
+        elif opts.smoke_kind == "video":
+            cmd = build_video_command(SMOKE_VIDEO_URL, run_opts)
+        else:
+            raise SystemExit("[mdl] ERROR: Unknown smoke kind (expected: audio|video).")
+
+    return _run_or_print(opts, run_opts, cmd, needs_ffmpeg=run_opts.cover)
@@ -0,0 +1,624 @@
+from __future__ import annotations
+
+import json
+import os
+import tempfile
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, replace
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Union
+
+from mdl.builders.yt_dlp_audio import build_audio_command
+from mdl.builders.yt_dlp_info import build_info_command
+from mdl.builders.yt_dlp_video import build_video_command
+from mdl.core.bandwidth import download_lease
+from mdl.core.failures import classify_failure, failure_policy, open_failure_cache
+from mdl.core.formats import describe_format
+from mdl.core.info_cache import open_info_cache
+from mdl.core.options import RunOptions
+from mdl.core.probe import format_table, summarize_info, summarize_playlist
+from mdl.core.playlist import audio_entry_template, is_playlist_url
+from mdl.core.telemetry import ItemTelemetry, start_item
+from mdl.core.throttle import HostLimits, format_rate, host_key, is_throttle_signal, open_throttle
+from mdl.infra.progress import ProgressSink
+from mdl.infra.tracing import span
+from mdl.services.cookie_jar import cookie_session, is_auth_signal
+from mdl.services.library import library_hit, recording
+from mdl.services.scratch import Scratch, free_space_problem, open_scratch
+
+# Runs one yt-dlp argument list and returns its exit code:
+# execute(cmd, observe=None, progress=None, rate_limit=None). Callers pick the
+# transport: run_command (terminal), run_prefixed (batch), or a daemon sink;
+# `observe`, `progress` and `rate_limit` are forwarded to the runner unchanged.
+Execute = Callable[..., int]
+
+# Emits one "[mdl] ..." status line through the caller's output channel.
+Note = Callable[[str], None]
+
+_DOWNLOAD_BUILDERS: Dict[str, Callable[..., List[str]]] = {
+    "audio": build_audio_command,
+    "video": build_video_command,
+}
+
+
+class _RunWatch:
+    """
+    Line observer that remembers whether yt-dlp reported throttling or a
+    signed-out response, and its last error line (for classify_failure).
+    """
+
+    def __init__(self) -> None:
+        self.throttled = False
+        self.signed_out = False
+        self.error: Optional[str] = None
+
+    def __call__(self, line: str) -> None:
+        if not self.throttled and is_throttle_signal(line):
+            self.throttled = True
+        if not self.signed_out and is_auth_signal(line):
+            self.signed_out = True
+        if line.startswith("ERROR:"):
+            self.error = line[len("ERROR:"):].strip()
+
+
+def _describe_limits(lim: HostLimits) -> str:
+    rate = format_rate(lim.rate) if lim.rate is not None else "unlimited"
+    return f"rate {rate}, sleep {lim.sleep:g}s"
+
+
+def _library_skip(url: str, kind: str, note: Note, item: Optional[ItemTelemetry]) -> bool:
+    hit = library_hit(url, kind)
+    if hit is None:
+        return False
+    note(f"[mdl] skip: already in library: {hit.path}")
+    if item is not None:
+        item.file(hit.path)
+        item.finish(0, skipped=True)
+    return True
+
+
+def _failure_skip(url: str, note: Note, item: Optional[ItemTelemetry]) -> bool:
+    """Negative-cache check: True (item fails, no yt-dlp run) if the URL failed permanently before."""
+    known = open_failure_cache().get(url)
+    if known is None:
+        return False
+    since = time.strftime("%Y-%m-%d", time.localtime(known.failed_at))
+    note(f"[mdl] skip: known failure since {since}, {known.describe()}")
+    if item is not None:
+        item.finish(1)
+    return True
+
+
+def _report_failure(url: str, rc: int, error: Optional[str], note: Note) -> None:
+    """Classify a failed run, say what happens next, and cache it if it is permanent."""
+    failure = classify_failure(rc, error)
+    if failure is None or error is None:
+        return
+    policy = failure_policy(failure)
+    action = policy.action
+    if policy.cache_ttl is not None and open_failure_cache().record(url, failure, error):
+        action += f"; skipped without extraction for {policy.cache_ttl // 86400} days"
+    note(f"[mdl] failure: {failure}: {action}")
+
+
+def _admit(run_opts: RunOptions, note: Note) -> bool:
+    """Free-space preflight: False (item fails) if the library or scratch is full."""
+    problem = free_space_problem(run_opts)
+    if problem is None:
+        return True
+    note(problem)
+    return False
+
+
+def _format_note(kind: str, run_opts: RunOptions, note: Note) -> Callable[[Dict[str, Any]], None]:
+    """Record observer that reports each finished item's format decision (copy/transcode/remux)."""
+    target = run_opts.audio_format if kind == "audio" else run_opts.video_format
+    return lambda rec: note(describe_format(kind, target, rec))
+
+
+def _publish_done(scratch: Optional[Scratch], rc: int, note: Note) -> int:
+    """Exit code after the scratch files were moved; the directory goes once the item succeeded."""
+    if scratch is None:
+        return rc
+    for path in scratch.kept:
+        note(f"[mdl] kept existing library file: {path} (new copy discarded)")
+    for failure in scratch.failed:
+        note(f"[mdl] ERROR: could not move into the library: {failure}")
+    if scratch.failed and rc == 0:
+        rc = 1
+    if rc == 0:
+        scratch.cleanup()
+    return rc
+
+
+def _fetch(
+    url: str,
+    run_opts: RunOptions,
+    build_cmd: Callable[[RunOptions, Optional[Path]], List[str]],
+    *,
+    execute: Execute,
+    note: Note,
+    progress: Optional[ProgressSink],
+) -> int:
+    """
+    Run `build_cmd(item_opts, info_json)` under the host's throttle limits
+    and a lease on the shared bandwidth budget, with the exported cookie jar
+    (re-exported and retried once if yt-dlp reports being signed out), from
+    cached metadata when there is some (retrying once from the URL if that
+    fails), and feed the outcome back to the throttle controller. A failure
+    is classified (see mdl.core.failures) and, if permanent, cached so the
+    URL is not extracted again for a while.
+    """
+    cache = open_info_cache()
+    cached = cache.get(url)
+    throttle = open_throttle(run_opts.preset)
+    host_opts = throttle.apply(run_opts, url)
+    watch = _RunWatch()
+
+    with download_lease(host_opts) as lease, cookie_session(host_opts) as cookies:
+        rate_limit = lease.rate if lease.shared else None
+
+        def _run(info_json: Optional[Path]) -> int:
+            with span("build_command"):
+                cmd = build_cmd(cookies.apply(lease.apply(host_opts)), info_json)
+            return execute(cmd, observe=watch, progress=progress, rate_limit=rate_limit)
+
+        rc = _run(cached)
+        if rc != 0 and rc != 130 and watch.signed_out and cookies.refresh():
+            note("[mdl] cookies: signed out; re-exported from the browser, retrying.")
+            watch.signed_out = False
+            rc = _run(cached)
+        if rc != 0 and rc != 130 and cached is not None:
+            note("[mdl] cached info did not work; retrying with a fresh extraction.")
+            cache.invalidate(url)
+            rc = _run(None)
+
+    if rc != 0:
+        _report_failure(url, rc, watch.error, note)
+    if rc != 130:
+        changed = throttle.record(url, ok=(rc == 0), throttled=watch.throttled)
+        if changed is not None:
+            verb = "backing off" if watch.throttled else "speeding up"
+            note(f"[mdl] throttle: {host_key(url)} {verb} to {_describe_limits(changed)}")
+    return rc
+
+
+def run_download_item(
+    kind: str,
+    url: str,
+    run_opts: RunOptions,
+    *,
+    execute: Execute,
+    note: Note,
+    out_tpl: Optional[str] = None,
+) -> int:
+    """
+    Download one URL as `kind` (audio|video), the same way for every entrypoint:
+
+    1. Skip it if the library archive already has it (no network).
+    2. Reuse a fresh cached info JSON from `mdl info` instead of re-extracting.
+       If that run fails (e.g. expired format URLs), drop the entry and retry
+       once from the URL.
+    3. Record finished items into the archive.
+    4. Run with the host's adaptive throttle limits and feed the outcome back.
+    5. Report progress and the outcome to telemetry (--events/--metrics).
+    6. With a `scratch` directory, download there and move finished files
+       into the library; either way, refuse to start on a full disk.
+    7. Classify a failure; fail at once, without yt-dlp, for a URL that
+       failed permanently before (removed, private, geo-blocked).
+
+    `out_tpl` overrides the output template (playlist entries run on their own).
+    """
+    item = start_item(kind, url)
+    if _library_skip(url, kind, note, item):
+        return 0
+    if _failure_skip(url, note, item):
+        return 1
+    rc = _download(kind, url, run_opts, execute=execute, note=note, item=item, out_tpl=out_tpl)
+    if item is not None:
+        item.finish(rc)
+    return rc
+
+
+def _download(
+    kind: str,
+    url: str,
+    run_opts: RunOptions,
+    *,
+    execute: Execute,
+    note: Note,
+    item: Optional[ItemTelemetry],
+    out_tpl: Optional[str],
+    keep_info: Optional[Path] = None,
+    on_record: Optional[Callable[[Dict[str, Any]], None]] = None,
+) -> int:
+    """
+    Steps 2-6 of run_download_item for an item that is not in the library.
+    `keep_info` receives the item's info JSON, `on_record` every result record.
+    """
+    if not _admit(run_opts, note):
+        return 1
+    build = _DOWNLOAD_BUILDERS[kind]
+    report = _format_note(kind, run_opts, note)
+
+    def _record(rec: Dict[str, Any]) -> None:
+        report(rec)
+        if on_record is not None:
+            on_record(rec)
+
+    scratch = open_scratch(kind, url, run_opts)
+    with recording(
+        kind,
+        on_file=(item.file if item is not None else None),
+        relocate=(scratch.publish if scratch is not None else None),
+        on_record=_record,
+    ) as record_to:
+        rc = _fetch(
+            url,
+            scratch.options(run_opts) if scratch is not None else run_opts,
+            lambda opts, info_json: build(
+                url, opts, record_to=record_to, info_json=info_json, out_tpl=out_tpl, handoff_to=keep_info
+            ),
+            execute=execute,
+            note=note,
+            progress=(item.progress if item is not None else None),
+        )
+    return _publish_done(scratch, rc, note)
+
+
+def _local_source_info(info_json: Path, media: Path) -> Path:
+    """
+    Copy of an item's info JSON whose only format is `media`, a file on
+    disk (file:// URL): loading it makes yt-dlp take its streams from there
+    instead of the network.
+    """
+    info = json.loads(info_json.read_text(encoding="utf-8").splitlines()[-1])
+    for key in ("requested_formats", "requested_downloads", "_filename", "filename", "filepath", "fragments",
+                "manifest_url", "http_headers"):
+        info.pop(key, None)
+    source = {
+        "format_id": str(info.get("format_id") or "local"),
+        "url": media.as_uri(),
+        "ext": media.suffix.lstrip("."),
+        "acodec": info.get("acodec"),
+        "vcodec": "none",  # -x only reads the audio stream
+    }
+    info.update(source)
+    info["formats"] = [source]
+    fd, name = tempfile.mkstemp(prefix="mdl-", suffix=".local.info.json")
+    with os.fdopen(fd, "w", encoding="utf-8") as fh:
+        json.dump(info, fh)
+    return Path(name)
+
+
+def _derive_audio(
+    url: str,
+    info_json: Path,
+    video: Path,
+    run_opts: RunOptions,
+    *,
+    execute: Execute,
+    note: Note,
+    item: Optional[ItemTelemetry],
+    out_tpl: Optional[str],
+) -> int:
+    """Audio for `url` extracted from its downloaded `video` file (no network), archived as usual."""
+    if not _admit(run_opts, note):
+        return 1
+    note(f"[mdl] both: extracting audio from {video}")
+    source = _local_source_info(info_json, video)
+    scratch = open_scratch("audio", url, run_opts)
+    report = _format_note("audio", run_opts, note)
+    audio: List[Path] = []
+
+    def _record(rec: Dict[str, Any]) -> None:
+        report(rec)
+        audio.append(Path(str(rec["filepath"])))
+
+    started = time.time()
+    try:
+        with recording(
+            "audio",
+            on_file=(item.file if item is not None else None),
+            relocate=(scratch.publish if scratch is not None else None),
+            on_record=_record,
+        ) as record_to:
+            with span("build_command"):
+                cmd = build_audio_command(
+                    url,
+                    scratch.options(run_opts) if scratch is not None else run_opts,
+                    record_to=record_to,
+                    info_json=source,
+                    out_tpl=out_tpl,
+                    local_source=True,
+                )
+            rc = execute(cmd, progress=(item.progress if item is not None else None))
+    finally:
+        source.unlink(missing_ok=True)
+    # --keep-video leaves a copy of the video next to the audio unless the
+    # two are the same file; only a copy made by this run is removed.
+    for path in audio:
+        copy = path.with_suffix(video.suffix)
+        try:
+            if copy != video and copy.stat().st_ctime >= started:
+                copy.unlink()
+        except OSError:
+            pass
+    return _publish_done(scratch, rc, note)
+
+
+def run_both_item(
+    url: str,
+    run_opts: RunOptions,
+    *,
+    execute: Execute,
+    note: Note,
+    out_tpl: Optional[str] = None,
+) -> int:
+    """
+    Download one URL as video and derive the audio from the downloaded file
+    (mdl both): one extraction and one download of the shared audio stream
+    instead of two of each. Each half is skipped when the library already
+    has it; with only the video there, the audio is downloaded on its own.
+
+    `out_tpl` is the video entry template of a playlist entry; the audio
+    goes to its audio counterpart.
+    """
+    item = start_item("both", url)
+    audio_tpl = audio_entry_template(out_tpl) if out_tpl is not None else None
+    have_video, have_audio = library_hit(url, "video"), library_hit(url, "audio")
+    if have_video is not None and have_audio is not None:
+        note(f"[mdl] skip: already in library: {have_video.path}, {have_audio.path}")
+        if item is not None:
+            item.finish(0, skipped=True)
+        return 0
+    if _failure_skip(url, note, item):
+        return 1
+
+    if is_playlist_url(url) and out_tpl is None:
+        # Unexpanded playlist: no per-entry info to derive from, so two runs.
+        rc = _download("video", url, run_opts, execute=execute, note=note, item=item, out_tpl=None)
+        if rc == 0:
+            rc = _download("audio", url, run_opts, execute=execute, note=note, item=item, out_tpl=None)
+    elif have_video is not None:
+        note(f"[mdl] both: video already in library: {have_video.path}; downloading the audio")
+        rc = _download("audio", url, run_opts, execute=execute, note=note, item=item, out_tpl=audio_tpl)
+    else:
+        fd, name = tempfile.mkstemp(prefix="mdl-", suffix=".info.json")
+        os.close(fd)
+        info_json = Path(name)
+        videos: List[str] = []
+        try:
+            rc = _download(
+                "video", url, run_opts, execute=execute, note=note, item=item, out_tpl=out_tpl,
+                keep_info=info_json, on_record=lambda rec: videos.append(str(rec["filepath"])),
+            )
+            if rc == 0 and have_audio is None:
+                if videos and _keep_last_line(info_json):
+                    rc = _derive_audio(
+                        url, info_json, Path(videos[-1]), run_opts,
+                        execute=execute, note=note, item=item, out_tpl=audio_tpl,
+                    )
+                else:
+                    rc = _download("audio", url, run_opts, execute=execute, note=note, item=item, out_tpl=audio_tpl)
+        finally:
+            info_json.unlink(missing_ok=True)
+    if item is not None:
+        item.finish(rc)
+    return rc
+
+
+@dataclass(frozen=True)
+class StagedItem:
+    """A downloaded item waiting for its post-processing step (see fetch_item)."""
+    kind: str
+    url: str
+    run_opts: RunOptions
+    info_json: Path                      # handoff: info JSON of the finished download
+    out_tpl: Optional[str]
+    telemetry: Optional[ItemTelemetry]
+    scratch: Optional[Scratch] = None    # where the media waits (run_opts.out_dir points there)
+
+
+def _keep_last_line(path: Path) -> bool:
+    """Reduce a handoff file to its last JSON line (a retried run appends a second one)."""
+    try:
+        lines = [ln for ln in path.read_text(encoding="utf-8").splitlines() if ln.strip()]
+    except OSError:
+        return False
+    if not lines:
+        return False
+    path.write_text(lines[-1] + "\n", encoding="utf-8")
+    return True
+
+
+def fetch_item(
+    kind: str,
+    url: str,
+    run_opts: RunOptions,
+    *,
+    execute: Execute,
+    note: Note,
+    out_tpl: Optional[str] = None,
+) -> Union[int, StagedItem]:
+    """
+    Network stage of a staged download: run_download_item without yt-dlp's
+    post-processors (no -x, remux, tagging or thumbnail embedding), so the
+    caller's download slot is free as soon as the media is on disk.
+
+    Returns the exit code when the item is already finished (skipped, failed
+    or cancelled), otherwise a StagedItem for postprocess_item().
+    """
+    build = _DOWNLOAD_BUILDERS[kind]
+    item = start_item(kind, url)
+    if _library_skip(url, kind, note, item):
+        return 0
+    if _failure_skip(url, note, item):
+        return 1
+    if not _admit(run_opts, note):
+        if item is not None:
+            item.finish(1)
+        return 1
+
+    scratch = open_scratch(kind, url, run_opts)
+    if scratch is not None:
+        run_opts = scratch.options(run_opts)
+    fd, name = tempfile.mkstemp(prefix="mdl-", suffix=".handoff.json")
+    os.close(fd)
+    handoff = Path(name)
+    rc = _fetch(
+        url,
+        run_opts,
+        lambda opts, info_json: build(
+            url, opts, info_json=info_json, out_tpl=out_tpl, postprocess=False, handoff_to=handoff
+        ),
+        execute=execute,
+        note=note,
+        progress=(item.progress if item is not None else None),
+    )
+    if rc != 0 or not _keep_last_line(handoff):
+        handoff.unlink(missing_ok=True)
+        if item is not None:
+            item.finish(rc)
+        return rc
+
+    if item is not None:
+        item.enter("handoff")
+    return StagedItem(
+        kind=kind,
+        url=url,
+        # The media is already on disk: nothing left to throttle.
+        run_opts=replace(run_opts, limit_rate=None, sleep_min=None, sleep_max=None),
+        info_json=handoff,
+        out_tpl=out_tpl,
+        telemetry=item,
+        scratch=scratch,
+    )
+
+
+def postprocess_item(staged: StagedItem, *, execute: Execute, note: Note) -> int:
+    """
+    CPU stage of a staged download: the full command for the item, loaded from
+    the handoff info JSON. yt-dlp finds the media already downloaded and only
+    runs its post-processors (ffmpeg), then the result is archived as usual
+    (moved out of the scratch directory first, if there is one).
+    """
+    build = _DOWNLOAD_BUILDERS[staged.kind]
+    item = staged.telemetry
+    scratch = staged.scratch
+    if item is not None:
+        item.enter("postprocess")
+    try:
+        with cookie_session(staged.run_opts) as cookies, recording(
+            staged.kind,
+            on_file=(item.file if item is not None else None),
+            relocate=(scratch.publish if scratch is not None else None),
+            on_record=_format_note(staged.kind, staged.run_opts, note),
+        ) as record_to:
+            with span("build_command"):
+                cmd = build(
+                    staged.url,
+                    cookies.apply(staged.run_opts),
+                    record_to=record_to,
+                    info_json=staged.info_json,
+                    out_tpl=staged.out_tpl,
+                )
+            rc = execute(cmd, progress=(item.progress if item is not None else None))
+    finally:
+        staged.info_json.unlink(missing_ok=True)
+    rc = _publish_done(scratch, rc, note)
+    if item is not None:
+        item.finish(rc)
+    return rc
+
+
+@contextmanager
+def _probe_target(url: str) -> Iterator[Path]:
+    """Where yt-dlp writes a probe's info JSON: an info cache fill, or a temp file for uncacheable URLs."""
+    with open_info_cache().filling(url) as cache_to:
+        if cache_to is not None:
+            yield cache_to
+            return
+    fd, name = tempfile.mkstemp(prefix="mdl-", suffix=".info.json")
+    os.close(fd)
+    try:
+        yield Path(name)
+    finally:
+        Path(name).unlink(missing_ok=True)
+
+
+def _summary_from(url: str, info_json: Path) -> Optional[Dict[str, Any]]:
+    try:
+        info = json.loads(info_json.read_text(encoding="utf-8").splitlines()[-1])
+    except (OSError, ValueError, IndexError):
+        return None
+    return summarize_info(url, info) if isinstance(info, dict) else None
+
+
+def _probe_playlist(url: str, run_opts: RunOptions, note: Note) -> Optional[Dict[str, Any]]:
+    # Deferred: the playlist service imports the worker pool, which imports this module.
+    from mdl.services.playlist_service import enumerate_playlist
+
+    playlist = enumerate_playlist(url, run_opts, note=note)
+    if playlist is None:
+        return None
+    return summarize_playlist(url, playlist.id, playlist.title, [e.duration for e in playlist.entries])
+
+
+def run_info_item(
+    url: str,
+    run_opts: RunOptions,
+    *,
+    execute: Execute,
+    note: Note,
+    report: Optional[Note] = None,
+    as_json: bool = False,
+) -> int:
+    """
+    Probe one URL without downloading and report its formats (codecs,
+    bitrates, sizes, duration) to `report` (default: `note`): a table, or
+    with `as_json` one compact JSON line (core.probe.summarize_info), also
+    for failures ({"url", "error"}). yt-dlp's own output goes to `note`.
+
+    A fresh cached info JSON is reported without network access; otherwise
+    the extraction is cached for the download that follows. Playlists are
+    listed flat (entry count and total duration).
+    """
+    report = report if report is not None else note
+    errors: List[str] = []
+
+    def _watch(line: str) -> None:
+        if line.startswith("ERROR:"):
+            errors.append(line[len("ERROR:"):].strip())
+
+    summary: Optional[Dict[str, Any]] = None
+    rc = 0
+    if is_playlist_url(url):
+        summary = _probe_playlist(url, run_opts, note)
+        rc = 0 if summary is not None else 1
+    else:
+        cached = open_info_cache().get(url)
+        if cached is not None:
+            note("[mdl] info: using cached metadata")
+            summary = _summary_from(url, cached)
+        else:
+            with cookie_session(run_opts) as cookies, _probe_target(url) as info_to:
+                with span("build_command"):
+                    cmd = build_info_command(url, cookies.apply(run_opts), info_to=info_to)
+                rc = execute(cmd, observe=_watch)
+                if rc == 0 and _keep_last_line(info_to):
+                    summary = _summary_from(url, info_to)
+        if summary is None and rc == 0:
+            rc = 1
+
+    if summary is None:
+        if as_json:
+            error = errors[-1] if errors else "no information extracted"
+            report(json.dumps({"url": url, "error": error}, separators=(",", ":")))
+        return rc
+    if as_json:
+        report(json.dumps(summary, separators=(",", ":"), ensure_ascii=False))
+    else:
+        report("\n".join(format_table(summary)))
+    return 0
@@ -0,0 +1,297 @@
+from __future__ import annotations
+
+import threading
+import time
+from dataclasses import dataclass, field, replace
+from datetime import datetime
+from typing import Dict, Optional, Sequence, Set, Tuple
+
+from mdl.core.checkpoint import open_checkpoint
+from mdl.core.config import Defaults
+from mdl.core.failures import classify_failure, failure_policy, open_failure_cache
+from mdl.core.journal import (
+    STATE_DONE,
+    STATE_FAILED,
+    STATE_QUEUED,
+    STATE_RETRYABLE,
+    STATE_RUNNING,
+    Job,
+    JobJournal,
+    JobSpec,
+    Run,
+    open_journal,
+)
+from mdl.core.options import Options, RunOptions
+from mdl.core.sync_state import is_synced, open_sync_state
+from mdl.infra.pool import FairQueue
+from mdl.services.pool_service import WorkItem, postprocess_workers, prepare_engine, print_summary, run_items
+
+
+def journal_run(command: str, kind: str, source: str, items: Sequence[WorkItem], *, jobs: int, pp_jobs: Optional[int]) -> int:
+    """Record a new multi-item run in the journal; returns its id."""
+    specs = [JobSpec(url=i.url, out_tpl=i.out_tpl, playlist=i.playlist, entry_id=i.entry_id) for i in items]
+    return open_journal().create_run(command, kind, source, specs, options={"jobs": jobs, "pp_jobs": pp_jobs})
+
+
+def job_outcome(url: str, rc: int, error: Optional[str]) -> Tuple[Optional[str], bool]:
+    """
+    The error to record for a finished job, prefixed with its failure class,
+    and whether another attempt is worth it. The class comes from the error
+    line, or from the negative cache when the item was failed without
+    running yt-dlp at all.
+    """
+    failure = classify_failure(rc, error)
+    if failure is None and rc not in (0, 130):
+        known = open_failure_cache().get(url)
+        if known is not None:
+            failure, error = known.failure, known.error
+    if failure is not None:
+        error = f"{failure}: {error}"
+    return error, failure_policy(failure).retry
+
+
+def _work_item(journal: JobJournal, kind: str, job: Job, rcs: Dict[int, int], errors: Dict[int, Optional[str]]) -> WorkItem:
+    spec = job.spec
+    checkpoint = open_checkpoint(kind, spec.playlist) if spec.playlist and spec.entry_id else None
+    synced = open_sync_state(kind, spec.playlist) if checkpoint is not None and is_synced(kind, spec.playlist) else None
+
+    def _start() -> None:
+        journal.start(job.run_id, job.seq)
+
+    def _done(rc: int, error: Optional[str]) -> None:
+        error, retry = job_outcome(spec.url, rc, error)
+        journal.finish(job.run_id, job.seq, rc, error=error, retry=retry)
+        rcs[job.seq] = rc
+        errors[job.seq] = error
+        if checkpoint is not None and rc == 0:
+            checkpoint.mark_done(str(spec.entry_id))
+        if synced is not None and rc == 0:
+            synced.mark_seen(str(spec.entry_id))
+
+    return WorkItem(
+        url=spec.url, out_tpl=spec.out_tpl, playlist=spec.playlist, entry_id=spec.entry_id, on_start=_start, on_done=_done
+    )
+
+
+def run_journaled(run_id: int, kind: str, run_opts: RunOptions, *, jobs: int, pp_jobs: Optional[int], label: str) -> int:
+    """
+    Work through a journaled run until every job is done or out of attempts:
+    one pool pass over the runnable jobs, then wait for the earliest retry
+    backoff and pass again. Every start and finish is committed to the
+    journal, so a crash or Ctrl+C loses nothing (`mdl resume` continues).
+    Prints the run summary; returns 0 if every job succeeded, else 1
+    (130 when interrupted).
+    """
+    journal = open_journal()
+    rcs: Dict[int, int] = {}
+    errors: Dict[int, Optional[str]] = {}
+    first_pass = True
+
+    try:
+        while True:
+            runnable = journal.runnable(run_id)
+            if not runnable:
+                wake = journal.next_eligible(run_id)
+                if wake is None:
+                    break
+                waiting = len(journal.jobs(run_id, states=(STATE_RETRYABLE,)))
+                delay = max(0.0, wake - time.time())
+                print(f"[mdl] {label}: {waiting} job(s) failed; retrying in {delay:.0f}s")
+                time.sleep(delay)
+                continue
+
+            if not first_pass:
+                attempt = max(j.attempts for j in runnable) + 1
+                print(f"[mdl] {label}: retrying {len(runnable)} job(s) (attempt {attempt}/{Defaults.job_max_attempts})")
+            first_pass = False
+            items = [_work_item(journal, kind, job, rcs, errors) for job in runnable]
+            run_items(kind, items, run_opts, jobs=jobs, pp_jobs=pp_jobs)
+    except KeyboardInterrupt:
+        journal.requeue_running(run_id)
+        print(f"[mdl] {label}: interrupted; continue with: mdl resume {run_id}")
+        return 130
+
+    journal.finish_run(run_id)
+    return _summarize(journal, run_id, kind, label, rcs, errors)
+
+
+def _summarize(
+    journal: JobJournal, run_id: int, kind: str, label: str, rcs: Dict[int, int], errors: Dict[int, Optional[str]]
+) -> int:
+    """Print a finished run's summary and clear its playlist checkpoints if every job is done; returns its exit code."""
+    final = journal.jobs(run_id)
+    results = [(j.spec.url, rcs.get(j.seq, 0 if j.state == STATE_DONE else 1)) for j in final]
+    print_summary(label, results, [errors.get(j.seq) or j.last_error for j in final])
+
+    if all(j.state == STATE_DONE for j in final):
+        for playlist in {j.spec.playlist for j in final if j.spec.playlist}:
+            open_checkpoint(kind, playlist).clear()
+        return 0
+    return 1
+
+
+@dataclass(frozen=True)
+class _FedRun:
+    id: int
+    kind: str
+    run_opts: RunOptions
+    label: str
+    rcs: Dict[int, int] = field(default_factory=dict)
+    errors: Dict[int, Optional[str]] = field(default_factory=dict)
+
+
+class JournalFeed:
+    """
+    Journaled runs fed into one long-lived pool (see stream_items) instead
+    of a pool pass per run, so runs overlap: a run's jobs are queued as soon
+    as it is added, a failed job is queued again on its own once its
+    backoff is over (nothing waits for it), and each run is finished and
+    summarized when its last job is. Used by `mdl watch`.
+    """
+
+    def __init__(self, queue: FairQueue[WorkItem]) -> None:
+        self._queue = queue
+        self._journal = open_journal()
+        self._lock = threading.RLock()
+        self._runs: Dict[int, _FedRun] = {}
+        self._fed: Set[Tuple[int, int]] = set()  # (run, seq) of jobs in the pool
+        self._timers: Dict[int, Tuple[float, threading.Timer]] = {}  # run -> (due, retry timer)
+
+    def add(self, run_id: int, kind: str, run_opts: RunOptions, *, label: str) -> None:
+        run = _FedRun(id=run_id, kind=kind, run_opts=run_opts, label=label)
+        with self._lock:
+            self._runs[run_id] = run
+            self._feed(run)
+
+    def interrupt(self) -> None:
+        """After the pool stopped (Ctrl+C): put the unfinished runs back for `mdl resume`."""
+        with self._lock:
+            for _, timer in self._timers.values():
+                timer.cancel()
+            self._timers.clear()
+            runs, self._runs = self._runs, {}
+        for run in runs.values():
+            self._journal.requeue_running(run.id)
+            print(f"[mdl] {run.label}: interrupted; continue with: mdl resume {run.id}")
+
+    def _feed(self, run: _FedRun) -> None:
+        runnable = [j for j in self._journal.runnable(run.id) if (run.id, j.seq) not in self._fed]
+        retries = [j for j in runnable if j.attempts]
+        if retries:
+            attempt = max(j.attempts for j in retries) + 1
+            print(f"[mdl] {run.label}: retrying {len(retries)} job(s) (attempt {attempt}/{Defaults.job_max_attempts})", flush=True)
+        for job in runnable:
+            self._fed.add((run.id, job.seq))
+            self._queue.put(self._item(run, job))
+
+    def _item(self, run: _FedRun, job: Job) -> WorkItem:
+        item = _work_item(self._journal, run.kind, job, run.rcs, run.errors)
+        record = item.on_done
+        assert record is not None
+
+        def _done(rc: int, error: Optional[str]) -> None:
+            record(rc, error)
+            self._settle(run, job.seq)
+
+        return replace(item, kind=run.kind, run_opts=run.run_opts, on_done=_done)
+
+    def _settle(self, run: _FedRun, seq: int) -> None:
+        with self._lock:
+            self._fed.discard((run.id, seq))
+            if run.id not in self._runs:
+                return  # interrupted
+            if self._journal.finish_run(run.id):
+                del self._runs[run.id]
+                _summarize(self._journal, run.id, run.kind, run.label, run.rcs, run.errors)
+                return
+            self._feed(run)  # a cancelled job is queued again
+            self._schedule(run)
+
+    def _schedule(self, run: _FedRun) -> None:
+        """Arm the run's retry timer for its earliest failed job that is not in the pool."""
+        waiting = [
+            j for j in self._journal.jobs(run.id, states=(STATE_RETRYABLE,)) if (run.id, j.seq) not in self._fed
+        ]
+        if not waiting:
+            return
+        due = min(j.next_eligible for j in waiting)
+        armed = self._timers.get(run.id)
+        if armed is not None:
+            if armed[0] <= due:
+                return
+            armed[1].cancel()
+        delay = max(0.0, due - time.time())
+        timer = threading.Timer(delay, self._retry, (run.id,))
+        timer.daemon = True
+        self._timers[run.id] = (due, timer)
+        timer.start()
+        print(f"[mdl] {run.label}: {len(waiting)} job(s) failed; retrying in {delay:.0f}s", flush=True)
+
+    def _retry(self, run_id: int) -> None:
+        with self._lock:
+            self._timers.pop(run_id, None)
+            run = self._runs.get(run_id)
+            if run is not None:
+                self._feed(run)
+                self._schedule(run)
+
+
+def _describe(run: Run) -> str:
+    counts = run.counts
+    parts = [f"{counts.get(STATE_DONE, 0)} done"]
+    if counts.get(STATE_FAILED):
+        parts.append(f"{counts[STATE_FAILED]} failed")
+    remaining = sum(counts.get(s, 0) for s in (STATE_QUEUED, STATE_RUNNING, STATE_RETRYABLE))
+    if remaining:
+        parts.append(f"{remaining} remaining")
+    return ", ".join(parts)
+
+
+def _list_runs(journal: JobJournal) -> int:
+    runs = journal.recent_runs()
+    if not runs:
+        print("[mdl] resume: no runs recorded.")
+        return 0
+    for run in runs:
+        created = datetime.fromtimestamp(run.created_at).strftime("%Y-%m-%d %H:%M")
+        status = "finished" if run.finished_at is not None else "unfinished"
+        print(f"{run.id:>5}  {created}  {run.command} {run.kind:<5}  {status:<10}  {_describe(run)}  {run.source}")
+    return 0
+
+
+def run_resume(opts: Options, run_opts: RunOptions) -> int:
+    """
+    `mdl resume [RUN]`: continue the latest unfinished batch/playlist run (or
+    RUN) exactly where it stopped: finished jobs are not touched, interrupted
+    ones are retried, failed ones only with --retry-failed.
+    """
+    journal = open_journal()
+    if opts.list_runs:
+        return _list_runs(journal)
+
+    if opts.run_id is not None:
+        run_id = opts.run_id
+    else:
+        latest = journal.latest_unfinished()
+        if latest is None:
+            print("[mdl] resume: nothing to resume (see: mdl resume --list).")
+            return 0
+        run_id = latest.id
+
+    dep_rc = prepare_engine(run_opts)
+    if dep_rc != 0:
+        return dep_rc
+
+    if opts.retry_failed:
+        # An explicit retry also overrides the negative cache for these URLs.
+        failures = open_failure_cache()
+        for job in journal.jobs(run_id, states=(STATE_FAILED,)):
+            failures.forget(job.spec.url)
+    run = journal.claim_run(run_id, retry_failed=opts.retry_failed)
+    jobs = opts.jobs if opts.jobs is not None else int(run.options.get("jobs") or Defaults.batch_jobs)
+    pp_jobs = opts.pp_jobs if opts.pp_jobs is not None else run.options.get("pp_jobs")
+    pending = len(journal.jobs(run.id, states=(STATE_QUEUED, STATE_RETRYABLE)))
+    pools = f"{min(jobs, max(pending, 1))} download + {min(postprocess_workers(pp_jobs), max(pending, 1))} post-processing worker(s)"
+    print(f"[mdl] resume: run {run.id} ({run.command} {run.kind} {run.source}): {_describe(run)}; {pools}")
+    return run_journaled(run.id, run.kind, run_opts, jobs=jobs, pp_jobs=pp_jobs, label=f"resume {run.id}")
+
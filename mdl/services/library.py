@@ -0,0 +1,126 @@
+from __future__ import annotations
+
+import json
+import os
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from mdl.core.archive import ArchiveEntry, open_archive
+from mdl.core.playlist import is_playlist_url
+from mdl.core.urls import canonical_url, media_key
+
+
+def library_hit(url: str, kind: str) -> Optional[ArchiveEntry]:
+    """
+    Archive entry for `url` downloaded as `kind` (audio|video) if it is
+    already in the library, decided without touching the network. Entries
+    whose file no longer exists do not count.
+
+    The item is found by (extractor, id) where the id can be derived from the
+    URL, otherwise by the canonical URL it was first downloaded from.
+    """
+    if is_playlist_url(url):
+        return None
+    key = media_key(url)
+    if key is not None:
+        entry = open_archive().lookup(*key, kind)
+    else:
+        entry = open_archive().lookup_url(canonical_url(url), kind)
+    if entry is None or not Path(entry.path).exists():
+        return None
+    return entry
+
+
+def _source_urls(rec: Dict[str, Any]) -> List[str]:
+    """Canonical URLs a result record can be looked up by (see library_hit)."""
+    # A playlist entry's original_url is the playlist's own URL; its webpage_url is still its own.
+    fields = ("webpage_url",) if rec.get("playlist_index") is not None else ("original_url", "webpage_url")
+    urls: List[str] = []
+    for field in fields:
+        raw = rec.get(field)
+        if not raw or is_playlist_url(str(raw)) or media_key(str(raw)) is not None:
+            continue  # ids derivable from the URL are looked up by (extractor, id) instead
+        url = canonical_url(str(raw))
+        if url not in urls:
+            urls.append(url)
+    return urls
+
+
+def ingest_records(
+    path: Path,
+    *,
+    kind: str,
+    on_file: Optional[Callable[[str], None]] = None,
+    relocate: Optional[Callable[[str], Optional[str]]] = None,
+    on_record: Optional[Callable[[Dict[str, Any]], None]] = None,
+) -> int:
+    """
+    Load result records written by yt-dlp (see builders.result_args) into the
+    archive as downloads of `kind`, then delete the record file. Returns the number of items recorded.
+    `relocate` moves each finished file to its final path and returns it (None
+    skips the record); `on_file` is called with the final path of each
+    recorded item and `on_record` with its whole record.
+    """
+    try:
+        lines = path.read_text(encoding="utf-8", errors="replace").splitlines()
+    except FileNotFoundError:
+        return 0
+    finally:
+        try:
+            path.unlink()
+        except FileNotFoundError:
+            pass
+
+    archive = open_archive()
+    count = 0
+    for line in lines:
+        try:
+            rec = json.loads(line)
+        except ValueError:
+            continue
+        extractor, video_id, filepath = rec.get("extractor_key"), rec.get("id"), rec.get("filepath")
+        if not (extractor and video_id and filepath):
+            continue
+        if relocate is not None:
+            filepath = relocate(str(filepath))
+            if filepath is None:
+                continue
+        try:
+            size: Optional[int] = os.stat(filepath).st_size
+        except OSError:
+            size = None
+        archive.record(
+            str(extractor),
+            str(video_id),
+            str(filepath),
+            kind=kind,
+            format=(str(rec["format_id"]) if rec.get("format_id") else None),
+            size=size,
+            urls=_source_urls(rec),
+        )
+        if on_file is not None:
+            on_file(str(filepath))
+        if on_record is not None:
+            on_record(dict(rec, filepath=str(filepath)))
+        count += 1
+    return count
+
+
+@contextmanager
+def recording(
+    kind: str,
+    *,
+    on_file: Optional[Callable[[str], None]] = None,
+    relocate: Optional[Callable[[str], Optional[str]]] = None,
+    on_record: Optional[Callable[[Dict[str, Any]], None]] = None,
+) -> Iterator[Path]:
+    """Temporary result-record file that is ingested into the archive on exit."""
+    fd, name = tempfile.mkstemp(prefix="mdl-", suffix=".records.jsonl")
+    os.close(fd)
+    path = Path(name)
+    try:
+        yield path
+    finally:
+        ingest_records(path, kind=kind, on_file=on_file, relocate=relocate, on_record=on_record)
@@ -0,0 +1,199 @@
+from __future__ import annotations
+
+import json
+from dataclasses import dataclass
+from typing import Callable, List, Optional, Sequence
+
+from mdl.builders.yt_dlp_playlist import build_playlist_command
+from mdl.core.checkpoint import open_checkpoint
+from mdl.core.config import Defaults
+from mdl.core.failures import open_failure_cache
+from mdl.core.options import RunOptions
+from mdl.core.playlist import entry_template, is_playlist_url
+from mdl.core.urls import canonical_url, classify_url
+from mdl.infra.output import emit_line, printable_cmd
+from mdl.infra.runner import run_capture
+from mdl.infra.tracing import span
+from mdl.services.cookie_jar import cookie_session
+from mdl.services.journal_service import journal_run, run_journaled
+from mdl.services.pool_service import WorkItem, postprocess_workers, prepare_engine
+
+_PLAYLIST_TEMPLATES = {
+    "audio": Defaults.audio_playlist_tpl,
+    "video": Defaults.video_playlist_tpl,
+    "both": Defaults.video_playlist_tpl,  # audio entries: core.playlist.audio_entry_template
+}
+
+
+@dataclass(frozen=True)
+class PlaylistEntry:
+    id: str
+    url: str
+    index: int  # 1-based position in the playlist (yt-dlp's playlist_index)
+    upload_date: Optional[str] = None  # YYYYMMDD, when the listing has it
+    duration: Optional[float] = None   # seconds, when the listing has it
+
+
+@dataclass(frozen=True)
+class Playlist:
+    url: str
+    title: str
+    entries: List[PlaylistEntry]
+    id: Optional[str] = None
+
+
+def enumerate_playlist(
+    url: str,
+    run_opts: RunOptions,
+    *,
+    start: int = 1,
+    count: Optional[int] = None,
+    note: Callable[[str], None] = emit_line,
+) -> Optional[Playlist]:
+    """
+    List a playlist's entries with a single flat extraction (no per-entry
+    network requests). Returns None if yt-dlp failed or returned no entries.
+    With `count`, only entries start..start+count-1 are listed. The command
+    line goes to `note`.
+    """
+    items = f"{start}:{start + count - 1}" if count is not None else None
+    with cookie_session(run_opts) as cookies:
+        with span("build_command"):
+            cmd = build_playlist_command(url, cookies.apply(run_opts), items=items)
+        note(f"[mdl] exec: {printable_cmd(cmd)}")
+        rc, lines = run_capture(cmd, engine=run_opts.engine)
+    if rc != 0:
+        return None
+
+    data = None
+    for line in lines:
+        if line.startswith("{"):
+            try:
+                data = json.loads(line)
+            except ValueError:
+                continue
+            break
+    if not isinstance(data, dict):
+        return None
+
+    entries: List[PlaylistEntry] = []
+    for i, raw in enumerate(data.get("entries") or [], start=start):
+        if not isinstance(raw, dict):
+            continue
+        entry_url = raw.get("url") or raw.get("webpage_url")
+        entry_id = raw.get("id")
+        if not entry_url or not entry_id:
+            continue
+        entries.append(
+            PlaylistEntry(
+                id=str(entry_id),
+                url=canonical_url(str(entry_url)),
+                index=int(raw.get("playlist_index") or i),
+                upload_date=(str(raw["upload_date"]) if raw.get("upload_date") else None),
+                duration=(float(raw["duration"]) if isinstance(raw.get("duration"), (int, float)) else None),
+            )
+        )
+
+    if not entries:
+        return None
+    title = str(data.get("title") or data.get("id") or "NA")
+    return Playlist(url=url, title=title, entries=entries, id=(str(data["id"]) if data.get("id") else None))
+
+
+def entry_items(kind: str, playlist: Playlist, entries: Sequence[PlaylistEntry]) -> List[WorkItem]:
+    """
+    One work item per entry, with the playlist title and index rendered into
+    its output template. Entries that failed permanently before (negative
+    cache: removed, private, geo-blocked) get none.
+    """
+    failures = open_failure_cache()
+    live = [e for e in entries if failures.get(e.url) is None]
+    if len(live) < len(entries):
+        print(f"[mdl] playlist: skipping {len(entries) - len(live)} entries that failed permanently before")
+    tpl = _PLAYLIST_TEMPLATES[kind]
+    return [
+        WorkItem(
+            url=entry.url,
+            out_tpl=entry_template(tpl, playlist_title=playlist.title, playlist_index=entry.index),
+            playlist=playlist.url,
+            entry_id=entry.id,
+        )
+        for entry in live
+    ]
+
+
+def plan_playlist(kind: str, url: str, run_opts: RunOptions) -> Optional[List[WorkItem]]:
+    """
+    Expand a playlist URL into one work item per entry that is not already
+    checkpointed as done. Each item carries an output template with the
+    playlist title and index filled in, so files land exactly where a
+    whole-playlist run would put them.
+
+    Returns None when enumeration fails; callers then fall back to one
+    yt-dlp process for the whole playlist.
+    """
+    playlist = enumerate_playlist(url, run_opts)
+    if playlist is None:
+        return None
+
+    checkpoint = open_checkpoint(kind, url)
+    pending = [e for e in playlist.entries if e.id not in checkpoint.done]
+    skipped = len(playlist.entries) - len(pending)
+    resumed = f", resuming ({skipped} already done)" if skipped else ""
+    print(f"[mdl] playlist: '{playlist.title}' has {len(playlist.entries)} entries{resumed}")
+    items = entry_items(kind, playlist, pending)
+    if not pending:
+        checkpoint.clear()
+    return items
+
+
+def plan_items(kind: str, urls: Sequence[str], run_opts: RunOptions) -> List[WorkItem]:
+    """
+    Work items for a URL list (batch, watch). Playlists fan out into one
+    item per entry, so their entries share the pool; an entry that is also
+    listed on its own (or in an earlier playlist) runs once.
+    """
+    items: List[WorkItem] = []
+    seen = set()
+    for url in urls:
+        planned = plan_playlist(kind, url, run_opts) if is_playlist_url(url) else None
+        for item in planned if planned is not None else [WorkItem(url=url)]:
+            key = classify_url(item.url).key
+            if key not in seen:
+                seen.add(key)
+                items.append(item)
+    return items
+
+
+def run_playlist(
+    kind: str,
+    url: str,
+    run_opts: RunOptions,
+    *,
+    jobs: Optional[int],
+    pp_jobs: Optional[int] = None,
+) -> Optional[int]:
+    """
+    Download a playlist entry by entry across the worker pool as a journaled
+    run (retries with backoff, `mdl resume` after a crash), skipping entries
+    the checkpoint of an earlier run already finished. Returns None if the
+    playlist could not be enumerated (caller falls back to a single yt-dlp
+    process).
+    """
+    dep_rc = prepare_engine(run_opts)
+    if dep_rc != 0:
+        return dep_rc
+
+    items = plan_playlist(kind, url, run_opts)
+    if items is None:
+        print("[mdl] playlist: could not enumerate entries; running it as one yt-dlp process.")
+        return None
+    if not items:
+        return 0
+
+    workers = jobs if jobs is not None else Defaults.batch_jobs
+    entries = f"{len(items)} {kind} entr{'y' if len(items) == 1 else 'ies'}"
+    pools = f"{min(workers, len(items))} download + {min(postprocess_workers(pp_jobs), len(items))} post-processing worker(s)"
+    run_id = journal_run("playlist", kind, url, items, jobs=workers, pp_jobs=pp_jobs)
+    print(f"[mdl] playlist: run {run_id}: {entries}, {pools}")
+    return run_journaled(run_id, kind, run_opts, jobs=workers, pp_jobs=pp_jobs, label="playlist")
@@ -0,0 +1,284 @@
+from __future__ import annotations
+
+import itertools
+import os
+import sys
+import threading
+from dataclasses import dataclass, replace
+from typing import Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+from mdl.core.bandwidth import open_bandwidth
+from mdl.core.config import Defaults
+from mdl.core.options import RunOptions
+from mdl.core.playlist import is_playlist_url
+from mdl.core.throttle import host_key
+from mdl.infra.engine import ENGINE_INPROCESS, warm_up
+from mdl.infra.output import emit_line
+from mdl.infra.pool import FairQueue, Handoff, run_pipeline, run_stream
+from mdl.infra.runner import check_dependencies, effective_engine, run_prefixed
+from mdl.infra.tracing import span, tagged
+from mdl.services.item_service import StagedItem, fetch_item, postprocess_item, run_both_item, run_download_item
+from mdl.services.scratch import free_space_problem
+
+
+# Longest error text kept per item (journal last_error).
+_ERROR_MAX = 500
+
+
+@dataclass(frozen=True)
+class WorkItem:
+    """One download scheduled on the worker pool."""
+    url: str
+    out_tpl: Optional[str] = None                   # pre-rendered playlist entry template
+    playlist: Optional[str] = None                  # playlist URL (checkpoint) of an expanded entry
+    entry_id: Optional[str] = None                  # entry id within `playlist`
+    kind: Optional[str] = None                      # audio|video|both, if not the pool's (mixed-kind streams)
+    run_opts: Optional[RunOptions] = None           # settings, if not the pool's (runs started at different times)
+    on_start: Optional[Callable[[], None]] = None   # called when a worker picks the item up
+    # Called with the item's exit code and its last yt-dlp error line (if any).
+    on_done: Optional[Callable[[int, Optional[str]], None]] = None
+
+
+def prepare_engine(run_opts: RunOptions) -> int:
+    """
+    Check dependencies and free space once for a multi-item run and, with
+    the in-process engine, pay the yt_dlp import up front instead of in
+    every worker. Returns 0 or the error code.
+    """
+    dep_rc = check_dependencies(needs_ffmpeg=run_opts.cover, engine=run_opts.engine)
+    if dep_rc != 0:
+        return dep_rc
+    problem = free_space_problem(run_opts)
+    if problem is not None:
+        print(problem, file=sys.stderr)
+        return 1
+    if effective_engine(run_opts.engine) == ENGINE_INPROCESS:
+        with span("warm_up"):
+            warm_up()
+    return 0
+
+
+def print_summary(
+    label: str, results: Sequence[tuple[str, int]], errors: Optional[Sequence[Optional[str]]] = None
+) -> None:
+    failed = sum(1 for _, rc in results if rc != 0)
+    ok = len(results) - failed
+    print(f"[mdl] {label} summary: {ok} ok, {failed} failed ({len(results)} total)")
+    for i, (url, rc) in enumerate(results):
+        print(f"[mdl]   rc={rc:<4} {url}")
+        if rc != 0 and errors is not None and errors[i]:
+            print(f"[mdl]            {errors[i]}")
+
+
+def postprocess_workers(pp_jobs: Optional[int]) -> int:
+    """--pp-jobs, else Defaults.postprocess_jobs, where 0 means one per CPU."""
+    n = pp_jobs if pp_jobs is not None else Defaults.postprocess_jobs
+    return n if n > 0 else (os.cpu_count() or 1)
+
+
+# What the download stage hands to post-processing: the item's label, the item, its staged download.
+_Staged = Tuple[str, WorkItem, StagedItem]
+
+
+class _Stages:
+    """
+    The per-item work of run_items and stream_items: the download stage, the
+    post-processing stage and the report of each item's exit code. Items
+    are identified by a label ("3/10", or "7" in a stream) that names their
+    profiling spans; `prefix` maps it to their output line prefix.
+    """
+
+    def __init__(
+        self,
+        kind: str,
+        run_opts: RunOptions,
+        *,
+        jobs: int,
+        pp_workers: int,
+        prefix: Callable[[str], str],
+        remaining: Callable[[], int],
+    ) -> None:
+        self.kind = kind
+        # Transcodes running side by side split the CPUs instead of each taking all of them.
+        self.ffmpeg_threads = max(1, (os.cpu_count() or 1) // max(1, pp_workers))
+        self.run_opts = replace(run_opts, ffmpeg_threads=self.ffmpeg_threads)
+        self.jobs = jobs
+        self.started = 0
+        self.finished = 0
+        self._prefix = prefix
+        self._remaining = remaining  # items not finished yet, from started/finished
+        self._errors: Dict[str, str] = {}  # item label -> last yt-dlp error line
+        self._lock = threading.Lock()
+        # Tell the shared bandwidth budget how many downloads are coming, so the
+        # first ones do not take all of it (see mdl.core.bandwidth).
+        self._budget = open_bandwidth() if run_opts.bandwidth is not None else None
+
+    def expect(self, *, started: int = 0, finished: int = 0) -> None:
+        with self._lock:
+            self.started += started
+            self.finished += finished
+            if self._budget is not None:
+                self._budget.expect(min(self.jobs, self._remaining()))
+
+    def _opts(self, item: WorkItem) -> RunOptions:
+        if item.run_opts is None:
+            return self.run_opts
+        return replace(item.run_opts, ffmpeg_threads=self.ffmpeg_threads)
+
+    def _execute_for(self, label: str, item: WorkItem):
+        prefix, engine = self._prefix(label), self._opts(item).engine
+
+        def _execute(cmd: List[str], observe=None, progress=None, rate_limit=None) -> int:
+            def _watch(line: str) -> None:
+                if observe is not None:
+                    observe(line)
+                if line.startswith("ERROR:"):
+                    self._errors[label] = line[len("ERROR:"):].strip()[:_ERROR_MAX]
+
+            return run_prefixed(
+                cmd, prefix=prefix, engine=engine, observe=_watch, progress=progress, rate_limit=rate_limit
+            )
+
+        return _execute
+
+    def _note_for(self, label: str):
+        prefix = self._prefix(label)
+
+        def _note(msg: str) -> None:
+            emit_line(msg, prefix=prefix)
+
+        return _note
+
+    def _done(self, label: str, item: WorkItem, rc: int) -> int:
+        self.expect(finished=1)
+        error = self._errors.pop(label, None)
+        if item.on_done is not None:
+            item.on_done(rc, error if rc != 0 else None)
+        return rc
+
+    def download(self, label: str, item: WorkItem) -> Union[int, Handoff[_Staged]]:
+        self.expect(started=1)
+        with tagged(job=label, url=item.url), span(f"job {label}", cat="job", stage="download"):
+            return self._fetch(label, item)
+
+    def _fetch(self, label: str, item: WorkItem) -> Union[int, Handoff[_Staged]]:
+        if item.on_start is not None:
+            item.on_start()
+        kind, run_opts = item.kind or self.kind, self._opts(item)
+        execute, note = self._execute_for(label, item), self._note_for(label)
+        if is_playlist_url(item.url) and item.out_tpl is None:
+            # Unexpanded playlist: one yt-dlp process handles every entry itself.
+            rc = run_download_item(kind, item.url, run_opts, execute=execute, note=note)
+            return self._done(label, item, rc)
+        if kind == "both":
+            # The audio is derived from the finished video, so the item runs start to end here.
+            rc = run_both_item(item.url, run_opts, execute=execute, note=note, out_tpl=item.out_tpl)
+            return self._done(label, item, rc)
+        out = fetch_item(kind, item.url, run_opts, execute=execute, note=note, out_tpl=item.out_tpl)
+        if isinstance(out, StagedItem):
+            return Handoff((label, item, out))
+        return self._done(label, item, out)
+
+    def postprocess(self, label: str, item: WorkItem, staged: StagedItem) -> int:
+        with tagged(job=label, url=staged.url), span(f"job {label}", cat="job", stage="postprocess"):
+            rc = postprocess_item(staged, execute=self._execute_for(label, item), note=self._note_for(label))
+        return self._done(label, item, rc)
+
+
+def run_items(
+    kind: str,
+    items: Sequence[WorkItem],
+    run_opts: RunOptions,
+    *,
+    jobs: int,
+    pp_jobs: Optional[int] = None,
+) -> List[int]:
+    """
+    Download every item in two stages with separate pools: at most `jobs`
+    yt-dlp downloads and at most postprocess_workers(pp_jobs) post-processing
+    runs (ffmpeg extraction, remux, tagging, embedding) at a time, so network
+    and CPU work overlap. Downloads are scheduled round-robin across hosts
+    with at most run_opts.host_jobs per host, so a slow or throttled site
+    only holds back its own items. Output lines are prefixed with `[i/total]`.
+    Returns exit codes in item order.
+    Raises KeyboardInterrupt after cancelling queued items.
+
+    When profiling, each stage of an item is a "job i/total" span on its
+    worker's track, and every span inside it is tagged with the job.
+    """
+    total = len(items)
+    width = len(str(total))
+    pp_workers = postprocess_workers(pp_jobs)
+
+    def _prefix(label: str) -> str:
+        n, _, of = label.partition("/")
+        return f"[{int(n):0{width}d}/{of}] "
+
+    stages = _Stages(
+        kind, run_opts, jobs=jobs, pp_workers=min(pp_workers, total), prefix=_prefix,
+        remaining=lambda: total - stages.finished,
+    )
+    stages.expect()
+
+    def _download(i: int, item: WorkItem) -> Union[int, Handoff[_Staged]]:
+        return stages.download(f"{i + 1}/{total}", item)
+
+    def _postprocess(_i: int, value: _Staged) -> int:
+        return stages.postprocess(*value)
+
+    return run_pipeline(
+        items,
+        _download,
+        _postprocess,
+        workers=jobs,
+        second_workers=pp_workers,
+        queue_size=Defaults.handoff_queue,
+        key=lambda item: host_key(item.url),
+        per_key=run_opts.host_jobs,
+    )
+
+
+def item_queue(run_opts: RunOptions) -> FairQueue[WorkItem]:
+    """Queue feeding stream_items: round-robin across hosts, at most run_opts.host_jobs per host."""
+    return FairQueue(lambda item: host_key(item.url), per_key=run_opts.host_jobs)
+
+
+def stream_items(
+    kind: str,
+    queue: FairQueue[WorkItem],
+    run_opts: RunOptions,
+    *,
+    jobs: int,
+    pp_jobs: Optional[int] = None,
+) -> None:
+    """
+    run_items for a long-lived process whose items keep arriving (mdl worker,
+    mdl watch): the same two pools, fed from `queue` (see item_queue), which
+    the caller fills while this runs. A download slot takes the next item as
+    soon as it frees up, so there are no batches to wait out. Output lines
+    are prefixed with `[n]`, counting the items taken; exit codes go to each
+    item's on_done. Returns once the queue is closed and empty and every
+    item is finished. Raises KeyboardInterrupt after dropping queued items.
+    """
+    pp_workers = postprocess_workers(pp_jobs)
+    stages = _Stages(
+        kind, run_opts, jobs=jobs, pp_workers=pp_workers, prefix=lambda label: f"[{label}] ",
+        remaining=lambda: stages.started - stages.finished + len(queue),
+    )
+    taken = itertools.count(1)
+
+    def _download(item: WorkItem) -> Optional[Handoff[_Staged]]:
+        out = stages.download(str(next(taken)), item)
+        return out if isinstance(out, Handoff) else None
+
+    def _postprocess(value: _Staged) -> None:
+        stages.postprocess(*value)
+
+    run_stream(
+        queue,
+        _download,
+        _postprocess,
+        workers=jobs,
+        second_workers=pp_workers,
+        queue_size=Defaults.handoff_queue,
+    )
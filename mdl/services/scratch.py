@@ -0,0 +1,139 @@
+from __future__ import annotations
+
+import errno
+import hashlib
+import os
+import re
+import shutil
+from dataclasses import replace
+from pathlib import Path
+from typing import List, Optional
+
+from mdl.core.config import Defaults
+from mdl.core.options import RunOptions
+
+_SIZE_UNITS = {"": 1, "K": 1024, "M": 1024**2, "G": 1024**3, "T": 1024**4}
+
+
+class Scratch:
+    """
+    Per-item directory under the `scratch` setting. yt-dlp runs with it as
+    out_dir, so .part fragments, merge and ffmpeg intermediates never touch
+    the library; publish() then moves each finished file into the library
+    in one step.
+
+    The directory name is derived from the item, so a retried download
+    finds its fragments again (--continue). It is removed once the item
+    succeeds and kept when it fails.
+    """
+
+    def __init__(self, root: Path, kind: str, url: str, out_dir: Path) -> None:
+        digest = hashlib.sha1(f"{kind}\0{url}".encode("utf-8")).hexdigest()[:16]
+        self.dir = root / f"mdl-{digest}"
+        self.out_dir = out_dir
+        self.failed: List[str] = []
+        self.kept: List[str] = []
+
+    def options(self, run_opts: RunOptions) -> RunOptions:
+        """`run_opts` writing into the scratch directory instead of the library."""
+        return replace(run_opts, out_dir=self.dir)
+
+    def publish(self, filepath: str) -> Optional[str]:
+        """
+        Move a finished file into the library and return its final path
+        (None if the move failed; see `failed`). A file that already exists
+        in the library is kept, as with --no-overwrites (see `kept`): yt-dlp
+        only sees the scratch directory, so it cannot skip it beforehand.
+        """
+        src = Path(filepath)
+        try:
+            dest = self.out_dir / src.relative_to(self.dir)
+        except ValueError:
+            return filepath  # not ours (e.g. already in the library)
+        try:
+            if dest.exists():
+                src.unlink(missing_ok=True)
+                self.kept.append(str(dest))
+            else:
+                _move_into(src, dest)
+        except OSError as e:
+            self.failed.append(f"{dest}: {e}")
+            return None
+        return str(dest)
+
+    def cleanup(self) -> None:
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+
+def _move_into(src: Path, dest: Path) -> None:
+    """
+    Move `src` to `dest` so that `dest` appears complete or not at all. On
+    one filesystem that is a rename; across filesystems the copy goes to a
+    hidden name next to `dest` first and is renamed once it is on disk.
+    """
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        os.rename(src, dest)
+        return
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+
+    tmp = dest.with_name(f".{dest.name}.mdl-part")
+    try:
+        with open(src, "rb") as fin, open(tmp, "wb") as fout:
+            shutil.copyfileobj(fin, fout, 1024 * 1024)
+            fout.flush()
+            os.fsync(fout.fileno())
+        shutil.copystat(src, tmp)
+        os.replace(tmp, dest)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+    src.unlink()
+
+
+def open_scratch(kind: str, url: str, run_opts: RunOptions) -> Optional[Scratch]:
+    """Scratch directory for one item, or None when no `scratch` is configured."""
+    if run_opts.scratch_dir is None:
+        return None
+    return Scratch(run_opts.scratch_dir, kind, url, run_opts.out_dir)
+
+
+def parse_size(raw: str) -> int:
+    """Parse a disk size ("500M", "1G", "1.5GiB", "2TB") into bytes (binary units)."""
+    m = re.fullmatch(r"\s*(\d+(?:\.\d+)?)\s*([KMGT]?)(?:i?B)?\s*", str(raw), re.IGNORECASE)
+    if not m:
+        raise ValueError(f"invalid size '{raw}'")
+    return int(float(m.group(1)) * _SIZE_UNITS[m.group(2).upper()])
+
+
+def _free_bytes(path: Path) -> Optional[int]:
+    # The library or scratch directory may not exist yet: ask its nearest parent.
+    for candidate in (path, *path.parents):
+        try:
+            return shutil.disk_usage(candidate).free
+        except OSError:
+            continue
+    return None
+
+
+def free_space_problem(run_opts: RunOptions) -> Optional[str]:
+    """
+    Error line if the library or the scratch directory has less than
+    Defaults.min_free_space left (None when there is room). Checked before
+    a download is admitted, so a full disk fails fast instead of leaving
+    half-written files behind.
+    """
+    need = parse_size(Defaults.min_free_space)
+    places = [("library", run_opts.out_dir)]
+    if run_opts.scratch_dir is not None:
+        places.append(("scratch", run_opts.scratch_dir))
+    for label, path in places:
+        free = _free_bytes(path)
+        if free is not None and free < need:
+            return (
+                f"[mdl] ERROR: not enough free space in {label} {path}: "
+                f"{free // (1024 * 1024)} MiB left, need {Defaults.min_free_space}."
+            )
+    return None
@@ -0,0 +1,128 @@
+from __future__ import annotations
+
+import time
+from typing import List, Optional, Sequence, Tuple
+
+from mdl.core.config import Defaults
+from mdl.core.failures import open_failure_cache
+from mdl.core.options import Options, RunOptions
+from mdl.core.sync_state import SyncState, open_sync_state
+from mdl.core.urls import canonical_url, classify_url
+from mdl.services.journal_service import journal_run, run_journaled
+from mdl.services.playlist_service import Playlist, PlaylistEntry, entry_items, enumerate_playlist
+from mdl.services.pool_service import WorkItem, postprocess_workers, prepare_engine
+
+
+def _reached_known(entries: Sequence[PlaylistEntry], state: SyncState) -> bool:
+    """
+    True once the listing has Defaults.sync_known_run known entries in a row
+    (synced, or failed permanently in an earlier run).
+    """
+    failures = open_failure_cache()
+    run = 0
+    for entry in entries:
+        known = state.known(entry.id, entry.upload_date) or failures.get(entry.url) is not None
+        run = run + 1 if known else 0
+        if run >= Defaults.sync_known_run:
+            return True
+    return False
+
+
+def _walk(url: str, run_opts: RunOptions, state: SyncState, *, full: bool) -> Optional[Tuple[Playlist, bool]]:
+    """
+    List a playlist/channel from the top until known territory: windows of
+    Defaults.sync_window entries, doubling, until a run of known entries or
+    the end of the listing. Returns the entries listed and whether that was
+    the whole listing, or None if the first listing failed.
+    """
+    if full:
+        playlist = enumerate_playlist(url, run_opts)
+        return None if playlist is None else (playlist, True)
+
+    first: Optional[Playlist] = None
+    entries: List[PlaylistEntry] = []
+    start, count = 1, Defaults.sync_window
+    while True:
+        page = enumerate_playlist(url, run_opts, start=start, count=count)
+        if page is None:
+            # Failed, or an empty slice past the end: keep what was listed, prune nothing.
+            complete = False
+            break
+        first = first or page
+        entries += page.entries
+        if len(page.entries) < count:
+            complete = True  # reached the end of the listing
+            break
+        if _reached_known(entries, state):
+            complete = False
+            break
+        start, count = start + count, count * 2
+    if first is None:
+        return None
+    return Playlist(url=url, title=first.title, entries=entries), complete
+
+
+def plan_sync(kind: str, url: str, run_opts: RunOptions, *, full: bool) -> Optional[List[WorkItem]]:
+    """
+    Work items for the entries of a playlist/channel that `mdl sync` has not
+    downloaded yet, walking only as much of the listing as needed (see
+    _walk). The whole listing is walked on the first sync, with `full`, and
+    every Defaults.sync_full_every seconds; such walks also forget entries
+    that were removed. Returns None if the listing failed.
+    """
+    state = open_sync_state(kind, url)
+    full = full or not state.seen or time.time() - state.full_at >= Defaults.sync_full_every
+    walked = _walk(url, run_opts, state, full=full)
+    if walked is None:
+        return None
+    playlist, complete = walked
+
+    listed = {e.id for e in playlist.entries}
+    gone = state.listed((e.upload_date for e in playlist.entries), complete_ids=(listed if complete else None))
+    new = [e for e in playlist.entries if e.id not in state.seen]
+    how = "whole listing" if complete else f"first {len(playlist.entries)}, stopped at known entries"
+    forgot = f", {gone} removed since the last walk" if gone else ""
+    print(f"[mdl] sync: '{playlist.title}': {len(new)} new ({how}{forgot})")
+    return entry_items(kind, playlist, new)
+
+
+def run_sync(opts: Options, run_opts: RunOptions) -> int:
+    """
+    `mdl sync URL...`: download what is new in each playlist/channel since
+    the last sync, as one journaled run over the worker pool. An entry
+    counts as synced once it downloaded successfully; failed entries are
+    retried as usual (and listed again by the next sync).
+    """
+    kind = opts.kind or "audio"
+    urls = list(dict.fromkeys(canonical_url(u) for u in opts.urls))
+    if not urls:
+        raise SystemExit("[mdl] ERROR: sync requires URL. Try: mdl sync -h")
+
+    dep_rc = prepare_engine(run_opts)
+    if dep_rc != 0:
+        return dep_rc
+
+    items: List[WorkItem] = []
+    seen = set()
+    failed = 0
+    for url in urls:
+        planned = plan_sync(kind, url, run_opts, full=opts.full)
+        if planned is None:
+            print(f"[mdl] sync: could not list {url}; skipped.")
+            failed += 1
+            continue
+        for item in planned:
+            key = classify_url(item.url).key
+            if key not in seen:
+                seen.add(key)
+                items.append(item)
+    if not items:
+        print("[mdl] sync: nothing new.")
+        return 1 if failed else 0
+
+    jobs = opts.jobs if opts.jobs is not None else Defaults.batch_jobs
+    pools = f"{min(jobs, len(items))} download + {min(postprocess_workers(opts.pp_jobs), len(items))} post-processing worker(s)"
+    run_id = journal_run("sync", kind, " ".join(urls), items, jobs=jobs, pp_jobs=opts.pp_jobs)
+    print(f"[mdl] sync: run {run_id}: {len(items)} new {kind} item(s) from {len(urls)} listing(s), {pools}")
+    rc = run_journaled(run_id, kind, run_opts, jobs=jobs, pp_jobs=opts.pp_jobs, label="sync")
+    return rc if rc != 0 or not failed else 1
@@ -0,0 +1,291 @@
+from __future__ import annotations
+
+import os
+import signal
+import stat
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+from mdl.core.config import Defaults
+from mdl.core.config_store import config_version
+from mdl.core.journal import open_journal
+from mdl.core.options import Options, RunOptions
+from mdl.core.resolve import resolve_run_options
+from mdl.core.urls import dedupe_urls
+from mdl.infra.pool import FairQueue
+from mdl.infra.watch import DirWatcher
+from mdl.services.batch_service import parse_url_list
+from mdl.services.journal_service import JournalFeed, journal_run
+from mdl.services.playlist_service import plan_items
+from mdl.services.pool_service import WorkItem, item_queue, postprocess_workers, prepare_engine, stream_items
+
+# Inbox files that are still being written by the usual atomic-write patterns.
+_PARTIAL_SUFFIXES = (".tmp", ".part", ".partial", ".crdownload", ".swp")
+
+# Where picked-up lists are moved once their URLs are in the job journal.
+_PROCESSED_DIR = "processed"
+
+
+@dataclass(frozen=True)
+class _Drop:
+    source: str            # inbox file name, or "fifo"
+    path: Optional[Path]   # inbox file, moved to processed/ when its run starts (None: FIFO line)
+    urls: List[str]
+
+
+class _Backlog:
+    """
+    URL lists picked up but not journaled yet, bounded in URLs: while it is
+    full, the inbox leaves new files where they are and the FIFO is not read
+    (so its writers block), until the dispatcher takes the backlog.
+    """
+
+    def __init__(self, limit: int) -> None:
+        self.limit = limit
+        self._cond = threading.Condition()
+        self._drops: List[_Drop] = []
+        self._size = 0
+
+    def full(self) -> bool:
+        with self._cond:
+            return self._size >= self.limit
+
+    def wait_room(self) -> None:
+        with self._cond:
+            while self._size >= self.limit:
+                self._cond.wait()
+
+    def put(self, drop: _Drop) -> None:
+        with self._cond:
+            self._drops.append(drop)
+            self._size += len(drop.urls)
+            self._cond.notify_all()
+
+    def take(self) -> List[_Drop]:
+        """Everything waiting, as soon as there is something (blocks)."""
+        with self._cond:
+            while not self._drops:
+                self._cond.wait(timeout=1.0)  # stays responsive to Ctrl+C
+            drops, self._drops, self._size = self._drops, [], 0
+            self._cond.notify_all()
+            return drops
+
+
+def _watch_inbox(inbox: Path, watcher: DirWatcher, backlog: _Backlog) -> None:
+    """
+    Pick up URL lists dropped into `inbox`. A file is taken once its size and
+    mtime have stayed the same for Defaults.watch_settle seconds, so lists
+    still being written are not read half-way; hidden files and the usual
+    temporary names are ignored until they are renamed.
+    """
+    seen: Dict[Path, Tuple[Tuple[int, int], float]] = {}  # path -> ((size, mtime_ns), unchanged since)
+    claimed: Set[Path] = set()
+    told_full = False
+    while True:
+        now = time.monotonic()
+        present: Set[Path] = set()
+        ready: List[Path] = []
+        with os.scandir(inbox) as it:
+            for entry in it:
+                if entry.name.startswith(".") or entry.name.endswith(_PARTIAL_SUFFIXES):
+                    continue
+                try:
+                    if not entry.is_file():
+                        continue
+                    st = entry.stat()
+                except OSError:
+                    continue
+                path = Path(entry.path)
+                present.add(path)
+                if path in claimed:
+                    continue
+                sig = (st.st_size, st.st_mtime_ns)
+                prev = seen.get(path)
+                if prev is None or prev[0] != sig:
+                    seen[path] = (sig, now)
+                elif now - prev[1] >= Defaults.watch_settle:
+                    ready.append(path)
+        for gone in set(seen) - present:
+            del seen[gone]
+        claimed &= present
+
+        for path in sorted(ready, key=lambda p: (seen[p][1], p.name)):
+            if backlog.full():
+                if not told_full:
+                    print(f"[mdl] watch: backlog full ({backlog.limit} URLs); new lists wait in the inbox", flush=True)
+                    told_full = True
+                break
+            told_full = False
+            try:
+                urls = parse_url_list(path.read_text(encoding="utf-8", errors="replace"))
+            except OSError:
+                continue  # vanished or unreadable: looked at again on the next scan
+            claimed.add(path)
+            del seen[path]
+            backlog.put(_Drop(source=path.name, path=path, urls=urls))
+
+        # Files still settling (or waiting for room) are looked at again shortly;
+        # otherwise only a change in the directory (or the poll interval) wakes the scan.
+        settling = bool(seen) or told_full
+        watcher.wait(Defaults.watch_settle if settling else None)
+
+
+def _read_fifo(fifo: Path, backlog: _Backlog) -> None:
+    """Take URLs written to a FIFO, one per line; a writer closing it is not the end."""
+    while True:
+        with open(fifo, encoding="utf-8", errors="replace") as f:  # blocks until a writer opens it
+            for line in f:
+                urls = parse_url_list(line)
+                if urls:
+                    backlog.wait_room()
+                    backlog.put(_Drop(source="fifo", path=None, urls=urls))
+
+
+def _archive(drops: List[_Drop], processed: Optional[Path]) -> None:
+    """Move picked-up inbox files out of the way (their URLs are journaled now)."""
+    if processed is None:
+        return
+    stamp = time.strftime("%Y%m%d-%H%M%S")
+    for drop in drops:
+        if drop.path is None:
+            continue
+        processed.mkdir(exist_ok=True)
+        try:
+            os.replace(drop.path, processed / f"{stamp}-{drop.path.name}")
+        except OSError as e:
+            print(f"[mdl] watch: could not move {drop.path.name} to {_PROCESSED_DIR}/: {e.strerror or e}", flush=True)
+
+
+def _raise_interrupt(_signum, _frame) -> None:
+    raise KeyboardInterrupt
+
+
+def _dispatch(
+    opts: Options,
+    run_opts: RunOptions,
+    backlog: _Backlog,
+    queue: FairQueue[WorkItem],
+    feed: JournalFeed,
+    processed: Optional[Path],
+    exit_rc: List[int],
+) -> None:
+    """
+    Turn whatever arrived into a journaled run and feed it to the pool at
+    once, alongside the runs still going. Intake pauses while the pool has
+    a backlog's worth of items not started yet, so the backlog bound holds.
+    A failed dependency check (or an error) stops the watch: `exit_rc` is
+    set and `queue` closed, so the pool finishes what it has and returns.
+    """
+    try:
+        _dispatch_runs(opts, run_opts, backlog, queue, feed, processed, exit_rc)
+    except Exception:
+        exit_rc.append(1)
+        queue.close()
+        raise
+
+
+def _dispatch_runs(
+    opts: Options,
+    run_opts: RunOptions,
+    backlog: _Backlog,
+    queue: FairQueue[WorkItem],
+    feed: JournalFeed,
+    processed: Optional[Path],
+    exit_rc: List[int],
+) -> None:
+    kind = opts.kind or "audio"
+    version = config_version()
+    while True:
+        if not queue.wait_for_room(backlog.limit):
+            return  # the pool stopped
+        drops = backlog.take()
+        urls, _ = dedupe_urls(u for d in drops for u in d.urls)
+        sources = ", ".join(dict.fromkeys(d.source for d in drops))
+        if config_version() != version:
+            # Settings edited while watching (`mdl preset fast`, ...) apply from the next run on.
+            version = config_version()
+            run_opts = resolve_run_options(opts)
+            queue.set_limit(run_opts.host_jobs)
+        dep_rc = prepare_engine(run_opts)
+        if dep_rc != 0:
+            exit_rc.append(dep_rc)  # unarchived lists stay in the inbox for the next start
+            queue.close()
+            return
+
+        items = plan_items(kind, urls, run_opts)
+        if not items:
+            _archive(drops, processed)
+            print(f"[mdl] watch: nothing to download in {sources}", flush=True)
+            continue
+        jobs = opts.jobs if opts.jobs is not None else Defaults.batch_jobs
+        run_id = journal_run("watch", kind, sources, items, jobs=jobs, pp_jobs=opts.pp_jobs)
+        _archive(drops, processed)
+        print(f"[mdl] watch: run {run_id}: {len(items)} {kind} item(s) from {sources}", flush=True)
+        feed.add(run_id, kind, run_opts, label=f"watch run {run_id}")
+
+
+def run_watch(opts: Options, run_opts: RunOptions) -> int:
+    """
+    `mdl watch PATH`: download URL lists as they arrive, dropped as files
+    into the inbox directory PATH (or written to PATH when it is a FIFO).
+    Each arrival becomes a journaled run like `batch` (`mdl resume`
+    continues it after a crash), started with the settings in effect at
+    that moment. Its jobs join one long-lived pool at once, so a new list
+    never waits for earlier runs or their retry backoff. Runs until Ctrl+C
+    or SIGTERM.
+    """
+    kind = opts.kind or "audio"
+    path = Path(opts.source or ".").expanduser()
+    try:
+        mode = path.stat().st_mode
+    except OSError as e:
+        raise SystemExit(f"[mdl] ERROR: cannot watch '{path}': {e.strerror or e}")
+    if not stat.S_ISDIR(mode) and not stat.S_ISFIFO(mode):
+        raise SystemExit(f"[mdl] ERROR: cannot watch '{path}': not a directory or FIFO.")
+
+    dep_rc = prepare_engine(run_opts)
+    if dep_rc != 0:
+        return dep_rc
+
+    backlog = _Backlog(Defaults.watch_backlog)
+    processed: Optional[Path] = None
+    if stat.S_ISFIFO(mode):
+        how = "FIFO, one URL per line"
+        reader = threading.Thread(target=_read_fifo, args=(path, backlog), name="mdl-watch", daemon=True)
+    else:
+        processed = path / _PROCESSED_DIR
+        watcher = DirWatcher(path, poll=Defaults.watch_poll)
+        how = f"inbox, {watcher.mode}; picked-up lists move to {_PROCESSED_DIR}/"
+        reader = threading.Thread(target=_watch_inbox, args=(path, watcher, backlog), name="mdl-watch", daemon=True)
+
+    unfinished = open_journal().latest_unfinished()
+    if unfinished is not None and unfinished.command == "watch":
+        print(f"[mdl] watch: run {unfinished.id} did not finish; continue it with: mdl resume {unfinished.id}")
+
+    jobs = opts.jobs if opts.jobs is not None else Defaults.batch_jobs
+    queue = item_queue(run_opts)
+    feed = JournalFeed(queue)
+    exit_rc: List[int] = []
+    dispatcher = threading.Thread(
+        target=_dispatch,
+        args=(opts, run_opts, backlog, queue, feed, processed, exit_rc),
+        name="mdl-dispatch",
+        daemon=True,
+    )
+
+    signal.signal(signal.SIGTERM, _raise_interrupt)
+    reader.start()
+    dispatcher.start()
+    pools = f"{jobs} download + {postprocess_workers(opts.pp_jobs)} post-processing worker(s)"
+    print(f"[mdl] watch: {path} ({how}); {kind} downloads, {pools}", flush=True)
+    try:
+        stream_items(kind, queue, run_opts, jobs=jobs, pp_jobs=opts.pp_jobs)
+    except KeyboardInterrupt:
+        feed.interrupt()
+        print("[mdl] watch: stopped")
+        return 0
+    feed.interrupt()  # runs still waiting for a retry
+    return exit_rc[0] if exit_rc else 1
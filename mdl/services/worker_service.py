@@ -0,0 +1,209 @@
+from __future__ import annotations
+
+import os
+import socket
+import sqlite3
+import sys
+import threading
+from dataclasses import replace
+from pathlib import Path
+from typing import Iterable, List, Optional, Set, Tuple
+
+from mdl.core.config import Defaults
+from mdl.core.options import Options, RunOptions
+from mdl.core.work_queue import QueuedJob
+from mdl.infra.pool import FairQueue
+from mdl.services.coordinator_client import Queue, open_queue
+from mdl.services.journal_service import job_outcome
+from mdl.services.pool_service import WorkItem, item_queue, postprocess_workers, prepare_engine, print_summary, stream_items
+
+# A coordinator that does not answer, or a queue file on storage that went away.
+_UNREACHABLE = (OSError, sqlite3.Error)
+
+
+def worker_name() -> str:
+    """How this node appears in leases (`mdl coordinator status`)."""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class _Leases:
+    """
+    The jobs this worker holds, renewed every Defaults.lease_heartbeat
+    seconds from a background thread for as long as they run. A lease the
+    queue no longer grants (this node missed its heartbeats and the job went
+    elsewhere) is reported once and dropped.
+    """
+
+    def __init__(self, queue: Queue, worker: str) -> None:
+        self._queue = queue
+        self._worker = worker
+        self._lock = threading.Lock()
+        self._ids: Set[int] = set()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._beat, name="mdl-heartbeat", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def hold(self, ids: Iterable[int]) -> None:
+        with self._lock:
+            self._ids.update(ids)
+
+    def drop(self, job_id: int) -> None:
+        with self._lock:
+            self._ids.discard(job_id)
+
+    def _beat(self) -> None:
+        while not self._stop.wait(Defaults.lease_heartbeat):
+            with self._lock:
+                ids = sorted(self._ids)
+            try:
+                held = set(self._queue.heartbeat(self._worker, ids))
+            except _UNREACHABLE as e:
+                print(f"[mdl] worker: heartbeat failed ({e}); leases run out after {Defaults.lease_ttl}s", flush=True)
+                continue
+            with self._lock:
+                lost = self._ids.intersection(ids) - held
+                self._ids -= lost
+            for job_id in sorted(lost):
+                print(f"[mdl] worker: lost the lease on job {job_id}; another node may run it", flush=True)
+
+
+def _work_item(
+    queue: Queue,
+    worker: str,
+    job: QueuedJob,
+    leases: _Leases,
+    results: List[Tuple[str, int]],
+    errors: List[Optional[str]],
+) -> WorkItem:
+    spec = job.spec
+
+    def _done(rc: int, error: Optional[str]) -> None:
+        error, retry = job_outcome(spec.url, rc, error)
+        leases.drop(job.id)
+        try:
+            state = queue.finish(worker, job.id, rc, error=error, retry=retry)
+        except _UNREACHABLE as e:
+            print(f"[mdl] worker: could not report job {job.id} ({e}); it runs again once its lease expires", flush=True)
+            state = None
+        if state is None:
+            print(f"[mdl] worker: job {job.id} was not recorded (lease expired)", flush=True)
+        if rc != 130:
+            results.append((spec.url, rc))
+            errors.append(error)
+
+    return WorkItem(
+        url=spec.url, out_tpl=spec.out_tpl, playlist=spec.playlist, entry_id=spec.entry_id, kind=job.kind, on_done=_done
+    )
+
+
+def _lease_jobs(
+    queue: Queue,
+    worker: str,
+    items: FairQueue[WorkItem],
+    leases: _Leases,
+    results: List[Tuple[str, int]],
+    errors: List[Optional[str]],
+    *,
+    drain: bool,
+    stop: threading.Event,
+) -> None:
+    """
+    Lease one job whenever a download slot of this node is idle, so the
+    pools stay full instead of waiting for the slowest job of a batch.
+    With `drain`, `items` is closed once the queue has no unfinished jobs.
+    """
+    waiting = False
+    while not stop.is_set() and not items.closed:
+        if not items.wait_for_demand(timeout=1.0):
+            continue
+        try:
+            leased = queue.lease(worker, 1)
+            idle = not leased and drain and queue.status()["open"] == 0
+        except _UNREACHABLE as e:
+            print(f"[mdl] worker: queue unreachable ({e}); retrying in {Defaults.worker_poll:.0f}s", flush=True)
+            stop.wait(Defaults.worker_poll)
+            continue
+        except SystemExit as e:  # the coordinator no longer takes our token: finish what runs, then stop
+            print(e, file=sys.stderr, flush=True)
+            items.close()
+            return
+        if idle:
+            items.close()
+            return
+        if not leased:
+            if not waiting:
+                print("[mdl] worker: no runnable jobs; waiting for work", flush=True)
+                waiting = True
+            stop.wait(Defaults.worker_poll)
+            continue
+        waiting = False
+        for job in leased:
+            leases.hold([job.id])
+            print(f"[mdl] worker: leased job {job.id} ({job.kind}) {job.spec.url}", flush=True)
+            items.put(_work_item(queue, worker, job, leases, results, errors))
+
+
+def run_worker(opts: Options, run_opts: RunOptions) -> int:
+    """
+    `mdl worker QUEUE`: take jobs from a shared queue (a coordinator URL or
+    a queue file on shared storage) and run them on this machine's worker
+    pools, `--jobs` at a time, until stopped (or, with --drain, until the
+    queue has nothing left). Leases are renewed while the jobs run; Ctrl+C
+    gives the unfinished ones back. Files go to this node's `out` unless
+    --out names another (e.g. shared) directory.
+    """
+    queue = open_queue(opts.queue)
+    if opts.out:
+        run_opts = replace(run_opts, out_dir=Path(opts.out).expanduser().resolve())
+
+    dep_rc = prepare_engine(run_opts)
+    if dep_rc != 0:
+        return dep_rc
+
+    try:
+        queue.status()  # a refused token fails here, before any work is leased
+    except _UNREACHABLE:
+        pass  # retried while leasing
+
+    name = worker_name()
+    jobs = opts.jobs if opts.jobs is not None else Defaults.batch_jobs
+    pools = f"{jobs} download + {postprocess_workers(opts.pp_jobs)} post-processing worker(s)"
+    print(f"[mdl] worker {name}: leasing from {queue.describe()}, {pools}, out: {run_opts.out_dir}")
+
+    results: List[Tuple[str, int]] = []
+    errors: List[Optional[str]] = []
+    leases = _Leases(queue, name)
+    leases.start()
+    items = item_queue(run_opts)
+    stop = threading.Event()
+    feeder = threading.Thread(
+        target=_lease_jobs,
+        args=(queue, name, items, leases, results, errors),
+        kwargs={"drain": opts.drain, "stop": stop},
+        name="mdl-lease",
+        daemon=True,
+    )
+    feeder.start()
+    try:
+        stream_items(opts.kind or "audio", items, run_opts, jobs=jobs, pp_jobs=opts.pp_jobs)
+    except KeyboardInterrupt:
+        stop.set()
+        feeder.join()
+        try:
+            released = queue.release(name)
+        except _UNREACHABLE:
+            released = 0  # the leases run out on their own
+        print(f"[mdl] worker: interrupted; {released} leased job(s) returned to the queue")
+        return 130
+    finally:
+        stop.set()
+        leases.stop()
+
+    print_summary(f"worker {name}", results, errors)
+    return 0 if all(rc == 0 for _, rc in results) else 1
@@ -0,0 +1,14 @@
+import pytest
+
+from mdl.core import archive, journal
+
+
+@pytest.fixture(autouse=True)
+def config_dir(tmp_path, monkeypatch):
+    """Every test gets its own mdl config dir, so no state file of the user's is touched."""
+    path = tmp_path / "config"
+    monkeypatch.setenv("MDL_CONFIG_DIR", str(path))
+    # The process-wide stores remember the path they were first opened at.
+    for module in (archive, journal):
+        monkeypatch.setattr(module, "_SHARED", None)
+    return path
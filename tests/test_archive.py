@@ -0,0 +1,69 @@
+import json
+
+import pytest
+
+from mdl.core.archive import Archive
+from mdl.services.library import ingest_records, library_hit
+
+
+@pytest.fixture
+def archive(tmp_path):
+    return Archive(tmp_path / "archive.sqlite3")
+
+
+def test_audio_and_video_are_separate_entries(archive):
+    archive.record("Youtube", "abc", "/lib/a.m4a", kind="audio", format="140", size=10)
+    assert archive.lookup("Youtube", "abc", "video") is None
+    archive.record("Youtube", "abc", "/lib/a.mp4", kind="video")
+    audio = archive.lookup("Youtube", "abc", "audio")
+    video = archive.lookup("Youtube", "abc", "video")
+    assert (audio.path, audio.format, audio.size) == ("/lib/a.m4a", "140", 10)
+    assert video.path == "/lib/a.mp4"
+
+
+def test_lookup_by_source_url(archive):
+    archive.record("Generic", "clip", "/lib/clip.m4a", kind="audio", urls=["https://example.com/clip"])
+    entry = archive.lookup_url("https://example.com/clip", "audio")
+    assert entry is not None and entry.video_id == "clip"
+    assert archive.lookup_url("https://example.com/clip", "video") is None
+    assert archive.lookup_url("https://example.com/other", "audio") is None
+
+
+def test_lookup_by_path(archive):
+    archive.record("Youtube", "abc", "/lib/a.m4a", kind="audio")
+    entry = archive.lookup_path("/lib/a.m4a", "audio")
+    assert entry is not None and entry.video_id == "abc"
+    assert archive.lookup_path("/lib/a.m4a", "video") is None
+    assert archive.lookup_path("/lib/b.m4a", "audio") is None
+
+
+def test_a_path_belongs_to_the_item_recorded_last(archive):
+    archive.record("Youtube", "old", "/lib/a.m4a", kind="audio")
+    archive.record("Youtube", "new", "/lib/a.m4a", kind="audio")
+    assert archive.lookup("Youtube", "old", "audio") is None
+    assert archive.lookup_path("/lib/a.m4a", "audio").video_id == "new"
+
+
+def test_records_persist_across_connections(tmp_path):
+    Archive(tmp_path / "archive.sqlite3").record("Youtube", "abc", "/lib/a.m4a", kind="audio")
+    assert Archive(tmp_path / "archive.sqlite3").lookup("Youtube", "abc", "audio") is not None
+
+
+def test_library_hit_by_id_or_canonical_url_while_the_file_exists(tmp_path):
+    song, clip = tmp_path / "song.m4a", tmp_path / "clip.m4a"
+    song.write_bytes(b"x")
+    clip.write_bytes(b"x")
+    records = tmp_path / "records.jsonl"
+    records.write_text("\n".join(json.dumps(rec) for rec in [
+        {"extractor_key": "Youtube", "id": "dQw4w9WgXcQ", "filepath": str(song)},
+        {"extractor_key": "Generic", "id": "clip", "filepath": str(clip),
+         "original_url": "https://example.com/clip?utm_source=x", "webpage_url": "https://example.com/clip"},
+    ]) + "\n", encoding="utf-8")
+    assert ingest_records(records, kind="audio") == 2
+    assert not records.exists()
+
+    assert library_hit("https://youtu.be/dQw4w9WgXcQ", "audio") is not None
+    assert library_hit("https://example.com/clip#top", "audio") is not None
+    assert library_hit("https://example.com/clip", "video") is None
+    clip.unlink()
+    assert library_hit("https://example.com/clip", "audio") is None
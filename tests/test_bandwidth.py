@@ -0,0 +1,42 @@
+from mdl.core.bandwidth import BandwidthBudget, fair_shares
+
+MIB = 1024 * 1024
+
+
+def test_fair_shares_split_evenly_without_caps():
+    assert fair_shares(9 * MIB, {1: None, 2: None, 3: None}) == {1: 3 * MIB, 2: 3 * MIB, 3: 3 * MIB}
+
+
+def test_fair_shares_give_a_capped_lease_its_cap_and_the_rest_to_the_others():
+    shares = fair_shares(8 * MIB, {1: MIB, 2: None, 3: None})
+    assert shares == {1: MIB, 2: 7 * MIB // 2, 3: 7 * MIB // 2}
+    assert sum(shares.values()) == 8 * MIB
+
+
+def test_fair_shares_ignore_caps_above_the_fair_share():
+    assert fair_shares(4 * MIB, {1: 10 * MIB, 2: None}) == {1: 2 * MIB, 2: 2 * MIB}
+
+
+def test_fair_shares_never_grant_zero():
+    assert fair_shares(1, {1: None, 2: None, 3: None}) == {1: 1, 2: 1, 3: 1}
+
+
+def test_expected_downloads_hold_back_part_of_the_budget(tmp_path):
+    budget = BandwidthBudget(tmp_path / "bandwidth.sqlite3")
+    budget.expect(4)
+    with budget.lease(8 * MIB, None) as first:
+        assert first.rate() == 2 * MIB
+    budget.expect(1)
+    with budget.lease(8 * MIB, None) as alone:
+        assert alone.rate() == 8 * MIB
+
+
+def test_grants_stay_within_the_budget(tmp_path):
+    budget = BandwidthBudget(tmp_path / "bandwidth.sqlite3")
+    budget.expect(1)
+    first = budget.lease(8 * MIB, None)
+    assert first.rate() == 8 * MIB
+    second = budget.lease(8 * MIB, MIB)
+    assert second.rate() <= MIB
+    first.release()
+    second.release()
@@ -0,0 +1,63 @@
+import pytest
+
+from mdl.core.config import Defaults
+from mdl.core.failures import (
+    AUTH_REQUIRED,
+    GEO_BLOCKED,
+    NETWORK,
+    POSTPROCESS,
+    RATE_LIMITED,
+    UNAVAILABLE,
+    FailureCache,
+    classify_failure,
+    failure_policy,
+)
+
+
+@pytest.mark.parametrize("error, failure", [
+    ("[youtube] abc: Sign in to confirm you're not a bot", RATE_LIMITED),
+    ("Unable to download webpage: HTTP Error 429: Too Many Requests", RATE_LIMITED),
+    ("[youtube] abc: Private video. Sign in if you've been granted access to this video", UNAVAILABLE),
+    ("[youtube] abc: Video unavailable. This video has been removed by the uploader", UNAVAILABLE),
+    ("[youtube] abc: The uploader has not made this video available in your country", GEO_BLOCKED),
+    ("[youtube] abc: This video is available to this channel's members. Join this channel", AUTH_REQUIRED),
+    ("Postprocessing: Conversion failed!", POSTPROCESS),
+    ("Unable to download webpage: <urlopen error timed out>", NETWORK),
+    ("unable to download video data: HTTP Error 503: Service Unavailable", NETWORK),
+    # A bare 404/410 is as often a stale format URL or a CDN hiccup: retried, not cached as removed.
+    ("unable to download video data: HTTP Error 404: Not Found", NETWORK),
+    ("[generic] x: Unable to download webpage: HTTP Error 410: Gone", NETWORK),
+])
+def test_classify_failure(error, failure):
+    assert classify_failure(1, error) == failure
+
+
+@pytest.mark.parametrize("rc, error", [
+    (0, "HTTP Error 429"),
+    (127, "yt-dlp not found"),
+    (130, "Interrupted by user"),
+    (1, None),
+    (1, "something nobody has seen before"),
+])
+def test_unclassified(rc, error):
+    assert classify_failure(rc, error) is None
+
+
+def test_policies():
+    assert failure_policy(RATE_LIMITED).retry and failure_policy(NETWORK).retry
+    assert not failure_policy(AUTH_REQUIRED).retry and failure_policy(AUTH_REQUIRED).cache_ttl is None
+    assert failure_policy(UNAVAILABLE).cache_ttl == Defaults.failure_ttl_unavailable
+    assert failure_policy(GEO_BLOCKED).cache_ttl == Defaults.failure_ttl_geo
+    assert failure_policy(None).retry  # unknown errors keep the journal's default
+
+
+def test_failure_cache_records_only_cached_classes(tmp_path):
+    cache = FailureCache(tmp_path / "failures.sqlite3")
+    url = "https://www.youtube.com/watch?v=dQw4w9WgXcQ"
+    assert not cache.record(url, NETWORK, "timed out")
+    assert cache.get(url) is None
+    assert cache.record(url, UNAVAILABLE, "Video unavailable")
+    known = cache.get("https://youtu.be/dQw4w9WgXcQ")  # same item, other URL shape
+    assert known is not None and known.describe() == "unavailable: Video unavailable"
+    cache.forget(url)
+    assert cache.get(url) is None
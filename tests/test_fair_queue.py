@@ -0,0 +1,182 @@
+import threading
+import time
+
+import pytest
+
+from mdl.core.throttle import host_key
+from mdl.infra.pool import FairQueue, Handoff, run_pipeline, run_stream
+
+
+def _queue(items, per_key=None):
+    queue = FairQueue(lambda item: item[0], per_key=per_key)
+    for item in items:
+        queue.put(item)
+    return queue
+
+
+def test_round_robin_across_keys_fifo_within_a_key():
+    queue = _queue(["a1", "a2", "a3", "b1", "b2", "c1"])
+    queue.close()
+    order = []
+    while (item := queue.get()) is not None:
+        order.append(item)
+        queue.done(item)
+    assert order == ["a1", "b1", "c1", "a2", "b2", "a3"]
+
+
+def test_per_key_cap_holds_back_only_that_key():
+    queue = _queue(["a1", "a2", "a3", "b1"], per_key=2)
+    assert [queue.get(), queue.get(), queue.get()] == ["a1", "b1", "a2"]
+    assert len(queue) == 1  # a3 waits: two items of "a" are out
+
+    got = []
+    taker = threading.Thread(target=lambda: got.append(queue.get()))
+    taker.start()
+    time.sleep(0.05)
+    assert got == []
+    queue.done("a1")
+    taker.join(timeout=2)
+    assert got == ["a3"]
+
+
+def test_set_limit_releases_capped_items():
+    queue = _queue(["a1", "a2"], per_key=1)
+    assert queue.get() == "a1"
+    got = []
+    taker = threading.Thread(target=lambda: got.append(queue.get()))
+    taker.start()
+    time.sleep(0.05)
+    queue.set_limit(None)
+    taker.join(timeout=2)
+    assert got == ["a2"]
+
+
+def test_close_and_drain():
+    queue = _queue(["a1", "b1"])
+    queue.close()
+    assert queue.get() == "a1"
+    assert queue.drain() == ["b1"]
+    assert queue.get() is None
+
+
+def test_host_key_folds_subdomain_variants():
+    assert host_key("https://www.youtube.com/watch?v=x") == host_key("https://m.youtube.com/watch?v=y")
+    assert host_key("https://Example.com:8080/a") == "example.com"
+    assert host_key("not a url") == "unknown"
+
+
+def test_run_pipeline_caps_items_per_key():
+    active = {}
+    peak = {}
+    lock = threading.Lock()
+
+    def _first(_i, item):
+        key = item[0]
+        with lock:
+            active[key] = active.get(key, 0) + 1
+            peak[key] = max(peak.get(key, 0), active[key])
+        time.sleep(0.02)
+        with lock:
+            active[key] -= 1
+        return item
+
+    items = [f"a{i}" for i in range(6)] + [f"b{i}" for i in range(6)]
+    results = run_pipeline(
+        items, _first, lambda _i, value: value, workers=6, second_workers=1, queue_size=1,
+        key=lambda item: item[0], per_key=2,
+    )
+    assert results == items
+    assert peak == {"a": 2, "b": 2}
+
+
+def test_wait_for_demand_reports_an_idle_consumer():
+    items = FairQueue(lambda item: item[0], per_key=1)
+    assert not items.wait_for_demand(timeout=0.01)
+    taken = []
+    consumer = threading.Thread(target=lambda: taken.append(items.get()))
+    consumer.start()
+    assert items.wait_for_demand(timeout=2)
+    items.put("a1")
+    consumer.join(timeout=2)
+    assert taken == ["a1"]
+
+    consumer = threading.Thread(target=lambda: taken.append(items.get()))
+    consumer.start()
+    assert items.wait_for_demand(timeout=2)
+    items.put("a2")  # held back by the cap: no more demand
+    assert not items.wait_for_demand(timeout=0.05)
+    items.done("a1")
+    consumer.join(timeout=2)
+    assert taken == ["a1", "a2"]
+    items.close()
+    assert not items.wait_for_demand(timeout=0.01)
+
+
+def test_run_stream_takes_items_as_slots_free_up():
+    items = FairQueue(lambda item: item[0])
+    started = {}
+    finished = []
+
+    def _first(item):
+        started[item] = time.monotonic()
+        time.sleep(0.3 if item == "slow" else 0.02)
+        return Handoff(item) if item != "slow" else None
+
+    def _second(item):
+        finished.append(item)
+
+    for item in ("slow", "a1", "b1", "c1"):
+        items.put(item)
+    stream = threading.Thread(
+        target=run_stream, args=(items, _first, _second), kwargs={"workers": 2, "second_workers": 1, "queue_size": 1}
+    )
+    stream.start()
+    time.sleep(0.1)
+    items.put("d1")  # arrives while the stream runs
+    items.close()
+    stream.join(timeout=5)
+    assert not stream.is_alive()
+    assert sorted(finished) == ["a1", "b1", "c1", "d1"]
+    # The fast items did not wait for the slow one to finish.
+    assert started["c1"] - started["slow"] < 0.3
+
+
+def test_run_stream_reraises_a_stage_error():
+    items = FairQueue(lambda item: item)
+    items.put("x")
+    items.put("y")
+
+    def _first(item):
+        raise RuntimeError(item)
+
+    with pytest.raises(RuntimeError):
+        run_stream(items, _first, lambda _value: None, workers=1, second_workers=1, queue_size=0)
+
+
+def test_run_pipeline_stops_on_a_stage_error():
+    ran = []
+
+    def _first(i, item):
+        ran.append(item)
+        time.sleep(0.02)
+        if item == 0:
+            raise RuntimeError(item)
+        return Handoff(item)
+
+    with pytest.raises(RuntimeError):
+        run_pipeline(list(range(20)), _first, lambda _i, value: value, workers=2, second_workers=1, queue_size=1)
+    # Both pools are shut down before the error surfaces; queued items never start.
+    assert not [t for t in threading.enumerate() if t.name.startswith(("mdl-worker", "mdl-postprocess"))]
+    assert len(ran) < 20
+
+
+def test_wait_for_room_blocks_until_an_item_is_taken():
+    items = FairQueue(lambda item: item)
+    items.put("a")
+    items.put("b")
+    assert items.wait_for_room(3, timeout=0.01)
+    assert not items.wait_for_room(2, timeout=0.05)
+    threading.Timer(0.05, items.get).start()
+    assert items.wait_for_room(2, timeout=2)
+    items.close()
+    assert not items.wait_for_room(2, timeout=0.01)
@@ -0,0 +1,80 @@
+import os
+import time
+
+import pytest
+
+from mdl.core.info_cache import InfoCache, cache_key
+
+A = "https://www.youtube.com/watch?v=aaaaaaaaaaa"
+B = "https://www.youtube.com/watch?v=bbbbbbbbbbb"
+C = "https://www.youtube.com/watch?v=ccccccccccc"
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return InfoCache(tmp_path / "info-cache", ttl=3600, max_entries=2, max_bytes=1024 * 1024)
+
+
+def _fill(cache, url, data=b'{"id": "x"}\n'):
+    with cache.filling(url) as tmp:
+        tmp.write_bytes(data)
+    return cache.get(url)
+
+
+def test_every_url_shape_of_a_video_shares_one_key():
+    assert cache_key(A) == cache_key("https://youtu.be/aaaaaaaaaaa") == cache_key(A + "&t=42")
+    assert cache_key(A) != cache_key(B)
+    assert cache_key("https://www.youtube.com/playlist?list=PL123") is None
+
+
+def test_filled_entry_is_a_hit_until_it_expires(cache):
+    path = _fill(cache, A)
+    assert path is not None and path.read_bytes() == b'{"id": "x"}\n'
+    assert cache.get("https://youtu.be/aaaaaaaaaaa") == path
+    old = time.time() - cache.ttl - 1
+    os.utime(path, (old, old))
+    assert cache.get(A) is None
+    assert not path.exists()
+
+
+def test_filling_keeps_only_one_complete_object(cache):
+    for data in (b"", b'{"id": "x"', b'{"id": "x"}\n{"id": "y"}\n', b"ERROR: nope\n"):
+        assert _fill(cache, A, data) is None
+    assert list(cache.root.iterdir()) == []
+
+
+def test_failed_fill_is_discarded(cache):
+    with pytest.raises(RuntimeError):
+        with cache.filling(A) as tmp:
+            tmp.write_bytes(b'{"id": "x"}')
+            raise RuntimeError("yt-dlp failed")
+    assert cache.get(A) is None
+    assert list(cache.root.iterdir()) == []
+
+
+def test_insert_evicts_the_least_recently_used_entry(cache):
+    a = _fill(cache, A)
+    b = _fill(cache, B)
+    now = time.time()
+    for path in (a, b):
+        os.utime(path, (now - 100, now - 10))
+    assert cache.get(A) == a  # used: now the most recent
+    _fill(cache, C)
+    assert cache.get(B) is None
+    assert cache.get(A) is not None and cache.get(C) is not None
+
+
+def test_insert_keeps_the_cache_within_max_bytes(tmp_path):
+    cache = InfoCache(tmp_path / "info-cache", ttl=3600, max_entries=10, max_bytes=100)
+    a = _fill(cache, A, b'{"pad": "' + b"x" * 60 + b'"}')
+    now = time.time()
+    os.utime(a, (now - 100, now - 10))
+    _fill(cache, B, b'{"pad": "' + b"y" * 60 + b'"}')
+    assert cache.get(A) is None
+    assert cache.get(B) is not None
+
+
+def test_invalidate(cache):
+    _fill(cache, A)
+    cache.invalidate("https://youtu.be/aaaaaaaaaaa")
+    assert cache.get(A) is None
@@ -0,0 +1,34 @@
+import json
+
+from mdl.services.item_service import _local_source_info
+
+
+def test_local_source_info_points_the_only_format_at_the_file(tmp_path):
+    info_json = tmp_path / "item.info.json"
+    info = {
+        "id": "abc",
+        "title": "Song",
+        "format_id": "137+140",
+        "acodec": "mp4a.40.2",
+        "formats": [{"format_id": "137", "url": "https://cdn.example/v"}, {"format_id": "140", "url": "https://cdn.example/a"}],
+        "requested_formats": [{"format_id": "137"}, {"format_id": "140"}],
+        "requested_downloads": [{"filepath": "/library/Song.mp4"}],
+        "filepath": "/library/Song.mp4",
+        "http_headers": {"User-Agent": "x"},
+    }
+    # Only the last line counts (yt-dlp may have written an earlier object).
+    info_json.write_text('{"id": "stale"}\n' + json.dumps(info) + "\n", encoding="utf-8")
+    media = tmp_path / "library" / "Song.mp4"
+
+    path = _local_source_info(info_json, media)
+    try:
+        local = json.loads(path.read_text(encoding="utf-8"))
+    finally:
+        path.unlink()
+
+    source = {"format_id": "137+140", "url": media.as_uri(), "ext": "mp4", "acodec": "mp4a.40.2", "vcodec": "none"}
+    assert local["formats"] == [source]
+    assert {k: local[k] for k in source} == source
+    assert (local["id"], local["title"]) == ("abc", "Song")
+    for key in ("requested_formats", "requested_downloads", "filepath", "http_headers"):
+        assert key not in local
@@ -0,0 +1,164 @@
+import pytest
+
+from mdl.core.config import Defaults
+from mdl.core.journal import (
+    STATE_DONE,
+    STATE_FAILED,
+    STATE_QUEUED,
+    STATE_RETRYABLE,
+    STATE_RUNNING,
+    JobJournal,
+    JobSpec,
+    retry_delay,
+)
+
+
+@pytest.fixture
+def journal(tmp_path):
+    return JobJournal(tmp_path / "jobs.sqlite3")
+
+
+def _run(journal, *urls):
+    return journal.create_run("batch", "audio", "list.txt", [JobSpec(url=u) for u in urls], options={"jobs": 2})
+
+
+def _state(journal, run_id, seq):
+    return journal.jobs(run_id)[seq].state
+
+
+def test_retry_delay_doubles_and_is_capped():
+    assert retry_delay(0) == retry_delay(1) == Defaults.job_retry_backoff
+    assert retry_delay(2) == 2 * Defaults.job_retry_backoff
+    assert retry_delay(3) == 4 * Defaults.job_retry_backoff
+    assert retry_delay(50) == Defaults.job_retry_backoff_max
+
+
+def test_new_run_jobs_are_queued_in_list_order(journal):
+    run_id = _run(journal, "https://a.example/1", "https://a.example/2")
+    jobs = journal.runnable(run_id)
+    assert [j.spec.url for j in jobs] == ["https://a.example/1", "https://a.example/2"]
+    assert all(j.state == STATE_QUEUED and j.attempts == 0 for j in jobs)
+
+
+def test_finish_success_is_done(journal):
+    run_id = _run(journal, "https://a.example/1")
+    journal.start(run_id, 0)
+    assert _state(journal, run_id, 0) == STATE_RUNNING
+    assert journal.finish(run_id, 0, 0, error="ignored") == STATE_DONE
+    job = journal.jobs(run_id)[0]
+    assert job.attempts == 1 and job.last_error is None
+    assert journal.finish_run(run_id)
+
+
+def test_finish_failure_backs_off_then_fails_out_of_attempts(journal):
+    run_id = _run(journal, "https://a.example/1")
+    for attempt in range(1, Defaults.job_max_attempts):
+        journal.start(run_id, 0)
+        before = journal.jobs(run_id)[0]
+        assert journal.finish(run_id, 0, 1, error="boom") == STATE_RETRYABLE
+        job = journal.jobs(run_id)[0]
+        assert job.attempts == attempt == before.attempts
+        assert job.next_eligible > 0
+        assert journal.runnable(run_id) == []
+        assert journal.next_eligible(run_id) == job.next_eligible
+        assert [j.seq for j in journal.runnable(run_id, now=job.next_eligible)] == [0]
+        assert not journal.finish_run(run_id)
+    journal.start(run_id, 0)
+    assert journal.finish(run_id, 0, 1) == STATE_FAILED
+    job = journal.jobs(run_id)[0]
+    assert job.last_error == "exit code 1"
+    assert journal.next_eligible(run_id) is None
+    assert journal.finish_run(run_id)
+
+
+def test_finish_without_retry_fails_at_once(journal):
+    run_id = _run(journal, "https://a.example/1")
+    journal.start(run_id, 0)
+    assert journal.finish(run_id, 0, 1, error="unavailable: gone", retry=False) == STATE_FAILED
+    assert journal.jobs(run_id)[0].last_error == "unavailable: gone"
+
+
+def test_cancelled_job_is_queued_again_without_using_an_attempt(journal):
+    run_id = _run(journal, "https://a.example/1")
+    journal.start(run_id, 0)
+    assert journal.finish(run_id, 0, 130) == STATE_QUEUED
+    job = journal.jobs(run_id)[0]
+    assert job.attempts == 0 and job.last_error == "cancelled"
+
+
+def test_requeue_running_gives_the_attempt_back(journal):
+    run_id = _run(journal, "https://a.example/1", "https://a.example/2")
+    journal.start(run_id, 0)
+    journal.start(run_id, 1)
+    journal.finish(run_id, 1, 0)
+    journal.requeue_running(run_id)
+    first, second = journal.jobs(run_id)
+    assert (first.state, first.attempts) == (STATE_QUEUED, 0)
+    assert (second.state, second.attempts) == (STATE_DONE, 1)
+
+
+def test_claim_run_retries_interrupted_jobs_at_once(journal):
+    run_id = _run(journal, "https://a.example/1", "https://a.example/2", "https://a.example/3")
+    journal.start(run_id, 0)  # left running by a crash
+    journal.start(run_id, 1)
+    journal.finish(run_id, 1, 1, error="timed out")  # waiting out its backoff
+    journal.start(run_id, 2)
+    journal.finish(run_id, 2, 0)
+
+    run = journal.claim_run(run_id)
+    assert run.counts == {STATE_RETRYABLE: 2, STATE_DONE: 1}
+    interrupted, backing_off, _ = journal.jobs(run_id)
+    assert interrupted.last_error == "interrupted"
+    assert backing_off.last_error == "timed out"
+    assert [j.seq for j in journal.runnable(run_id)] == [0, 1]
+
+
+def test_claim_run_fails_interrupted_jobs_out_of_attempts(journal):
+    run_id = _run(journal, "https://a.example/1")
+    for _ in range(Defaults.job_max_attempts - 1):
+        journal.start(run_id, 0)
+        journal.finish(run_id, 0, 1)
+    journal.start(run_id, 0)
+    assert journal.claim_run(run_id).counts == {STATE_FAILED: 1}
+
+
+def test_claim_run_retry_failed_resets_attempts(journal):
+    run_id = _run(journal, "https://a.example/1")
+    journal.start(run_id, 0)
+    journal.finish(run_id, 0, 1, retry=False)
+    assert journal.finish_run(run_id)
+    with pytest.raises(SystemExit):
+        journal.claim_run(run_id + 1)
+
+    run = journal.claim_run(run_id, retry_failed=True)
+    assert run.finished_at is None
+    job = journal.jobs(run_id)[0]
+    assert (job.state, job.attempts) == (STATE_QUEUED, 0)
+
+
+def test_claim_run_refuses_a_finished_run(journal):
+    run_id = _run(journal, "https://a.example/1")
+    journal.start(run_id, 0)
+    journal.finish(run_id, 0, 0)
+    journal.finish_run(run_id)
+    with pytest.raises(SystemExit):
+        journal.claim_run(run_id)
+
+
+def test_prune_keeps_unfinished_runs(journal):
+    unfinished = _run(journal, "https://a.example/1")
+    journal.start(unfinished, 0)
+    journal.finish(unfinished, 0, 1, error="timed out")
+    finished = _run(journal, "https://a.example/2")
+    journal.start(finished, 0)
+    journal.finish(finished, 0, 0)
+    assert journal.finish_run(finished)
+
+    for n in range(Defaults.journal_keep_runs):
+        _run(journal, f"https://b.example/{n}")
+
+    assert journal.get_run(finished) is None
+    assert journal.get_run(unfinished) is not None
+    [job] = journal.jobs(unfinished)
+    assert (job.state, job.last_error) == (STATE_RETRYABLE, "timed out")
+    assert not journal.finish_run(unfinished)
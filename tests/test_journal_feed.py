@@ -0,0 +1,42 @@
+from mdl.core.config import Defaults
+from mdl.core.journal import STATE_DONE, open_journal
+from mdl.core.options import RunOptions
+from mdl.infra.pool import FairQueue
+from mdl.services.journal_service import JournalFeed, journal_run
+from mdl.services.pool_service import WorkItem
+
+
+def _run_opts(tmp_path):
+    return RunOptions(
+        out_dir=tmp_path / "library", preset="fast", cookies_from=None, cover=False, audio_format="m4a",
+        video_format="mp4", engine="subprocess", limit_rate=None, sleep_min=None, sleep_max=None,
+    )
+
+
+def _add(feed, queue, run_opts, url):
+    run_id = journal_run("watch", "audio", "inbox", [WorkItem(url=url)], jobs=1, pp_jobs=None)
+    feed.add(run_id, "audio", run_opts, label=f"watch run {run_id}")
+    item = queue.get()
+    item.on_start()
+    return run_id, item
+
+
+def test_a_long_running_watch_run_outlives_the_runs_after_it(tmp_path, capsys):
+    queue = FairQueue(lambda item: item.url)
+    feed = JournalFeed(queue)
+    run_opts = _run_opts(tmp_path)
+    first, slow = _add(feed, queue, run_opts, "https://slow.example/1")
+
+    for n in range(Defaults.journal_keep_runs + 1):
+        _, item = _add(feed, queue, run_opts, f"https://fast.example/{n}")
+        item.on_done(0, None)
+
+    journal = open_journal()
+    assert len(journal.recent_runs(limit=1000)) == Defaults.journal_keep_runs + 1
+    assert journal.get_run(first).finished_at is None
+
+    slow.on_done(0, None)
+    run = journal.get_run(first)
+    assert run.finished_at is not None
+    assert [j.state for j in journal.jobs(first)] == [STATE_DONE]
+    assert f"watch run {first}" in capsys.readouterr().out
@@ -0,0 +1,58 @@
+from mdl.core.probe import format_table, summarize_info, summarize_playlist
+
+INFO = {
+    "id": "abc",
+    "title": "Song",
+    "extractor_key": "Youtube",
+    "duration": 200,
+    "formats": [
+        {"format_id": "140", "ext": "m4a", "vcodec": "none", "acodec": "mp4a.40.2", "abr": 129.5, "tbr": 129.5,
+         "filesize": 3_200_000, "url": "https://cdn.example/a"},
+        {"format_id": "137", "ext": "mp4", "width": 1920, "height": 1080, "fps": 30, "vcodec": "avc1", "acodec": "none",
+         "tbr": 4000, "filesize_approx": 99_000_000},
+        {"format_id": "sb0", "ext": "mhtml", "vcodec": "none", "acodec": "none", "tbr": 8},
+        "not a format",
+    ],
+}
+
+
+def test_summarize_info_keeps_identity_and_format_fields():
+    summary = summarize_info("https://youtu.be/abc", INFO)
+    assert {k: summary[k] for k in ("url", "id", "title", "extractor", "duration")} == {
+        "url": "https://youtu.be/abc", "id": "abc", "title": "Song", "extractor": "Youtube", "duration": 200.0,
+    }
+    audio, video, storyboard = summary["formats"]
+    assert audio == {
+        "format_id": "140", "ext": "m4a", "vcodec": "none", "acodec": "mp4a.40.2", "abr": 129.5, "tbr": 129.5,
+        "filesize": 3_200_000,
+    }
+    assert (video["filesize"], video["filesize_approx"]) == (99_000_000, True)
+    # No size given: estimated from the bitrate (KBit/s) and the duration.
+    assert (storyboard["filesize"], storyboard["filesize_approx"]) == (200_000, True)
+
+
+def test_summarize_info_without_formats_describes_the_item_itself():
+    summary = summarize_info("https://example.com/a.mp3", {"id": "a", "ext": "mp3", "format_id": "mp3", "filesize": 10})
+    assert summary["duration"] is None
+    assert summary["formats"] == [{"format_id": "mp3", "ext": "mp3", "filesize": 10}]
+
+
+def test_summarize_playlist_adds_the_known_durations():
+    summary = summarize_playlist("https://example.com/list", "PL1", "Mix", [60.0, None, 30.5])
+    assert (summary["type"], summary["entries"], summary["duration"]) == ("playlist", 3, 90.5)
+    assert summarize_playlist("https://example.com/list", None, "Mix", [None])["duration"] is None
+
+
+def test_format_table_aligns_the_columns():
+    head, header, audio, video, storyboard = format_table(summarize_info("https://youtu.be/abc", INFO))
+    assert head == "[mdl] info: Song [abc] 3:20"
+    assert header.split() == ["ID", "EXT", "RESOLUTION", "FPS", "FILESIZE", "TBR", "VCODEC", "ACODEC", "ABR"]
+    assert audio.split() == ["140", "m4a", "audio", "only", "3.05MiB", "130k", "none", "mp4a.40.2", "130k"]
+    assert video.split() == ["137", "mp4", "1920x1080", "30", "~94.41MiB", "4000k", "avc1", "none"]
+    assert storyboard.split()[4] == "~195.31KiB"
+    assert header.index("EXT") == audio.index("m4a") == video.index("mp4")
+
+
+def test_format_table_for_a_playlist_is_one_line():
+    summary = summarize_playlist("https://example.com/list", "PL1", "Mix", [3600.0, 1.0])
+    assert format_table(summary) == ["[mdl] info: Mix [PL1] 1:00:01, playlist of 2 entries"]
@@ -0,0 +1,86 @@
+import errno
+import os
+
+import pytest
+
+from mdl.services import scratch
+from mdl.services.scratch import Scratch, parse_size
+
+
+def _scratch(tmp_path):
+    box = Scratch(tmp_path / "scratch", "audio", "https://example.com/a", tmp_path / "library")
+    box.dir.mkdir(parents=True)
+    return box
+
+
+def _cross_device(monkeypatch):
+    def _rename(src, dest):
+        raise OSError(errno.EXDEV, "Invalid cross-device link")
+
+    monkeypatch.setattr(scratch.os, "rename", _rename)
+
+
+def test_publish_moves_the_file_into_the_library(tmp_path):
+    box = _scratch(tmp_path)
+    src = box.dir / "Artist" / "song.m4a"
+    src.parent.mkdir()
+    src.write_bytes(b"audio")
+    assert box.publish(str(src)) == str(tmp_path / "library" / "Artist" / "song.m4a")
+    assert (tmp_path / "library" / "Artist" / "song.m4a").read_bytes() == b"audio"
+    assert not src.exists()
+    assert box.failed == [] and box.kept == []
+
+
+def test_publish_keeps_an_existing_library_file(tmp_path):
+    box = _scratch(tmp_path)
+    dest = tmp_path / "library" / "song.m4a"
+    dest.parent.mkdir()
+    dest.write_bytes(b"old")
+    src = box.dir / "song.m4a"
+    src.write_bytes(b"new")
+    assert box.publish(str(src)) == str(dest)
+    assert dest.read_bytes() == b"old"
+    assert not src.exists()
+    assert box.kept == [str(dest)]
+
+
+def test_publish_leaves_files_outside_the_scratch_directory(tmp_path):
+    box = _scratch(tmp_path)
+    other = tmp_path / "library" / "song.m4a"
+    assert box.publish(str(other)) == str(other)
+
+
+def test_publish_across_filesystems_copies_then_renames(tmp_path, monkeypatch):
+    _cross_device(monkeypatch)
+    box = _scratch(tmp_path)
+    src = box.dir / "song.m4a"
+    src.write_bytes(b"audio")
+    dest = tmp_path / "library" / "song.m4a"
+    assert box.publish(str(src)) == str(dest)
+    assert dest.read_bytes() == b"audio"
+    assert not src.exists()
+    assert list(dest.parent.iterdir()) == [dest]
+
+
+def test_failed_copy_across_filesystems_leaves_no_partial_file(tmp_path, monkeypatch):
+    _cross_device(monkeypatch)
+
+    def _replace(src, dest):
+        raise OSError(errno.ENOSPC, "No space left on device")
+
+    monkeypatch.setattr(scratch.os, "replace", _replace)
+    box = _scratch(tmp_path)
+    src = box.dir / "song.m4a"
+    src.write_bytes(b"audio")
+    assert box.publish(str(src)) is None
+    assert len(box.failed) == 1
+    assert src.exists()
+    assert os.listdir(tmp_path / "library") == []
+
+
+def test_parse_size():
+    assert parse_size("500M") == 500 * 1024**2
+    assert parse_size("1.5GiB") == int(1.5 * 1024**3)
+    assert parse_size("2tb") == 2 * 1024**4
+    with pytest.raises(ValueError):
+        parse_size("lots")
@@ -0,0 +1,54 @@
+from mdl.core.sync_state import SyncState, is_synced, open_sync_state
+
+
+def test_known_by_id_or_older_than_the_newest_listed(tmp_path):
+    state = SyncState(tmp_path / "state.json")
+    assert not state.known("a", "20240101")
+    state.mark_seen("a")
+    state.listed(["20240301", None, "20240201"])
+    assert state.newest == "20240301"
+    assert state.known("a", None)
+    assert state.known("b", "20240215")       # older than the newest listed
+    assert not state.known("c", "20240301")   # same day: may be new
+    assert not state.known("d", None)          # no date: only ids count
+
+
+def test_listed_keeps_the_newest_date_seen(tmp_path):
+    state = SyncState(tmp_path / "state.json")
+    state.listed(["20240301"])
+    state.listed(["20240101"])
+    assert state.newest == "20240301"
+    assert state.full_at == 0.0
+
+
+def test_complete_walk_forgets_removed_entries(tmp_path):
+    state = SyncState(tmp_path / "state.json")
+    for entry_id in ("a", "b", "c"):
+        state.mark_seen(entry_id)
+    assert state.listed(["20240101"], complete_ids={"a", "c", "z"}) == 1
+    assert state.seen == {"a", "c"}
+    assert state.full_at > 0
+
+
+def test_state_survives_a_reload(tmp_path):
+    path = tmp_path / "state.json"
+    state = SyncState(path)
+    state.mark_seen("a")
+    state.listed(["20240301"], complete_ids={"a"})
+    again = SyncState(path)
+    assert (again.seen, again.newest, again.full_at) == ({"a"}, "20240301", state.full_at)
+
+
+def test_corrupt_state_starts_empty(tmp_path):
+    path = tmp_path / "state.json"
+    path.write_text("{not json", encoding="utf-8")
+    state = SyncState(path)
+    assert (state.seen, state.newest, state.full_at) == (set(), None, 0.0)
+
+
+def test_is_synced_per_kind_and_url():
+    url = "https://www.youtube.com/@someone/videos"
+    assert not is_synced("audio", url)
+    open_sync_state("audio", url).listed([])
+    assert is_synced("audio", url)
+    assert not is_synced("video", url)
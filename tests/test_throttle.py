@@ -0,0 +1,80 @@
+import pytest
+
+from mdl.core import throttle
+from mdl.core.config import Defaults
+from mdl.core.throttle import HostLimits, ThrottleController, parse_rate
+
+URL = "https://www.example.com/watch?v=1"
+MIB = 1024 * 1024
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1_000_000.0]
+    monkeypatch.setattr(throttle.time, "time", lambda: now[0])
+    return now
+
+
+def _controller(tmp_path, preset):
+    return ThrottleController(tmp_path / "throttle.json", preset)
+
+
+def test_throttling_halves_the_rate_and_doubles_the_sleep(tmp_path, clock):
+    ctl = _controller(tmp_path, "safe")
+    assert ctl.limits("example.com") == HostLimits(rate=MIB, sleep=5.0)
+    assert ctl.record(URL, ok=False, throttled=True) == HostLimits(rate=MIB // 2, sleep=10.0)
+    assert ctl.record(URL, ok=False, throttled=True) == HostLimits(rate=MIB // 4, sleep=20.0)
+    assert ctl.limits("example.com") == HostLimits(rate=MIB // 4, sleep=20.0)
+
+
+def test_clean_runs_ramp_up_at_most_once_per_interval(tmp_path, clock):
+    ctl = _controller(tmp_path, "safe")
+    assert ctl.record(URL, ok=True, throttled=False) == HostLimits(rate=int(MIB * 1.25), sleep=3.75)
+    assert ctl.record(URL, ok=True, throttled=False) is None  # too soon
+    clock[0] += Defaults.throttle_increase_every
+    rate = int(int(MIB * 1.25) * 1.25)
+    assert ctl.record(URL, ok=True, throttled=False) == HostLimits(rate=rate, sleep=3.75 * 0.75)
+    assert ctl.limits("example.com") == HostLimits(rate=rate, sleep=2.81)  # stored rounded
+
+
+def test_failures_without_throttling_change_nothing(tmp_path, clock):
+    ctl = _controller(tmp_path, "safe")
+    assert ctl.record(URL, ok=False, throttled=False) is None
+    assert ctl.limits("example.com") == HostLimits(rate=MIB, sleep=5.0)
+
+
+def test_safe_preset_stays_within_its_bounds(tmp_path, clock):
+    ctl = _controller(tmp_path, "safe")
+    for _ in range(20):
+        ctl.record(URL, ok=False, throttled=True)
+    assert ctl.limits("example.com") == HostLimits(
+        rate=parse_rate(Defaults.throttle_min_rate), sleep=Defaults.throttle_max_sleep
+    )
+    for _ in range(40):
+        clock[0] += Defaults.throttle_increase_every
+        ctl.record(URL, ok=True, throttled=False)
+    assert ctl.limits("example.com") == HostLimits(
+        rate=parse_rate(Defaults.throttle_max_rate), sleep=Defaults.throttle_safe_min_sleep
+    )
+
+
+def test_fast_preset_limits_a_host_only_until_it_recovers(tmp_path, clock):
+    ctl = _controller(tmp_path, "fast")
+    assert ctl.limits("example.com") == HostLimits(rate=None, sleep=0.0)
+    assert ctl.record(URL, ok=True, throttled=False) is None  # already unlimited
+    backoff = parse_rate(Defaults.throttle_backoff_rate)
+    assert ctl.record(URL, ok=False, throttled=True) == HostLimits(rate=backoff // 2, sleep=2.0)
+    limits = []
+    for _ in range(10):
+        clock[0] += Defaults.throttle_increase_every
+        changed = ctl.record(URL, ok=True, throttled=False)
+        if changed is not None:
+            limits.append(changed)
+    assert limits[-1] == HostLimits(rate=None, sleep=0.0)
+    assert ctl.limits("example.com") == HostLimits(rate=None, sleep=0.0)
+
+
+def test_presets_keep_separate_state(tmp_path, clock):
+    _controller(tmp_path, "fast").record(URL, ok=False, throttled=True)
+    assert _controller(tmp_path, "safe").limits("example.com") == HostLimits(rate=MIB, sleep=5.0)
+    assert _controller(tmp_path, "fast").limits("example.com").rate is not None
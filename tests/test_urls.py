@@ -0,0 +1,81 @@
+import pytest
+
+from mdl.core.urls import (
+    KIND_CHANNEL,
+    KIND_PLAYLIST,
+    KIND_UNKNOWN,
+    KIND_VIDEO,
+    SITE_GENERIC,
+    SITE_YOUTUBE,
+    canonical_url,
+    classify_url,
+    dedupe_urls,
+    media_key,
+)
+
+VIDEO = "https://www.youtube.com/watch?v=dQw4w9WgXcQ"
+
+
+@pytest.mark.parametrize("url", [
+    "https://youtu.be/dQw4w9WgXcQ",
+    "https://youtu.be/dQw4w9WgXcQ?si=share123",
+    "https://www.youtube.com/watch?v=dQw4w9WgXcQ&list=PLabc123&index=3",
+    "https://music.youtube.com/watch?v=dQw4w9WgXcQ&feature=share",
+    "https://m.youtube.com/watch?v=dQw4w9WgXcQ",
+    "https://www.youtube.com/shorts/dQw4w9WgXcQ",
+    "https://www.youtube-nocookie.com/embed/dQw4w9WgXcQ",
+    "www.youtube.com/watch?v=dQw4w9WgXcQ#t=42",
+    "  https://www.youtube.com/watch?v=dQw4w9WgXcQ  ",
+])
+def test_youtube_video_shapes_share_one_canonical_url(url):
+    target = classify_url(url)
+    assert (target.site, target.kind, target.id) == (SITE_YOUTUBE, KIND_VIDEO, "dQw4w9WgXcQ")
+    assert target.url == VIDEO
+
+
+def test_youtube_playlist():
+    target = classify_url("https://music.youtube.com/playlist?list=PLabc123&si=x")
+    assert (target.kind, target.id) == (KIND_PLAYLIST, "PLabc123")
+    assert target.url == "https://www.youtube.com/playlist?list=PLabc123"
+
+
+def test_youtube_channel_tab():
+    target = classify_url("https://www.youtube.com/@someone/videos/")
+    assert (target.kind, target.id) == (KIND_CHANNEL, "@someone")
+    assert target.url == "https://www.youtube.com/@someone/videos"
+
+
+def test_generic_url_loses_only_tracking_parameters_and_fragment():
+    url = "HTTPS://Example.COM:443/media/clip?id=7&utm_source=x&fbclid=y#top"
+    target = classify_url(url)
+    assert (target.site, target.kind, target.id) == (SITE_GENERIC, KIND_UNKNOWN, None)
+    assert target.url == "https://example.com/media/clip?id=7"
+    assert canonical_url("http://example.com:8080/a") == "http://example.com:8080/a"
+
+
+def test_generic_list_parameter_is_a_playlist():
+    assert classify_url("https://example.com/show?list=9").kind == KIND_PLAYLIST
+
+
+@pytest.mark.parametrize("url", ["ytsearch5:lofi", "/home/me/clip.mp4", "https://example.com:bad/x"])
+def test_pseudo_and_malformed_urls_pass_through(url):
+    target = classify_url(url)
+    assert (target.site, target.kind, target.url) == (SITE_GENERIC, KIND_UNKNOWN, url)
+
+
+def test_dedupe_urls_keeps_first_seen_canonical_order():
+    urls, dropped = dedupe_urls([
+        "https://youtu.be/dQw4w9WgXcQ",
+        "https://example.com/a?utm_medium=mail",
+        "https://www.youtube.com/watch?v=dQw4w9WgXcQ&list=PLabc123",
+        "https://example.com/a",
+        "https://example.com/b",
+    ])
+    assert urls == [VIDEO, "https://example.com/a", "https://example.com/b"]
+    assert dropped == 2
+
+
+def test_media_key_only_for_single_videos_of_known_sites():
+    assert media_key("https://youtu.be/dQw4w9WgXcQ") == ("Youtube", "dQw4w9WgXcQ")
+    assert media_key("https://www.youtube.com/playlist?list=PLabc123") is None
+    assert media_key("https://example.com/clip.mp4") is None
@@ -0,0 +1,103 @@
+import threading
+import time
+
+import pytest
+
+from mdl.core.config import Defaults
+from mdl.core.journal import STATE_DONE, STATE_FAILED, STATE_QUEUED, STATE_RETRYABLE, JobSpec
+from mdl.core.work_queue import STATE_LEASED, WorkQueue
+from mdl.services.coordinator_client import RemoteQueue
+from mdl.services.coordinator_service import _Server
+
+
+@pytest.fixture
+def queue(tmp_path):
+    return WorkQueue(tmp_path / "queue.sqlite3")
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """time.time() that tests move forward by hand."""
+    now = [time.time()]
+    monkeypatch.setattr(time, "time", lambda: now[0])
+    return now
+
+
+def _specs(*ids):
+    return [JobSpec(url=f"https://example.com/{i}") for i in ids]
+
+
+def test_add_skips_known_urls_and_requeues_failed_ones(queue):
+    assert queue.add("audio", _specs(1, 2)) == 2
+    assert queue.add("audio", _specs(2, 3)) == 1
+    assert queue.add("video", _specs(1)) == 1  # kinds are separate
+    [job] = queue.lease("w1", 1)
+    queue.finish("w1", job.id, 1, retry=False)
+    assert queue.add("audio", [job.spec]) == 1
+    assert queue.status()["counts"] == {STATE_QUEUED: 4}
+
+
+def test_lease_is_oldest_first_and_one_kind(queue):
+    queue.add("audio", _specs(1))
+    queue.add("video", _specs(2))
+    queue.add("audio", _specs(3))
+    jobs = queue.lease("w1", 5)
+    assert [(j.kind, j.spec.url) for j in jobs] == [("audio", "https://example.com/1"), ("audio", "https://example.com/3")]
+    assert all(j.attempts == 1 for j in jobs)
+    assert [j.kind for j in queue.lease("w2", 5)] == ["video"]
+    assert queue.lease("w3", 5) == []
+
+
+def test_expired_lease_goes_to_another_worker(queue, clock):
+    queue.add("audio", _specs(1))
+    [job] = queue.lease("w1", 1)
+    clock[0] += Defaults.lease_ttl / 2
+    assert queue.heartbeat("w1", [job.id]) == [job.id]
+    clock[0] += Defaults.lease_ttl - 1
+    assert queue.lease("w2", 1) == []  # renewed: still w1's
+
+    clock[0] += 2
+    [again] = queue.lease("w2", 1)
+    assert (again.id, again.attempts) == (job.id, 2)
+    assert queue.heartbeat("w1", [job.id]) == []
+    assert queue.finish("w1", job.id, 0) is None  # w1's late outcome is dropped
+    assert queue.finish("w2", job.id, 0) == STATE_DONE
+
+
+def test_lease_expiry_out_of_attempts_fails_the_job(queue, clock):
+    queue.add("audio", _specs(1))
+    for _ in range(Defaults.job_max_attempts):
+        assert len(queue.lease("w1", 1)) == 1
+        clock[0] += Defaults.lease_ttl + 1
+    status = queue.status()
+    assert status["counts"] == {STATE_FAILED: 1}
+    assert status["failed"][0]["last_error"] == "lease expired on w1"
+
+
+def test_finish_backs_off_and_release_gives_jobs_back(queue, clock):
+    queue.add("audio", _specs(1, 2))
+    first, second = queue.lease("w1", 2)
+    assert queue.finish("w1", first.id, 1, error="timed out") == STATE_RETRYABLE
+    assert queue.status()["counts"] == {STATE_RETRYABLE: 1, STATE_LEASED: 1}
+    assert queue.release("w1") == 1
+    [job] = queue.lease("w2", 2)  # the retry is still backing off
+    assert (job.id, job.attempts) == (second.id, 1)
+    clock[0] = queue.status()["next_eligible"]
+    assert [j.id for j in queue.lease("w2", 2)] == [first.id]
+    assert queue.status()["open"] == 2
+
+
+def test_coordinator_requires_the_token(queue):
+    server = _Server(("127.0.0.1", 0), queue, "secret")
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    try:
+        remote = RemoteQueue(base, "secret")
+        assert remote.add("audio", _specs(1)) == 1
+        assert [j.spec.url for j in remote.lease("w1", 1)] == ["https://example.com/1"]
+        for token in ("wrong", None):
+            with pytest.raises(SystemExit):
+                RemoteQueue(base, token).status()
+    finally:
+        server.shutdown()
+        server.server_close()